@@ -31,3 +31,15 @@ class Config(BaseModel):
     FMT_FRAME_INDEX_DIGITS: int = 8
     N_WORKERS: int = os.cpu_count()
     FRAME_EXTRACT_RESIZE_DIMS: int = 64
+
+    ###
+    # Inference config
+    ###
+
+    # Most videos passed to one `litpose predict` invocation when a model's
+    # sessions are coalesced into batches.
+    INFERENCE_MAX_VIDEOS_PER_PREDICT: int = 32
+
+    # Reuse predictions from a content-addressed cache under LP_SYSTEM_DIR/prediction_cache
+    # when a model predicts a video it has predicted before (re-imported, or forced rerun).
+    INFERENCE_PREDICTION_CACHE: bool = False
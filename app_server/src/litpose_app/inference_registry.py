@@ -0,0 +1,243 @@
+"""SQLite-backed registry of inference tasks, so batch inference survives server restarts.
+
+Inference state otherwise lives only in module globals of `routes/inference.py`.
+The registry persists, per task: its plan (one JSON object per step), status fields,
+and per step its state and subprocess PID.
+On startup the server reads back unfinished tasks to resume them or to reattach to
+step subprocesses that outlived the previous server process.
+
+The database lives at ``LP_SYSTEM_DIR/inference_tasks.sqlite``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+
+class StepState:
+    """String constants for the persisted state of one plan step."""
+
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
+
+@dataclass
+class PersistedStep:
+    """One plan step as stored in the registry."""
+
+    index: int
+    spec: dict
+    state: str
+    pid: int | None
+    pid_create_time: float | None
+
+
+@dataclass
+class PersistedTask:
+    """One inference task as stored in the registry."""
+
+    task_id: str
+    project_key: str | None
+    owner_pid: int | None
+    status: str
+    completed: int | None
+    total: int | None
+    error: str | None
+    message: str | None
+    created_at: float
+    updated_at: float
+    steps: list[PersistedStep]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    project_key TEXT,
+    owner_pid INTEGER,
+    status TEXT NOT NULL,
+    completed INTEGER,
+    total INTEGER,
+    error TEXT,
+    message TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    task_id TEXT NOT NULL REFERENCES tasks(task_id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    spec TEXT NOT NULL,
+    state TEXT NOT NULL,
+    pid INTEGER,
+    pid_create_time REAL,
+    started_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (task_id, idx)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks(status);
+"""
+
+_TASK_FIELDS = ("status", "completed", "total", "error", "message")
+
+
+class InferenceTaskRegistry:
+    """Thread-safe persistence of inference tasks in a small SQLite database."""
+
+    def __init__(self, db_path: Path) -> None:
+        """Open (creating if needed) the registry database at db_path."""
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection inside a transaction, serialized across threads."""
+        with self._lock:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                conn.execute("PRAGMA foreign_keys=ON")
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    # -----------------------------
+    # Writes
+    # -----------------------------
+
+    def create_task(
+        self, task_id: str, project_key: str | None, status: str, step_specs: list[dict]
+    ) -> None:
+        """Record a new task, owned by this process, with its plan; all steps start PENDING."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO tasks (task_id, project_key, owner_pid, status, completed, total, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, 0, ?, ?, ?)",
+                (task_id, project_key, os.getpid(), status, len(step_specs), now, now),
+            )
+            conn.executemany(
+                "INSERT INTO steps (task_id, idx, spec, state) VALUES (?, ?, ?, ?)",
+                [
+                    (task_id, i, json.dumps(spec), StepState.PENDING)
+                    for i, spec in enumerate(step_specs)
+                ],
+            )
+
+    def claim_task(self, task_id: str) -> None:
+        """Make this process the owner of a task (when resuming it after a restart)."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE tasks SET owner_pid = ?, updated_at = ? WHERE task_id = ?",
+                (os.getpid(), time.time(), task_id),
+            )
+
+    def update_task(self, task_id: str, **fields) -> None:
+        """Update status fields (status, completed, total, error, message) of a task."""
+        fields = {k: v for k, v in fields.items() if k in _TASK_FIELDS}
+        if not fields:
+            return
+        assignments = ", ".join(f"{k} = ?" for k in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE tasks SET {assignments}, updated_at = ? WHERE task_id = ?",
+                (*fields.values(), time.time(), task_id),
+            )
+
+    def step_started(
+        self,
+        task_id: str,
+        index: int,
+        pid: int | None = None,
+        pid_create_time: float | None = None,
+    ) -> None:
+        """Mark a step RUNNING, with the subprocess running it if already known."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE steps SET state = ?, pid = ?, pid_create_time = ?, "
+                "started_at = ? WHERE task_id = ? AND idx = ?",
+                (StepState.RUNNING, pid, pid_create_time, time.time(), task_id, index),
+            )
+
+    def step_pid(self, task_id: str, index: int, pid: int, pid_create_time: float | None) -> None:
+        """Record the subprocess running a step, so it can be found after a restart."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE steps SET pid = ?, pid_create_time = ? WHERE task_id = ? AND idx = ?",
+                (pid, pid_create_time, task_id, index),
+            )
+
+    def step_finished(self, task_id: str, index: int, ok: bool) -> None:
+        """Mark a step DONE or FAILED."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE steps SET state = ?, finished_at = ? WHERE task_id = ? AND idx = ?",
+                (StepState.DONE if ok else StepState.FAILED, time.time(), task_id, index),
+            )
+
+    def prune(self, keep_statuses: set[str], older_than_seconds: float) -> int:
+        """Delete tasks not in keep_statuses last updated before the cutoff. Returns count."""
+        cutoff = time.time() - older_than_seconds
+        placeholders = ", ".join("?" for _ in keep_statuses) or "''"
+        with self._connect() as conn:
+            cur = conn.execute(
+                f"DELETE FROM tasks WHERE updated_at < ? AND status NOT IN ({placeholders})",
+                (cutoff, *keep_statuses),
+            )
+            return cur.rowcount
+
+    # -----------------------------
+    # Reads
+    # -----------------------------
+
+    def get_task(self, task_id: str) -> PersistedTask | None:
+        """Return one task with its steps, or None if unknown."""
+        tasks = self._load("WHERE task_id = ?", (task_id,))
+        return tasks[0] if tasks else None
+
+    def list_tasks(self, statuses: set[str]) -> list[PersistedTask]:
+        """Return tasks whose status is in statuses, oldest first."""
+        if not statuses:
+            return []
+        placeholders = ", ".join("?" for _ in statuses)
+        return self._load(f"WHERE status IN ({placeholders})", tuple(statuses))
+
+    def _load(self, where: str, params: tuple) -> list[PersistedTask]:
+        """Load tasks matching a WHERE clause together with their steps."""
+        with self._connect() as conn:
+            task_rows = conn.execute(
+                "SELECT task_id, project_key, owner_pid, status, completed, total, error, message, "
+                f"created_at, updated_at FROM tasks {where} ORDER BY created_at",
+                params,
+            ).fetchall()
+            tasks = []
+            for row in task_rows:
+                step_rows = conn.execute(
+                    "SELECT idx, spec, state, pid, pid_create_time FROM steps "
+                    "WHERE task_id = ? ORDER BY idx",
+                    (row[0],),
+                ).fetchall()
+                steps = [
+                    PersistedStep(
+                        index=s[0],
+                        spec=json.loads(s[1]),
+                        state=s[2],
+                        pid=s[3],
+                        pid_create_time=s[4],
+                    )
+                    for s in step_rows
+                ]
+                tasks.append(PersistedTask(*row, steps=steps))
+        return tasks
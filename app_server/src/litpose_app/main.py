@@ -41,12 +41,14 @@ from starlette.staticfiles import StaticFiles
 from . import deps
 from .migrations import run_migrations_for_all_projects
 from .rootconfig import RootConfig
+from .routes.inference import get_eks_service, recover_inference_tasks
 from .routes.labeler.multiview_autolabel import warm_up_anipose
 from .routes.videos import cleanup_old_uploads
 from .train_scheduler import _train_scheduler_process_target
 from .utils.check_for_upgrade import check_for_upgrade
 from .utils.file_response import file_response
 from .utils.gpu_lock import clear_stale_gpu_task
+from .utils.train_wakeup import set_wake_event
 
 ## Setup logging
 logging.basicConfig(
@@ -56,16 +58,16 @@ logger = logging.getLogger(__name__)
 
 
 class NoisyEndpointFilter(logging.Filter):
-    """Filter out 200 OK logs for noisy polling endpoints."""
+    """Filter out 200 OK and 304 Not Modified logs for noisy polling endpoints."""
 
     def filter(self, record: logging.LogRecord) -> bool:
-        """Return False to suppress 200 OK logs for high-frequency polling paths."""
+        """Return False to suppress 200/304 logs for high-frequency polling paths."""
         # uvicorn access logs have the following format for record.args:
         # (client_addr, method, path, http_version, status_code)
         if record.args and len(record.args) >= 5:
             path = record.args[2]
             status_code = record.args[4]
-            if status_code == 200:
+            if status_code in (200, 304):
                 if path in ["/app/v0/rpc/listModels", "/app/v0/task/active"]:
                     return False
             if str(path).startswith("/app/v0/files/"):
@@ -94,6 +96,13 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     # a crash but is no longer actually running.
     clear_stale_gpu_task()
 
+    # Resume inference tasks interrupted by a previous shutdown, reattaching to any
+    # step subprocesses that are still running.
+    try:
+        await anyio.to_thread.run_sync(recover_inference_tasks)
+    except Exception:
+        logger.exception("Failed to recover inference tasks")
+
     # Start model train scheduler loop in a separate process
     try:
         logger.info("Starting train scheduler in a separate process...")
@@ -101,16 +110,22 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
         # This ensures a fresh process that doesn't inherit uvicorn's signal handlers,
         # allowing KeyboardInterrupt to work correctly without manual resets.
         ctx = multiprocessing.get_context("spawn")
+        # Lets createTrainTask and inference wake the scheduler instead of it polling.
+        wake_event = ctx.Event()
         _train_scheduler_process = ctx.Process(
-            target=_train_scheduler_process_target, daemon=True
+            target=_train_scheduler_process_target, args=(wake_event,), daemon=True
         )
         _train_scheduler_process.start()
+        set_wake_event(wake_event)
         logger.info(f"Started train scheduler process [{_train_scheduler_process.pid}]")
     except Exception:
         logger.exception("Failed to start train scheduler process")
 
     yield  # Application is now ready to receive requests
 
+    # Stop the warm EKS workers so they don't outlive the server.
+    get_eks_service().shutdown()
+
 
 app = FastAPI(lifespan=lifespan)
 
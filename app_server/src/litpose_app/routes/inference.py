@@ -2,30 +2,48 @@
 
 from __future__ import annotations
 
+import contextlib
 import copy
 import json
 import logging
 import math
 import os
+import re
+import shutil
+import signal
 import subprocess
 import sys
 import threading
 import time
 import uuid
-from collections.abc import Iterator
-from concurrent.futures import Future, ThreadPoolExecutor
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import asdict, dataclass, field
 from pathlib import Path
 
+import psutil
 import yaml
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from .. import deps
+from ..config import Config
 from ..datatypes import Project
 from ..deps import ProjectInfoGetter
-from ..utils.gpu_lock import gpu_lock_blocking, read_gpu_task
+from ..inference_registry import InferenceTaskRegistry, PersistedTask, StepState
+from ..utils.eks_service import EksJob, EksService
+from ..utils.frame_progress import FrameProgress
+from ..utils.gpu_lock import get_gpu_arbiter, gpu_devices, gpu_lock_blocking, read_gpu_tasks
+from ..utils.inference.progress import ENV_VAR as PROGRESS_ENV_VAR
+from ..utils.inference_metrics import ProcessMetrics, ProcessSampler, TaskMetrics
+from ..utils.log_store import TaskLogStore
+from ..utils.notifier import ChangeNotifier
+from ..utils.prediction_cache import PredictionCache
+from ..utils.prediction_index import PredictionIndex
+from ..utils.train_wakeup import wake_train_scheduler
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -37,8 +55,15 @@ router = APIRouter()
 _executor: ThreadPoolExecutor | None = None
 _status_lock = threading.RLock()
 _futures_by_task: dict[str, Future] = {}
-_active_procs_by_task: dict[str, subprocess.Popen] = {}
+# Popen for steps we launched, psutil.Process for steps reattached after a restart.
+# GPU and CPU steps of a task can run concurrently, hence a list per task.
+_active_procs_by_task: dict[str, list[subprocess.Popen | psutil.Process]] = {}
 _cancel_requests: set = set()
+# Environment restricting a task's subprocesses to its leased GPU, while it holds the lease.
+_device_env_by_task: dict[str, dict[str, str]] = {}
+# Wakes SSE streams of a task whenever its status or logs change.
+_notifier = ChangeNotifier()
+_prediction_index = PredictionIndex()
 
 
 def get_executor() -> ThreadPoolExecutor:
@@ -46,13 +71,19 @@ def get_executor() -> ThreadPoolExecutor:
     global _executor
     if _executor is None:
         cpu = os.cpu_count() or 2
-        workers = max(1, math.ceil(cpu / 10))
+        # At least one task per GPU slot, so tasks can run on different devices at once.
+        workers = max(1, math.ceil(cpu / 10), len(gpu_devices()))
         _executor = ThreadPoolExecutor(
             max_workers=workers, thread_name_prefix="model-infer"
         )
     return _executor  # type: ignore
 
 
+def get_prediction_index() -> PredictionIndex:
+    """Return the process-wide cache of prediction outputs used for skip detection."""
+    return _prediction_index
+
+
 # -----------------------------
 # Status tracking
 # -----------------------------
@@ -68,6 +99,15 @@ class InferenceStatus(str):
     CANCELLED = "CANCELLED"
 
 
+_TERMINAL_STATUSES = {InferenceStatus.COMPLETED, InferenceStatus.FAILED, InferenceStatus.CANCELLED}
+_ALL_STATUSES = {
+    InferenceStatus.PENDING,
+    InferenceStatus.WAITING,
+    InferenceStatus.RUNNING,
+    *_TERMINAL_STATUSES,
+}
+
+
 @dataclass
 class InferenceTaskStatus:
     """Mutable in-memory state for one inference task."""
@@ -77,6 +117,12 @@ class InferenceTaskStatus:
     total: int | None = None
     error: str | None = None
     message: str | None = None
+    # Aggregate throughput (frames, fps, peak memory) of the task's finished processes.
+    throughput: dict | None = None
+    # Frames predicted so far, estimated total, rate and ETA, from the progress channel.
+    frameProgress: dict | None = None
+    # Tasks ahead of this one in the GPU queue while it is WAITING (0: next in line).
+    queuePosition: int | None = None
     logs: list[str] = field(default_factory=list)
 
 
@@ -108,20 +154,61 @@ def set_status(task_id: str, **kwargs) -> None:
         st = _get_or_create_status_nolock(task_id)
         for k, v in kwargs.items():
             setattr(st, k, v)
+    _notifier.publish(task_id)
+    _persist("update_task", task_id, **kwargs)
+    if kwargs.get("status") in _TERMINAL_STATUSES:
+        _on_task_finished(task_id)
 
 
-def _status_snapshot_dict(task_id: str) -> dict:
-    """Return a JSON-serializable dict of the current status plus all accumulated log lines."""
-    st = get_or_create_status(task_id)
-    d = asdict(st)
+def _on_task_finished(task_id: str) -> None:
+    """Let the log store evict old finished tasks, and forget their status too."""
+    evicted = get_log_store().mark_finished(task_id)
+    if not evicted:
+        return
+    with _status_lock:
+        for tid in evicted:
+            _status_by_task.pop(tid, None)
+            _futures_by_task.pop(tid, None)
+            _cancel_requests.discard(tid)
+        evicted_set = set(evicted)
+        _task_id_order[:] = [tid for tid in _task_id_order if tid not in evicted_set]
+    for tid in evicted:
+        shutil.rmtree(_step_output_dir(tid), ignore_errors=True)
+
+
+def _status_snapshot_dict(task_id: str) -> dict | None:
+    """Return a JSON-serializable dict of the current status plus all accumulated log lines.
+
+    None if the task is unknown (never started here, or evicted after finishing).
+    """
+    with _status_lock:
+        st = _status_by_task.get(task_id)
+        if st is None:
+            return None
+        d = asdict(st)
     # Hydrate logs from the log buffer (status object doesn't store them)
     d["logs"] = _get_logs(task_id)
     return d
 
 
-def _stream_sse_sync(gen: Iterator[dict]) -> Iterator[str]:
-    """Wrap a dict generator as SSE-formatted text/event-stream chunks."""
-    for payload in gen:
+def _status_event_dict(task_id: str) -> dict | None:
+    """Return the status fields of task_id (without logs) as an SSE status event.
+
+    None if the task is unknown; unlike `get_or_create_status`, nothing is inserted.
+    """
+    with _status_lock:
+        st = _status_by_task.get(task_id)
+        if st is None:
+            return None
+        d = asdict(st)
+    d.pop("logs", None)
+    d["type"] = "status"
+    return d
+
+
+async def _stream_sse(gen: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Wrap an async dict generator as SSE-formatted text/event-stream chunks."""
+    async for payload in gen:
         data = json.dumps(payload)
         yield f"data: {data}\n\n"
 
@@ -130,60 +217,375 @@ def _stream_sse_sync(gen: Iterator[dict]) -> Iterator[str]:
 # Log buffer
 # -----------------------------
 
-_logs_by_task: dict[str, list[str]] = {}
-_logs_lock = threading.RLock()
+_log_store: TaskLogStore | None = None
+_log_store_lock = threading.Lock()
+
+
+def get_log_store() -> TaskLogStore:
+    """Return (creating if needed) the log store; lines beyond its ring spill to LP_SYSTEM_DIR."""
+    global _log_store
+    with _log_store_lock:
+        if _log_store is None:
+            _log_store = TaskLogStore(deps.root_config().LP_SYSTEM_DIR / "inference_logs")
+            _log_store.remove_stale_spill_files()
+    return _log_store
 
 
 def _append_log(task_id: str, line: str) -> None:
-    """Append one log line to the in-memory log buffer for task_id (thread-safe)."""
-    with _logs_lock:
-        _logs_by_task.setdefault(task_id, []).append(line)
+    """Append one log line to the log store for task_id (thread-safe)."""
+    get_log_store().append(task_id, line)
+    _notifier.publish(task_id)
 
 
 def _get_logs(task_id: str, from_offset: int = 0) -> list[str]:
     """Return log lines for task_id starting at from_offset (thread-safe)."""
-    with _logs_lock:
-        return list(_logs_by_task.get(task_id, [])[from_offset:])
+    return get_log_store().get(task_id, from_offset)
 
 
 # -----------------------------
-# Subprocess helper
+# Persistence
 # -----------------------------
 
-def _run_subprocess_with_logging(task_id: str, cmd: list[str]) -> int:
-    """Run a subprocess, capturing stdout/stderr into the task log buffer. Returns exit code."""
-    proc = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,
+_registry: InferenceTaskRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_task_registry() -> InferenceTaskRegistry:
+    """Return (creating if needed) the on-disk task registry under LP_SYSTEM_DIR."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = InferenceTaskRegistry(
+                deps.root_config().LP_SYSTEM_DIR / "inference_tasks.sqlite"
+            )
+    return _registry
+
+
+def _persist(method: str, *args, **kwargs) -> None:
+    """Call a registry write method, logging rather than failing the task on errors."""
+    try:
+        getattr(get_task_registry(), method)(*args, **kwargs)
+    except Exception:
+        logger.exception("Failed to persist inference task state (%s)", method)
+
+
+_prediction_cache: PredictionCache | None = None
+_prediction_cache_lock = threading.Lock()
+
+
+def get_prediction_cache() -> PredictionCache:
+    """Return (creating if needed) the content-addressed prediction cache under LP_SYSTEM_DIR."""
+    global _prediction_cache
+    with _prediction_cache_lock:
+        if _prediction_cache is None:
+            _prediction_cache = PredictionCache(
+                deps.root_config().LP_SYSTEM_DIR / "prediction_cache"
+            )
+    return _prediction_cache
+
+
+@dataclass
+class _TaskTelemetry:
+    """Measurements of a running task: throughput metrics and frame-level progress."""
+
+    metrics: TaskMetrics
+    # Plan steps, used to label each process's metrics.
+    steps: list[InferStep]
+    # Set once the task knows how many videos it will predict.
+    frames: FrameProgress | None = None
+
+
+_metrics_dir: Path | None = None
+_telemetry_by_task: dict[str, _TaskTelemetry] = {}
+
+
+def get_metrics_dir() -> Path:
+    """Return the directory of persisted per-task throughput summaries under LP_SYSTEM_DIR."""
+    global _metrics_dir
+    if _metrics_dir is None:
+        _metrics_dir = deps.root_config().LP_SYSTEM_DIR / "inference_metrics"
+    return _metrics_dir
+
+
+def _metrics_path(task_id: str) -> Path:
+    """Return the persisted throughput summary of a task, kept after the task is evicted."""
+    return get_metrics_dir() / f"{task_id}.json"
+
+
+def _record_process_metrics(task_id: str, metrics: ProcessMetrics) -> None:
+    """Label a finished process's metrics with its steps and add them to the task summary."""
+    with _status_lock:
+        telemetry = _telemetry_by_task.get(task_id)
+    if telemetry is None:
+        return
+    steps = telemetry.steps
+    ran = [steps[i] for i in metrics.steps if 0 <= i < len(steps)]
+    if ran:
+        metrics.kind = ran[0].kind
+        metrics.model = ran[0].model_dir.name
+        metrics.sessions = [step.session for step in ran]
+    set_status(task_id, throughput=telemetry.metrics.add(metrics))
+
+
+def _follow_frame_progress(task_id: str, path: Path) -> Callable[[bool], None]:
+    """Return a poll function that feeds new progress channel lines into the task's progress.
+
+    Snapshots are published at most every FrameProgress.min_interval, or
+    immediately when the poll function is called with final=True.
+    """
+    follower = _OutputFollower(path, "")
+
+    def poll(final: bool = False) -> None:
+        """Read new progress lines and publish a snapshot if one is due."""
+        lines = follower.read_lines() + (follower.flush() if final else [])
+        with _status_lock:
+            telemetry = _telemetry_by_task.get(task_id)
+        frames = telemetry.frames if telemetry is not None else None
+        if frames is None:
+            return
+        for line in lines:
+            frames.update_from_line(line)
+        snapshot = frames.snapshot_if_due(force=final)
+        if snapshot is not None:
+            set_status(task_id, frameProgress=snapshot)
+
+    return poll
+
+
+def _step_to_spec(step: InferStep) -> dict:
+    """Serialize an InferStep to a JSON-compatible dict."""
+    return {
+        "kind": step.kind,
+        "model_dir": str(step.model_dir),
+        "session": step.session,
+        "video_paths": [str(p) for p in step.video_paths],
+        "member_of": str(step.member_of) if step.member_of is not None else None,
+        "member_dirs": [str(p) for p in step.member_dirs],
+        "ensemble_config": step.ensemble_config,
+    }
+
+
+def _step_from_spec(spec: dict) -> InferStep:
+    """Inverse of _step_to_spec."""
+    return InferStep(
+        kind=spec["kind"],
+        model_dir=Path(spec["model_dir"]),
+        session=spec["session"],
+        video_paths=[Path(p) for p in spec["video_paths"]],
+        member_of=Path(spec["member_of"]) if spec.get("member_of") else None,
+        member_dirs=[Path(p) for p in spec.get("member_dirs", [])],
+        ensemble_config=spec.get("ensemble_config") or {},
     )
+
+
+# -----------------------------
+# Subprocess helper
+# -----------------------------
+
+def _step_output_dir(task_id: str) -> Path:
+    """Directory holding the raw stdout/stderr files of a task's step subprocesses."""
+    return get_log_store().spill_dir / task_id
+
+
+def _step_output_paths(task_id: str, step_index: int | None) -> tuple[Path, Path]:
+    """Return the (stdout, stderr) file paths for one step subprocess."""
+    name = f"step{step_index}" if step_index is not None else f"proc{time.time_ns()}"
+    out_dir = _step_output_dir(task_id)
+    return out_dir / f"{name}.stdout", out_dir / f"{name}.stderr"
+
+
+class _OutputFollower:
+    """Incrementally reads complete lines from a growing output file."""
+
+    def __init__(self, path: Path, prefix: str) -> None:
+        """Follow path from its start, prefixing every line with prefix."""
+        self.path = path
+        self.prefix = prefix
+        self.offset = 0
+        self.partial = b""
+
+    def read_lines(self) -> list[str]:
+        """Return lines completed since the last call. \\r also ends a line (tqdm)."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return []
+        self.offset += len(chunk)
+        parts = re.split(rb"\r\n|\r|\n", self.partial + chunk)
+        self.partial = parts.pop()
+        return self._decode(parts)
+
+    def flush(self) -> list[str]:
+        """Return the trailing partial line, if any, once the writer has exited."""
+        parts, self.partial = [self.partial], b""
+        return self._decode(parts)
+
+    def _decode(self, parts: list[bytes]) -> list[str]:
+        """Decode non-empty raw lines and add the prefix."""
+        return [
+            f"{self.prefix}{p.decode('utf-8', errors='replace')}" for p in parts if p
+        ]
+
+
+def _follow_step_output(
+    task_id: str,
+    stdout_path: Path,
+    stderr_path: Path,
+    is_alive: Callable[[], bool],
+    on_poll: Callable[[], None] | None = None,
+    log_prefix: str = "",
+    metrics: ProcessMetrics | None = None,
+) -> None:
+    """Copy new output lines into the task log until the step process exits.
+
+    on_poll, if given, is called after every read, including the last one.
+    log_prefix tells apart the output of steps running concurrently.
+    LP_METRICS lines on stdout are added to metrics instead of the log.
+    """
+    followers = [
+        _OutputFollower(stdout_path, log_prefix),
+        _OutputFollower(stderr_path, f"{log_prefix}[stderr] "),
+    ]
+
+    def append(lines: list[str], is_stdout: bool) -> None:
+        """Log lines, diverting reported metrics."""
+        for line in lines:
+            if is_stdout and metrics is not None and metrics.add_reported(line[len(log_prefix):]):
+                continue
+            _append_log(task_id, line)
+
+    while True:
+        alive = is_alive()
+        for follower in followers:
+            append(follower.read_lines(), follower is followers[0])
+        if not alive:
+            for follower in followers:
+                append(follower.flush(), follower is followers[0])
+        if on_poll is not None:
+            on_poll()
+        if not alive:
+            return
+        time.sleep(0.1)
+
+
+def _pid_create_time(pid: int) -> float | None:
+    """Return the OS create time of pid, used to tell it apart from a reused PID."""
+    try:
+        return psutil.Process(pid).create_time()
+    except Exception:
+        return None
+
+
+def _is_process_alive(pid: int, create_time: float | None) -> bool:
+    """Return True if pid is running, not a zombie, and is the process started at create_time."""
+    try:
+        proc = psutil.Process(pid)
+        if create_time is not None and abs(proc.create_time() - create_time) > 1:
+            return False
+        return proc.status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+    except psutil.AccessDenied:
+        return True
+
+
+def _kill_step_process(proc: subprocess.Popen | psutil.Process) -> None:
+    """Kill a step subprocess together with its children (it leads its own process group)."""
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except Exception:
+        try:
+            proc.kill()
+        except Exception:
+            pass
+
+
+def _run_subprocess_with_logging(
+    task_id: str,
+    cmd: list[str],
+    step_index: int | None = None,
+    *,
+    shared_by: list[int] | None = None,
+    on_poll: Callable[[], None] | None = None,
+    log_prefix: str = "",
+) -> int:
+    """Run a subprocess, capturing stdout/stderr into the task log buffer. Returns exit code.
+
+    Output goes to files rather than pipes and the child gets its own session, so
+    the step keeps running if the server restarts and can be reattached to by PID.
+    shared_by lists every step run by this one process (a model worker); its PID
+    is recorded for all of them. Output files are named after step_index.
+
+    The process's wall time, peak memory and reported counters are added to the
+    task's throughput metrics. Its progress channel (see utils/inference/progress.py)
+    is a file next to stdout, feeding the task's frame-level progress.
+    """
+    stdout_path, stderr_path = _step_output_paths(task_id, step_index)
+    stdout_path.parent.mkdir(parents=True, exist_ok=True)
+    progress_path = stdout_path.with_suffix(".progress")
+    progress_path.unlink(missing_ok=True)
+    with _status_lock:
+        device_env = _device_env_by_task.get(task_id, {})
+    t0 = time.monotonic()
+    with open(stdout_path, "wb") as out, open(stderr_path, "wb") as err:
+        proc = subprocess.Popen(
+            cmd,
+            stdout=out,
+            stderr=err,
+            start_new_session=True,
+            env={
+                **os.environ,
+                **device_env,
+                "PYTHONUNBUFFERED": "1",
+                PROGRESS_ENV_VAR: str(progress_path),
+            },
+        )
     with _status_lock:
-        _active_procs_by_task[task_id] = proc
-
-    def _reader(pipe, prefix: str) -> None:
-        """Read lines from pipe and append each to the task log buffer."""
-        for line in iter(pipe.readline, ''):
-            stripped = line.rstrip('\n')
-            if stripped:
-                _append_log(task_id, f"{prefix}{stripped}")
-        pipe.close()
-
-    t_out = threading.Thread(target=_reader, args=(proc.stdout, ''), daemon=True)
-    t_err = threading.Thread(target=_reader, args=(proc.stderr, '[stderr] '), daemon=True)
-    t_out.start()
-    t_err.start()
+        _active_procs_by_task.setdefault(task_id, []).append(proc)
+    pid_steps = shared_by if shared_by is not None else [step_index]
+    create_time = _pid_create_time(proc.pid)
+    for i in pid_steps:
+        if i is not None:
+            _persist("step_pid", task_id, i, proc.pid, create_time)
+
+    metrics = ProcessMetrics(steps=[i for i in pid_steps if i is not None])
+    sampler = ProcessSampler(proc.pid)
+    poll_frames = _follow_frame_progress(task_id, progress_path)
+
+    def poll() -> None:
+        """Sample memory use and progress, then run the caller's poll hook."""
+        sampler.sample()
+        poll_frames(proc.poll() is not None)
+        if on_poll is not None:
+            on_poll()
+
     try:
+        _follow_step_output(
+            task_id, stdout_path, stderr_path, lambda: proc.poll() is None, poll, log_prefix,
+            metrics,
+        )
         ret = proc.wait()
     finally:
-        with _status_lock:
-            _active_procs_by_task.pop(task_id, None)
-    t_out.join()
-    t_err.join()
+        _forget_active_proc(task_id, proc)
+    metrics.wall_seconds = round(time.monotonic() - t0, 3)
+    metrics.peak_rss_mb = sampler.peak_rss_mb
+    metrics.peak_gpu_mb = sampler.peak_gpu_mb
+    _record_process_metrics(task_id, metrics)
     return ret
 
 
+def _forget_active_proc(task_id: str, proc: subprocess.Popen | psutil.Process) -> None:
+    """Remove a finished step process from the task's active processes."""
+    with _status_lock:
+        procs = _active_procs_by_task.get(task_id, [])
+        if proc in procs:
+            procs.remove(proc)
+        if not procs:
+            _active_procs_by_task.pop(task_id, None)
+
+
 # -----------------------------
 # Plan data structures
 # -----------------------------
@@ -199,6 +601,8 @@ class InferStep:
     member_of: Path | None = None          # parent EKS model dir, for kind='member'
     member_dirs: list[Path] = field(default_factory=list)   # for kind='eks'
     ensemble_config: dict = field(default_factory=dict)     # for kind='member' and 'eks'
+    stale: bool = False  # predictions exist but are older than their inputs
+    cached: bool = False  # every video's predictions are in the prediction cache
 
 
 @dataclass
@@ -243,27 +647,24 @@ def _session_to_videos(data_dir: Path, view_names: list[str]) -> dict[str, list[
     return result
 
 
-def _all_view_preds_exist(model_dir: Path, session: str, view_names: list[str]) -> bool:
-    """Return True if all expected prediction CSVs already exist for this model/session."""
-    preds_dir = model_dir / "video_preds"
+def _view_preds_mtimes(model_dir: Path, session: str, view_names: list[str]) -> list[float | None]:
+    """Return the mtime of each expected prediction CSV for this model/session (None if missing)."""
+    index = get_prediction_index()
     if view_names:
-        return all((preds_dir / f"{session}_{cam}.csv").exists() for cam in view_names)
-    return (preds_dir / f"{session}.csv").exists()
+        return [index.pred_mtime(model_dir, f"{session}_{cam}.csv") for cam in view_names]
+    return [index.pred_mtime(model_dir, f"{session}.csv")]
 
 
-def _is_model_completed(model_dir: Path) -> bool:
-    """Return True if the model is marked as COMPLETED in its train_status.json."""
-    status_path = model_dir / "train_status.json"
-    if status_path.is_file():
-        try:
-            status = json.loads(status_path.read_text())
-            return status.get("status") == "COMPLETED"
-        except Exception:
-            return False
-    # EKS models don't have train_status.json, but they are considered "completed" if ensemble.yaml exists
-    if (model_dir / "ensemble.yaml").is_file():
-        return True
-    return False
+def _preds_state(
+    model_dir: Path, session: str, view_names: list[str], not_before: float
+) -> str:
+    """Return 'missing', 'stale' (some CSV older than not_before) or 'fresh'."""
+    mtimes = _view_preds_mtimes(model_dir, session, view_names)
+    if any(m is None for m in mtimes):
+        return "missing"
+    if any(m < not_before for m in mtimes):
+        return "stale"
+    return "fresh"
 
 
 # -----------------------------
@@ -276,6 +677,7 @@ def _build_infer_plan(
     sessions: list[str],
     video_relative_paths: list[str] | None = None,
     force: bool = False,
+    use_cache: bool = False,
 ) -> InferPlan:
     """
     Build an ordered, skip-filtered list of inference steps.
@@ -283,6 +685,13 @@ def _build_infer_plan(
     If video_relative_paths is provided, sessions are derived from those paths.
     If sessions == ["all"], all videos in data_dir are discovered.
     Otherwise sessions is treated as a list of session names.
+
+    A (model, session) is skipped only if its predictions are newer than what
+    they derive from: the model's checkpoint and the session's videos, or for
+    EKS the member predictions. Stale predictions are queued again.
+
+    With use_cache, prediction steps whose outputs are all in the prediction
+    cache are flagged `cached` (an index lookup; no video is read).
     """
     view_names: list[str] = list(project.config.view_names or [])
     model_base = Path(project.paths.model_dir)
@@ -321,26 +730,49 @@ def _build_infer_plan(
         sess_to_vids = _session_to_videos(data_base, view_names)
         target_sessions = list(sess_to_vids.keys()) if sessions == ["all"] else sessions
 
+    index = get_prediction_index()
+    video_mtimes: dict[Path, float] = {}
+
+    def videos_mtime(session: str) -> float:
+        """Return the newest mtime among the session's videos, stat'ing each video once."""
+        newest = 0.0
+        for vp in sess_to_vids.get(session, []):
+            if vp not in video_mtimes:
+                try:
+                    video_mtimes[vp] = vp.stat().st_mtime
+                except OSError:
+                    video_mtimes[vp] = 0.0
+            newest = max(newest, video_mtimes[vp])
+        return newest
+
     steps: list[InferStep] = []
     skipped_count = 0
     seen_member_keys: set = set()
+    # (model_dir, session) pairs queued for prediction; their EKS output must be redone.
+    queued_preds: set = set()
 
     # Pass 1: normal models
     for model_dir in normal_model_dirs:
-        if not _is_model_completed(model_dir):
+        marker = index.model_marker(model_dir)
+        if not marker.completed:
             continue
         for session in target_sessions:
-            if (
-                not force
-                and _all_view_preds_exist(model_dir, session, view_names)
-            ):
+            state = _preds_state(
+                model_dir,
+                session,
+                view_names,
+                max(marker.completed_at or 0.0, videos_mtime(session)),
+            )
+            if not force and state == "fresh":
                 skipped_count += 1
             else:
+                queued_preds.add((model_dir, session))
                 steps.append(InferStep(
                     kind="normal",
                     model_dir=model_dir,
                     session=session,
                     video_paths=sess_to_vids.get(session, []),
+                    stale=state == "stale",
                 ))
 
     # Pass 1 (continued): member models required by EKS models
@@ -349,20 +781,26 @@ def _build_infer_plan(
         members = ensemble_config.get("members", [])
         member_dirs = [(model_base / m["id"]).resolve() for m in members]
 
-        for session in target_sessions:
-            for member_dir in member_dirs:
-                if not _is_model_completed(member_dir):
-                    continue
+        # Model-major order, so each member's sessions can share one model worker.
+        for member_dir in member_dirs:
+            marker = index.model_marker(member_dir)
+            if not marker.completed:
+                continue
+            for session in target_sessions:
                 key = (member_dir, session)
                 if key in seen_member_keys:
                     continue
                 seen_member_keys.add(key)
-                if (
-                    not force
-                    and _all_view_preds_exist(member_dir, session, ens_views)
-                ):
+                state = _preds_state(
+                    member_dir,
+                    session,
+                    ens_views,
+                    max(marker.completed_at or 0.0, videos_mtime(session)),
+                )
+                if not force and state == "fresh":
                     skipped_count += 1
                 else:
+                    queued_preds.add(key)
                     steps.append(InferStep(
                         kind="member",
                         model_dir=member_dir,
@@ -370,21 +808,34 @@ def _build_infer_plan(
                         video_paths=sess_to_vids.get(session, []),
                         member_of=eks_model_dir,
                         ensemble_config=ensemble_config,
+                        stale=state == "stale",
                     ))
 
     # Pass 2: EKS smoother steps
     for eks_model_dir, ensemble_config in eks_models:
-        if not _is_model_completed(eks_model_dir):
+        marker = index.model_marker(eks_model_dir)
+        if not marker.completed:
             continue
         ens_views = ensemble_config.get("view_names", view_names)
         members = ensemble_config.get("members", [])
         member_dirs = [(model_base / m["id"]).resolve() for m in members]
 
         for session in target_sessions:
-            if (
-                not force
-                and _all_view_preds_exist(eks_model_dir, session, ens_views)
-            ):
+            member_mtimes = [
+                m
+                for member_dir in member_dirs
+                for m in _view_preds_mtimes(member_dir, session, ens_views)
+                if m is not None
+            ]
+            state = _preds_state(
+                eks_model_dir,
+                session,
+                ens_views,
+                max([marker.completed_at or 0.0, *member_mtimes]),
+            )
+            if state == "fresh" and any((m, session) in queued_preds for m in member_dirs):
+                state = "stale"
+            if not force and state == "fresh":
                 skipped_count += 1
             else:
                 steps.append(InferStep(
@@ -394,8 +845,15 @@ def _build_infer_plan(
                     video_paths=sess_to_vids.get(session, []),
                     member_dirs=member_dirs,
                     ensemble_config=ensemble_config,
+                    stale=state == "stale",
                 ))
 
+    if use_cache:
+        cache = get_prediction_cache()
+        for step in steps:
+            if step.kind in ("normal", "member") and step.video_paths:
+                step.cached = all(cache.contains(step.model_dir, vp) for vp in step.video_paths)
+
     return InferPlan(steps=steps, skipped_count=skipped_count)
 
 
@@ -403,16 +861,14 @@ def _build_infer_plan(
 # Execution
 # -----------------------------
 
-def _run_eks_step(task_id: str, step: InferStep) -> bool:
-    """Run EKS smoother for a single (model, session) pair. Returns True on success."""
+def _run_eks_step(task_id: str, step: InferStep, step_index: int | None = None) -> bool:
+    """Run EKS smoother for a single (model, session) pair. Returns True on success.
+
+    The session is smoothed by the warm EKS worker pool. Cancelling stops
+    waiting for it; a session already being smoothed finishes in its worker.
+    """
     ensemble_config = step.ensemble_config
     view_names: list[str] = ensemble_config.get("view_names", [])
-    smooth_param: float = ensemble_config.get("smooth_param", 1000.0)
-    quantile_keep_pca: float = ensemble_config.get("quantile_keep_pca", 50.0)
-
-    eks_video_preds_dir = step.model_dir / "video_preds"
-    eks_video_preds_dir.mkdir(parents=True, exist_ok=True)
-    eks_script = Path(__file__).parent.parent / "scripts" / "run_eks.py"
 
     input_files: list[str] = []
     for member_dir in step.member_dirs:
@@ -423,22 +879,59 @@ def _run_eks_step(task_id: str, step: InferStep) -> bool:
                 return False
             input_files.append(str(pred_file))
 
-    cmd = [
-        sys.executable, str(eks_script),
-        "--save_dir", str(eks_video_preds_dir),
-        "--camera_names", *view_names,
-        "--smooth_param", str(smooth_param),
-        "--quantile_keep_pca", str(quantile_keep_pca),
-        "--input_files", *input_files,
-    ]
-    ret = _run_subprocess_with_logging(task_id, cmd)
-    if ret != 0:
+    job = EksJob(
+        session=step.session,
+        save_dir=step.model_dir / "video_preds",
+        camera_names=view_names,
+        input_files=input_files,
+        smooth_param=ensemble_config.get("smooth_param", 1000.0),
+        quantile_keep_pca=ensemble_config.get("quantile_keep_pca", 50.0),
+        chunk_frames=ensemble_config.get("chunk_frames"),
+        chunk_overlap_frames=ensemble_config.get("chunk_overlap_frames", 600),
+    )
+    t0 = time.monotonic()
+    future = get_eks_service().submit(job)
+    while True:
+        try:
+            result = future.result(timeout=0.2)
+            break
+        except FutureTimeoutError:
+            if _is_cancelled(task_id):
+                future.cancel()
+                return False
+    wall = time.monotonic() - t0
+
+    # EKS runs alongside GPU prediction, so its output lines are labelled.
+    prefix = f"[eks {step.session}] "
+    for line in result.output:
+        _append_log(task_id, f"{prefix}{line}")
+    _append_log(
+        task_id,
+        f"{prefix}--- smoothed {result.smooth_seconds:.1f}s, "
+        f"waited {max(0.0, wall - result.smooth_seconds):.1f}s for a worker ---",
+    )
+    _record_process_metrics(
+        task_id,
+        ProcessMetrics(
+            steps=[step_index] if step_index is not None else [],
+            wall_seconds=round(result.smooth_seconds, 3),
+            frames=result.frames,
+        ),
+    )
+    if not result.ok:
+        _append_log(task_id, f"{prefix}[error] {result.error}")
         _append_log(task_id, f"[error] EKS smoother failed for {step.model_dir.name} on {step.session}")
         return False
     return True
 
 
-def _start_batch_inference_background(task_id: str, plan: InferPlan, project_key: str) -> Future:
+def _start_batch_inference_background(
+    task_id: str,
+    plan: InferPlan,
+    project_key: str,
+    config: Config | None = None,
+    priority: int = 0,
+) -> Future:
     """Submit the inference plan to the thread pool, acquiring the GPU lock before each run."""
     with _status_lock:
         fut = _futures_by_task.get(task_id)
@@ -447,23 +940,73 @@ def _start_batch_inference_background(task_id: str, plan: InferPlan, project_key
 
     steps = plan.steps
     total = len(steps)
+    _persist(
+        "create_task",
+        task_id,
+        project_key,
+        InferenceStatus.WAITING,
+        [_step_to_spec(step) for step in steps],
+    )
     set_status(task_id, status=InferenceStatus.WAITING, completed=0, total=total, error=None)
+    return _submit_steps(task_id, steps, project_key, config=config, priority=priority)
+
+
+@dataclass
+class _OrphanStep:
+    """A step subprocess that survived a server restart and is still running.
+
+    A model worker runs several steps, so indices lists every RUNNING step of the
+    process; its output files are named after the first.
+    """
+
+    indices: list[int]
+    pid: int
+    create_time: float | None
+
+
+def _submit_steps(
+    task_id: str,
+    steps: list[InferStep],
+    project_key: str | None,
+    done: set[int] | None = None,
+    errors: list[str] | None = None,
+    orphan: _OrphanStep | None = None,
+    config: Config | None = None,
+    priority: int = 0,
+) -> Future:
+    """Run the not-yet-done steps of a task on the thread pool (see _run_steps)."""
+    total = len(steps)
+
+    def _gpu_lock() -> contextlib.AbstractContextManager:
+        """Lease a GPU slot, reporting the task's place in the GPU queue while it waits."""
+        return gpu_lock_blocking(
+            "inference",
+            task_id,
+            project_key=project_key,
+            priority=priority,
+            on_wait=lambda ahead: set_status(task_id, queuePosition=ahead),
+            cancelled=lambda: _is_cancelled(task_id),
+        )
 
     def _run() -> None:
-        """Acquire the GPU lock and execute all inference steps for this task."""
+        """Execute all inference steps for this task, taking the GPU lock for GPU steps."""
         try:
-            with gpu_lock_blocking("inference", task_id, project_key=project_key):
-                with _status_lock:
-                    if task_id in _cancel_requests:
-                        return
-                set_status(task_id, status=InferenceStatus.RUNNING)
-                _run_steps(task_id, steps, total)
+            _run_steps(
+                task_id,
+                steps,
+                total,
+                done=done,
+                errors=errors,
+                config=config,
+                gpu_lock=_gpu_lock,
+                orphan=orphan,
+            )
         except Exception as e:
             with _status_lock:
                 if task_id in _cancel_requests:
                     return
-            set_status(task_id, status=InferenceStatus.FAILED, error=f"Exception: {e}")
             _append_log(task_id, f"[error] Exception: {e}")
+            set_status(task_id, status=InferenceStatus.FAILED, error=f"Exception: {e}")
 
     future = get_executor().submit(_run)
     with _status_lock:
@@ -471,73 +1014,799 @@ def _start_batch_inference_background(task_id: str, plan: InferPlan, project_key
     return future
 
 
+def _step_outputs_exist(step: InferStep) -> bool:
+    """Return True if every prediction file a step should write exists."""
+    preds_dir = step.model_dir / "video_preds"
+    if step.kind == "eks":
+        views = step.ensemble_config.get("view_names", [])
+        return bool(views) and all(
+            (preds_dir / f"{step.session}_{v}.csv").exists() for v in views
+        )
+    return bool(step.video_paths) and all(
+        (preds_dir / f"{vp.stem}.csv").exists() for vp in step.video_paths
+    )
+
+
+def _reattach_step(
+    task_id: str,
+    steps: list[InferStep],
+    orphan: _OrphanStep,
+    progress: _StepProgress,
+) -> None:
+    """Follow a step subprocess left over from before a restart until it exits.
+
+    Its exit code is unavailable (it is not our child), so success is judged by
+    whether its prediction files were written. Steps of a model worker that did
+    not get to write theirs are left pending, to be rerun.
+    """
+    first = steps[orphan.indices[0]]
+    _append_log(
+        task_id,
+        f"=== Reattached to step {orphan.indices[0] + 1}/{len(steps)} (pid {orphan.pid}): "
+        f"{first.kind} — {first.model_dir.name} on "
+        f"{', '.join(steps[i].session for i in orphan.indices)} ===",
+    )
+    proc = None
+    try:
+        proc = psutil.Process(orphan.pid)
+        with _status_lock:
+            _active_procs_by_task.setdefault(task_id, []).append(proc)
+    except psutil.NoSuchProcess:
+        pass
+    try:
+        stdout_path, stderr_path = _step_output_paths(task_id, orphan.indices[0])
+        poll_frames = _follow_frame_progress(task_id, stdout_path.with_suffix(".progress"))
+        _follow_step_output(
+            task_id,
+            stdout_path,
+            stderr_path,
+            lambda: _is_process_alive(orphan.pid, orphan.create_time),
+            poll_frames,
+        )
+        poll_frames(True)
+    finally:
+        if proc is not None:
+            _forget_active_proc(task_id, proc)
+    if _is_cancelled(task_id):
+        return
+
+    if len(orphan.indices) > 1:
+        for i in orphan.indices:
+            if _step_outputs_exist(steps[i]):
+                progress.finish(i, True)
+        return
+
+    step = first
+    ok = _step_outputs_exist(step)
+    err_msg = None
+    if not ok:
+        err_msg = f"{step.kind} step for {step.model_dir.name} on {step.session} did not produce predictions"
+        _append_log(task_id, f"[error] {err_msg}")
+    progress.finish(orphan.indices[0], ok, err_msg)
+
+
+# Unfinished tasks are kept indefinitely; finished ones for a week.
+_REGISTRY_RETENTION_SECONDS = 7 * 24 * 3600
+
+
+def recover_inference_tasks(resume: bool = True) -> None:
+    """Resume (or mark interrupted) tasks left unfinished by a previous server process.
+
+    Called once on startup. Steps recorded as DONE/FAILED are not rerun. A step
+    whose subprocess is still alive is reattached to; one whose subprocess died
+    with the old server is rerun from scratch. Tasks owned by another live server
+    process are left alone.
+    """
+    registry = get_task_registry()
+    registry.prune(
+        keep_statuses={InferenceStatus.PENDING, InferenceStatus.WAITING, InferenceStatus.RUNNING},
+        older_than_seconds=_REGISTRY_RETENTION_SECONDS,
+    )
+    tasks = registry.list_tasks(
+        {InferenceStatus.PENDING, InferenceStatus.WAITING, InferenceStatus.RUNNING}
+    )
+    tasks = [
+        t for t in tasks
+        if t.owner_pid is None
+        or t.owner_pid == os.getpid()
+        or not _is_process_alive(t.owner_pid, None)
+    ]
+    others = {
+        t.task_id
+        for t in registry.list_tasks(_ALL_STATUSES)
+        if t.owner_pid not in (None, os.getpid()) and _is_process_alive(t.owner_pid, None)
+    }
+    _remove_stale_task_files(keep={t.task_id for t in tasks}, in_use=others)
+
+    for task in tasks:
+        try:
+            _recover_task(task, resume)
+        except Exception:
+            logger.exception("Failed to recover inference task %s", task.task_id)
+
+
+def _recover_task(task: PersistedTask, resume: bool) -> None:
+    """Restore one persisted task into memory and resume it, or mark it FAILED."""
+    steps = [_step_from_spec(ps.spec) for ps in task.steps]
+    done = {ps.index for ps in task.steps if ps.state in (StepState.DONE, StepState.FAILED)}
+    errors = [
+        f"{steps[ps.index].kind} step for {steps[ps.index].model_dir.name} "
+        f"on {steps[ps.index].session} failed"
+        for ps in task.steps
+        if ps.state == StepState.FAILED
+    ]
+    orphan = None
+    for ps in task.steps:
+        if (
+            ps.state == StepState.RUNNING
+            and ps.pid is not None
+            and _is_process_alive(ps.pid, ps.pid_create_time)
+        ):
+            if orphan is not None and orphan.pid == ps.pid:
+                orphan.indices.append(ps.index)
+            else:
+                orphan = _OrphanStep([ps.index], ps.pid, ps.pid_create_time)
+
+    get_task_registry().claim_task(task.task_id)
+    with _status_lock:
+        _get_or_create_status_nolock(task.task_id)
+    if not resume:
+        if orphan is not None:
+            _kill_step_process(psutil.Process(orphan.pid))
+        set_status(
+            task.task_id,
+            status=InferenceStatus.FAILED,
+            completed=len(done),
+            total=len(steps),
+            error="Interrupted by server restart",
+        )
+        return
+
+    set_status(
+        task.task_id,
+        status=InferenceStatus.WAITING,
+        completed=len(done),
+        total=len(steps),
+        error=None,
+        message=task.message,
+    )
+    _append_log(
+        task.task_id,
+        f"=== Server restarted: resuming inference ({len(done)}/{len(steps)} steps done) ===",
+    )
+    logger.info(
+        "Resuming inference task %s (%d/%d steps done%s)",
+        task.task_id,
+        len(done),
+        len(steps),
+        f", reattaching to pid {orphan.pid}" if orphan else "",
+    )
+    _submit_steps(task.task_id, steps, task.project_key, done, errors, orphan)
+
+
+def _remove_stale_task_files(keep: set[str], in_use: set[str]) -> None:
+    """Delete files left in the log dir by tasks of earlier server processes.
+
+    Step output dirs of tasks that are not being recovered (keep) are deleted once
+    over a day old. Spill files are deleted unless another live server process
+    owns their task (in_use): their block index died with the process that wrote
+    them, so nothing can read them. A recovered task rewrites its spill file.
+    """
+    store = get_log_store()
+    spill_dir = store.spill_dir
+    cutoff = time.time() - 24 * 3600
+    if not spill_dir.is_dir():
+        return
+    for d in spill_dir.iterdir():
+        try:
+            if d.is_dir():
+                if d.name not in keep and d.stat().st_mtime < cutoff:
+                    shutil.rmtree(d, ignore_errors=True)
+            elif d.name.endswith(".log.z"):
+                task_id = d.name[: -len(".log.z")]
+                if task_id not in in_use and store.count(task_id) == 0:
+                    d.unlink(missing_ok=True)
+        except OSError:
+            continue
+
+
 def _is_cancelled(task_id: str) -> bool:
     """Return True if a cancel request has been registered for task_id."""
     with _status_lock:
         return task_id in _cancel_requests
 
 
-def _run_steps(task_id: str, steps: list[InferStep], total: int) -> None:
-    """Execute each inference step in order, logging progress and collecting errors."""
-    errors: list[str] = []
-    for i, step in enumerate(steps):
-        if _is_cancelled(task_id):
-            return
+# A model's sessions are predicted by one model_worker.py process when there are
+# at least this many of them in a row; single sessions go through predict_wrapper.py.
+_MODEL_WORKER_MIN_STEPS = 2
+# Set LP_FAKE_PREDICT=1 to run the CPU-only fake predictor (for tests and development).
+_FAKE_PREDICT = os.environ.get("LP_FAKE_PREDICT") == "1"
 
-        msg = (
-            f"Step {i + 1}/{total}: {step.kind} — "
-            f"{step.model_dir.name} on {step.session}"
-        )
-        set_status(task_id, message=msg)
-        _append_log(task_id, f"=== {msg} ===")
 
-        if step.kind in ("normal", "member"):
-            predict_wrapper = (
-                Path(__file__).parent.parent
-                / "utils" / "inference" / "predict_wrapper.py"
+class _StepProgress:
+    """Thread-safe record of which steps of a task have finished, and why any failed.
+
+    Finishing a step persists it and updates the task's `completed` count;
+    `on_finish` lets the scheduler start steps that were waiting on it.
+    """
+
+    def __init__(
+        self, task_id: str, done: set[int] | None = None, errors: list[str] | None = None
+    ) -> None:
+        """Start from the steps already done (and errors already seen) before a restart."""
+        self.task_id = task_id
+        self.errors: list[str] = list(errors or [])
+        self.on_finish: Callable[[int, bool], None] | None = None
+        self._done: set[int] = set(done or ())
+        self._lock = threading.Lock()
+
+    def is_done(self, i: int) -> bool:
+        """Return True if step i has finished, successfully or not."""
+        with self._lock:
+            return i in self._done
+
+    def pending(self, indices: list[int]) -> list[int]:
+        """Return the indices not yet finished, in order."""
+        with self._lock:
+            return [i for i in indices if i not in self._done]
+
+    def finish(self, i: int, ok: bool, error: str | None = None) -> None:
+        """Mark step i finished; error is recorded for the task summary when not ok."""
+        with self._lock:
+            if i in self._done:
+                return
+            self._done.add(i)
+            if not ok and error:
+                self.errors.append(error)
+            count = len(self._done)
+        _persist("step_finished", self.task_id, i, ok)
+        set_status(self.task_id, completed=count)
+        if self.on_finish is not None:
+            self.on_finish(i, ok)
+
+
+def _group_steps(steps: list[InferStep], indices: list[int]) -> list[list[int]]:
+    """Split step indices into groups of consecutive prediction steps of one model.
+
+    EKS steps are always groups of one.
+    """
+    groups: list[list[int]] = []
+    for i in indices:
+        step = steps[i]
+        if groups:
+            prev = steps[groups[-1][-1]]
+            if (
+                step.kind in ("normal", "member")
+                and prev.kind in ("normal", "member")
+                and prev.model_dir == step.model_dir
+            ):
+                groups[-1].append(i)
+                continue
+        groups.append([i])
+    return groups
+
+
+def _run_model_worker(
+    task_id: str,
+    steps: list[InferStep],
+    group: list[int],
+    total: int,
+    progress: _StepProgress,
+) -> None:
+    """Predict a group of sessions of one model in a single model_worker.py process.
+
+    The model is loaded once and predicts at the profiled batch size, like
+    predict_wrapper.py, which shares the profile. Each session is marked done as
+    soon as the worker reports it; sessions it did not finish are left pending
+    for the caller to rebatch through predict_wrapper.py.
+    """
+    model_dir = steps[group[0]].model_dir
+    stdout_path, _ = _step_output_paths(task_id, group[0])
+    jobs_path = stdout_path.with_suffix(".jobs")
+    results_path = stdout_path.with_suffix(".results")
+    jobs_path.parent.mkdir(parents=True, exist_ok=True)
+    jobs_path.write_text(
+        "".join(
+            json.dumps(
+                {
+                    "index": i,
+                    "session": steps[i].session,
+                    "video_paths": [str(p) for p in steps[i].video_paths],
+                }
             )
-            cmd = [
-                sys.executable, str(predict_wrapper),
-                str(step.model_dir),
-                *[str(p) for p in step.video_paths],
-                "--skip_viz",
-            ]
-            ret = _run_subprocess_with_logging(task_id, cmd)
-            if ret != 0:
-                if _is_cancelled(task_id):
-                    return
-                err_msg = (
-                    f"litpose predict failed for {step.model_dir.name} "
-                    f"on {step.session}"
+            + "\n"
+            for i in group
+        )
+    )
+    results_path.unlink(missing_ok=True)
+
+    msg = (
+        f"Steps {group[0] + 1}-{group[-1] + 1}/{total}: {steps[group[0]].kind} — "
+        f"{model_dir.name} on {len(group)} sessions"
+    )
+    set_status(task_id, message=msg)
+    _append_log(task_id, f"=== {msg} ===")
+    for i in group:
+        _persist("step_started", task_id, i)
+
+    results = _OutputFollower(results_path, "")
+
+    def on_poll() -> None:
+        """Mark sessions done as the worker reports them."""
+        for line in results.read_lines():
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if event.get("event") == "model_loaded":
+                _append_log(task_id, f"--- Model loaded in {event['seconds']:.1f}s ---")
+            elif event.get("event") == "result" and event.get("ok"):
+                i = event["index"]
+                _append_log(
+                    task_id,
+                    f"--- Step {i + 1}/{total}: {steps[i].session} done "
+                    f"in {event['seconds']:.1f}s ---",
                 )
-                _append_log(task_id, f"[error] {err_msg}")
-                errors.append(err_msg)
+                progress.finish(i, True)
+
+    model_worker = Path(__file__).parent.parent / "utils" / "inference" / "model_worker.py"
+    cmd = [
+        sys.executable, str(model_worker),
+        str(model_dir),
+        "--jobs", str(jobs_path),
+        "--results", str(results_path),
+        "--profile", str(_batch_size_profile_path()),
+        "--skip_viz",
+        *(["--fake"] if _FAKE_PREDICT else []),
+    ]
+    ret = _run_subprocess_with_logging(task_id, cmd, group[0], shared_by=group, on_poll=on_poll)
+    remaining = progress.pending(group)
+    if remaining and not _is_cancelled(task_id):
+        _append_log(
+            task_id,
+            f"[warning] Model worker exited with code {ret}; "
+            f"retrying the remaining {len(remaining)} sessions with predict_wrapper.py",
+        )
+
+
+def _batch_steps(
+    steps: list[InferStep], indices: list[int], max_videos: int
+) -> list[list[int]]:
+    """Pack a model's pending steps, in order, into batches of at most max_videos videos.
+
+    A step with more views than max_videos still gets a batch of its own.
+    """
+    batches: list[list[int]] = []
+    n_videos = 0
+    for i in indices:
+        size = len(steps[i].video_paths)
+        if (
+            batches
+            and steps[i].kind != "eks"
+            and steps[batches[-1][0]].kind != "eks"
+            and n_videos + size <= max_videos
+        ):
+            batches[-1].append(i)
+            n_videos += size
         else:
-            if not _run_eks_step(task_id, step):
-                if _is_cancelled(task_id):
+            batches.append([i])
+            n_videos = size
+    return batches
+
+
+def _step_reported_done(task_id: str, step: InferStep) -> bool:
+    """Return True if the progress channel reported every video of a step as predicted."""
+    with _status_lock:
+        telemetry = _telemetry_by_task.get(task_id)
+    frames = telemetry.frames if telemetry is not None else None
+    return (
+        frames is not None
+        and bool(step.video_paths)
+        and all(frames.video_done(str(step.model_dir), str(vp)) for vp in step.video_paths)
+    )
+
+
+def _batch_size_profile_path() -> Path:
+    """Return the batch size profile shared by predict_wrapper.py and model_worker.py."""
+    return deps.root_config().LP_SYSTEM_DIR / "batch_size_profile.json"
+
+
+def _predict_wrapper_cmd(model_dir: Path, video_paths: list[Path]) -> list[str]:
+    """Build the predict_wrapper.py command, with the batch size profile under LP_SYSTEM_DIR."""
+    predict_wrapper = (
+        Path(__file__).parent.parent
+        / "utils" / "inference" / "predict_wrapper.py"
+    )
+    return [
+        sys.executable, str(predict_wrapper),
+        str(model_dir),
+        *[str(p) for p in video_paths],
+        "--skip_viz",
+        "--profile", str(_batch_size_profile_path()),
+        *(["--fake"] if _FAKE_PREDICT else []),
+    ]
+
+
+def _run_predict_batch(
+    task_id: str,
+    steps: list[InferStep],
+    batch: list[int],
+    total: int,
+    progress: _StepProgress,
+) -> bool:
+    """Predict several sessions of one model with a single predict_wrapper.py invocation.
+
+    A session counts as done once the progress channel reports all of its videos
+    complete (predict_wrapper.py does so only after litpose has moved past a
+    video's CSV), or once the whole run succeeds; a CSV merely appearing may still
+    be half-written. Videos are predicted in order and a failure aborts the run,
+    so on failure only the first unfinished session is marked failed; the rest
+    stay pending for the caller to rebatch. Returns False if the task was cancelled.
+    """
+    model_dir = steps[batch[0]].model_dir
+    video_paths = [p for i in batch for p in steps[i].video_paths]
+    msg = (
+        f"Steps {batch[0] + 1}-{batch[-1] + 1}/{total}: {steps[batch[0]].kind} — "
+        f"{model_dir.name} on {len(batch)} sessions ({len(video_paths)} videos)"
+    )
+    set_status(task_id, message=msg)
+    _append_log(task_id, f"=== {msg} ===")
+    for i in batch:
+        _persist("step_started", task_id, i)
+
+    def on_poll() -> None:
+        """Mark sessions done as the progress channel reports their videos complete."""
+        for i in progress.pending(batch):
+            if _step_reported_done(task_id, steps[i]):
+                progress.finish(i, True)
+
+    cmd = _predict_wrapper_cmd(model_dir, video_paths)
+    ret = _run_subprocess_with_logging(task_id, cmd, batch[0], shared_by=batch, on_poll=on_poll)
+    if ret != 0 and _is_cancelled(task_id):
+        return False
+    on_poll()
+    unfinished = progress.pending(batch)
+    if ret == 0:
+        for i in unfinished:
+            progress.finish(i, True)
+    elif unfinished:
+        i = unfinished[0]
+        err_msg = f"litpose predict failed for {model_dir.name} on {steps[i].session}"
+        _append_log(task_id, f"[error] {err_msg}")
+        progress.finish(i, False, err_msg)
+    return True
+
+
+def _run_step(
+    task_id: str, steps: list[InferStep], i: int, total: int, progress: _StepProgress
+) -> bool:
+    """Run one step in its own subprocess. Returns False if the task was cancelled."""
+    step = steps[i]
+    msg = (
+        f"Step {i + 1}/{total}: {step.kind} — "
+        f"{step.model_dir.name} on {step.session}"
+    )
+    set_status(task_id, message=msg)
+    _append_log(task_id, f"=== {msg} ===")
+    _persist("step_started", task_id, i)
+
+    ok = True
+    err_msg = None
+    if step.kind in ("normal", "member"):
+        cmd = _predict_wrapper_cmd(step.model_dir, step.video_paths)
+        ret = _run_subprocess_with_logging(task_id, cmd, i)
+        if ret != 0:
+            if _is_cancelled(task_id):
+                return False
+            ok = False
+            err_msg = (
+                f"litpose predict failed for {step.model_dir.name} "
+                f"on {step.session}"
+            )
+            _append_log(task_id, f"[error] {err_msg}")
+    else:
+        if not _run_eks_step(task_id, step, i):
+            if _is_cancelled(task_id):
+                return False
+            ok = False
+            err_msg = f"EKS smoother failed for {step.model_dir.name} on {step.session}"
+
+    progress.finish(i, ok, err_msg)
+    return True
+
+
+# -----------------------------
+# Scheduling
+# -----------------------------
+
+_cpu_executor: ThreadPoolExecutor | None = None
+
+
+# Sessions smoothed in parallel; each EKS worker process holds its own jax runtime.
+_EKS_WORKERS = max(1, min(8, (os.cpu_count() or 2) // 2))
+_eks_service: EksService | None = None
+_eks_service_lock = threading.Lock()
+
+
+def get_eks_service() -> EksService:
+    """Return (creating if needed) the warm EKS worker pool shared by all tasks."""
+    global _eks_service
+    with _eks_service_lock:
+        if _eks_service is None:
+            _eks_service = EksService(_EKS_WORKERS)
+    return _eks_service
+
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    """Return (creating if needed) the pool running CPU-only steps alongside GPU steps.
+
+    Each slot waits on one session in the EKS service, so it is sized to match it.
+    """
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ThreadPoolExecutor(
+            max_workers=_EKS_WORKERS, thread_name_prefix="model-eks"
+        )
+    return _cpu_executor  # type: ignore
+
+
+def _step_resource(step: InferStep) -> str:
+    """Return the resource class a step needs: 'gpu' for prediction, 'cpu' for EKS."""
+    return "cpu" if step.kind == "eks" else "gpu"
+
+
+def _step_dependencies(steps: list[InferStep]) -> dict[int, set[int]]:
+    """Map each step to the steps in the plan whose predictions it consumes.
+
+    An EKS step depends on the prediction steps of its members for the same
+    session; members already predicted before the plan was built are not steps.
+    """
+    producers: dict[tuple[Path, str], list[int]] = {}
+    for i, step in enumerate(steps):
+        if step.kind in ("normal", "member"):
+            producers.setdefault((step.model_dir, step.session), []).append(i)
+    deps: dict[int, set[int]] = {}
+    for i, step in enumerate(steps):
+        deps[i] = set()
+        if step.kind == "eks":
+            for member_dir in step.member_dirs:
+                deps[i].update(producers.get((member_dir, step.session), []))
+    return deps
+
+
+class _StepScheduler:
+    """Executes a task's plan as a DAG over two resource classes.
+
+    GPU steps run in plan order in the calling thread, which holds the GPU lock.
+    CPU steps (EKS smoothing) are submitted to the CPU pool as soon as every step
+    they depend on has finished, so they overlap with prediction of later models.
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        steps: list[InferStep],
+        progress: _StepProgress,
+        config: Config,
+    ) -> None:
+        """Prepare to run the pending steps of a plan, tracking them in progress."""
+        self.task_id = task_id
+        self.steps = steps
+        self.total = len(steps)
+        self.progress = progress
+        self.config = config
+        self.deps = _step_dependencies(steps)
+        self._lock = threading.Lock()
+        self._cpu_futures: dict[int, Future] = {}
+        # Predicted steps to add to the prediction cache once their process has exited.
+        self._to_cache: list[int] = []
+        progress.on_finish = self._on_step_finished
+
+    def pending(self, resource: str) -> list[int]:
+        """Return the unfinished steps of one resource class, in plan order."""
+        return self.progress.pending(
+            [i for i, step in enumerate(self.steps) if _step_resource(step) == resource]
+        )
+
+    def start_ready_cpu_steps(self) -> None:
+        """Submit every CPU step whose dependencies have all finished."""
+        if _is_cancelled(self.task_id):
+            return
+        with self._lock:
+            for i in self.pending("cpu"):
+                if i in self._cpu_futures:
+                    continue
+                if all(self.progress.is_done(d) for d in self.deps[i]):
+                    self._cpu_futures[i] = get_cpu_executor().submit(self._run_cpu_step, i)
+
+    def _on_step_finished(self, i: int, ok: bool) -> None:
+        """Start CPU steps that were waiting on the GPU step that just finished."""
+        # Outputs may have been rewritten in place, which the index can't see by itself.
+        get_prediction_index().invalidate(self.steps[i].model_dir)
+        if _step_resource(self.steps[i]) == "gpu":
+            if ok and self.config.INFERENCE_PREDICTION_CACHE:
+                with self._lock:
+                    self._to_cache.append(i)
+            self.start_ready_cpu_steps()
+
+    def restore_cached_steps(self) -> None:
+        """Finish pending prediction steps whose outputs can be copied from the cache."""
+        if not self.config.INFERENCE_PREDICTION_CACHE:
+            return
+        cache = get_prediction_cache()
+        restored = 0
+        for i in self.pending("gpu"):
+            step = self.steps[i]
+            # Copying is cheap, so a partial hit is harmless: the step still runs.
+            if step.video_paths and all(
+                cache.restore(step.model_dir, vp) for vp in step.video_paths
+            ):
+                self.progress.finish(i, True)
+                restored += 1
+        if restored:
+            _append_log(self.task_id, f"=== Restored {restored} steps from the prediction cache ===")
+        with self._lock:
+            self._to_cache.clear()
+
+    def store_finished_in_cache(self) -> None:
+        """Add the outputs of prediction steps finished so far to the prediction cache."""
+        with self._lock:
+            indices, self._to_cache = self._to_cache, []
+        if not indices:
+            return
+        cache = get_prediction_cache()
+        for i in indices:
+            step = self.steps[i]
+            for vp in step.video_paths:
+                try:
+                    cache.store(step.model_dir, vp)
+                except Exception:
+                    logger.exception("Failed to cache predictions of %s for %s", vp, step.model_dir)
+
+    def _run_cpu_step(self, i: int) -> None:
+        """Run one CPU step on the CPU pool, recording an unexpected exception as a failure."""
+        if _is_cancelled(self.task_id):
+            return
+        try:
+            _run_step(self.task_id, self.steps, i, self.total, self.progress)
+        except Exception as e:
+            step = self.steps[i]
+            err_msg = f"{step.kind} step for {step.model_dir.name} on {step.session} failed: {e}"
+            _append_log(self.task_id, f"[error] {err_msg}")
+            self.progress.finish(i, False, err_msg)
+
+    def run_gpu_steps(self) -> None:
+        """Run all pending GPU steps in order: model worker first, then batched predictions."""
+        for group in _group_steps(self.steps, self.pending("gpu")):
+            if _is_cancelled(self.task_id):
+                return
+            if len(group) >= _MODEL_WORKER_MIN_STEPS:
+                _run_model_worker(self.task_id, self.steps, group, self.total, self.progress)
+                self.store_finished_in_cache()
+            # Each round finishes at least one step; a failed batch is rebatched without it.
+            pending = self.progress.pending(group)
+            while pending:
+                if _is_cancelled(self.task_id):
+                    return
+                batch = _batch_steps(
+                    self.steps, pending, self.config.INFERENCE_MAX_VIDEOS_PER_PREDICT
+                )[0]
+                if len(batch) > 1:
+                    ok = _run_predict_batch(
+                        self.task_id, self.steps, batch, self.total, self.progress
+                    )
+                else:
+                    ok = _run_step(self.task_id, self.steps, batch[0], self.total, self.progress)
+                # Cache outputs only once the process has exited and stopped writing them.
+                self.store_finished_in_cache()
+                if not ok:
                     return
-                err_msg = f"EKS smoother failed for {step.model_dir.name} on {step.session}"
-                errors.append(err_msg)
+                pending = self.progress.pending(pending)
+
+    def wait_cpu_steps(self) -> None:
+        """Block until every submitted CPU step has finished."""
+        while True:
+            with self._lock:
+                futures = [f for f in self._cpu_futures.values() if not f.done()]
+            if not futures:
+                return
+            wait(futures)
+
+
+def _run_steps(
+    task_id: str,
+    steps: list[InferStep],
+    total: int,
+    done: set[int] | None = None,
+    errors: list[str] | None = None,
+    config: Config | None = None,
+    gpu_lock: Callable[[], contextlib.AbstractContextManager] = contextlib.nullcontext,
+    orphan: _OrphanStep | None = None,
+) -> None:
+    """Execute the plan's pending steps, then set the task's final status.
+
+    Steps whose index is in `done` are skipped (they completed before a restart).
+    GPU steps run under `gpu_lock`, which is released as soon as they are done;
+    the task then waits for any CPU steps still smoothing. A plan with only CPU
+    steps never takes the GPU lock, nor does one fully restored from the
+    prediction cache.
+    """
+    task_metrics = TaskMetrics(task_id, _metrics_path(task_id))
+    with _status_lock:
+        _telemetry_by_task[task_id] = _TaskTelemetry(task_metrics, steps)
+    if task_metrics.summary()["processes"]:
+        # Resumed after a restart: show what was measured before it.
+        set_status(task_id, throughput=task_metrics.summary())
+    try:
+        _execute_steps(task_id, steps, total, done, errors, config, gpu_lock, orphan)
+    finally:
+        with _status_lock:
+            _telemetry_by_task.pop(task_id, None)
+
+
+def _execute_steps(
+    task_id: str,
+    steps: list[InferStep],
+    total: int,
+    done: set[int] | None,
+    errors: list[str] | None,
+    config: Config | None,
+    gpu_lock: Callable[[], contextlib.AbstractContextManager],
+    orphan: _OrphanStep | None,
+) -> None:
+    """Body of `_run_steps`, run while the task's metrics are being collected."""
+    progress = _StepProgress(task_id, done, errors)
+    scheduler = _StepScheduler(task_id, steps, progress, config or Config())
+    if _is_cancelled(task_id):
+        return
+    scheduler.restore_cached_steps()
+    n_videos = sum(len(steps[i].video_paths) for i in scheduler.pending("gpu"))
+    with _status_lock:
+        _telemetry_by_task[task_id].frames = FrameProgress(n_videos)
 
-        set_status(task_id, completed=i + 1)
+    if scheduler.pending("gpu") or orphan is not None:
+        with gpu_lock() as lease:
+            if _is_cancelled(task_id):
+                return
+            with _status_lock:
+                _device_env_by_task[task_id] = lease.env if lease is not None else {}
+            try:
+                set_status(task_id, status=InferenceStatus.RUNNING, queuePosition=None)
+                if orphan is not None:
+                    _reattach_step(task_id, steps, orphan, progress)
+                scheduler.start_ready_cpu_steps()
+                scheduler.run_gpu_steps()
+            finally:
+                with _status_lock:
+                    _device_env_by_task.pop(task_id, None)
+        # A PENDING training may have been waiting for the GPU.
+        wake_train_scheduler()
+    else:
+        if _is_cancelled(task_id):
+            return
+        set_status(task_id, status=InferenceStatus.RUNNING)
+        scheduler.start_ready_cpu_steps()
+    scheduler.wait_cpu_steps()
 
     if _is_cancelled(task_id):
         return
 
+    errors = progress.errors
     if errors:
         summary = f"{len(errors)} steps failed: " + "; ".join(errors[:3])
         if len(errors) > 3:
             summary += " ..."
+        # Log before the terminal status, which ends SSE streams.
+        _append_log(task_id, f"=== Inference completed with {len(errors)} errors ===")
         set_status(
             task_id,
             status=InferenceStatus.COMPLETED,
             completed=total,
             error=summary
         )
-        _append_log(task_id, f"=== Inference completed with {len(errors)} errors ===")
     else:
-        set_status(task_id, status=InferenceStatus.COMPLETED, completed=total)
         _append_log(task_id, "=== Inference completed ===")
+        set_status(task_id, status=InferenceStatus.COMPLETED, completed=total)
 
 
 # -----------------------------
@@ -552,6 +1821,9 @@ class InferTaskRequest(BaseModel):
     sessions: list[str]
     videoRelativePaths: list[str] = []
     force: bool = False
+    # Place in the machine-wide GPU queue: higher priorities go first, and may ask a
+    # lower-priority training to yield its GPU at its next checkpoint.
+    priority: int = 0
 
 
 class ResolveRequest(BaseModel):
@@ -590,6 +1862,7 @@ def _validate_model_paths(project: Project, model_relative_paths: list[str]) ->
 def start_inference_task(
     req: InferTaskRequest,
     project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+    config: Config = Depends(deps.config),
 ) -> dict:
     """Start a background inference task and return its task ID."""
     project: Project = project_info_getter(req.projectKey)
@@ -601,9 +1874,10 @@ def start_inference_task(
         req.sessions,
         video_relative_paths=req.videoRelativePaths or None,
         force=req.force,
+        use_cache=config.INFERENCE_PREDICTION_CACHE,
     )
     task_id = str(uuid.uuid4())
-    _start_batch_inference_background(task_id, plan, req.projectKey)
+    _start_batch_inference_background(task_id, plan, req.projectKey, config, req.priority)
     return {"taskId": task_id, "status": "ACCEPTED"}
 
 
@@ -612,95 +1886,120 @@ def cancel_inference_task(taskId: str) -> dict:
     """Cancel a running or waiting inference task."""
     with _status_lock:
         st = _status_by_task.get(taskId)
-        terminal = {InferenceStatus.COMPLETED, InferenceStatus.FAILED, InferenceStatus.CANCELLED}
-        if st is None or st.status in terminal:
+        if st is None or st.status in _TERMINAL_STATUSES:
             return {"ok": True}
         _cancel_requests.add(taskId)
         st.status = InferenceStatus.CANCELLED
-        proc = _active_procs_by_task.get(taskId)
-    if proc is not None:
-        try:
-            proc.kill()
-        except Exception:
-            pass
+        procs = list(_active_procs_by_task.get(taskId, []))
+    _notifier.publish(taskId)
+    _persist("update_task", taskId, status=InferenceStatus.CANCELLED)
+    _on_task_finished(taskId)
+    for proc in procs:
+        _kill_step_process(proc)
     return {"ok": True}
 
 
 @router.get("/app/v0/inference/task/active")
 def get_active_inference_task() -> dict:
     """Return the taskId of the most recent non-terminal task, or null."""
-    terminal = {InferenceStatus.COMPLETED, InferenceStatus.FAILED, InferenceStatus.CANCELLED}
     with _status_lock:
         for task_id in reversed(_task_id_order):
             st = _status_by_task.get(task_id)
-            if st is not None and st.status not in terminal:
+            if st is not None and st.status not in _TERMINAL_STATUSES:
                 return {"taskId": task_id}
     return {"taskId": None}
 
 
 @router.get("/app/v0/task/active")
 def get_active_task() -> dict:
-    """Return the task currently holding the GPU lock, or null."""
-    task = read_gpu_task()
-    if task:
-        return task
-    return {"taskId": None}
+    """Return the tasks holding GPU slots (the first one's fields at top level) and the GPU queue."""
+    tasks = read_gpu_tasks()
+    first = tasks[0] if tasks else {"taskId": None}
+    return {
+        **first,
+        "tasks": tasks,
+        "devices": gpu_devices(),
+        "queue": get_gpu_arbiter().waiters(),
+    }
 
 
 @router.get("/app/v0/inference/task/{taskId}")
 def get_inference_task_status(taskId: str) -> dict:
     """Get the current status of an inference task, including all log lines so far."""
-    return _status_snapshot_dict(taskId)
+    snapshot = _status_snapshot_dict(taskId)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Unknown task {taskId}")
+    return snapshot
+
+
+@router.get("/app/v0/inference/task/{taskId}/metrics")
+def get_inference_task_metrics(taskId: str) -> dict:
+    """Get the persisted throughput summary of a task, with per-process measurements."""
+    if not re.fullmatch(r"[\w-]+", taskId):
+        raise HTTPException(status_code=400, detail=f"Invalid task id: {taskId}")
+    try:
+        return json.loads(_metrics_path(taskId).read_text())
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"No metrics for task {taskId}") from None
 
 
 @router.get("/app/v0/inference/task/{taskId}/stream")
-def stream_inference_task(taskId: str) -> StreamingResponse:
-    """Stream real-time status updates and log lines for an inference task via SSE."""
-    terminal = {InferenceStatus.COMPLETED, InferenceStatus.FAILED, InferenceStatus.CANCELLED}
+async def stream_inference_task(taskId: str) -> StreamingResponse:
+    """Stream real-time status updates and log lines for an inference task via SSE.
 
-    def poller() -> Iterator[dict]:
-        """Yield status and log SSE events until the task reaches a terminal state."""
-        log_offset = 0
-        last_snapshot = None
+    Events are pushed as soon as `set_status` or `_append_log` publishes a change;
+    while the task is idle the stream just awaits, without holding a worker thread.
+    Log reads (which may decompress spilled blocks) run in the threadpool.
+    Unknown tasks get a 404.
+    """
+    if _status_event_dict(taskId) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown task {taskId}")
 
-        # Replay all logs accumulated before the subscriber connected
-        initial_logs = _get_logs(taskId, 0)
-        if initial_logs:
-            yield {"type": "log", "lines": initial_logs}
-            log_offset = len(initial_logs)
+    async def events() -> AsyncIterator[dict]:
+        """Yield status and log SSE events until the task reaches a terminal state."""
+        with _notifier.subscribe(taskId) as sub:
+            log_offset = 0
+            last_snapshot = None
+
+            # Replay all logs accumulated before the subscriber connected
+            initial_logs = await run_in_threadpool(_get_logs, taskId, 0)
+            if initial_logs:
+                yield {"type": "log", "lines": initial_logs}
+                log_offset = len(initial_logs)
+
+            while True:
+                snapshot = _status_event_dict(taskId)
+                if snapshot is None:
+                    # Evicted while streaming; the client gets a 404 if it reconnects.
+                    break
 
-        while True:
-            snapshot = _status_snapshot_dict(taskId)
-            # Don't include the full logs list in SSE status events — too large
-            snapshot.pop("logs", None)
-            snapshot["type"] = "status"
-
-            # Only yield if status-related fields have changed
-            if snapshot != last_snapshot:
-                yield snapshot
-                last_snapshot = snapshot
-
-            new_lines = _get_logs(taskId, log_offset)
-            if new_lines:
-                yield {"type": "log", "lines": new_lines}
-                log_offset += len(new_lines)
-
-            if snapshot["status"] in terminal:
-                # Final flush in case lines arrived after the last poll
-                final_lines = _get_logs(taskId, log_offset)
-                if final_lines:
-                    yield {"type": "log", "lines": final_lines}
-                break
+                # Only yield if status-related fields have changed
+                if snapshot != last_snapshot:
+                    yield snapshot
+                    last_snapshot = snapshot
+
+                new_lines = await run_in_threadpool(_get_logs, taskId, log_offset)
+                if new_lines:
+                    yield {"type": "log", "lines": new_lines}
+                    log_offset += len(new_lines)
+
+                if snapshot["status"] in _TERMINAL_STATUSES:
+                    # Final flush in case lines arrived after the status was read
+                    final_lines = await run_in_threadpool(_get_logs, taskId, log_offset)
+                    if final_lines:
+                        yield {"type": "log", "lines": final_lines}
+                    break
 
-            time.sleep(0.5)
+                await sub.wait()
 
-    return StreamingResponse(_stream_sse_sync(poller()), media_type="text/event-stream")
+    return StreamingResponse(_stream_sse(events()), media_type="text/event-stream")
 
 
 @router.post("/app/v0/inference/resolve")
 def resolve_inference(
     req: ResolveRequest,
     project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+    config: Config = Depends(deps.config),
 ) -> dict:
     """Preview which inference steps would execute for a given request."""
     project: Project = project_info_getter(req.projectKey)
@@ -712,6 +2011,7 @@ def resolve_inference(
         req.sessions,
         video_relative_paths=req.videoRelativePaths or None,
         force=False,
+        use_cache=config.INFERENCE_PREDICTION_CACHE,
     )
     model_base = Path(project.paths.model_dir)
     runs = []
@@ -720,7 +2020,13 @@ def resolve_inference(
             model_rel = str(step.model_dir.relative_to(model_base))
         except ValueError:
             model_rel = str(step.model_dir)
-        run: dict = {"model": model_rel, "session": step.session, "kind": step.kind}
+        run: dict = {
+            "model": model_rel,
+            "session": step.session,
+            "kind": step.kind,
+            "stale": step.stale,
+            "cached": step.cached,
+        }
         if step.member_of is not None:
             try:
                 run["member_of"] = str(step.member_of.relative_to(model_base))
@@ -2,10 +2,8 @@
 
 from __future__ import annotations
 
-import re
 import shutil
 import tempfile
-from collections.abc import Callable
 from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from typing import Any
@@ -19,10 +17,10 @@ from pydantic import BaseModel
 from litpose_app import deps
 from litpose_app.config import Config
 from litpose_app.datatypes import Project
-from litpose_app.deps import ProjectInfoGetter
+from litpose_app.deps import ApplicationError, ProjectInfoGetter
 from litpose_app.routes.labeler import find_calibration_file, get_session_level_calibration_path
 from litpose_app.tasks.extract_frames import MVLabelFile
-from litpose_app.utils.fix_empty_first_row import fix_empty_first_row
+from litpose_app.utils.mv_label_index import MVLabelIndex, load_mv_label_index
 
 router = APIRouter()
 
@@ -67,6 +65,37 @@ class BundleAdjustResponse(BaseModel):
     """Full CameraGroup TOML (post-adjustment)."""
 
 
+class BundleAdjustMultiSessionRequest(BaseModel):
+    """Request to jointly bundle-adjust one calibration shared by several sessions.
+
+    Synchronized points from every session are pooled into a single p2ds array,
+    subsampled down to `maxPoints`, and refined in one bundle adjustment run.
+    """
+
+    projectKey: str
+    mvlabelfile: MVLabelFile
+    sessionKeys: list[str]  # names of the sessions with the view stripped out
+
+    maxPoints: int = 5000
+    """Point budget for bundle adjustment. Reprojection errors use all points."""
+
+    iterative: bool = True
+    addl_bundle_adjust_kwargs: dict = {"only_extrinsics": True}
+
+
+class BundleAdjustMultiSessionResponse(BundleAdjustResponse):
+    """Joint bundle adjustment results, plus how many points were used."""
+
+    sessionKeys: list[str]
+    """Sessions whose points contributed to the adjustment."""
+
+    nPointsAvailable: int
+    """Number of synchronized 2D points found across all sessions."""
+
+    nPointsUsed: int
+    """Number of points actually passed to bundle adjustment."""
+
+
 class SaveCalibrationForSessionRequest(BaseModel):
     """Request to persist an updated CameraGroup TOML as the session-level calibration file."""
 
@@ -75,6 +104,14 @@ class SaveCalibrationForSessionRequest(BaseModel):
     newCgToml: str
 
 
+class SaveCalibrationForSessionsRequest(BaseModel):
+    """Request to persist one CameraGroup TOML as the calibration of several sessions."""
+
+    projectKey: str
+    sessionKeys: list[str]  # names of the sessions with the view stripped out
+    newCgToml: str
+
+
 @router.post("/app/v0/rpc/bundleAdjust")
 def bundle_adjust(
         request: BundleAdjustRequest,
@@ -82,6 +119,7 @@ def bundle_adjust(
         config: Config = Depends(deps.config),
 ) -> BundleAdjustResponse:
     """Run bundle adjustment in an isolated subprocess and return before/after reprojection errors."""
+    index = _label_index(request.mvlabelfile)
     with ProcessPoolExecutor(max_workers=1) as executor:
         project: Project = project_info_getter(request.projectKey)
         fut = executor.submit(
@@ -89,14 +127,17 @@ def bundle_adjust(
             request,
             project,
             config,
+            index,
         )
         result = fut.result()
 
     return BundleAdjustResponse.model_validate(result)
 
 
-def _bundle_adjust_impl(request: BundleAdjustRequest, project: Project, config: Config) -> dict:
-    """Load calibration, read label CSVs, run bundle adjustment, and return a result dict."""
+def _bundle_adjust_impl(
+        request: BundleAdjustRequest, project: Project, config: Config, index: MVLabelIndex
+) -> dict:
+    """Load calibration, index the label rows, run bundle adjustment, and return a result dict."""
     camera_group_toml_path = find_calibration_file(request.sessionKey, project, config)
     if camera_group_toml_path is None:
         raise FileNotFoundError(
@@ -108,42 +149,10 @@ def _bundle_adjust_impl(request: BundleAdjustRequest, project: Project, config:
 
     views = list(map(lambda c: c.name, cg.cameras))
 
-    # Group multiview csv files
-    files_by_view = {v.viewName: v.csvPath for v in request.mvlabelfile.views}
-
-    # Read DFs
-    dfs_by_view = {}
-    for view in views:
-        try:
-            csv = files_by_view[view]
-        except KeyError as e:
-            print(f"No CSV found for view from CameraGroup {view}")
-            raise e
-        df = pd.read_csv(csv, header=[0, 1, 2], index_col=0)
-        df = fix_empty_first_row(df)
-        dfs_by_view[view] = df
-    views = list(dfs_by_view.keys())
-
-    p2ds = get_p2ds(dfs_by_view, request.sessionKey)
+    p2ds = _p2ds_from_index(index.for_views(views), [request.sessionKey])
     p3ds = cg.triangulate(p2ds)
     old_reprojection_error = cg.reprojection_error(p3ds, p2ds)
-    if request.iterative:
-        cg.bundle_adjust_iter(
-            p2ds,
-            verbose=True,
-            start_mu=1,  # Low because we are already close
-            end_mu=1,
-            n_samp_iter=min(p2ds.shape[1], 200),
-            n_samp_full=min(p2ds.shape[1], 1000),
-            error_threshold=10,  # Assume points are already good
-            **request.addl_bundle_adjust_kwargs,
-        )
-    else:
-        cg.bundle_adjust(
-            p2ds,
-            verbose=True,
-            **request.addl_bundle_adjust_kwargs,
-        )
+    _run_bundle_adjust(cg, p2ds, request.iterative, request.addl_bundle_adjust_kwargs)
     new_cg_dicts = cg.get_dicts()
     new_cg_toml = dump_as_string(cg)
     p3ds = cg.triangulate(p2ds)
@@ -164,6 +173,124 @@ def _bundle_adjust_impl(request: BundleAdjustRequest, project: Project, config:
     }
 
 
+@router.post("/app/v0/rpc/bundleAdjustMultiSession")
+def bundle_adjust_multi_session(
+        request: BundleAdjustMultiSessionRequest,
+        project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+        config: Config = Depends(deps.config),
+) -> BundleAdjustMultiSessionResponse:
+    """Run one joint bundle adjustment over all requested sessions in an isolated subprocess."""
+    if not request.sessionKeys:
+        raise ApplicationError("Select at least one session to bundle adjust.")
+    index = _label_index(request.mvlabelfile)
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        project: Project = project_info_getter(request.projectKey)
+        fut = executor.submit(
+            _bundle_adjust_multi_session_impl,
+            request,
+            project,
+            config,
+            index,
+        )
+        result = fut.result()
+
+    return BundleAdjustMultiSessionResponse.model_validate(result)
+
+
+def _bundle_adjust_multi_session_impl(
+        request: BundleAdjustMultiSessionRequest,
+        project: Project,
+        config: Config,
+        index: MVLabelIndex,
+) -> dict:
+    """Pool points from sessions sharing a calibration, subsample, and bundle adjust once."""
+    camera_group_toml_path = None
+    camera_group_toml = None
+    for session_key in request.sessionKeys:
+        path = find_calibration_file(session_key, project, config)
+        if path is None:
+            raise FileNotFoundError(f"Could not find calibration file for {session_key}")
+        toml = path.read_text()
+        if camera_group_toml is None:
+            camera_group_toml_path, camera_group_toml = path, toml
+        elif toml != camera_group_toml:
+            raise ApplicationError(
+                f"Session {session_key} uses calibration {path.name}, which differs from "
+                f"{camera_group_toml_path.name}. Joint bundle adjustment requires all "
+                "sessions to share the same calibration."
+            )
+
+    cg = CameraGroup.load(camera_group_toml_path)
+    old_cg_dicts = cg.get_dicts()
+    old_cg_toml = dump_as_string(cg)
+
+    views = list(map(lambda c: c.name, cg.cameras))
+
+    p2ds = _p2ds_from_index(index.for_views(views), request.sessionKeys)
+    p2ds_sample = subsample_p2ds(p2ds, request.maxPoints)
+    logger.info(
+        f"Joint bundle adjustment over {len(request.sessionKeys)} sessions: "
+        f"using {p2ds_sample.shape[1]} of {p2ds.shape[1]} points."
+    )
+
+    p3ds = cg.triangulate(p2ds)
+    old_reprojection_error = cg.reprojection_error(p3ds, p2ds)
+    _run_bundle_adjust(cg, p2ds_sample, request.iterative, request.addl_bundle_adjust_kwargs)
+    new_cg_dicts = cg.get_dicts()
+    new_cg_toml = dump_as_string(cg)
+    p3ds = cg.triangulate(p2ds)
+    new_reprojection_error = cg.reprojection_error(p3ds, p2ds)
+
+    return {
+        "camList": views,
+        "oldReprojectionError": np.linalg.norm(old_reprojection_error, axis=2)
+        .sum(axis=1)
+        .tolist(),
+        "newReprojectionError": np.linalg.norm(new_reprojection_error, axis=2)
+        .sum(axis=1)
+        .tolist(),
+        "oldCgDicts": old_cg_dicts,
+        "newCgDicts": new_cg_dicts,
+        "oldCgToml": old_cg_toml,
+        "newCgToml": new_cg_toml,
+        "sessionKeys": request.sessionKeys,
+        "nPointsAvailable": int(p2ds.shape[1]),
+        "nPointsUsed": int(p2ds_sample.shape[1]),
+    }
+
+
+def _label_index(mvlabelfile: MVLabelFile) -> MVLabelIndex:
+    """Return the (cached) row index of a label file, built in this process.
+
+    Bundle adjustment runs in a fresh subprocess per request, so the index is
+    cached here and handed to it instead of re-reading the CSVs every time.
+    """
+    return load_mv_label_index({v.viewName: v.csvPath for v in mvlabelfile.views})
+
+
+def _run_bundle_adjust(
+        cg: CameraGroup, p2ds: np.ndarray, iterative: bool, addl_bundle_adjust_kwargs: dict
+) -> None:
+    """Refine cg in place from p2ds, with the settings used by the bundle adjust dialog."""
+    if iterative:
+        cg.bundle_adjust_iter(
+            p2ds,
+            verbose=True,
+            start_mu=1,  # Low because we are already close
+            end_mu=1,
+            n_samp_iter=min(p2ds.shape[1], 200),
+            n_samp_full=min(p2ds.shape[1], 1000),
+            error_threshold=10,  # Assume points are already good
+            **addl_bundle_adjust_kwargs,
+        )
+    else:
+        cg.bundle_adjust(
+            p2ds,
+            verbose=True,
+            **addl_bundle_adjust_kwargs,
+        )
+
+
 @router.post("/app/v0/rpc/saveCalibrationForSession")
 def save_calibration_for_session(
         request: SaveCalibrationForSessionRequest,
@@ -172,13 +299,36 @@ def save_calibration_for_session(
 ) -> None:
     """Validate and save a CameraGroup TOML as the session calibration, backing up the old one."""
     project = project_info_getter(request.projectKey)
+    _validate_cg_toml(request.newCgToml)
+    _save_calibration_for_session(request.sessionKey, request.newCgToml, project, config)
+
+
+@router.post("/app/v0/rpc/saveCalibrationForSessions")
+def save_calibration_for_sessions(
+        request: SaveCalibrationForSessionsRequest,
+        project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+        config: Config = Depends(deps.config),
+) -> None:
+    """Save one CameraGroup TOML as the calibration of every listed session (e.g. after joint BA)."""
+    project = project_info_getter(request.projectKey)
+    _validate_cg_toml(request.newCgToml)
+    for session_key in request.sessionKeys:
+        _save_calibration_for_session(session_key, request.newCgToml, project, config)
+
 
+def _validate_cg_toml(cg_toml: str) -> None:
+    """Raise if cg_toml cannot be loaded as a CameraGroup."""
     with tempfile.NamedTemporaryFile(mode="w", suffix=".toml") as f:
-        f.write(request.newCgToml)
+        f.write(cg_toml)
         f.flush()
         CameraGroup.load(f.name)
 
-    session_level_calibration_path = get_session_level_calibration_path(request.sessionKey, project, config)
+
+def _save_calibration_for_session(
+        session_key: str, cg_toml: str, project: Project, config: Config
+) -> None:
+    """Write cg_toml as the session-level calibration, backing up any existing file."""
+    session_level_calibration_path = get_session_level_calibration_path(session_key, project, config)
 
     if session_level_calibration_path.exists():
         backup_path = (
@@ -193,7 +343,7 @@ def save_calibration_for_session(
 
     session_level_calibration_path.parent.mkdir(parents=True, exist_ok=True)
     with open(session_level_calibration_path, "w") as f:
-        f.write(request.newCgToml)
+        f.write(cg_toml)
 
 
 def dump_as_string(cg: CameraGroup) -> str:
@@ -207,64 +357,46 @@ def dump_as_string(cg: CameraGroup) -> str:
         return f.read()
 
 
-def get_is_of_current_session(sessionKey: str) -> Callable[[str], bool]:
-    """Return a predicate that matches image paths belonging to sessionKey."""
-    def is_of_current_session(imgpath: str) -> bool:
-        """Return True if imgpath is from the current session."""
-        return re.search(f"^labeled-data/{re.escape(sessionKey)}_/", imgpath) is not None
-
-    return is_of_current_session
-
-
 def get_p2ds(dfs_by_view: dict[str, pd.DataFrame], sessionKey: str) -> np.ndarray:
     """Build a (C, N, 2) array of shared valid 2-D points across cameras for bundle adjustment."""
-    # 1. Normalize Indices (Remove view-specific prefixes/suffixes)
-    views = list(dfs_by_view.keys())
-    for view in views:
-        dfs_by_view[view].index = dfs_by_view[view].index.str.replace(
-            view, "", regex=False
-        )
-
-    # 2. Identify the "Shared Valid Truth"
-    valid_indices = None
+    return get_p2ds_multisession(dfs_by_view, [sessionKey])
 
-    for view in views:
-        df = dfs_by_view[view]
 
-        # Filter: Session
-        is_of_current_session = get_is_of_current_session(sessionKey=sessionKey.replace(view, ""))
-        session_mask = df.index.map(is_of_current_session)
+def get_p2ds_multisession(
+    dfs_by_view: dict[str, pd.DataFrame],
+    sessionKeys: list[str],
+    index: MVLabelIndex | None = None,
+) -> np.ndarray:
+    """Build a (C, N, 2) array of shared valid 2-D points pooled from all sessionKeys.
 
-        # Filter: NaN coordinates (assuming MultiIndex level 2 is 'x' or 'y')
-        coords_cols = df.columns.get_level_values(2).isin(["x", "y"])
-        non_nan_mask = df.loc[:, coords_cols].notna().all(axis=1)
+    Pass a prebuilt `index` to reuse it across calls on the same label file.
+    """
+    if index is None:
+        index = MVLabelIndex.from_dfs(dfs_by_view)
+    return _p2ds_from_index(index, sessionKeys)
 
-        # Combined valid frames for this specific view
-        current_valid = df.index[session_mask & non_nan_mask]
 
-        if valid_indices is None:
-            valid_indices = current_valid
-        else:
-            valid_indices = valid_indices.intersection(current_valid)
-
-    if valid_indices is None or len(valid_indices) == 0:
+def _p2ds_from_index(index: MVLabelIndex, sessionKeys: list[str]) -> np.ndarray:
+    """Build the (C, N, 2) array of points of the frames of sessionKeys synchronized in index."""
+    rows = index.synchronized_rows(sessionKeys)
+    if rows.shape[1] == 0:
         raise RuntimeError(
-            f"No synchronized valid frames found for session {sessionKey}."
+            f"No synchronized valid frames found for session(s) {', '.join(sessionKeys)}."
         )
 
-    logging.info(f"Final synchronized dataset contains {len(valid_indices)} frames.")
-
-    # 3. Extract, Reshape, and Stack (CxNx2)
-    # .reshape(-1, 2) turns [x1, y1, x2, y2...] into [[x1, y1], [x2, y2]...]
-    processed_arrays = [
-        dfs_by_view[v]
-        .loc[
-            valid_indices, (dfs_by_view[v].columns.get_level_values(2).isin(["x", "y"]))
-        ]
-        .to_numpy()
-        .reshape(-1, 2)
-        for v in views
-    ]
-
-    p2ds = np.stack(processed_arrays)
-    return p2ds
+    logging.info(f"Final synchronized dataset contains {rows.shape[1]} frames.")
+
+    return index.gather_p2ds(rows)
+
+
+def subsample_p2ds(p2ds: np.ndarray, max_points: int, seed: int = 0) -> np.ndarray:
+    """Return at most max_points columns of a (C, N, 2) p2ds array, sampled without replacement.
+
+    Sampling is seeded so repeated runs over the same labels give the same calibration.
+    """
+    n_points = p2ds.shape[1]
+    if max_points <= 0 or n_points <= max_points:
+        return p2ds
+    rng = np.random.default_rng(seed)
+    idxs = np.sort(rng.choice(n_points, size=max_points, replace=False))
+    return p2ds[:, idxs]
@@ -2,29 +2,52 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import hashlib
 import json
 import logging
 import os
 import shutil
+import threading
 import time
-from collections.abc import Iterator
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import wait
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
 from typing import Literal
 
 import yaml
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
 
 from litpose_app import deps
 from litpose_app.datatypes import Project
 from litpose_app.deps import ProjectInfoGetter
+from litpose_app.rootconfig import RootConfig
+from litpose_app.train_queue import get_train_queue, project_lock
+from litpose_app.utils.checkpoints import training_runs
+from litpose_app.utils.gpu_lock import withdraw_gpu_request
+from litpose_app.utils.log_follower import LogFollower
+from litpose_app.utils.model_inventory import ModelInventoryService
+from litpose_app.utils.notifier import ChangeNotifier
+from litpose_app.utils.stat_cache import Signature, StatCache
+from litpose_app.utils.train_metrics import TrainMetricsStore
+from litpose_app.utils.train_wakeup import wake_train_scheduler
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+_MAX_LIST_MODELS_WAIT_SECONDS = 30.0
+# Removed models remembered per model dir; older cursors get a full listing.
+_MAX_REMEMBERED_REMOVALS = 1000
+
 
 StatusLiteral = Literal[
     "PENDING",
@@ -61,6 +84,8 @@ class CreateTrainTaskRequest(BaseModel):
     modelName: str = Field(..., min_length=1)
     # YAML as string, but we store it verbatim; client may send object -> we will stringify if needed
     configYaml: str
+    # Higher priorities start first; see train_queue.py for the order within a priority.
+    priority: int = 0
 
 
 class CreateTrainTaskResponse(BaseModel):
@@ -69,21 +94,40 @@ class CreateTrainTaskResponse(BaseModel):
     ok: bool
 
 
+class ModelSummary(BaseModel):
+    """The few config fields the models table shows, extracted when the config is read."""
+
+    model_type: str | None = None
+    backbone: str | None = None
+    losses_to_use: list[str] = []
+    max_epochs: int | None = None
+    creation_datetime: str | None = None
+    # EKS models: number of ensemble members.
+    n_members: int | None = None
+
+
 class ModelListResponseEntry(BaseModel):
     """Metadata for one model entry returned by listModels."""
 
     model_name: str
     model_relative_path: str
     model_kind: Literal['normal', 'eks'] = 'normal'
+    # None in the "summary" view of listModels; see getModelConfig.
     config: dict | None
     ensemble_config: dict | None = None
     status: TrainStatus | None = None
+    summary: ModelSummary | None = None
 
 
 class ListModelsResponse(BaseModel):
-    """Response containing all model entries for a project."""
+    """Response containing all model entries for a project, or the changes since a cursor."""
 
     models: list[ModelListResponseEntry]
+    # Pass as `since` to get only what changes after this response.
+    cursor: str | None = None
+    # True if models holds only the changed models, and removed the removed models' paths.
+    delta: bool = False
+    removed: list[str] = []
 
 
 class DeleteModelRequest(BaseModel):
@@ -105,8 +149,9 @@ class RenameModelRequest(BaseModel):
 def create_train_task(
     request: CreateTrainTaskRequest,
     project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+    root_config: RootConfig = Depends(deps.root_config),
 ) -> CreateTrainTaskResponse:
-    """Write config.yaml and train_status.json (PENDING) for a new model, ready for the scheduler."""
+    """Write config.yaml and train_status.json (PENDING) for a new model and queue it."""
     project: Project = project_info_getter(request.projectKey)
     if project.paths.model_dir is None:
         raise HTTPException(
@@ -145,97 +190,619 @@ def create_train_task(
     (model_dir / "train_stdout.log").touch(exist_ok=True)
     (model_dir / "train_stderr.log").touch(exist_ok=True)
 
+    get_train_queue(root_config.LP_SYSTEM_DIR).enqueue(
+        request.projectKey, model_dir, priority=request.priority
+    )
+    wake_train_scheduler()
+    _notify_models_changed(project)
     return CreateTrainTaskResponse(ok=True)
 
 
-class ListModelsRequest(BaseModel):
-    """Request to list all models in a project."""
+class TrainQueueEntry(BaseModel):
+    """One queued or launched training task, as returned by listTrainQueue."""
 
     projectKey: str
+    modelRelativePath: str | None
+    priority: int
+    state: str
+    enqueuedAt: float
 
 
-@router.post("/app/v0/rpc/listModels")
-def list_models(
-    request: ListModelsRequest,
+class ListTrainQueueRequest(BaseModel):
+    """Request to list the training queue, optionally of one project."""
+
+    projectKey: str | None = None
+
+
+class ListTrainQueueResponse(BaseModel):
+    """Queue entries, launched first, then in priority and queue-position order."""
+
+    entries: list[TrainQueueEntry]
+
+
+class UpdateTrainQueueEntryRequest(BaseModel):
+    """Request to change the priority and/or the position of a queued training task."""
+
+    projectKey: str
+    modelRelativePath: str
+    priority: int | None = None
+    # Move the task just before this one; the empty string moves it to the end.
+    beforeModelRelativePath: str | None = None
+
+
+class CancelTrainTaskRequest(BaseModel):
+    """Request to cancel a training task that hasn't started yet."""
+
+    projectKey: str
+    modelRelativePath: str
+
+
+def _queued_model_dir(project: Project, model_relative_path: str) -> Path:
+    """Resolve a model path within the project's model dir, as stored in the queue."""
+    model_dir = Path(project.paths.model_dir / model_relative_path).resolve()
+    try:
+        model_dir.relative_to(Path(project.paths.model_dir).resolve())
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid model path.",
+        )
+    return model_dir
+
+
+@router.post("/app/v0/rpc/listTrainQueue")
+def list_train_queue(
+    request: ListTrainQueueRequest,
+    project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+    root_config: RootConfig = Depends(deps.root_config),
+) -> ListTrainQueueResponse:
+    """Return the training tasks waiting to start or running, in queue order."""
+    entries = []
+    model_dirs: dict[str, Path] = {}
+    for e in get_train_queue(root_config.LP_SYSTEM_DIR).entries(request.projectKey):
+        if e.project_key not in model_dirs:
+            model_dirs[e.project_key] = Path(
+                project_info_getter(e.project_key).paths.model_dir
+            ).resolve()
+        try:
+            rel = str(e.model_dir.relative_to(model_dirs[e.project_key]))
+        except ValueError:
+            rel = None
+        entries.append(
+            TrainQueueEntry(
+                projectKey=e.project_key,
+                modelRelativePath=rel,
+                priority=e.priority,
+                state=e.state,
+                enqueuedAt=e.enqueued_at,
+            )
+        )
+    return ListTrainQueueResponse(entries=entries)
+
+
+@router.post("/app/v0/rpc/updateTrainQueueEntry")
+def update_train_queue_entry(
+    request: UpdateTrainQueueEntryRequest,
+    project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+    root_config: RootConfig = Depends(deps.root_config),
+) -> None:
+    """Reprioritize and/or reorder a queued training task."""
+    project: Project = project_info_getter(request.projectKey)
+    model_dir = _queued_model_dir(project, request.modelRelativePath)
+    queue = get_train_queue(root_config.LP_SYSTEM_DIR)
+    ok = True
+    if request.priority is not None:
+        ok = queue.set_priority(model_dir, request.priority)
+    if ok and request.beforeModelRelativePath is not None:
+        before = (
+            _queued_model_dir(project, request.beforeModelRelativePath)
+            if request.beforeModelRelativePath
+            else None
+        )
+        ok = queue.move(model_dir, before)
+    if not ok:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Training task is not queued.",
+        )
+    wake_train_scheduler()
+
+
+@router.post("/app/v0/rpc/cancelTrainTask")
+def cancel_train_task(
+    request: CancelTrainTaskRequest,
     project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
-) -> ListModelsResponse:
-    """Return all model entries found in the project's model directory (up to 2 levels deep)."""
-    models: list[ModelListResponseEntry] = []
+    root_config: RootConfig = Depends(deps.root_config),
+) -> None:
+    """Remove a queued training task from the queue and mark it CANCELED."""
     project: Project = project_info_getter(request.projectKey)
+    model_dir = _queued_model_dir(project, request.modelRelativePath)
+    if not get_train_queue(root_config.LP_SYSTEM_DIR).cancel(model_dir):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Training task is not queued.",
+        )
+    # Give up the place the scheduler may hold for it in the GPU queue.
+    withdraw_gpu_request(f"train:{request.projectKey}:{model_dir.name}")
+    status_path = model_dir / "train_status.json"
+    status_path.write_text(json.dumps(TrainStatus(status="CANCELED").model_dump(), indent=2))
+    _notify_models_changed(project)
+
+
+class ListModelsRequest(BaseModel):
+    """Request to list all models in a project, or the changes since a cursor."""
+
+    projectKey: str
+    # Cursor of a previous response: return only models changed since then.
+    since: str | None = None
+    # With since: if nothing changed yet, wait up to this long for a change (long-poll).
+    waitSeconds: float = Field(default=0.0, ge=0.0, le=_MAX_LIST_MODELS_WAIT_SECONDS)
+    # "summary" leaves out config and ensemble_config, keeping only each model's summary.
+    view: Literal['full', 'summary'] = 'full'
+
+
+# Parsed model entries and model dir listings, reused until their files change.
+_model_entry_cache: StatCache[ModelListResponseEntry] = StatCache()
+_model_dir_listing_cache: StatCache[list[Path]] = StatCache(max_entries=1024)
+# Last listModels bodies per model dir and view, as (ETag, JSON bytes), least
+# recently used dropped first.
+_list_models_bodies: OrderedDict[tuple[Path, str], tuple[str, bytes]] = OrderedDict()
+_list_models_bodies_lock = threading.Lock()
+_MAX_LIST_MODELS_BODIES = 64
+
+
+@dataclass
+class _ModelScan:
+    """Models of a model dir and the stat signatures of the files they were read from."""
+
+    models: list[ModelListResponseEntry]
+    signatures: list[Signature]
+    # Signatures of each model's files, by model relative path.
+    entry_signatures: dict[str, tuple[Signature, ...]]
+
+
+@dataclass
+class _ModelChanges:
+    """Versions at which the models of one model dir last changed, for listModels deltas."""
+
+    version: int = 0
+    changed_at: dict[str, tuple[int, tuple[Signature, ...]]] = field(default_factory=dict)
+    removed_at: dict[str, int] = field(default_factory=dict)
+    # Deltas from before this version can't be given (their removals were forgotten).
+    oldest_version: int = 0
+    # The latest scan, which long-polls read instead of scanning themselves.
+    scan: _ModelScan | None = None
+
+    def update(self, scan: _ModelScan) -> None:
+        """Bump the version of models that appeared, changed or disappeared since last scan."""
+        self.scan = scan
+        bumped = False
+        for path, sigs in scan.entry_signatures.items():
+            previous = self.changed_at.get(path)
+            if previous is None or previous[1] != sigs:
+                if not bumped:
+                    self.version += 1
+                    bumped = True
+                self.changed_at[path] = (self.version, sigs)
+                self.removed_at.pop(path, None)
+        for path in list(self.changed_at):
+            if path not in scan.entry_signatures:
+                if not bumped:
+                    self.version += 1
+                    bumped = True
+                del self.changed_at[path]
+                self.removed_at[path] = self.version
+        while len(self.removed_at) > _MAX_REMEMBERED_REMOVALS:
+            path = min(self.removed_at, key=self.removed_at.__getitem__)
+            self.oldest_version = self.removed_at.pop(path)
+
+    def since(self, version: int) -> tuple[set[str], list[str]] | None:
+        """Return (changed paths, removed paths) after version, or None if unknown."""
+        if version < self.oldest_version or version > self.version:
+            return None
+        changed = {p for p, (v, _) in self.changed_at.items() if v > version}
+        removed = sorted(p for p, v in self.removed_at.items() if v > version)
+        return changed, removed
+
+
+# Cursors from another server process (e.g. before a restart) get a full listing.
+_MODEL_CHANGES_EPOCH = uuid.uuid4().hex[:8]
+_model_changes: dict[Path, _ModelChanges] = {}
+_model_changes_lock = threading.Lock()
+# Published by the scanner of a model dir when its models changed, waking long-polls.
+_models_notifier = ChangeNotifier()
+_LIST_MODELS_POLL_SECONDS = 1.0
+
+
+@dataclass
+class _ModelDirScanner:
+    """Background rescans of one model dir while listModels calls long-poll it.
+
+    Models also change in other processes (the train scheduler, the training
+    itself, the user), which don't tell this one. So one thread per model dir
+    rescans it every `_LIST_MODELS_POLL_SECONDS`, however many calls wait on it,
+    and publishes to `_models_notifier` when something changed.
+    """
+
+    waiters: int = 0
+    # Set to rescan at once (this process changed a model).
+    wake: threading.Event = field(default_factory=threading.Event)
+
+
+_model_dir_scanners: dict[Path, _ModelDirScanner] = {}
+_model_dir_scanners_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def _scanning(model_dir: Path) -> Iterator[None]:
+    """Keep model_dir's scanner running for the block, starting it if needed."""
+    with _model_dir_scanners_lock:
+        scanner = _model_dir_scanners.get(model_dir)
+        if scanner is None:
+            scanner = _model_dir_scanners[model_dir] = _ModelDirScanner()
+            threading.Thread(
+                target=_run_model_dir_scanner,
+                args=(model_dir, scanner),
+                name=f"model-scanner-{model_dir.name}",
+                daemon=True,
+            ).start()
+        scanner.waiters += 1
+    try:
+        yield
+    finally:
+        with _model_dir_scanners_lock:
+            scanner.waiters -= 1
+
+
+def _run_model_dir_scanner(model_dir: Path, scanner: _ModelDirScanner) -> None:
+    """Scanner thread: rescan model_dir and publish its changes until nobody waits."""
+    while True:
+        scanner.wake.wait(_LIST_MODELS_POLL_SECONDS)
+        scanner.wake.clear()
+        with _model_dir_scanners_lock:
+            if scanner.waiters == 0:
+                del _model_dir_scanners[model_dir]
+                return
+        with _model_changes_lock:
+            changes = _model_changes.get(model_dir)
+            version = changes.version if changes is not None else None
+        try:
+            _, changes = _scan_and_track(model_dir)
+        except Exception:
+            logger.exception("Failed to scan model directory %s", model_dir)
+            continue
+        with _model_changes_lock:
+            changed = changes.version != version
+        if changed:
+            _models_notifier.publish(str(model_dir))
+
+
+def _notify_models_changed(project: Project) -> None:
+    """Have the project's models rescanned now, if listModels calls are waiting on them."""
     if project.paths.model_dir is None:
-        return ListModelsResponse(models=models)
+        return
+    with _model_dir_scanners_lock:
+        scanner = _model_dir_scanners.get(Path(project.paths.model_dir))
+    if scanner is not None:
+        scanner.wake.set()
 
-    model_dir = Path(project.paths.model_dir)
-    models = read_models_l1_from_base(model_dir, model_dir)
+
+def _scan_models(model_dir: Path) -> _ModelScan:
+    """Read the models of model_dir (up to 2 levels deep) through the stat caches."""
+    scan = _ModelScan(models=[], signatures=[], entry_signatures={})
+    models = _read_models_l1(model_dir, model_dir, scan.signatures, scan.entry_signatures)
     for m in models:
         if m.config is None and m.model_kind != 'eks':
             models.extend(
-                read_models_l1_from_base(model_dir, model_dir / m.model_relative_path)
+                _read_models_l1(
+                    model_dir,
+                    model_dir / m.model_relative_path,
+                    scan.signatures,
+                    scan.entry_signatures,
+                )
             )
+    scan.models = [m for m in models if m.config is not None or m.model_kind == 'eks']
+    scan.entry_signatures = {
+        m.model_relative_path: scan.entry_signatures[m.model_relative_path] for m in scan.models
+    }
+    return scan
 
-    models = [m for m in models if m.config is not None or m.model_kind == 'eks']
 
-    return ListModelsResponse(models=models)
+def _scan_and_track(model_dir: Path) -> tuple[_ModelScan, _ModelChanges]:
+    """Scan model_dir and record what changed since the previous scan."""
+    scan = _scan_models(model_dir)
+    with _model_changes_lock:
+        changes = _model_changes.setdefault(model_dir, _ModelChanges())
+        changes.update(scan)
+    return scan, changes
 
 
-def read_models_l1_from_base(
-    model_dir: Path, iter_base: Path
+def _project_models(
+    models: list[ModelListResponseEntry], view: str
 ) -> list[ModelListResponseEntry]:
-    """Return one ModelListResponseEntry per immediate child directory of iter_base."""
+    """Return the entries as shown in the given listModels view."""
+    if view == 'full':
+        return models
+    return [m.model_copy(update={"config": None, "ensemble_config": None}) for m in models]
+
+
+def _models_delta(
+    model_dir: Path, since: int, view: str, rescan: bool = True
+) -> ListModelsResponse | None:
+    """Scan model_dir and return the changes after version since (None if there are none).
+
+    Without rescan, the latest scan is used instead (model_dir must have been
+    scanned before). Returns a full listing if the changes since that version
+    are unknown.
+    """
+    if rescan:
+        scan, changes = _scan_and_track(model_dir)
+    with _model_changes_lock:
+        if not rescan:
+            changes = _model_changes[model_dir]
+            scan = changes.scan
+        cursor = f"{_MODEL_CHANGES_EPOCH}:{changes.version}"
+        delta = changes.since(since)
+    if delta is None:
+        return ListModelsResponse(models=_project_models(scan.models, view), cursor=cursor)
+    changed, removed = delta
+    if not changed and not removed:
+        return None
+    return ListModelsResponse(
+        models=_project_models(
+            [m for m in scan.models if m.model_relative_path in changed], view
+        ),
+        cursor=cursor,
+        delta=True,
+        removed=removed,
+    )
+
+
+def _parse_cursor(cursor: str) -> int | None:
+    """Return the version of a cursor issued by this process, or None."""
+    epoch, _, version = cursor.partition(":")
+    if epoch != _MODEL_CHANGES_EPOCH or not version.isdigit():
+        return None
+    return int(version)
+
+
+@router.post("/app/v0/rpc/listModels", response_model=ListModelsResponse)
+async def list_models(
+    request: ListModelsRequest,
+    http_request: Request,
+    project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+) -> Response:
+    """Return all model entries found in the project's model directory (up to 2 levels deep).
+
+    Entries are served from a cache checked with a few stats per model, and the
+    response carries an ETag; a matching If-None-Match gets a 304.
+
+    With `since` (the cursor of a previous response), only the models changed
+    since then are returned, with the paths of removed ones. If none changed,
+    the call waits up to `waitSeconds` for a change, then returns an empty delta.
+    Waiting calls don't scan: they are woken by the model dir's shared scanner.
+
+    The "summary" view leaves out the parsed configs, which the models table
+    doesn't need; getModelConfig returns them for one model.
+    """
+    project: Project = project_info_getter(request.projectKey)
+    if project.paths.model_dir is None:
+        return Response(
+            content=ListModelsResponse(models=[]).model_dump_json(),
+            media_type="application/json",
+        )
+    model_dir = Path(project.paths.model_dir)
+
+    since = _parse_cursor(request.since) if request.since else None
+    if request.since and since is not None:
+        deadline = time.monotonic() + request.waitSeconds
+        resp = await run_in_threadpool(_models_delta, model_dir, since, request.view)
+        if resp is None and request.waitSeconds > 0:
+            # Subscribed before the scanner starts, so none of its changes are missed.
+            with _models_notifier.subscribe(str(model_dir)) as sub, _scanning(model_dir):
+                while resp is None and (remaining := deadline - time.monotonic()) > 0:
+                    if await sub.wait(remaining):
+                        resp = await run_in_threadpool(
+                            _models_delta, model_dir, since, request.view, False
+                        )
+        if resp is None:
+            with _model_changes_lock:
+                version = _model_changes[model_dir].version
+            resp = ListModelsResponse(
+                models=[], cursor=f"{_MODEL_CHANGES_EPOCH}:{version}", delta=True
+            )
+        return Response(content=resp.model_dump_json(), media_type="application/json")
+
+    scan, changes = await run_in_threadpool(_scan_and_track, model_dir)
+    with _model_changes_lock:
+        version = changes.version
+    digest = hashlib.sha1(
+        repr(
+            (str(model_dir), request.view, _MODEL_CHANGES_EPOCH, version, scan.signatures)
+        ).encode()
+    ).hexdigest()
+    etag = f'"{digest}"'
+    if_none_match = http_request.headers.get("if-none-match", "")
+    if etag in [tag.strip(" W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    key = (model_dir, request.view)
+    with _list_models_bodies_lock:
+        cached = _list_models_bodies.get(key)
+        if cached is not None:
+            _list_models_bodies.move_to_end(key)
+    if cached is not None and cached[0] == etag:
+        body = cached[1]
+    else:
+        body = ListModelsResponse(
+            models=_project_models(scan.models, request.view),
+            cursor=f"{_MODEL_CHANGES_EPOCH}:{version}",
+        ).model_dump_json().encode()
+        with _list_models_bodies_lock:
+            _list_models_bodies[key] = (etag, body)
+            _list_models_bodies.move_to_end(key)
+            while len(_list_models_bodies) > _MAX_LIST_MODELS_BODIES:
+                _list_models_bodies.popitem(last=False)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+def _read_model_entry(model_dir: Path, child_path: Path) -> ModelListResponseEntry:
+    """Read config/ensemble/status from child_path and return a ModelListResponseEntry."""
+    ensemble_path = child_path / "ensemble.yaml"
+    config_path = child_path / "config.yaml"
+    status_path = child_path / "train_status.json"
+    config = None
+    ensemble_config = None
+    model_kind: Literal['normal', 'eks'] = 'normal'
+    status = None
+
+    if ensemble_path.is_file():
+        model_kind = 'eks'
+        try:
+            content = ensemble_path.read_text()
+            ensemble_config = yaml.safe_load(content)
+        except Exception:
+            logger.exception("Failed to read ensemble.yaml for %s", child_path)
+    elif config_path.is_file():
+        try:
+            content = config_path.read_text()
+            config = yaml.safe_load(content)
+        except Exception:
+            logger.exception("Failed to read config.yaml for %s", child_path)
+
+    if status_path.is_file():
+        try:
+            content = status_path.read_text()
+            status_data = json.loads(content)
+            status = TrainStatus(**status_data)
+        except Exception:
+            logger.exception("Failed to read train_status.json for %s", child_path)
+
+    return ModelListResponseEntry(
+        model_name=child_path.name,
+        model_relative_path=str(child_path.relative_to(model_dir)),
+        model_kind=model_kind,
+        config=config,
+        ensemble_config=ensemble_config,
+        status=status,
+        summary=_summarize(config, ensemble_config),
+    )
+
+
+def _summarize(config: dict | None, ensemble_config: dict | None) -> ModelSummary | None:
+    """Extract the summary fields of a model's config (or ensemble config)."""
+    if isinstance(ensemble_config, dict):
+        members = ensemble_config.get("members")
+        return ModelSummary(
+            creation_datetime=_str_or_none(ensemble_config.get("creation_datetime")),
+            n_members=len(members) if isinstance(members, list) else None,
+        )
+    if not isinstance(config, dict):
+        return None
+    model = config.get("model") if isinstance(config.get("model"), dict) else {}
+    training = config.get("training") if isinstance(config.get("training"), dict) else {}
+    losses = model.get("losses_to_use")
+    max_epochs = training.get("max_epochs")
+    return ModelSummary(
+        model_type=_str_or_none(model.get("model_type")),
+        backbone=_str_or_none(model.get("backbone")),
+        losses_to_use=[str(x) for x in losses] if isinstance(losses, list) else [],
+        max_epochs=max_epochs if isinstance(max_epochs, int) else None,
+        creation_datetime=_str_or_none(config.get("creation_datetime")),
+    )
+
+
+def _str_or_none(value: object) -> str | None:
+    """Return value as a string, or None if it's missing."""
+    return None if value is None else str(value)
+
+
+def _list_child_dirs(iter_base: Path) -> list[Path]:
+    """Return the immediate child directories of iter_base, sorted (none if it's missing)."""
     if not iter_base.exists():
         return []
+    return sorted([p for p in iter_base.iterdir() if p.is_dir()])
 
-    def read_model_config(child_path: Path) -> ModelListResponseEntry:
-        """Read config/ensemble/status from child_path and return a ModelListResponseEntry."""
-        ensemble_path = child_path / "ensemble.yaml"
-        config_path = child_path / "config.yaml"
-        status_path = child_path / "train_status.json"
-        config = None
-        ensemble_config = None
-        model_kind: Literal['normal', 'eks'] = 'normal'
-        status = None
-
-        if ensemble_path.is_file():
-            model_kind = 'eks'
-            try:
-                content = ensemble_path.read_text()
-                ensemble_config = yaml.safe_load(content)
-            except Exception:
-                logger.exception("Failed to read ensemble.yaml for %s", child_path)
-        elif config_path.is_file():
-            try:
-                content = config_path.read_text()
-                config = yaml.safe_load(content)
-            except Exception:
-                logger.exception("Failed to read config.yaml for %s", child_path)
-
-        if status_path.is_file():
-            try:
-                content = status_path.read_text()
-                status_data = json.loads(content)
-                status = TrainStatus(**status_data)
-            except Exception:
-                logger.exception("Failed to read train_status.json for %s", child_path)
-
-        return ModelListResponseEntry(
-            model_name=child_path.name,
-            model_relative_path=str(child_path.relative_to(model_dir)),
-            model_kind=model_kind,
-            config=config,
-            ensemble_config=ensemble_config,
-            status=status,
-        )
 
-    paths = sorted([p for p in iter_base.iterdir() if p.is_dir()])
-    models = [read_model_config(p) for p in paths]
+def _cached_model_entry(
+    model_dir: Path, child: Path
+) -> tuple[ModelListResponseEntry, tuple[Signature, ...]]:
+    """Return the entry of one model dir, re-read only if its files changed."""
+    return _model_entry_cache.get(
+        (model_dir, child),
+        [child / "ensemble.yaml", child / "config.yaml", child / "train_status.json"],
+        lambda: _read_model_entry(model_dir, child),
+    )
+
 
+def _read_models_l1(
+    model_dir: Path,
+    iter_base: Path,
+    signatures: list[Signature],
+    entry_signatures: dict[str, tuple[Signature, ...]] | None = None,
+) -> list[ModelListResponseEntry]:
+    """Return the cached entries of iter_base's child dirs, adding the signatures they depend on.
+
+    entry_signatures, if given, also gets each entry's own signatures by relative path.
+    """
+    children, dir_signatures = _model_dir_listing_cache.get(
+        iter_base, [iter_base], lambda: _list_child_dirs(iter_base)
+    )
+    signatures.extend(dir_signatures)
+    models = []
+    for child in children:
+        entry, sigs = _cached_model_entry(model_dir, child)
+        signatures.extend(sigs)
+        if entry_signatures is not None:
+            entry_signatures[entry.model_relative_path] = sigs
+        models.append(entry)
     return models
 
 
+def read_models_l1_from_base(
+    model_dir: Path, iter_base: Path
+) -> list[ModelListResponseEntry]:
+    """Return one ModelListResponseEntry per immediate child directory of iter_base."""
+    return _read_models_l1(model_dir, iter_base, [])
+
+
+class GetModelConfigRequest(BaseModel):
+    """Request for the full config of one model."""
+
+    projectKey: str
+    modelRelativePath: str
+
+
+class GetModelConfigResponse(BaseModel):
+    """The parsed config.yaml (or ensemble.yaml for EKS models) of one model."""
+
+    model_kind: Literal['normal', 'eks'] = 'normal'
+    config: dict | None = None
+    ensemble_config: dict | None = None
+
+
+@router.post("/app/v0/rpc/getModelConfig")
+def get_model_config(
+    request: GetModelConfigRequest,
+    project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+) -> GetModelConfigResponse:
+    """Return the full config of one model, for clients listing models in the summary view."""
+    project: Project = project_info_getter(request.projectKey)
+    _existing_model_dir(project, request.modelRelativePath)
+    model_dir = Path(project.paths.model_dir)
+    entry, _ = _cached_model_entry(model_dir, model_dir / request.modelRelativePath)
+    return GetModelConfigResponse(
+        model_kind=entry.model_kind,
+        config=entry.config,
+        ensemble_config=entry.ensemble_config,
+    )
+
+
 @router.post("/app/v0/rpc/deleteModel")
 def delete_model(
     request: DeleteModelRequest,
     project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+    root_config: RootConfig = Depends(deps.root_config),
 ) -> None:
     """Delete the model directory for the given model relative path."""
     project: Project = project_info_getter(request.projectKey)
@@ -245,7 +812,11 @@ def delete_model(
         os.path.normpath(project.paths.model_dir)
     )
 
+    get_train_queue(root_config.LP_SYSTEM_DIR).cancel(model_dir)
+    get_train_metrics_store().forget(model_dir.resolve())
+    get_model_inventory_service().forget(model_dir.resolve())
     shutil.rmtree(model_dir)
+    _notify_models_changed(project)
 
 
 class EnsembleMember(BaseModel):
@@ -263,6 +834,9 @@ class CreateEksModelRequest(BaseModel):
     view_names: list[str]
     smooth_param: float = 1000.0
     quantile_keep_pca: float = 50.0
+    # Smooth long sessions in overlapping windows of this many frames, bounding memory.
+    chunk_frames: int | None = Field(default=None, gt=0)
+    chunk_overlap_frames: int = Field(default=600, ge=0)
 
 
 class CreateEksModelResponse(BaseModel):
@@ -309,7 +883,16 @@ def create_eks_model(
         "quantile_keep_pca": request.quantile_keep_pca,
         "creation_datetime": datetime.now().isoformat(),
     }
+    if request.chunk_frames is not None:
+        if request.chunk_overlap_frames >= request.chunk_frames:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="chunk_overlap_frames must be smaller than chunk_frames.",
+            )
+        ensemble_data["chunk_frames"] = request.chunk_frames
+        ensemble_data["chunk_overlap_frames"] = request.chunk_overlap_frames
     (model_dir / "ensemble.yaml").write_text(yaml.dump(ensemble_data, default_flow_style=False))
+    _notify_models_changed(project)
 
     return CreateEksModelResponse(ok=True)
 
@@ -318,6 +901,7 @@ def create_eks_model(
 def rename_model(
     request: RenameModelRequest,
     project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+    root_config: RootConfig = Depends(deps.root_config),
 ) -> None:
     """Rename (move) a model directory to a new name within the project's model dir."""
     project: Project = project_info_getter(request.projectKey)
@@ -326,86 +910,430 @@ def rename_model(
     assert os.path.normpath(model_dir).startswith(
         os.path.normpath(project.paths.model_dir)
     )
-    shutil.move(model_dir, project.paths.model_dir / request.newModelName)
+    new_model_dir = project.paths.model_dir / request.newModelName
+    shutil.move(model_dir, new_model_dir)
+    # A queued task keeps its place under the new name.
+    get_train_queue(root_config.LP_SYSTEM_DIR).rename(model_dir, new_model_dir)
+    get_train_metrics_store().forget(model_dir.resolve())
+    get_model_inventory_service().forget(model_dir.resolve())
+    _notify_models_changed(project)
 
 
 _TRAIN_TERMINAL = {"COMPLETED", "FAILED", "CANCELED"}
 
 
-def _tail_log_file(path: Path, offset: int) -> tuple[list[str], int]:
-    """Read new bytes from a log file starting at byte offset. Returns (lines, new_offset)."""
+def _existing_model_dir(project: Project, model_relative_path: str) -> Path:
+    """Resolve a model dir of the project, raising 400 if it's outside it and 404 if missing."""
+    if project.paths.model_dir is None:
+        raise HTTPException(status_code=400, detail="Project model_dir is not configured.")
+    model_dir = (Path(project.paths.model_dir) / model_relative_path).resolve()
+    try:
+        model_dir.relative_to(Path(project.paths.model_dir).resolve())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid model path.")
+    if not model_dir.exists():
+        raise HTTPException(status_code=404, detail="Model directory not found.")
+    return model_dir
+
+
+_log_follower: LogFollower | None = None
+_log_follower_lock = threading.Lock()
+
+
+def get_log_follower() -> LogFollower:
+    """Return the process-wide follower of training log files, creating it on first use."""
+    global _log_follower
+    with _log_follower_lock:
+        if _log_follower is None:
+            _log_follower = LogFollower()
+        return _log_follower
+
+
+def _read_train_status(status_path: Path) -> TrainStatus | None:
+    """Return the status in train_status.json, or None if it's missing or unreadable."""
     try:
-        with open(path, "rb") as f:
-            f.seek(offset)
-            chunk = f.read()
-        new_offset = offset + len(chunk)
-        lines = [ln for ln in chunk.decode("utf-8", errors="replace").splitlines() if ln]
-        return lines, new_offset
-    except FileNotFoundError:
-        return [], offset
-
-
-def _stream_sse_sync(gen: Iterator[dict]) -> Iterator[str]:
-    """Wrap a dict generator as SSE-formatted text/event-stream chunks."""
-    for payload in gen:
+        return TrainStatus.model_validate(json.loads(status_path.read_text()))
+    except Exception:
+        return None
+
+
+async def _stream_sse(gen: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Wrap an async dict generator as SSE-formatted text/event-stream chunks."""
+    async for payload in gen:
         data = json.dumps(payload)
         yield f"data: {data}\n\n"
 
 
+# -----------------------------
+# Training metrics
+# -----------------------------
+
+# Metrics are re-read when the training's log or status changes, but at most this often.
+_TRAIN_METRICS_MIN_INTERVAL_SECONDS = 1.0
+# Re-read anyway after this long, in case the training logs metrics without printing.
+_TRAIN_METRICS_POLL_SECONDS = 10.0
+
+_train_metrics_store: TrainMetricsStore | None = None
+_train_metrics_store_lock = threading.Lock()
+
+
+def get_train_metrics_store() -> TrainMetricsStore:
+    """Return the process-wide store of live training metrics, creating it on first use."""
+    global _train_metrics_store
+    with _train_metrics_store_lock:
+        if _train_metrics_store is None:
+            _train_metrics_store = TrainMetricsStore()
+        return _train_metrics_store
+
+
+class GetTrainMetricsRequest(BaseModel):
+    """Request for the training metrics logged after a cursor."""
+
+    projectKey: str
+    modelRelativePath: str
+    # Cursor returned by the previous call; 0 for everything.
+    since: int = 0
+
+
+class TrainMetricsResponse(BaseModel):
+    """Downsampled [step, value] points per metric, logged after the request's cursor."""
+
+    cursor: int
+    epoch: int | None = None
+    step: int | None = None
+    series: dict[str, list[tuple[int, float]]] = {}
+
+
+@router.post("/app/v0/rpc/getTrainMetrics")
+def get_train_metrics(
+    request: GetTrainMetricsRequest,
+    project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+) -> TrainMetricsResponse:
+    """Return the epoch, step and metric points a model's training logged since a cursor."""
+    model_dir = _existing_model_dir(
+        project_info_getter(request.projectKey), request.modelRelativePath
+    )
+    metrics = get_train_metrics_store().get(model_dir)
+    return TrainMetricsResponse(**metrics.delta(request.since))
+
+
+# Registered before stream_train_task, whose path pattern also matches this one.
+@router.get("/app/v0/rpc/models/{projectKey}/{modelRelativePath:path}/metrics/stream")
+async def stream_train_metrics(
+    projectKey: str,
+    modelRelativePath: str,
+    since: int = 0,
+    project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+) -> StreamingResponse:
+    """Stream new training metrics via SSE until training terminates.
+
+    Metrics files live in run directories created during training, so they can't
+    be watched up front. Instead the shared `LogFollower` wakes the stream when
+    train_stdout.log (written to as training progresses) or train_status.json
+    changes, and the metrics are re-read then, at most every
+    `_TRAIN_METRICS_MIN_INTERVAL_SECONDS`.
+    """
+    model_dir = _existing_model_dir(project_info_getter(projectKey), modelRelativePath)
+    status_path = model_dir / "train_status.json"
+    stdout_path = model_dir / "train_stdout.log"
+    store = get_train_metrics_store()
+
+    def read() -> tuple[bool, dict]:
+        """Return whether training has terminated, and the model's refreshed metrics."""
+        ts = _read_train_status(status_path)
+        # Read after the status, so the last points of a finished run are included.
+        return ts is not None and ts.status in _TRAIN_TERMINAL, store.get(model_dir)
+
+    async def events() -> AsyncIterator[dict]:
+        """Yield a metrics event whenever new points were logged, then a final one."""
+        cursor = since
+        first = True
+        async with get_log_follower().follow(watch=[stdout_path, status_path]) as sub:
+            while True:
+                done, metrics = await run_in_threadpool(read)
+                delta = metrics.delta(cursor)
+                if delta["series"] or first:
+                    first = False
+                    cursor = delta["cursor"]
+                    yield {"type": "metrics", **delta}
+                if done:
+                    break
+                await sub.wait(_TRAIN_METRICS_POLL_SECONDS)
+                await asyncio.sleep(_TRAIN_METRICS_MIN_INTERVAL_SECONDS)
+
+    return StreamingResponse(_stream_sse(events()), media_type="text/event-stream")
+
+
+# -----------------------------
+# Training logs
+# -----------------------------
+
 @router.get("/app/v0/rpc/models/{projectKey}/{modelRelativePath:path}/stream")
-def stream_train_task(
+async def stream_train_task(
     projectKey: str,
     modelRelativePath: str,
     project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
 ) -> StreamingResponse:
-    """Stream training logs and status updates via SSE for a given model."""
-    project: Project = project_info_getter(projectKey)
-    if project.paths.model_dir is None:
-        raise HTTPException(status_code=400, detail="Project model_dir is not configured.")
-    model_dir = (Path(project.paths.model_dir) / modelRelativePath).resolve()
-    try:
-        model_dir.relative_to(project.paths.model_dir)
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid model path.")
-    if not model_dir.exists():
-        raise HTTPException(status_code=404, detail="Model directory not found.")
+    """Stream training logs and status updates via SSE for a given model.
+
+    The log files are read by the shared `LogFollower`, which wakes the stream when
+    they or train_status.json change; in between the stream just awaits. A client
+    gets the last `LogFollower.max_lines` lines of each log first, preceded by a
+    line saying how many earlier ones were left out, rather than the whole log.
+    """
+    model_dir = _existing_model_dir(project_info_getter(projectKey), modelRelativePath)
 
     stdout_path = model_dir / "train_stdout.log"
     stderr_path = model_dir / "train_stderr.log"
     status_path = model_dir / "train_status.json"
 
-    def poller() -> Iterator[dict]:
-        """Poll log files and train_status.json, yielding SSE events until training terminates."""
-        stdout_offset = 0
-        stderr_offset = 0
-        last_status: str | None = None
-
-        while True:
-            # Emit any new log lines
-            stdout_lines, stdout_offset = _tail_log_file(stdout_path, stdout_offset)
-            stderr_lines, stderr_offset = _tail_log_file(stderr_path, stderr_offset)
-            all_lines = stdout_lines + [f"[stderr] {ln}" for ln in stderr_lines]
-            if all_lines:
-                yield {"type": "log", "lines": all_lines}
-
-            # Emit status if it changed
-            try:
-                ts = TrainStatus.model_validate(json.loads(status_path.read_text()))
-                if ts.status != last_status:
+    async def events() -> AsyncIterator[dict]:
+        """Yield log and status SSE events as the files change, until training terminates."""
+        async with get_log_follower().follow(
+            stdout_path, stderr_path, watch=[status_path]
+        ) as sub:
+            last_status: str | None = None
+
+            while True:
+                # Emit any new log lines
+                all_lines = sub.read_lines(stdout_path) + [
+                    f"[stderr] {ln}" for ln in sub.read_lines(stderr_path)
+                ]
+                if all_lines:
+                    yield {"type": "log", "lines": all_lines}
+
+                # Emit status if it changed
+                ts = await run_in_threadpool(_read_train_status, status_path)
+                if ts is not None and ts.status != last_status:
                     last_status = ts.status
                     yield {"type": "status", **ts.model_dump()}
-            except Exception:
-                pass
 
-            if last_status in _TRAIN_TERMINAL:
-                # Final drain
-                stdout_lines, _ = _tail_log_file(stdout_path, stdout_offset)
-                stderr_lines, _ = _tail_log_file(stderr_path, stderr_offset)
-                final_lines = stdout_lines + [f"[stderr] {ln}" for ln in stderr_lines]
-                if final_lines:
-                    yield {"type": "log", "lines": final_lines}
-                break
+                if last_status in _TRAIN_TERMINAL:
+                    # Final drain, including a last line without a newline
+                    final_lines = await run_in_threadpool(
+                        lambda: sub.read_lines(stdout_path, final=True)
+                        + [f"[stderr] {ln}" for ln in sub.read_lines(stderr_path, final=True)]
+                    )
+                    if final_lines:
+                        yield {"type": "log", "lines": final_lines}
+                    break
+
+                await sub.wait()
+
+    return StreamingResponse(_stream_sse(events()), media_type="text/event-stream")
+
+
+# -----------------------------
+# Artifact inventory
+# -----------------------------
+
+_MAX_INVENTORY_WAIT_SECONDS = 30.0
+
+_model_inventory: ModelInventoryService | None = None
+_model_inventory_lock = threading.Lock()
+
+
+def get_model_inventory_service() -> ModelInventoryService:
+    """Return the process-wide model inventory service, creating it on first use."""
+    global _model_inventory
+    with _model_inventory_lock:
+        if _model_inventory is None:
+            _model_inventory = ModelInventoryService()
+        return _model_inventory
+
+
+class ArtifactTotals(BaseModel):
+    """Number and total size of the files of one artifact category."""
+
+    files: int = 0
+    bytes: int = 0
+
+
+class CheckpointFile(BaseModel):
+    """One checkpoint, by path relative to the model dir."""
+
+    path: str
+    bytes: int
+    mtime: float
+    # Used by inference; kept by the non_best_checkpoints cleanup.
+    best: bool
+
+
+class ModelInventory(BaseModel):
+    """Disk use of one model directory by artifact category."""
+
+    checkpoints: list[CheckpointFile]
+    predictions: ArtifactTotals
+    logs: ArtifactTotals
+    other: ArtifactTotals
+    total_bytes: int
+    scanned_at: float
+
+
+class ModelInventoryEntry(BaseModel):
+    """Last inventory of one model; None until its first scan completes."""
+
+    model_relative_path: str
+    inventory: ModelInventory | None = None
+    # Whether a scan of the model is queued or running.
+    scanning: bool = False
+
+
+class GetModelInventoryRequest(BaseModel):
+    """Request for the artifact inventory of some or all models of a project."""
+
+    projectKey: str
+    # All models of the project if None.
+    modelRelativePaths: list[str] | None = None
+    # Rescan even if the last inventory is recent.
+    refresh: bool = False
+    # How long to wait for pending scans before answering with what is known.
+    waitSeconds: float = Field(default=0.0, ge=0.0, le=_MAX_INVENTORY_WAIT_SECONDS)
+
+
+class GetModelInventoryResponse(BaseModel):
+    """Inventories of the requested models, and the total size of those scanned."""
+
+    models: list[ModelInventoryEntry]
+    total_bytes: int
+
+
+@router.post("/app/v0/rpc/getModelInventory")
+def get_model_inventory(
+    request: GetModelInventoryRequest,
+    project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+) -> GetModelInventoryResponse:
+    """Return the checkpoints, prediction, log and total sizes of models.
+
+    Scans run on the inventory service's threads, never on the request: the last
+    completed inventory is returned and a rescan is queued once it is stale.
+    """
+    project: Project = project_info_getter(request.projectKey)
+    if request.modelRelativePaths is not None:
+        paths = request.modelRelativePaths
+    elif project.paths.model_dir is None:
+        paths = []
+    else:
+        paths = [
+            m.model_relative_path for m in _scan_models(Path(project.paths.model_dir)).models
+        ]
+    model_dirs = [_existing_model_dir(project, p) for p in paths]
+
+    service = get_model_inventory_service()
+    pending = [service.inventory(d, request.refresh)[1] for d in model_dirs]
+    futures = [f for f in pending if f is not None]
+    if futures and request.waitSeconds > 0:
+        wait(futures, timeout=request.waitSeconds)
+
+    entries = []
+    for path, model_dir in zip(paths, model_dirs, strict=True):
+        inventory, future = service.inventory(model_dir)
+        entries.append(
+            ModelInventoryEntry(
+                model_relative_path=path,
+                inventory=(
+                    ModelInventory.model_validate(inventory, from_attributes=True)
+                    if inventory is not None
+                    else None
+                ),
+                scanning=future is not None,
+            )
+        )
+    return GetModelInventoryResponse(
+        models=entries,
+        total_bytes=sum(e.inventory.total_bytes for e in entries if e.inventory),
+    )
+
+
+# How long pruning waits for the scheduler to release a project's lock.
+_PRUNE_LOCK_TIMEOUT_SECONDS = 5.0
+
 
-            time.sleep(0.2)
+class PruneModelArtifactsRequest(BaseModel):
+    """Request to remove artifacts from models in bulk."""
 
-    return StreamingResponse(_stream_sse_sync(poller()), media_type="text/event-stream")
+    projectKey: str
+    modelRelativePaths: list[str]
+    # non_best_checkpoints keeps only the checkpoints inference uses;
+    # old_predictions removes prediction outputs older than olderThanDays.
+    action: Literal["non_best_checkpoints", "old_predictions"]
+    olderThanDays: float = Field(default=30.0, ge=0.0)
+    # List what would be removed without removing it.
+    dryRun: bool = False
+
+
+class PrunedModel(BaseModel):
+    """Files removed from one model, relative to its directory."""
+
+    model_relative_path: str
+    files: list[str]
+    bytes: int
+
+
+class PruneModelArtifactsResponse(BaseModel):
+    """Files removed per model, and the bytes freed in total."""
+
+    models: list[PrunedModel]
+    total_bytes: int
+
+
+@router.post("/app/v0/rpc/pruneModelArtifacts")
+def prune_model_artifacts(
+    request: PruneModelArtifactsRequest,
+    project_info_getter: ProjectInfoGetter = Depends(deps.project_info_getter),
+    root_config: RootConfig = Depends(deps.root_config),
+) -> PruneModelArtifactsResponse:
+    """Remove non-best checkpoints or old prediction files from the given models.
+
+    Refused with 409 if any of the models is still training or queued: a running
+    training is still writing checkpoints. Pruning checkpoints is also refused for
+    a model with several training runs, whose newest run inference doesn't load
+    (see utils/checkpoints.py). The check and the removal happen under the scheduler's
+    project lock, so no training of these models can start in between.
+    """
+    project: Project = project_info_getter(request.projectKey)
+    model_dirs = [_existing_model_dir(project, p) for p in request.modelRelativePaths]
+    queue = get_train_queue(root_config.LP_SYSTEM_DIR)
+    service = get_model_inventory_service()
+    older_than = time.time() - request.olderThanDays * 86400
+    pruned = []
+    with contextlib.ExitStack() as stack:
+        for base in sorted({model_dir.parent for model_dir in model_dirs}):
+            if not stack.enter_context(project_lock(base, timeout=_PRUNE_LOCK_TIMEOUT_SECONDS)):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="The training scheduler is busy with this project; try again.",
+                )
+        for path, model_dir in zip(request.modelRelativePaths, model_dirs, strict=True):
+            if queue.get(model_dir) is not None:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Model {path} is queued for training; prune it once training ends.",
+                )
+            train_status = _read_train_status(model_dir / "train_status.json")
+            if train_status is not None and train_status.status not in _TRAIN_TERMINAL:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Model {path} is {train_status.status}; "
+                    "prune it once training ends.",
+                )
+            if request.action == "non_best_checkpoints" and len(training_runs(model_dir)) > 1:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=f"Model {path} has several training runs in tb_logs; "
+                    "which checkpoints to keep is ambiguous.",
+                )
+
+        for path, model_dir in zip(request.modelRelativePaths, model_dirs, strict=True):
+            if request.action == "non_best_checkpoints":
+                result = service.prune_checkpoints(model_dir, request.dryRun)
+            else:
+                result = service.prune_predictions(model_dir, older_than, request.dryRun)
+            pruned.append(
+                PrunedModel(model_relative_path=path, files=result.files, bytes=result.bytes)
+            )
+    if not request.dryRun:
+        _notify_models_changed(project)
+    return PruneModelArtifactsResponse(
+        models=pruned, total_bytes=sum(p.bytes for p in pruned)
+    )
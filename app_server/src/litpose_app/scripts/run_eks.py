@@ -7,12 +7,20 @@ Usage:
         --camera_names Cam-A Cam-B Cam-C \
         --smooth_param 1000 \
         --quantile_keep_pca 50.0 \
-        --input_files member1/video_preds/session_Cam-A.csv ...
+        --input_files member1/video_preds/session_Cam-A.csv ... \
+        [--chunk_frames 36000 --chunk_overlap_frames 600]
 
 Input files must be ordered: for each member model, one file per camera,
 with cameras in the same order as --camera_names.
 Each input file must follow the naming convention {session}_{view}.csv
 (e.g., "session_Cam-A.csv").
+
+With --chunk_frames, the session is smoothed in overlapping windows so memory
+is bounded by the window rather than the session length (see
+`smooth_session_chunked`).
+
+The server runs `smooth_session` in warm worker processes (see
+litpose_app.utils.eks_service); this CLI remains for running EKS by hand.
 """
 from __future__ import annotations
 
@@ -20,6 +28,7 @@ import argparse
 import multiprocessing
 import os
 import sys
+import tempfile
 from pathlib import Path
 
 
@@ -41,6 +50,176 @@ def _plot_one(args: tuple) -> None:
     )
 
 
+def _fit_eks(
+    input_files: list[str],
+    save_dir: Path,
+    camera_names: list[str],
+    smooth_param: float,
+    quantile_keep_pca: float,
+) -> tuple:
+    """Call fit_eks_multicam; returns (camera_dfs, s_finals, input_dfs, bodypart_list)."""
+    from eks.multicam_smoother import fit_eks_multicam
+
+    camera_dfs, s_finals, input_dfs, bodypart_list, _df_3d = fit_eks_multicam(
+        input_source=input_files,
+        save_dir=str(save_dir),
+        camera_names=camera_names,
+        bodypart_list=None,
+        smooth_param=smooth_param,
+        s_frames=None,
+        quantile_keep_pca=quantile_keep_pca,
+        verbose=True,
+    )
+    return camera_dfs, s_finals, input_dfs, bodypart_list
+
+
+def smooth_session(
+    input_files: list[str],
+    save_dir: Path,
+    camera_names: list[str],
+    smooth_param: float,
+    quantile_keep_pca: float,
+) -> tuple:
+    """Smooth one session and save "{session}_{view}.csv" per camera to save_dir.
+
+    EKS writes to a scratch directory of its own inside save_dir, so sessions
+    smoothed concurrently into the same save_dir don't clobber each other's
+    fixed-name outputs.
+
+    Returns fit_eks_multicam's (camera_dfs, s_finals, input_dfs, bodypart_list).
+    """
+    save_dir.mkdir(parents=True, exist_ok=True)
+
+    # Extract session name from first input file (assumes pattern "{session}_{view}.csv")
+    session_name = Path(input_files[0]).stem.rsplit("_", 1)[0]
+
+    with tempfile.TemporaryDirectory(dir=save_dir, prefix=".eks_") as scratch:
+        scratch_dir = Path(scratch)
+        camera_dfs, s_finals, input_dfs, bodypart_list = _fit_eks(
+            input_files, scratch_dir, camera_names, smooth_param, quantile_keep_pca
+        )
+
+        # NOTE: EKS outputs files with the "multicam_{view}_results.csv" naming structure by
+        # default. This script works around that by renaming them to "{session}_{view}.csv".
+        # If EKS changes its output naming convention, this renaming logic would break.
+        for view in camera_names:
+            old_name = scratch_dir / f"multicam_{view}_results.csv"
+            new_name = save_dir / f"{session_name}_{view}.csv"
+            if old_name.exists():
+                os.replace(old_name, new_name)
+    return camera_dfs, s_finals, input_dfs, bodypart_list
+
+
+def chunk_windows(n_frames: int, chunk_frames: int, overlap_frames: int) -> list[tuple]:
+    """Split n_frames into overlapping windows.
+
+    Returns (start, end, keep_start, keep_end) per window: the window spans
+    frames [start, end), and its output is kept for [keep_start, keep_end).
+    Consecutive windows overlap by overlap_frames and hand over at the middle
+    of the overlap, where both are furthest from their own edges.
+    """
+    if overlap_frames >= chunk_frames:
+        raise ValueError("chunk_overlap_frames must be smaller than chunk_frames")
+    step = chunk_frames - overlap_frames
+    starts = [0]
+    while starts[-1] + chunk_frames < n_frames:
+        starts.append(starts[-1] + step)
+    windows = []
+    for k, start in enumerate(starts):
+        end = min(start + chunk_frames, n_frames)
+        keep_start = 0 if k == 0 else start + overlap_frames // 2
+        keep_end = n_frames if k == len(starts) - 1 else starts[k + 1] + overlap_frames // 2
+        windows.append((start, end, keep_start, keep_end))
+    return windows
+
+
+def _count_frames(csv_path: str) -> int:
+    """Return the number of frames in a prediction CSV (lines after the 3 header rows)."""
+    with open(csv_path, "rb") as f:
+        n_lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+    return max(0, n_lines - 3)
+
+
+def smooth_session_chunked(
+    input_files: list[str],
+    save_dir: Path,
+    camera_names: list[str],
+    smooth_param: float,
+    quantile_keep_pca: float,
+    chunk_frames: int,
+    overlap_frames: int,
+) -> int:
+    """Smooth one session window by window, streaming "{session}_{view}.csv" per camera.
+
+    Only one window of every input file is held in memory: the inputs are read
+    incrementally, each window is written to a scratch directory and smoothed
+    on its own, and the kept part of its output is appended to
+    "{session}_{view}.csv.partial". Those are renamed to the final names once the
+    last window is done, so a partial output never looks like a finished one.
+
+    Returns the number of frames smoothed.
+    """
+    import pandas as pd
+
+    session_name = Path(input_files[0]).stem.rsplit("_", 1)[0]
+    n_frames = _count_frames(input_files[0])
+    if n_frames <= chunk_frames:
+        # Also smoothed in a scratch directory, like the windows below.
+        smooth_session(input_files, save_dir, camera_names, smooth_param, quantile_keep_pca)
+        return n_frames
+    windows = chunk_windows(n_frames, chunk_frames, overlap_frames)
+    print(
+        f"Smoothing {n_frames} frames in {len(windows)} windows of {chunk_frames} "
+        f"(overlap {overlap_frames})",
+        flush=True,
+    )
+
+    save_dir.mkdir(parents=True, exist_ok=True)
+    readers = [
+        pd.read_csv(path, header=[0, 1, 2], index_col=0, iterator=True) for path in input_files
+    ]
+    buffers: list = [None] * len(input_files)
+    buffer_end = 0
+    partials = {view: save_dir / f"{session_name}_{view}.csv.partial" for view in camera_names}
+    try:
+        with tempfile.TemporaryDirectory(dir=save_dir, prefix=".eks_chunks") as scratch:
+            scratch_dir = Path(scratch)
+            for k, (start, end, keep_start, keep_end) in enumerate(windows):
+                window_files = []
+                for j, (path, reader) in enumerate(zip(input_files, readers, strict=True)):
+                    new_rows = reader.get_chunk(end - buffer_end)
+                    window = new_rows if buffers[j] is None else pd.concat([buffers[j], new_rows])
+                    buffers[j] = window.iloc[len(window) - (end - start):]
+                    # Same file names as the inputs, one directory per input: eks
+                    # matches files to cameras by name.
+                    window_path = scratch_dir / f"input{j}" / Path(path).name
+                    window_path.parent.mkdir(exist_ok=True)
+                    buffers[j].to_csv(window_path)
+                    window_files.append(str(window_path))
+                buffer_end = end
+
+                camera_dfs, *_ = _fit_eks(
+                    window_files, scratch_dir / "out", camera_names, smooth_param,
+                    quantile_keep_pca,
+                )
+                for view, df in zip(camera_names, camera_dfs, strict=True):
+                    kept = df.iloc[keep_start - start:keep_end - start].copy()
+                    kept.index = range(keep_start, keep_end)
+                    kept.to_csv(partials[view], mode="w" if k == 0 else "a", header=k == 0)
+                print(f"Window {k + 1}/{len(windows)} done (frames {start}-{end})", flush=True)
+    except BaseException:
+        for partial in partials.values():
+            partial.unlink(missing_ok=True)
+        raise
+    finally:
+        for reader in readers:
+            reader.close()
+
+    for view, partial in partials.items():
+        os.replace(partial, save_dir / f"{session_name}_{view}.csv")
+    return n_frames
+
+
 def main() -> None:
     """Parse CLI arguments and run the EKS multicam smoother, saving smoothed CSVs to save_dir."""
     parser = argparse.ArgumentParser(description="Run EKS multicam smoother")
@@ -50,43 +229,35 @@ def main() -> None:
     parser.add_argument("--quantile_keep_pca", type=float, default=50.0)
     parser.add_argument("--input_files", nargs="+", required=True, help="Prediction CSV files (member × camera order)")
     parser.add_argument("--debug_plots", action="store_true", default=False, help="Save per-keypoint debug plots for all cameras")
+    parser.add_argument("--chunk_frames", type=int, default=None, help="Smooth in windows of this many frames")
+    parser.add_argument("--chunk_overlap_frames", type=int, default=600, help="Overlap between consecutive windows")
     args = parser.parse_args()
 
     try:
-        from eks.multicam_smoother import fit_eks_multicam
+        import eks  # noqa: F401
     except ImportError:
         print("ERROR: eks package not found. Install it with: pip install eks", file=sys.stderr)
         sys.exit(1)
 
     save_dir = Path(args.save_dir)
-    save_dir.mkdir(parents=True, exist_ok=True)
 
     print(f"Running EKS on {len(args.input_files)} input files across {len(args.camera_names)} cameras", flush=True)
     print(f"Saving to: {save_dir}", flush=True)
 
-    camera_dfs, s_finals, input_dfs, bodypart_list, _df_3d = fit_eks_multicam(
-        input_source=args.input_files,
-        save_dir=str(save_dir),
-        camera_names=args.camera_names,
-        bodypart_list=None,
-        smooth_param=args.smooth_param,
-        s_frames=None,
-        quantile_keep_pca=args.quantile_keep_pca,
-        verbose=True,
-    )
+    if args.chunk_frames:
+        smooth_session_chunked(
+            args.input_files, save_dir, args.camera_names, args.smooth_param,
+            args.quantile_keep_pca, args.chunk_frames, args.chunk_overlap_frames,
+        )
+        print("EKS complete.", flush=True)
+        if args.debug_plots:
+            print("WARNING: debug plots are not supported with --chunk_frames", file=sys.stderr)
+        return
 
-    # Extract session name from first input file (assumes pattern "{session}_{view}.csv")
-    first_input = Path(args.input_files[0])
-    session_name = first_input.stem.rsplit("_", 1)[0]
-
-    # NOTE: EKS outputs files with the "multicam_{view}_results.csv" naming structure by default.
-    # This script works around that by renaming them to "{session}_{view}.csv".
-    # If EKS changes its output naming convention, this renaming logic would break.
-    for view in args.camera_names:
-        old_name = save_dir / f"multicam_{view}_results.csv"
-        new_name = save_dir / f"{session_name}_{view}.csv"
-        if old_name.exists():
-            os.rename(old_name, new_name)
+    camera_dfs, s_finals, input_dfs, bodypart_list = smooth_session(
+        args.input_files, save_dir, args.camera_names, args.smooth_param, args.quantile_keep_pca
+    )
+    session_name = Path(args.input_files[0]).stem.rsplit("_", 1)[0]
     print("EKS complete.", flush=True)
 
     # ── Debug plots for all keypoints, all cameras ───────────────────────────
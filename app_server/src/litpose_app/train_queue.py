@@ -0,0 +1,325 @@
+"""SQLite-backed queue of training tasks, shared by the web process and the train scheduler.
+
+`createTrainTask` enqueues the new model dir; the scheduler takes the next entry
+instead of listing every model dir of every project for PENDING statuses.
+train_status.json stays the per-model status record the UI reads; the queue only
+decides the order in which PENDING models start.
+
+Order: the highest priority first. Within a priority, projects take turns (the
+project least recently served goes first), and within a project entries run in
+queue position order, which starts as enqueue order and can be changed with `move`.
+Launched entries stay in the queue (state LAUNCHED, with the training PID) until
+the scheduler sees the process end, so a restarted scheduler can find trainings
+that died with it without scanning model dirs.
+
+The database lives at ``LP_SYSTEM_DIR/train_queue.sqlite``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import portalocker
+
+logger = logging.getLogger(__name__)
+
+
+class QueueState:
+    """String constants for the state of a queue entry."""
+
+    QUEUED = "QUEUED"
+    LAUNCHED = "LAUNCHED"
+
+
+@dataclass
+class QueueEntry:
+    """One training task in the queue."""
+
+    entry_id: int
+    project_key: str
+    model_dir: Path
+    priority: int
+    position: float
+    state: str
+    pid: int | None
+    enqueued_at: float
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_key TEXT NOT NULL,
+    model_dir TEXT NOT NULL UNIQUE,
+    priority INTEGER NOT NULL DEFAULT 0,
+    position REAL NOT NULL,
+    state TEXT NOT NULL,
+    pid INTEGER,
+    enqueued_at REAL NOT NULL,
+    launched_at REAL
+);
+CREATE INDEX IF NOT EXISTS entries_order ON entries(state, priority DESC, position);
+CREATE TABLE IF NOT EXISTS served (
+    project_key TEXT PRIMARY KEY,
+    last_served REAL NOT NULL
+);
+"""
+
+_FIELDS = (
+    "entry_id",
+    "project_key",
+    "model_dir",
+    "priority",
+    "position",
+    "state",
+    "pid",
+    "enqueued_at",
+)
+_COLUMNS = ", ".join(_FIELDS)
+
+
+def _key(model_dir: Path) -> str:
+    """Return the stored form of a model dir, so differently spelled paths match."""
+    return str(Path(model_dir).resolve())
+
+
+def _entry(row: tuple) -> QueueEntry:
+    """Build a QueueEntry from a row selected with _COLUMNS."""
+    entry_id, project_key, model_dir, priority, position, state, pid, enqueued_at = row
+    return QueueEntry(
+        entry_id, project_key, Path(model_dir), priority, position, state, pid, enqueued_at
+    )
+
+
+class TrainQueue:
+    """Thread- and process-safe training queue in a small SQLite database."""
+
+    def __init__(self, db_path: Path) -> None:
+        """Open (creating if needed) the queue database at db_path."""
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection inside a write transaction, serialized across threads."""
+        with self._lock:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            try:
+                # IMMEDIATE: the scheduler and the web process may both be writing.
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+
+    # -----------------------------
+    # Web process
+    # -----------------------------
+
+    def enqueue(self, project_key: str, model_dir: Path, priority: int = 0) -> QueueEntry:
+        """Append model_dir to the queue (or return its existing entry)."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE model_dir = ?", (_key(model_dir),)
+            ).fetchone()
+            if row is not None:
+                return _entry(row)
+            (last,) = conn.execute("SELECT MAX(position) FROM entries").fetchone()
+            cur = conn.execute(
+                "INSERT INTO entries (project_key, model_dir, priority, position, state, "
+                "enqueued_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (project_key, _key(model_dir), priority, (last or 0) + 1, QueueState.QUEUED, now),
+            )
+            return _entry(
+                conn.execute(
+                    f"SELECT {_COLUMNS} FROM entries WHERE entry_id = ?", (cur.lastrowid,)
+                ).fetchone()
+            )
+
+    def get(self, model_dir: Path) -> QueueEntry | None:
+        """Return the entry of model_dir, or None if it isn't queued or running."""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE model_dir = ?", (_key(model_dir),)
+            ).fetchone()
+        return _entry(row) if row else None
+
+    def entries(self, project_key: str | None = None) -> list[QueueEntry]:
+        """Return entries (of one project, or all), launched first, then by priority and position."""
+        query = f"SELECT {_COLUMNS} FROM entries"
+        params: tuple = ()
+        if project_key is not None:
+            query += " WHERE project_key = ?"
+            params = (project_key,)
+        query += " ORDER BY state = ? DESC, priority DESC, position"
+        with self._connect() as conn:
+            rows = conn.execute(query, (*params, QueueState.LAUNCHED)).fetchall()
+        return [_entry(r) for r in rows]
+
+    def set_priority(self, model_dir: Path, priority: int) -> bool:
+        """Change the priority of a queued entry. Returns False if it isn't queued."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE entries SET priority = ? WHERE model_dir = ? AND state = ?",
+                (priority, _key(model_dir), QueueState.QUEUED),
+            )
+        return cur.rowcount > 0
+
+    def move(self, model_dir: Path, before: Path | None) -> bool:
+        """Move a queued entry just before another one, or to the end if before is None.
+
+        Returns False if either entry isn't queued.
+        """
+        with self._connect() as conn:
+            if before is None:
+                (last,) = conn.execute("SELECT MAX(position) FROM entries").fetchone()
+                position = (last or 0) + 1
+            else:
+                row = conn.execute(
+                    "SELECT position FROM entries WHERE model_dir = ? AND state = ?",
+                    (_key(before), QueueState.QUEUED),
+                ).fetchone()
+                if row is None:
+                    return False
+                (prev,) = conn.execute(
+                    "SELECT MAX(position) FROM entries WHERE position < ? AND model_dir != ?",
+                    (row[0], _key(model_dir)),
+                ).fetchone()
+                position = (row[0] + prev) / 2 if prev is not None else row[0] - 1
+            cur = conn.execute(
+                "UPDATE entries SET position = ? WHERE model_dir = ? AND state = ?",
+                (position, _key(model_dir), QueueState.QUEUED),
+            )
+        return cur.rowcount > 0
+
+    def cancel(self, model_dir: Path) -> bool:
+        """Remove a queued (not yet launched) entry. Returns False if it isn't queued."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "DELETE FROM entries WHERE model_dir = ? AND state = ?",
+                (_key(model_dir), QueueState.QUEUED),
+            )
+        return cur.rowcount > 0
+
+    def rename(self, model_dir: Path, new_model_dir: Path) -> None:
+        """Follow a queued model dir that was moved, keeping its place in the queue."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE entries SET model_dir = ? WHERE model_dir = ? AND state = ?",
+                (_key(new_model_dir), _key(model_dir), QueueState.QUEUED),
+            )
+
+    # -----------------------------
+    # Scheduler
+    # -----------------------------
+
+    def peek(self) -> QueueEntry | None:
+        """Return the entry to launch next, without removing it."""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join('e.' + f for f in _FIELDS)} "
+                "FROM entries e LEFT JOIN served s ON s.project_key = e.project_key "
+                "WHERE e.state = ? AND e.priority = "
+                "(SELECT MAX(priority) FROM entries WHERE state = ?) "
+                "ORDER BY COALESCE(s.last_served, 0), e.position LIMIT 1",
+                (QueueState.QUEUED, QueueState.QUEUED),
+            ).fetchone()
+        return _entry(row) if row else None
+
+    def claim(self, entry_id: int) -> bool:
+        """Mark a queued entry LAUNCHED and its project served, before starting its training.
+
+        Returns False if the entry is no longer queued (e.g. it was just canceled).
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE entries SET state = ?, launched_at = ? WHERE entry_id = ? AND state = ?",
+                (QueueState.LAUNCHED, now, entry_id, QueueState.QUEUED),
+            )
+            if cur.rowcount == 0:
+                return False
+            conn.execute(
+                "INSERT INTO served (project_key, last_served) "
+                "SELECT project_key, ? FROM entries WHERE entry_id = ? "
+                "ON CONFLICT(project_key) DO UPDATE SET last_served = excluded.last_served",
+                (now, entry_id),
+            )
+        return True
+
+    def set_pid(self, entry_id: int, pid: int) -> None:
+        """Record the PID of a launched entry's training process."""
+        with self._connect() as conn:
+            conn.execute("UPDATE entries SET pid = ? WHERE entry_id = ?", (pid, entry_id))
+
+    def launched(self) -> list[QueueEntry]:
+        """Return the entries whose training was launched and not yet seen to finish."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_COLUMNS} FROM entries WHERE state = ?", (QueueState.LAUNCHED,)
+            ).fetchall()
+        return [_entry(r) for r in rows]
+
+    def remove(self, entry_id: int) -> None:
+        """Drop an entry (its training finished, or its model is no longer PENDING)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE entry_id = ?", (entry_id,))
+
+
+_queues: dict[Path, TrainQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def get_train_queue(system_dir: Path) -> TrainQueue:
+    """Return (opening if needed) the training queue under the given LP_SYSTEM_DIR."""
+    db_path = Path(system_dir) / "train_queue.sqlite"
+    with _queues_lock:
+        queue = _queues.get(db_path)
+        if queue is None:
+            queue = _queues[db_path] = TrainQueue(db_path)
+    return queue
+
+
+@contextlib.contextmanager
+def project_lock(base: Path, timeout: float = 0) -> Iterator[bool]:
+    """Hold the scheduler lock of a project's model dir; yields False if another holds it.
+
+    The scheduler launches trainings of the project only while holding it, so
+    holding it keeps queued trainings from starting in the meantime. Waits up to
+    timeout seconds for the lock.
+    """
+    lock_path = base / "scheduler.lock"
+    scheduler_lock_file = portalocker.Lock(str(lock_path), mode="a", timeout=timeout)
+    try:
+        scheduler_lock_file.acquire()
+        logger.debug(f"Acquired scheduler lock on {lock_path}")
+    except portalocker.exceptions.LockException:
+        logger.debug(f"Another scheduler holds the lock on {lock_path}. Skipping.")
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        try:
+            scheduler_lock_file.release()
+            logger.debug("Released scheduler lock.")
+        except Exception as e:
+            logger.error("Error releasing scheduler lock: %s", e)
@@ -1,13 +1,16 @@
-"""Background process that polls for PENDING training tasks and launches litpose train."""
+"""Background process that launches litpose train for queued training tasks."""
 
 from __future__ import annotations
 
+import contextlib
 import json
 import logging
 import os
 import subprocess
 import sys
+import threading
 import time
+from dataclasses import dataclass
 from pathlib import Path
 
 import portalocker
@@ -15,7 +18,15 @@ import psutil
 
 from . import deps
 from .routes.models import TrainStatus
-from .utils.gpu_lock import clear_gpu_task, gpu_lock_nonblocking, read_gpu_task
+from .train_queue import TrainQueue, get_train_queue, project_lock
+from .utils.gpu_lock import (
+    GpuLease,
+    clear_gpu_task,
+    gpu_lock_nonblocking,
+    read_gpu_tasks,
+    withdraw_gpu_request,
+)
+from .utils.train_wakeup import WakeEvent
 
 logger = logging.getLogger(__name__)
 
@@ -104,8 +115,11 @@ def _write_status(path: Path, status: TrainStatus) -> None:
     tmp.replace(path)
 
 
-def _launch_training(model_dir: Path) -> subprocess.Popen:
-    """Spawn a litpose train subprocess for model_dir, updating train_status.json to STARTED."""
+def _launch_training(model_dir: Path, env: dict[str, str] | None = None) -> subprocess.Popen:
+    """Spawn a litpose train subprocess for model_dir, updating train_status.json to STARTED.
+
+    env (e.g. CUDA_VISIBLE_DEVICES of a GPU lease) is added to the inherited environment.
+    """
     config_path = model_dir / "config.yaml"
     status_path = model_dir / "train_status.json"
     stdout_path = model_dir / "train_stdout.log"
@@ -127,6 +141,7 @@ def _launch_training(model_dir: Path) -> subprocess.Popen:
             stdout=out,
             stderr=err,
             cwd=str(model_dir),
+            env={**os.environ, **(env or {})},
         )
 
     _write_status(status_path, TrainStatus(status="STARTED", pid=proc.pid))
@@ -134,123 +149,260 @@ def _launch_training(model_dir: Path) -> subprocess.Popen:
     return proc
 
 
-def train_scheduler_loop(poll_interval_seconds: float = 2.0) -> None:
-    """Periodically checks for PENDING tasks and launches at most one training.
-
-    Holds the GPU lock for the entire lifetime of the training subprocess so that
-    inference tasks wait rather than running concurrently.
-    """
-    # GPU lock held across iterations while a training subprocess is alive.
-    _gpu_lock_ctx = None
-    _active_proc: subprocess.Popen | None = None
-    _active_model_dir: Path | None = None
+_RUNNING_STATUSES = ("STARTING", "STARTED", "TRAINING", "EVALUATING")
 
-    while True:
-        scheduler_lock_file = None
-        try:
-            # --- Check if our currently tracked subprocess has finished ---
-            if _active_proc is not None:
-                if not _is_pid_alive(_active_proc.pid):
-                    logger.info(
-                        "Training subprocess pid=%s finished for %s",
-                        _active_proc.pid,
-                        _active_model_dir,
-                    )
-                    if _gpu_lock_ctx is not None:
-                        try:
-                            _gpu_lock_ctx.__exit__(None, None, None)
-                        except Exception as e:
-                            logger.error("Error releasing GPU lock: %s", e)
-                        _gpu_lock_ctx = None
-                    _active_proc = None
-                    _active_model_dir = None
-                else:
-                    # Training still running — GPU is in use, nothing to launch.
-                    time.sleep(poll_interval_seconds)
-                    continue
 
-            project_util = deps.project_util(root_config=deps.root_config())
-            pps = project_util.get_all_project_paths()
-            for project_key, project_info in pps.items():
-                if not (
-                    project_info
-                    and project_info.model_dir
-                    and project_info.model_dir.exists()
-                ):
-                    continue
+@dataclass
+class _ActiveTraining:
+    """The training subprocess launched by this scheduler, with the GPU lock it holds."""
 
-                base = project_info.model_dir
-                lock_path = base / "scheduler.lock"
+    proc: subprocess.Popen
+    gpu_lock_ctx: contextlib.AbstractContextManager
+    model_dir: Path
+    entry_id: int
 
-                try:
-                    scheduler_lock_file = portalocker.Lock(
-                        str(lock_path), mode="a", timeout=0
-                    )
-                    scheduler_lock_file.acquire()
-                    logger.debug(f"Acquired scheduler lock on {lock_path}")
-                except portalocker.exceptions.LockException:
-                    logger.debug(
-                        f"Another scheduler holds the lock on {lock_path}. Skipping."
-                    )
-                    continue
 
-                # Mark any tasks whose process died as FAILED
-                for d in [p for p in base.iterdir() if p.is_dir()]:
-                    status_path = d / "train_status.json"
-                    ts = _read_status(status_path)
-                    if (
-                        ts
-                        and ts.status in ("STARTING", "STARTED", "TRAINING", "EVALUATING")
-                        and ts.pid
-                        and not _is_pid_alive(ts.pid)
-                    ):
-                        _write_status(status_path, TrainStatus(status="FAILED", pid=ts.pid))
-                        logger.info("Marked %s as FAILED due to defunct PID %s", d.name, ts.pid)
-                        # Also clear the GPU task if it matches this defunct task.
-                        # This prevents the UI from showing a stuck active task after it failed.
-                        defunct_task_id = f"train:{project_key}:{d.name}"
-                        current_gpu_task = read_gpu_task()
-                        if current_gpu_task and current_gpu_task.get("taskId") == defunct_task_id:
-                            clear_gpu_task()
-                            logger.info("Cleared stale GPU task info for defunct task %s", defunct_task_id)
-
-                # Find first PENDING task
-                pending_dirs = [
-                    d for d in sorted(p for p in base.iterdir() if p.is_dir())
-                    if (ts := _read_status(d / "train_status.json")) and ts.status == "PENDING"
-                ]
-                if not pending_dirs:
-                    continue
+def _fail_if_defunct(project_key: str, model_dir: Path) -> None:
+    """Mark a task whose training process died as FAILED."""
+    status_path = model_dir / "train_status.json"
+    ts = _read_status(status_path)
+    if not (ts and ts.status in _RUNNING_STATUSES and ts.pid and not _is_pid_alive(ts.pid)):
+        return
+    _write_status(status_path, TrainStatus(status="FAILED", pid=ts.pid))
+    logger.info("Marked %s as FAILED due to defunct PID %s", model_dir.name, ts.pid)
+    # Also clear the GPU task if it matches this defunct task.
+    # This prevents the UI from showing a stuck active task after it failed.
+    defunct_task_id = f"train:{project_key}:{model_dir.name}"
+    for gpu_task in read_gpu_tasks():
+        if gpu_task.get("taskId") == defunct_task_id:
+            clear_gpu_task(gpu_task["device"])
+            logger.info("Cleared stale GPU task info for defunct task %s", defunct_task_id)
+
+
+def _reconcile_project(queue: TrainQueue, project_key: str, base: Path) -> None:
+    """Scan one project's model dirs: fail defunct tasks, and enqueue PENDING ones.
+
+    This catches tasks the queue doesn't know about: created before it existed,
+    or by hand. Each train_status.json is read once.
+    """
+    with project_lock(base) as locked:
+        if not locked:
+            return
+        for d in sorted(p for p in base.iterdir() if p.is_dir()):
+            ts = _read_status(d / "train_status.json")
+            if ts is None:
+                continue
+            if ts.status == "PENDING":
+                if queue.get(d) is None:
+                    queue.enqueue(project_key, d)
+                    logger.info("Queued PENDING training %s found on disk", d)
+            elif ts.status in _RUNNING_STATUSES:
+                _fail_if_defunct(project_key, d)
+
+
+def _train_task_id(project_key: str, model_dir: Path) -> str:
+    """Return the task ID of a training, as shown in GPU slot metadata and the GPU queue."""
+    return f"train:{project_key}:{model_dir.name}"
+
+
+def _launch_next(queue: TrainQueue) -> _ActiveTraining | str | None:
+    """Launch the next queued task if it's its turn for a GPU slot and one is free.
+
+    Returns the launched training, the task ID of the task still waiting (for a
+    GPU slot or another scheduler's lock), or None if the queue is empty.
+    """
+    while (entry := queue.peek()) is not None:
+        task_id = _train_task_id(entry.project_key, entry.model_dir)
+        ts = _read_status(entry.model_dir / "train_status.json")
+        if ts is None or ts.status != "PENDING":
+            # Deleted, renamed or canceled outside the queue.
+            logger.info("Dropping queued training %s: no longer PENDING", entry.model_dir)
+            queue.remove(entry.entry_id)
+            withdraw_gpu_request(task_id)
+            continue
+
+        # Try to acquire a GPU slot (non-blocking — inference may be running or waiting)
+        try:
+            ctx = gpu_lock_nonblocking(
+                "training", task_id, project_key=entry.project_key, priority=entry.priority
+            )
+            lease: GpuLease | None = ctx.__enter__()
+        except portalocker.exceptions.LockException:
+            logger.debug("No GPU slot for %s yet, will retry.", task_id)
+            return task_id
 
-                # Try to acquire the GPU lock (non-blocking — inference may be running)
-                task_id = f"train:{project_key}:{pending_dirs[0].relative_to(base)}"
-                try:
-                    ctx = gpu_lock_nonblocking("training", task_id, project_key=project_key)
-                    ctx.__enter__()
-                except portalocker.exceptions.LockException:
-                    logger.debug("GPU busy (inference running), will retry.")
+        try:
+            with project_lock(entry.model_dir.parent) as locked:
+                if not locked:
+                    ctx.__exit__(None, None, None)
+                    return task_id
+                if not queue.claim(entry.entry_id):
+                    ctx.__exit__(None, None, None)
                     continue
-
-                proc = _launch_training(pending_dirs[0])
-                _gpu_lock_ctx = ctx
-                _active_proc = proc
-                _active_model_dir = pending_dirs[0]
-                logger.info("Launched training for %s", pending_dirs[0].name)
-                break  # Only launch one task per cycle
-
-        except Exception:
-            logger.exception("Error in train scheduler loop")
-        finally:
-            if scheduler_lock_file:
                 try:
-                    scheduler_lock_file.release()
-                    logger.debug("Released scheduler lock.")
-                except Exception as e:
-                    logger.error("Error releasing scheduler lock: %s", e)
-            time.sleep(poll_interval_seconds)
-
-
-def _train_scheduler_process_target() -> None:
+                    proc = _launch_training(entry.model_dir, lease.env if lease else None)
+                except BaseException:
+                    queue.remove(entry.entry_id)
+                    raise
+                queue.set_pid(entry.entry_id, proc.pid)
+        except BaseException:
+            ctx.__exit__(None, None, None)
+            raise
+        return _ActiveTraining(
+            proc=proc, gpu_lock_ctx=ctx, model_dir=entry.model_dir, entry_id=entry.entry_id
+        )
+    return None
+
+
+class _TrainScheduler:
+    """State of the scheduler loop: the trainings it launched and when to look again."""
+
+    def __init__(
+        self,
+        wake_event: WakeEvent,
+        poll_interval_seconds: float,
+        fallback_interval_seconds: float,
+        reconcile_interval_seconds: float = 600.0,
+    ) -> None:
+        """Work when wake_event is set, and at the given intervals otherwise."""
+        self.wake_event = wake_event
+        self.poll_interval_seconds = poll_interval_seconds
+        self.fallback_interval_seconds = fallback_interval_seconds
+        self.reconcile_interval_seconds = reconcile_interval_seconds
+        # Trainings launched by this loop and still running, by queue entry.
+        self.active: dict[int, _ActiveTraining] = {}
+        # Task holding our place in the GPU queue, to withdraw once we stop waiting for it.
+        self._gpu_waiter: str | None = None
+        self._next_reconcile = 0.0
+
+    def _watch_exit(self, proc: subprocess.Popen) -> None:
+        """Wake the loop as soon as proc exits, instead of noticing on the next round."""
+
+        def _wait() -> None:
+            """Reap proc, then wake the loop."""
+            proc.wait()
+            self.wake_event.set()
+
+        threading.Thread(target=_wait, name=f"train-exit-{proc.pid}", daemon=True).start()
+
+    def _release_finished(self, queue: TrainQueue) -> None:
+        """Forget active trainings whose process is gone, releasing their GPU slots.
+
+        Our own children are checked with poll(), not by PID: once the exit watcher
+        has reaped one, its PID may already belong to an unrelated process.
+        """
+        for entry_id, active in list(self.active.items()):
+            if active.proc.poll() is None:
+                continue
+            logger.info(
+                "Training subprocess pid=%s finished for %s", active.proc.pid, active.model_dir
+            )
+            try:
+                active.gpu_lock_ctx.__exit__(None, None, None)
+            except Exception as e:
+                logger.error("Error releasing GPU lock: %s", e)
+            queue.remove(entry_id)
+            del self.active[entry_id]
+
+    def _check_launched(self, queue: TrainQueue) -> bool:
+        """Drop finished launched entries not tracked by this loop (e.g. from before a restart).
+
+        Trainings whose process died are marked FAILED. Returns True if one is
+        still running, in which case nothing else may start: its GPU slot was
+        released with the previous scheduler, so which device it uses is unknown.
+        """
+        running = False
+        for entry in queue.launched():
+            if entry.entry_id in self.active:
+                continue
+            if entry.pid and _is_pid_alive(entry.pid):
+                running = True
+                continue
+            _fail_if_defunct(entry.project_key, entry.model_dir)
+            queue.remove(entry.entry_id)
+        return running
+
+    def _reconcile(self, queue: TrainQueue) -> None:
+        """Run the slow scan of all model dirs, if due."""
+        now = time.monotonic()
+        if now < self._next_reconcile:
+            return
+        self._next_reconcile = now + self.reconcile_interval_seconds
+        project_util = deps.project_util(root_config=deps.root_config())
+        pps = project_util.get_all_project_paths()
+        for project_key, project_info in pps.items():
+            if project_info and project_info.model_dir and project_info.model_dir.exists():
+                _reconcile_project(queue, project_key, project_info.model_dir)
+
+    def run_once(self) -> float:
+        """Do one round of scheduling; return how long to wait (unless woken) before the next."""
+        queue = get_train_queue(deps.root_config().LP_SYSTEM_DIR)
+        self._release_finished(queue)
+        orphan_running = self._check_launched(queue)
+        self._reconcile(queue)
+        if orphan_running:
+            # A training launched before a restart still runs; nobody will wake us when it ends.
+            return self.poll_interval_seconds
+
+        # Launch one training per free GPU slot.
+        while isinstance(result := _launch_next(queue), _ActiveTraining):
+            self.active[result.entry_id] = result
+            self._watch_exit(result.proc)
+            logger.info("Launched training for %s", result.model_dir.name)
+            self._gpu_waiter = None
+        if self._gpu_waiter is not None and self._gpu_waiter != result:
+            withdraw_gpu_request(self._gpu_waiter)
+        self._gpu_waiter = result
+        if result:
+            # A place in the GPU queue is kept only while we retry, and slot holders
+            # may not wake us (e.g. another server).
+            return self.poll_interval_seconds
+        return self.fallback_interval_seconds
+
+    def run_forever(self) -> None:
+        """Alternate scheduling rounds with waits that a wake-up cuts short."""
+        while True:
+            # Cleared before the round, so a wake-up arriving during it triggers another.
+            self.wake_event.clear()
+            try:
+                timeout = self.run_once()
+            except Exception:
+                logger.exception("Error in train scheduler loop")
+                timeout = self.poll_interval_seconds
+            self.wake_event.wait(timeout)
+
+
+def train_scheduler_loop(
+    poll_interval_seconds: float = 2.0,
+    wake_event: WakeEvent | None = None,
+    fallback_interval_seconds: float = 30.0,
+    reconcile_interval_seconds: float = 600.0,
+) -> None:
+    """Launches queued training tasks, one per free GPU slot, as soon as there is reason to.
+
+    Holds a GPU slot lease for the entire lifetime of each training subprocess so
+    that inference tasks use other devices or wait rather than sharing one.
+
+    Work is taken from the training queue (see ``train_queue.py``) when `wake_event`
+    is set (by the web process, see ``utils/train_wakeup.py``) or the training
+    subprocess exits, and otherwise every `fallback_interval_seconds`. While a
+    task waits for the GPU, rounds repeat every `poll_interval_seconds`. Model dirs
+    are only scanned at startup and every `reconcile_interval_seconds`, for
+    PENDING tasks the queue doesn't know about. Without a wake_event, every wait
+    is `poll_interval_seconds`.
+    """
+    if wake_event is None:
+        wake_event = threading.Event()
+        fallback_interval_seconds = poll_interval_seconds
+    _TrainScheduler(
+        wake_event,
+        poll_interval_seconds,
+        fallback_interval_seconds,
+        reconcile_interval_seconds,
+    ).run_forever()
+
+
+def _train_scheduler_process_target(wake_event: WakeEvent | None = None) -> None:
     """Wrapper function to run train_scheduler_loop in a separate process."""
     # Configure logging for the child process.
     # This ensures logs from the child process are properly handled,
@@ -262,7 +414,7 @@ def _train_scheduler_process_target() -> None:
 
     child_logger.info("Train scheduler subprocess online.")
     try:
-        train_scheduler_loop()
+        train_scheduler_loop(wake_event=wake_event)
     except KeyboardInterrupt:
         # This can happen if the parent sends a SIGINT
         child_logger.info(
@@ -0,0 +1,54 @@
+"""The checkpoint of a model that inference loads.
+
+`litpose predict` (and the warm model worker) load a model with lightning_pose's
+``Model.from_dir``, which takes the last file ``glob`` lists in
+``tb_logs/<model.model_name>/version_0/checkpoints/``. Other checkpoints (saved
+every few epochs) are never used for predictions.
+
+The prediction cache keys a model by this file, so it agrees with what inference
+actually loads. Pruning keeps it, but only while the model has a single run: a
+training launched again in the same dir logs to ``version_1`` and on, and its
+checkpoints, though newer, would be the ones pruned.
+"""
+
+from __future__ import annotations
+
+import glob
+from pathlib import Path
+
+import yaml
+
+
+def _model_name(model_dir: Path) -> str | None:
+    """Return model.model_name from the model's config.yaml, or None if it's unreadable."""
+    try:
+        config = yaml.safe_load((model_dir / "config.yaml").read_text())
+        return str(config["model"]["model_name"])
+    except (OSError, yaml.YAMLError, KeyError, TypeError):
+        return None
+
+
+def training_runs(model_dir: Path) -> list[Path]:
+    """Return the run dirs (``version_N``) Lightning logged for model_dir, sorted by name."""
+    model_name = _model_name(model_dir)
+    if model_name is None:
+        return []
+    runs = model_dir / "tb_logs" / model_name
+    return sorted(runs.glob("version_*"))
+
+
+def inference_checkpoint(model_dir: Path) -> Path | None:
+    """Return the checkpoint inference loads for model_dir, or None if there is none."""
+    model_name = _model_name(model_dir)
+    if model_name is None:
+        return None
+    pattern = (
+        Path(glob.escape(str(model_dir)))
+        / "tb_logs"
+        / glob.escape(model_name)
+        / "version_0"
+        / "checkpoints"
+        / "*.ckpt"
+    )
+    files = glob.glob(str(pattern))
+    return Path(files[-1]) if files else None
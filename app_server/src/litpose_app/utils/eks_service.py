@@ -0,0 +1,158 @@
+"""Warm pool of EKS smoothing workers shared by all inference tasks.
+
+Running ``scripts/run_eks.py`` per (EKS model, session) started a fresh
+interpreter each time and re-imported jax and eks, which costs more than smoothing
+a short session. This service keeps a pool of worker processes that import eks
+once at startup and then smooth sessions as they are submitted, several in
+parallel across cores.
+
+Workers are processes, not threads: jax holds the GIL for long stretches and
+keeps large per-process state, and a crash in a native extension must not take
+the server down. The pool uses the spawn start method because the server is
+multi-threaded.
+
+Member predictions are not pre-read or cached here: eks's public API takes file
+paths and parses each member CSV itself, so every input is read once per
+session, by eks. The frame count reported for throughput comes from the
+smoothed output.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EksJob:
+    """Smoothing of one session by one EKS model."""
+
+    session: str
+    save_dir: Path
+    camera_names: list[str]
+    input_files: list[str]
+    smooth_param: float = 1000.0
+    quantile_keep_pca: float = 50.0
+    # Smooth in overlapping windows of this many frames (None: the whole session at once).
+    chunk_frames: int | None = None
+    chunk_overlap_frames: int = 600
+
+
+@dataclass
+class EksResult:
+    """Outcome of an EksJob, with its console output and per-phase timing."""
+
+    ok: bool
+    error: str | None = None
+    output: list[str] = field(default_factory=list)
+    frames: int | None = None
+    smooth_seconds: float = 0.0
+
+
+# -----------------------------
+# Worker side
+# -----------------------------
+
+def _warm_up() -> None:
+    """Pool initializer: import eks (and with it jax) once per worker."""
+    try:
+        import eks.multicam_smoother  # noqa: F401
+    except ImportError:
+        # Reported per job, where the error reaches the task log.
+        pass
+
+
+def run_job(job: EksJob) -> EksResult:
+    """Smooth one session. Runs in a pool worker; never raises."""
+    from litpose_app.scripts.run_eks import smooth_session, smooth_session_chunked
+
+    out = io.StringIO()
+    for path in job.input_files:
+        if not os.path.exists(path):
+            return EksResult(ok=False, error=f"Missing prediction file: {path}")
+
+    t0 = time.monotonic()
+    try:
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            if job.chunk_frames:
+                frames = smooth_session_chunked(
+                    job.input_files,
+                    job.save_dir,
+                    job.camera_names,
+                    job.smooth_param,
+                    job.quantile_keep_pca,
+                    job.chunk_frames,
+                    job.chunk_overlap_frames,
+                )
+            else:
+                camera_dfs, *_ = smooth_session(
+                    job.input_files,
+                    job.save_dir,
+                    job.camera_names,
+                    job.smooth_param,
+                    job.quantile_keep_pca,
+                )
+                frames = len(camera_dfs[0]) if camera_dfs else None
+    except Exception as e:
+        out.write(traceback.format_exc())
+        return EksResult(
+            ok=False,
+            error=f"{type(e).__name__}: {e}",
+            output=out.getvalue().splitlines(),
+            smooth_seconds=time.monotonic() - t0,
+        )
+    return EksResult(
+        ok=True,
+        output=out.getvalue().splitlines(),
+        frames=frames,
+        smooth_seconds=time.monotonic() - t0,
+    )
+
+
+# -----------------------------
+# Server side
+# -----------------------------
+
+class EksService:
+    """Process pool of warm EKS workers, created on first use and kept for the server's life."""
+
+    def __init__(self, max_workers: int) -> None:
+        """Allow up to max_workers sessions to be smoothed at once."""
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Return the pool, (re)creating it if needed, e.g. after a worker crashed."""
+        with self._lock:
+            if self._pool is None or getattr(self._pool, "_broken", False):
+                if self._pool is not None:
+                    logger.warning("EKS worker pool broke; starting a new one")
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm_up,
+                )
+            return self._pool
+
+    def submit(self, job: EksJob) -> Future[EksResult]:
+        """Queue a job; the future resolves to its EksResult."""
+        return self._get_pool().submit(run_job, job)
+
+    def shutdown(self) -> None:
+        """Stop the workers, abandoning queued jobs."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
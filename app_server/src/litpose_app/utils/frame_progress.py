@@ -0,0 +1,99 @@
+"""Frame-level progress and ETA of an inference task, from its subprocesses' progress channel.
+
+Subprocesses report the absolute state of each (model, video) they predict (see
+``utils/inference/progress.py``). Frame counts are only known once a video starts,
+so the task total is estimated: known totals plus, for videos not yet started,
+the mean frame count of the videos seen so far. The rate is the number of frames
+predicted since the first report, over the time since then.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections.abc import Callable
+
+
+class FrameProgress:
+    """Thread-safe aggregate of per-video progress reports for one task."""
+
+    def __init__(
+        self,
+        n_videos: int,
+        min_interval: float = 0.5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Track n_videos (model, video) predictions; snapshots are due every min_interval s."""
+        self.n_videos = n_videos
+        self.min_interval = min_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (model, video) -> (frames done, frame total or None)
+        self._videos: dict[tuple[str, str], tuple[int, int | None]] = {}
+        self._first_report: float | None = None
+        self._last_published = -float("inf")
+        self._dirty = False
+
+    def update_from_line(self, line: str) -> None:
+        """Apply one JSON line of the progress channel; malformed lines are ignored."""
+        try:
+            event = json.loads(line)
+            key = (str(event["model"]), str(event["video"]))
+            done = int(event["done"])
+            total = int(event["total"]) if event.get("total") is not None else None
+        except (ValueError, KeyError, TypeError):
+            return
+        with self._lock:
+            if self._first_report is None:
+                self._first_report = self._clock()
+            prev_done = self._videos.get(key, (0, None))[0]
+            # Never go backwards, e.g. when a retried video restarts from 0.
+            self._videos[key] = (max(prev_done, done), total)
+            self._dirty = True
+
+    def video_done(self, model: str, video: str) -> bool:
+        """Return True if every frame of video was reported predicted by model."""
+        with self._lock:
+            done, total = self._videos.get((model, video), (0, None))
+        return total is not None and done >= total
+
+    def snapshot(self) -> dict:
+        """Return frames done, estimated total, rate and ETA."""
+        with self._lock:
+            return self._snapshot_nolock()
+
+    def snapshot_if_due(self, force: bool = False) -> dict | None:
+        """Return a snapshot if anything changed and min_interval has passed (or force)."""
+        with self._lock:
+            now = self._clock()
+            if not self._dirty or (not force and now - self._last_published < self.min_interval):
+                return None
+            self._dirty = False
+            self._last_published = now
+            return self._snapshot_nolock()
+
+    def _snapshot_nolock(self) -> dict:
+        """Build the snapshot. Caller must hold _lock."""
+        done = sum(d for d, _ in self._videos.values())
+        totals = [t for _, t in self._videos.values() if t]
+        videos_done = sum(1 for d, t in self._videos.values() if t and d >= t)
+        unseen = max(0, self.n_videos - len(self._videos))
+        estimated_total = sum(totals)
+        if totals:
+            estimated_total += round(unseen * sum(totals) / len(totals))
+        # Videos of unknown length count as their frames so far.
+        estimated_total += sum(d for d, t in self._videos.values() if not t)
+        elapsed = self._clock() - self._first_report if self._first_report is not None else 0
+        fps = done / elapsed if elapsed > 0 and done else None
+        eta = None
+        if fps and totals:
+            eta = round(max(0, estimated_total - done) / fps, 1)
+        return {
+            "framesDone": done,
+            "framesTotal": estimated_total or None,
+            "videosDone": videos_done,
+            "videosTotal": self.n_videos,
+            "fps": round(fps, 2) if fps else None,
+            "etaSeconds": eta,
+        }
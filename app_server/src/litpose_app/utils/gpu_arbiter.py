@@ -0,0 +1,129 @@
+"""Machine-wide queue of tasks waiting for a GPU slot, so slots go to waiters in a fair order.
+
+OS file locks (see ``gpu_lock.py``) don't queue: whoever polls first when a slot
+frees up gets it, so a quick inference could wait behind a stream of trainings
+or the other way around. Every task that wants a slot therefore first joins this
+queue, and only the waiter at its head may take a free slot. Order is by
+priority (higher first), then first come, first served, across task types.
+
+Waiters heartbeat by re-joining while they wait (blocking waiters every poll,
+the train scheduler on every retry); a waiter that stops doing so, e.g. because
+its process died, is dropped after `STALE_SECONDS`.
+
+A running task is never asked to give up its slot: ``litpose train`` can't
+resume a stopped training in the same run, so preempting one would restart its
+schedule and leave its checkpoints split across runs.
+
+The database sits next to the slot locks, so all servers on the machine share it.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+
+STALE_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS waiters (
+    ticket INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL UNIQUE,
+    task_type TEXT NOT NULL,
+    project_key TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    heartbeat REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS waiters_order ON waiters(priority DESC, ticket);
+"""
+
+
+class GpuArbiter:
+    """Priority/FIFO queue of GPU slot waiters in a small SQLite database."""
+
+    def __init__(self, db_path: Path) -> None:
+        """Open (creating if needed) the queue database at db_path."""
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(db_path, timeout=10)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection inside a write transaction, serialized across threads."""
+        with self._lock:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+            finally:
+                conn.close()
+
+    @staticmethod
+    def _prune(conn: sqlite3.Connection, now: float) -> None:
+        """Drop waiters that stopped heartbeating."""
+        conn.execute("DELETE FROM waiters WHERE heartbeat < ?", (now - STALE_SECONDS,))
+
+    def join(
+        self, task_type: str, task_id: str, project_key: str | None = None, priority: int = 0
+    ) -> int:
+        """Join the queue (or heartbeat if already in it) and return the number of waiters ahead.
+
+        A waiter keeps its place across calls; only its priority is updated.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            self._prune(conn, now)
+            conn.execute(
+                "INSERT INTO waiters (task_id, task_type, project_key, priority, enqueued_at, "
+                "heartbeat) VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(task_id) DO UPDATE SET "
+                "heartbeat = excluded.heartbeat, priority = excluded.priority",
+                (task_id, task_type, project_key, priority, now, now),
+            )
+            (ahead,) = conn.execute(
+                "SELECT COUNT(*) FROM waiters w, waiters me WHERE me.task_id = ? AND "
+                "(w.priority > me.priority OR (w.priority = me.priority AND w.ticket < me.ticket))",
+                (task_id,),
+            ).fetchone()
+        return ahead
+
+    def leave(self, task_id: str) -> None:
+        """Leave the queue (slot acquired, or gave up)."""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM waiters WHERE task_id = ?", (task_id,))
+
+    def waiters(self) -> list[dict]:
+        """Return the live waiters in queue order, with their position (0 = next)."""
+        now = time.time()
+        with self._connect() as conn:
+            self._prune(conn, now)
+            rows = conn.execute(
+                "SELECT task_id, task_type, project_key, priority, enqueued_at FROM waiters "
+                "ORDER BY priority DESC, ticket"
+            ).fetchall()
+        return [
+            {
+                "taskId": task_id,
+                "type": task_type,
+                "projectKey": project_key,
+                "priority": priority,
+                "position": i,
+                "waitingSeconds": round(now - enqueued_at, 1),
+            }
+            for i, (task_id, task_type, project_key, priority, enqueued_at) in enumerate(rows)
+        ]
+
@@ -1,113 +1,280 @@
-"""GPU lock management using portalocker to serialise training and inference tasks."""
+"""GPU slot leases using portalocker, to share devices between training and inference tasks.
+
+Every device is a slot with its own OS-level lock file, so at most one task runs
+per GPU while tasks on different GPUs run concurrently. A task holds a
+`GpuLease` while it uses its device; the lease gives the environment
+(CUDA_VISIBLE_DEVICES) for the task's child processes, and its metadata is
+written next to the lock so that any process can report what runs where.
+
+Before taking a slot, a task waits for its turn in the machine-wide queue of
+``gpu_arbiter.py``, which orders waiters by priority and then first come, first
+served, whatever their task type.
+
+Devices come from the LP_GPU_DEVICES environment variable, a comma-separated list
+of CUDA device indices, or of fake devices named "cpu..." that set nothing (for
+tests and CPU-only machines). Without it, devices are discovered with nvidia-smi,
+and a machine without GPUs gets a single "cpu" slot, which serializes tasks like
+the single global lock did.
+"""
 
 from __future__ import annotations
 
 import contextlib
 import json
 import logging
-from collections.abc import Generator
+import os
+import subprocess
+import threading
+import time
+from collections.abc import Callable, Generator
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 import portalocker
 
-GPU_LOCK_PATH = "/tmp/litpose_gpu.lock"
-GPU_TASK_PATH = "/tmp/litpose_gpu_task.json"
+from .gpu_arbiter import GpuArbiter
+
+GPU_LOCK_DIR = Path("/tmp")
+DEVICES_ENV_VAR = "LP_GPU_DEVICES"
+# How often a blocking lease re-checks its turn and the slots.
+_BLOCKING_POLL_SECONDS = 0.5
 
 logger = logging.getLogger(__name__)
 
 
-def _write_gpu_task(task_type: str, task_id: str, project_key: str | None = None) -> None:
-    """Atomically write current GPU task metadata to disk."""
-    tmp = Path(GPU_TASK_PATH + ".tmp")
-    data = {"type": task_type, "taskId": task_id}
-    if project_key:
-        data["projectKey"] = project_key
-    tmp.write_text(json.dumps(data))
-    tmp.rename(GPU_TASK_PATH)
+@dataclass
+class GpuLease:
+    """One task's hold on one device slot."""
+
+    device: str
+    task_type: str
+    task_id: str
+    project_key: str | None = None
+    priority: int = 0
+
+    @property
+    def env(self) -> dict[str, str]:
+        """Environment variables that restrict a child process to the leased device."""
+        if self.device.startswith("cpu"):
+            return {}
+        return {"CUDA_VISIBLE_DEVICES": self.device}
+
+    def to_dict(self) -> dict:
+        """Return the metadata reported for the slot."""
+        data = {
+            "type": self.task_type,
+            "taskId": self.task_id,
+            "device": self.device,
+            "priority": self.priority,
+        }
+        if self.project_key:
+            data["projectKey"] = self.project_key
+        return data
+
+
+@lru_cache(maxsize=1)
+def _discover_devices() -> tuple[str, ...]:
+    """Return the indices of the GPUs nvidia-smi lists, or ("cpu",) if there are none."""
+    try:
+        out = subprocess.run(
+            ["nvidia-smi", "--query-gpu=index", "--format=csv,noheader"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return ("cpu",)
+    devices = tuple(line.strip() for line in out.splitlines() if line.strip().isdigit())
+    return devices or ("cpu",)
+
+
+def gpu_devices() -> list[str]:
+    """Return the device slots, from LP_GPU_DEVICES or else from nvidia-smi."""
+    configured = os.environ.get(DEVICES_ENV_VAR, "")
+    devices = [d.strip() for d in configured.split(",") if d.strip()]
+    return devices or list(_discover_devices())
+
+
+class GpuWaitCancelled(Exception):
+    """Raised by a blocking lease whose task was cancelled while waiting."""
+
+
+_arbiters: dict[Path, GpuArbiter] = {}
+_arbiters_lock = threading.Lock()
+
+
+def get_gpu_arbiter() -> GpuArbiter:
+    """Return the queue of slot waiters that sits next to the slot locks."""
+    db_path = GPU_LOCK_DIR / "litpose_gpu_queue.sqlite"
+    with _arbiters_lock:
+        arbiter = _arbiters.get(db_path)
+        if arbiter is None:
+            arbiter = _arbiters[db_path] = GpuArbiter(db_path)
+    return arbiter
+
+
+def withdraw_gpu_request(task_id: str) -> None:
+    """Give up a non-blocking caller's place in the GPU queue."""
+    get_gpu_arbiter().leave(task_id)
+
+
+def _lock_path(device: str) -> Path:
+    """Return the lock file of a device slot."""
+    return GPU_LOCK_DIR / f"litpose_gpu_{device}.lock"
+
+
+def _task_path(device: str) -> Path:
+    """Return the task metadata file of a device slot."""
+    return GPU_LOCK_DIR / f"litpose_gpu_task_{device}.json"
+
+
+def _write_gpu_task(lease: GpuLease) -> None:
+    """Atomically write the task metadata of a lease to its slot."""
+    path = _task_path(lease.device)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(lease.to_dict()))
+    tmp.rename(path)
 
 
-def clear_gpu_task() -> None:
-    """Remove the GPU task metadata file, ignoring errors if it doesn't exist."""
+def clear_gpu_task(device: str) -> None:
+    """Remove a slot's task metadata file, ignoring errors if it doesn't exist."""
     try:
-        Path(GPU_TASK_PATH).unlink(missing_ok=True)
+        _task_path(device).unlink(missing_ok=True)
     except Exception:
         pass
 
 
+def read_gpu_tasks() -> list[dict]:
+    """Return the metadata of the task holding each busy slot, in device order."""
+    tasks = []
+    for device in gpu_devices():
+        try:
+            tasks.append(json.loads(_task_path(device).read_text()))
+        except Exception:
+            continue
+    return tasks
+
+
 def read_gpu_task() -> dict | None:
-    """Return the current GPU task metadata dict, or None if no task is active."""
-    try:
-        return json.loads(Path(GPU_TASK_PATH).read_text())
-    except Exception:
-        return None
+    """Return the metadata of the first busy slot's task, or None if no task is active."""
+    tasks = read_gpu_tasks()
+    return tasks[0] if tasks else None
 
 
 def clear_stale_gpu_task() -> bool:
-    """Attempts to clear the GPU task state if it's found to be stale.
+    """Attempts to clear the task metadata of slots found to be stale.
 
-    A task is considered stale if its metadata file exists but the corresponding
-    OS-level GPU lock is not held by any process.
+    A slot is considered stale if its metadata file exists but the corresponding
+    OS-level lock is not held by any process.
 
-    Returns True if the state was cleared or didn't exist, False if it's currently active.
+    Returns True if every slot's state was cleared or didn't exist, False if any is active.
     """
-    if not Path(GPU_TASK_PATH).exists():
-        return True
+    all_clear = True
+    for device in gpu_devices():
+        if not _task_path(device).exists():
+            continue
+        lock = portalocker.Lock(str(_lock_path(device)), mode="a", timeout=0)
+        try:
+            lock.acquire()
+            try:
+                # We acquired the lock, so any existing task info must be stale.
+                # (No process currently holds the lock).
+                clear_gpu_task(device)
+                logger.info("Cleared stale GPU task info for device %s (OS lock was free)", device)
+            finally:
+                lock.release()
+        except portalocker.exceptions.LockException:
+            # Lock is currently held; the task is not stale.
+            all_clear = False
+        except Exception:
+            # For other errors, don't clear (better to be safe).
+            logger.exception("Failed to check for stale GPU task on device %s", device)
+            all_clear = False
+    return all_clear
 
-    lock = portalocker.Lock(GPU_LOCK_PATH, mode="a", timeout=0)
-    try:
-        lock.acquire()
+
+def _try_acquire_slot() -> tuple[str, portalocker.Lock] | None:
+    """Lock the first free slot without waiting; None if all are busy."""
+    for device in gpu_devices():
+        lock = portalocker.Lock(str(_lock_path(device)), mode="a", timeout=0)
         try:
-            # We acquired the lock, so any existing task info must be stale.
-            # (No process currently holds the lock).
-            clear_gpu_task()
-            logger.info("Cleared stale GPU task info (OS lock was free)")
-            return True
-        finally:
-            lock.release()
-    except (portalocker.exceptions.LockException, portalocker.exceptions.AlreadyLocked):
-        # Lock is currently held; the task is not stale.
-        return False
-    except Exception:
-        # For other errors, don't clear (better to be safe).
-        logger.exception("Failed to check for stale GPU task")
-        return False
+            lock.acquire()
+        except portalocker.exceptions.LockException:
+            continue
+        return device, lock
+    return None
 
 
 @contextlib.contextmanager
-def gpu_lock_blocking(
-    task_type: str, task_id: str, project_key: str | None = None
-) -> Generator[None, None, None]:
-    """Blocking GPU lock. Waits until acquired."""
-    # portalocker.Lock by default includes NON_BLOCKING flag in LOCK_METHOD.
-    # We explicitly remove it to ensure we use the OS-level blocking lock.
-    flags = portalocker.LOCK_EX
-    lock = portalocker.Lock(GPU_LOCK_PATH, mode="a", timeout=None, flags=flags)
+def _leased(lease: GpuLease, lock: portalocker.Lock) -> Generator[GpuLease, None, None]:
+    """Publish a lease on a locked slot for the duration of the block, then release it."""
     try:
-        lock.acquire()
-    except Exception:
-        logger.exception(f"Failed to acquire GPU lock for {task_id}")
-        raise
-    try:
-        _write_gpu_task(task_type, task_id, project_key=project_key)
-        yield
+        _write_gpu_task(lease)
+        yield lease
     finally:
-        clear_gpu_task()
+        clear_gpu_task(lease.device)
         try:
             lock.release()
         except Exception:
-            logger.exception(f"Failed to release GPU lock for {task_id}")
+            logger.exception(f"Failed to release GPU lock for {lease.task_id}")
 
 
 @contextlib.contextmanager
-def gpu_lock_nonblocking(
-    task_type: str, task_id: str, project_key: str | None = None
-) -> Generator[portalocker.Lock, None, None]:
-    """Non-blocking GPU lock. Raises portalocker.LockException if busy."""
-    lock = portalocker.Lock(GPU_LOCK_PATH, mode="a", timeout=0)
-    lock.acquire()  # raises LockException if busy; no cleanup needed since lock wasn't held
+def gpu_lock_blocking(
+    task_type: str,
+    task_id: str,
+    project_key: str | None = None,
+    *,
+    priority: int = 0,
+    on_wait: Callable[[int], None] | None = None,
+    cancelled: Callable[[], bool] | None = None,
+) -> Generator[GpuLease, None, None]:
+    """Blocking GPU lease. Waits for the task's turn in the GPU queue and a free slot.
+
+    on_wait is called with the number of waiters ahead whenever it changes.
+    If cancelled() becomes true while waiting, raises GpuWaitCancelled.
+    """
+    arbiter = get_gpu_arbiter()
+    last_ahead = None
     try:
-        _write_gpu_task(task_type, task_id, project_key=project_key)
-        yield lock
+        while True:
+            if cancelled is not None and cancelled():
+                raise GpuWaitCancelled(task_id)
+            ahead = arbiter.join(task_type, task_id, project_key, priority)
+            slot = _try_acquire_slot() if ahead == 0 else None
+            if slot is not None:
+                break
+            if on_wait is not None and ahead != last_ahead:
+                on_wait(ahead)
+                last_ahead = ahead
+            time.sleep(_BLOCKING_POLL_SECONDS)
     finally:
-        clear_gpu_task()
-        lock.release()
+        arbiter.leave(task_id)
+    device, lock = slot
+    with _leased(GpuLease(device, task_type, task_id, project_key, priority), lock) as lease:
+        yield lease
+
+
+@contextlib.contextmanager
+def gpu_lock_nonblocking(
+    task_type: str, task_id: str, project_key: str | None = None, *, priority: int = 0
+) -> Generator[GpuLease, None, None]:
+    """Non-blocking GPU lease. Raises portalocker.LockException unless a slot is free for us.
+
+    A failed attempt keeps the task's place in the GPU queue as long as the caller
+    keeps retrying; call `withdraw_gpu_request` if it stops.
+    """
+    arbiter = get_gpu_arbiter()
+    ahead = arbiter.join(task_type, task_id, project_key, priority)
+    slot = _try_acquire_slot() if ahead == 0 else None
+    if slot is None:
+        # No cleanup needed since no lock was taken.
+        raise portalocker.exceptions.LockException(
+            f"No GPU slot for {task_id} ({ahead} waiting ahead)"
+        )
+    arbiter.leave(task_id)
+    device, lock = slot
+    with _leased(GpuLease(device, task_type, task_id, project_key, priority), lock) as lease:
+        yield lease
@@ -0,0 +1,133 @@
+"""Persisted per-GPU profile of the largest prediction batch size that fits in memory.
+
+predict_wrapper.py used to start every run at 96 and halve on each CUDA OOM,
+remembering only one size per backbone in /tmp. This controller instead keeps,
+per (backbone, model_type, image size, GPU name, free-memory bucket), the
+largest batch size known to succeed and the smallest known to OOM, and picks
+the next size to try by binary search between them. Once it has seen a success
+and no OOM, it searches upward by doubling, so the profile converges on the
+true limit from either side across runs.
+
+The profile is a small JSON file (by default ``~/.lightning-pose/batch_size_profile.json``).
+It must stay importable without the app's dependencies because the wrapper runs
+in lightning-pose's environment, so writes use a plain atomic rename.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+DEFAULT_PROFILE_PATH = Path.home() / ".lightning-pose" / "batch_size_profile.json"
+DEFAULT_BATCH_SIZE = 96
+MAX_BATCH_SIZE = 1024
+_FREE_MEMORY_BUCKET_MIB = 2048
+# Stop searching once the known-good and known-bad sizes are within this fraction.
+_CONVERGED_FRACTION = 1 / 8
+
+
+def gpu_info() -> tuple[str, int]:
+    """Return (GPU name, free memory in MiB) of the first visible GPU, or ("cpu", 0)."""
+    try:
+        out = subprocess.run(
+            [
+                "nvidia-smi",
+                "--query-gpu=name,memory.free",
+                "--format=csv,noheader,nounits",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=10,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return "cpu", 0
+    lines = out.strip().splitlines()
+    visible = os.environ.get("CUDA_VISIBLE_DEVICES", "").split(",")[0].strip()
+    index = int(visible) if visible.isdigit() and int(visible) < len(lines) else 0
+    try:
+        name, free = (part.strip() for part in lines[index].split(","))
+        return name, int(float(free))
+    except (IndexError, ValueError):
+        return "cpu", 0
+
+
+def profile_key(
+    backbone: str,
+    model_type: str,
+    image_size: tuple[int, int] | None,
+    gpu_name: str,
+    free_mib: int,
+) -> str:
+    """Build the profile key; free memory is bucketed so small fluctuations share an entry."""
+    size = f"{image_size[0]}x{image_size[1]}" if image_size else "unknown"
+    bucket = free_mib // _FREE_MEMORY_BUCKET_MIB * _FREE_MEMORY_BUCKET_MIB
+    return f"{backbone}|{model_type}|{size}|{gpu_name}|{bucket}MiB"
+
+
+class BatchSizeProfile:
+    """Binary-search batch-size controller backed by a JSON profile on disk."""
+
+    def __init__(self, path: Path = DEFAULT_PROFILE_PATH) -> None:
+        """Use the profile at path; it is created on the first recorded outcome."""
+        self.path = Path(path)
+
+    def _load(self) -> dict:
+        """Read the whole profile, returning an empty one on any error."""
+        try:
+            data = json.loads(self.path.read_text())
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _update(self, key: str, max_ok: int | None, min_oom: int | None) -> None:
+        """Write one entry, re-reading the file first so concurrent runs lose little."""
+        data = self._load()
+        data[key] = {"max_ok": max_ok, "min_oom": min_oom, "updated": time.time()}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".batch_size_profile")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"Warning: Could not save batch size profile to {self.path}: {e}")
+
+    def bounds(self, key: str) -> tuple[int | None, int | None]:
+        """Return (largest size known to succeed, smallest size known to OOM) for key."""
+        entry = self._load().get(key) or {}
+        return entry.get("max_ok"), entry.get("min_oom")
+
+    def next_batch_size(self, key: str) -> int:
+        """Return the batch size to try next for key."""
+        max_ok, min_oom = self.bounds(key)
+        if max_ok is None and min_oom is None:
+            return DEFAULT_BATCH_SIZE
+        if max_ok is None:
+            return max(1, min_oom // 2)
+        if min_oom is None:
+            return min(max_ok * 2, MAX_BATCH_SIZE)
+        if min_oom - max_ok <= max(1, int(max_ok * _CONVERGED_FRACTION)):
+            return max_ok
+        return (max_ok + min_oom) // 2
+
+    def record_ok(self, key: str, batch_size: int) -> None:
+        """Record that batch_size ran to completion."""
+        max_ok, min_oom = self.bounds(key)
+        max_ok = max(max_ok or 0, batch_size)
+        if min_oom is not None and min_oom <= max_ok:
+            # Contradicts an earlier OOM, so the environment changed; search up again.
+            min_oom = None
+        self._update(key, max_ok, min_oom)
+
+    def record_oom(self, key: str, batch_size: int) -> None:
+        """Record that batch_size ran out of GPU memory."""
+        max_ok, min_oom = self.bounds(key)
+        min_oom = batch_size if min_oom is None else min(min_oom, batch_size)
+        if max_ok is not None and max_ok >= min_oom:
+            max_ok = None
+        self._update(key, max_ok, min_oom)
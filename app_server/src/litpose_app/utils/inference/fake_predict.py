@@ -3,11 +3,73 @@
 from __future__ import annotations
 
 import argparse
+import os
 import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(__file__))
+from progress import ProgressWriter  # noqa: E402
+
+
+def write_fake_predictions(video_file: Path, output_dir: Path) -> None:
+    """Write a prediction CSV with litpose's 3 header rows and FAKE_PREDICT_FRAMES frames."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    n_frames = int(os.environ.get("FAKE_PREDICT_FRAMES", "10"))
+    header = "scorer,fake,fake\nbodyparts,nose,nose\ncoords,x,y\n"
+    rows = "".join(f"{i},0.0,0.0\n" for i in range(n_frames))
+    (output_dir / f"{video_file.stem}.csv").write_text(header + rows)
+
+
+class FakeModel:
+    """CPU-only stand-in for lightning_pose.api.model.Model, used by model_worker.py tests.
+
+    Writes a placeholder CSV per video, after printing a tqdm-style counter like
+    litpose's progress bar. Videos whose name contains "fail" raise, to exercise
+    the worker's fallback path, and batch sizes above FAKE_PREDICT_MAX_BATCH
+    raise a CUDA OOM error like main() below.
+    """
+
+    def __init__(self, model_dir: str) -> None:
+        """Remember the model directory; there are no weights to load."""
+        self.model_dir = Path(model_dir)
+        # Set by model_worker.py, like the real model's dali sequence length.
+        self.batch_size = 64
+
+    @classmethod
+    def from_dir(cls, model_dir: str) -> FakeModel:
+        """Mirror Model.from_dir."""
+        return cls(model_dir)
+
+    def predict_on_video_file(
+        self, video_file, output_dir, generate_labeled_video: bool = False
+    ) -> None:
+        """Write a placeholder prediction CSV for one video."""
+        video_file = Path(video_file)
+        if "fail" in video_file.stem:
+            raise RuntimeError(f"Fake prediction failure for {video_file.name}")
+        if self.batch_size > int(os.environ.get("FAKE_PREDICT_MAX_BATCH", "8")):
+            raise RuntimeError("CUDA out of memory. Tried to allocate 2.45 GiB")
+        n_frames = int(os.environ.get("FAKE_PREDICT_FRAMES", "10"))
+        print(f"\rPredicting: {n_frames // 2}/{n_frames} [00:00<00:00]", file=sys.stderr)
+        write_fake_predictions(video_file, Path(output_dir))
+
+    def predict_on_video_file_multiview(
+        self, video_file_per_view, output_dir, generate_labeled_video: bool = False
+    ) -> None:
+        """Write a placeholder prediction CSV for each view of one session."""
+        for video_file in video_file_per_view:
+            self.predict_on_video_file(video_file, output_dir, generate_labeled_video)
 
 
 def main() -> None:
-    """Parse litpose predict-style args and exit with OOM or success based on batch size."""
+    """Parse litpose predict-style args and exit with OOM or success based on batch size.
+
+    The largest batch size that fits is FAKE_PREDICT_MAX_BATCH (default 8). With
+    FAKE_PREDICT_OOM_HANG set, an OOM is followed by that many seconds of sleep,
+    like a real run that keeps going after the error. Per-video progress goes to
+    the progress channel (see progress.py) when LP_PROGRESS_FILE is set.
+    """
     # Setup parser to handle litpose predict-like arguments
     parser = argparse.ArgumentParser(description="Fake litpose predict for testing OOM handling.")
     parser.add_argument("model_dir", help="Path to the model directory")
@@ -41,10 +103,17 @@ def main() -> None:
         sys.exit(1)
 
     # Simulate CUDA OOM if batch size is too large
-    if batch_size > 8:
-        print("Error: CUDA out of memory. Tried to allocate 2.45 GiB (GPU 0; 8.00 GiB total capacity; 5.67 GiB already allocated; 1.23 GiB free; 5.70 GiB reserved in total by PyTorch)")
+    if batch_size > int(os.environ.get("FAKE_PREDICT_MAX_BATCH", "8")):
+        print("Error: CUDA out of memory. Tried to allocate 2.45 GiB (GPU 0; 8.00 GiB total capacity; 5.67 GiB already allocated; 1.23 GiB free; 5.70 GiB reserved in total by PyTorch)", flush=True)
+        time.sleep(float(os.environ.get("FAKE_PREDICT_OOM_HANG", "0")))
         sys.exit(1)
     else:
+        writer = ProgressWriter(min_interval=0)
+        n_frames = int(os.environ.get("FAKE_PREDICT_FRAMES", "10"))
+        for video_path in args.video_paths:
+            writer.update(args.model_dir, video_path, n_frames // 2, n_frames)
+            write_fake_predictions(Path(video_path), Path(args.model_dir) / "video_preds")
+            writer.update(args.model_dir, video_path, n_frames, n_frames)
         print(f"Success! Prediction completed with batch size {batch_size}.")
         sys.exit(0)
 
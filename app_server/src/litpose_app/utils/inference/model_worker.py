@@ -0,0 +1,235 @@
+"""Persistent prediction worker: loads one model once and predicts a queue of sessions.
+
+`litpose predict` is a fresh process per invocation, so running it once per session
+re-imports torch/lightning and reloads the checkpoint every time. This worker pays
+that cost once per model and then works through all of the model's sessions.
+
+Usage:
+    python model_worker.py MODEL_DIR --jobs jobs.jsonl --results results.jsonl \
+        [--profile batch_size_profile.json] [--skip_viz] [--fake]
+
+Each line of --jobs is one session:
+    {"index": 3, "session": "sess1", "video_paths": ["/data/videos/sess1_camA.mp4", ...]}
+
+Like predict_wrapper.py, the worker predicts at the batch size of the per-GPU
+profile (see batch_size_profile.py); on CUDA OOM it records the failure, frees
+the cached GPU memory and predicts the session again at the next smaller size.
+The model's progress bars are read in-process with predict_wrapper's
+`LitposeProgress`, so frame-level progress reaches the progress channel as it
+does from predict_wrapper.py.
+
+Throughput counters (model load time, frames per session) are printed to stdout
+as LP_METRICS lines. Results are appended to --results as JSON lines, flushed
+immediately:
+    {"event": "model_loaded", "seconds": 12.3}
+    {"event": "result", "index": 3, "session": "sess1", "ok": true, "seconds": 41.0, "error": null}
+
+The worker exits non-zero at the first failed session, so the caller can retry
+the remaining sessions with predict_wrapper.py.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import traceback
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(__file__))
+from batch_size_profile import (  # noqa: E402
+    DEFAULT_PROFILE_PATH,
+    BatchSizeProfile,
+    gpu_info,
+    profile_key,
+)
+from predict_wrapper import (  # noqa: E402
+    LitposeProgress,
+    count_prediction_frames,
+    read_model_config,
+    report_metrics,
+    sequence_length_flag,
+    smaller_batch_size,
+)
+
+# Progress bars redraw themselves with "\r"; each redraw counts as a line.
+_LINE_BREAK = re.compile(r"[\r\n]")
+
+
+def _load_model(model_dir: str, fake: bool):
+    """Load the model once: lightning-pose's Model API, or the CPU-only fake."""
+    if fake:
+        from fake_predict import FakeModel
+
+        return FakeModel.from_dir(model_dir)
+
+    from lightning_pose.api.model import Model
+
+    return Model.from_dir(model_dir)
+
+
+def _set_batch_size(model, flag: str, batch_size: int, fake: bool) -> None:
+    """Make the loaded model predict batch_size frames at a time."""
+    if fake:
+        model.batch_size = batch_size
+        return
+    from omegaconf import OmegaConf
+
+    OmegaConf.update(model.cfg, flag, batch_size)
+
+
+def _is_oom(e: BaseException) -> bool:
+    """Whether e is torch running out of GPU memory."""
+    return "CUDA out of memory" in str(e)
+
+
+def _free_gpu_memory() -> None:
+    """Return the memory cached by a failed attempt to the GPU before retrying."""
+    try:
+        import torch
+    except ImportError:
+        return
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+class _LineTap(io.TextIOBase):
+    """Text stream that passes writes through to stream and calls on_line per line."""
+
+    def __init__(self, stream, on_line) -> None:
+        """Forward to stream; feed each complete line to on_line."""
+        self._stream = stream
+        self._on_line = on_line
+        self._partial = ""
+
+    def write(self, text: str) -> int:
+        """Write text through and report the lines it completes."""
+        self._stream.write(text)
+        *lines, self._partial = _LINE_BREAK.split(self._partial + text)
+        for line in lines:
+            if line:
+                self._on_line(line)
+        return len(text)
+
+    def flush(self) -> None:
+        """Flush the underlying stream."""
+        self._stream.flush()
+
+
+def _predict_session(model, model_dir: str, video_paths: list[str], skip_viz: bool) -> None:
+    """Predict all views of one session into MODEL_DIR/video_preds."""
+    output_dir = Path(model_dir) / "video_preds"
+    if len(video_paths) > 1 and hasattr(model, "predict_on_video_file_multiview"):
+        model.predict_on_video_file_multiview(
+            video_paths, output_dir, generate_labeled_video=not skip_viz
+        )
+    else:
+        for video_path in video_paths:
+            model.predict_on_video_file(
+                video_path, output_dir, generate_labeled_video=not skip_viz
+            )
+
+
+def main() -> None:
+    """Load the model, then predict each queued session and report results."""
+    parser = argparse.ArgumentParser(description="Predict many sessions with one loaded model.")
+    parser.add_argument("model_dir", help="Path to the model directory")
+    parser.add_argument("--jobs", required=True, help="JSONL file of sessions to predict")
+    parser.add_argument("--results", required=True, help="JSONL file to append results to")
+    parser.add_argument(
+        "--profile", default=str(DEFAULT_PROFILE_PATH), help="Batch size profile JSON file"
+    )
+    parser.add_argument("--skip_viz", action="store_true", help="Skip labeled video generation")
+    parser.add_argument("--fake", action="store_true", help="Use the fake model for tests")
+    args = parser.parse_args()
+
+    jobs = [
+        json.loads(line) for line in Path(args.jobs).read_text().splitlines() if line.strip()
+    ]
+
+    with open(args.results, "a", buffering=1) as results:
+
+        def report(**payload) -> None:
+            """Append one result line."""
+            results.write(json.dumps(payload) + "\n")
+
+        t0 = time.monotonic()
+        print(f"--- Loading model {args.model_dir} ---", flush=True)
+        model = _load_model(args.model_dir, args.fake)
+        report(event="model_loaded", seconds=time.monotonic() - t0)
+        report_metrics(model_load_seconds=round(time.monotonic() - t0, 3))
+        print(f"--- Model loaded in {time.monotonic() - t0:.1f}s ---", flush=True)
+
+        backbone, model_type, image_size = read_model_config(args.model_dir)
+        gpu_name, free_mib = ("fake", 0) if args.fake else gpu_info()
+        key = profile_key(backbone, model_type, image_size, gpu_name, free_mib)
+        profile = BatchSizeProfile(args.profile)
+        flag = sequence_length_flag(model_type)
+        batch_size = profile.next_batch_size(key)
+
+        for job in jobs:
+            print(f"--- Predicting session {job['session']} ---", flush=True)
+            t_job = time.monotonic()
+            # Allow for coarse mtime resolution when telling freshly written predictions apart.
+            progress = LitposeProgress(args.model_dir, job["video_paths"], time.time() - 2)
+            error = None
+            while True:
+                print(f"--- Using batch size {batch_size} for {key} ---", flush=True)
+                _set_batch_size(model, flag, batch_size, args.fake)
+                stdout = _LineTap(sys.stdout, progress.on_line)
+                stderr = _LineTap(sys.stderr, progress.on_line)
+                try:
+                    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                        _predict_session(
+                            model, args.model_dir, job["video_paths"], args.skip_viz
+                        )
+                except Exception as e:
+                    traceback.print_exc()
+                    if not _is_oom(e):
+                        error = f"{type(e).__name__}: {e}"
+                        break
+                    print(f"!!! CUDA out of memory with batch size {batch_size} !!!", flush=True)
+                    profile.record_oom(key, batch_size)
+                    if batch_size <= 1:
+                        error = "Could not predict even with batch size 1 (CUDA out of memory)"
+                        break
+                    batch_size = smaller_batch_size(profile, key, batch_size)
+                    _free_gpu_memory()
+                    continue
+                break
+            if error is not None:
+                report(
+                    event="result",
+                    index=job["index"],
+                    session=job["session"],
+                    ok=False,
+                    seconds=time.monotonic() - t_job,
+                    error=error,
+                )
+                sys.exit(1)
+            profile.record_ok(key, batch_size)
+            progress.finish()
+            session_frames = sum(
+                count_prediction_frames(
+                    os.path.join(args.model_dir, "video_preds", f"{Path(video_path).stem}.csv")
+                )
+                for video_path in job["video_paths"]
+            )
+            report_metrics(frames=session_frames)
+            report(
+                event="result",
+                index=job["index"],
+                session=job["session"],
+                ok=True,
+                seconds=time.monotonic() - t_job,
+                error=None,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,234 @@
-"""Wrapper around litpose predict that retries with a smaller batch size on CUDA OOM."""
+"""Wrapper around litpose predict that picks the batch size from a per-GPU profile.
+
+The batch size comes from batch_size_profile.BatchSizeProfile, which binary-searches
+the largest size that fits for this model and GPU across runs. On CUDA OOM the
+attempt is killed as soon as the error is printed, the profile is updated and
+the remaining videos are retried with the next smaller candidate.
+"""
 
 from __future__ import annotations
 
 import argparse
 import json
 import os
+import re
 import subprocess
 import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+from batch_size_profile import (  # noqa: E402
+    DEFAULT_PROFILE_PATH,
+    BatchSizeProfile,
+    gpu_info,
+    profile_key,
+)
+from progress import ProgressWriter, video_frame_count  # noqa: E402
+
+# tqdm's "n/total [elapsed<remaining" counter.
+_TQDM_COUNTER = re.compile(r"(\d+)/(\d+) \[")
 
-CACHE_FILE = "/tmp/litpose_predict_batch_size_cache.json"
-
-def load_cache() -> dict:
-    """Load the batch-size cache from disk, returning an empty dict on any error."""
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE) as f:
-                return json.load(f)
-        except Exception:
-            return {}
-    return {}
-
-def save_to_cache(key: str, value: int) -> None:
-    """Persist a key/value pair to the batch-size cache on disk."""
-    cache = load_cache()
-    cache[key] = value
+
+def read_model_config(model_dir: str | None) -> tuple[str, str, tuple[int, int] | None]:
+    """Return (backbone, model_type, (height, width)) from model_dir/config.yaml."""
+    backbone, model_type, image_size = "unknown", "unknown", None
+    if not model_dir:
+        return backbone, model_type, image_size
+    config_path = os.path.join(model_dir, "config.yaml")
+    if not os.path.exists(config_path):
+        return backbone, model_type, image_size
     try:
-        with open(CACHE_FILE, "w") as f:
-            json.dump(cache, f)
+        import yaml
+
+        with open(config_path) as f:
+            config = yaml.safe_load(f) or {}
+        model = config.get("model", {}) or {}
+        backbone = str(model.get("backbone", backbone))
+        model_type = str(model.get("model_type", model_type))
+        dims = (config.get("data", {}) or {}).get("image_resize_dims") or {}
+        if "height" in dims and "width" in dims:
+            image_size = (int(dims["height"]), int(dims["width"]))
+    except ImportError:
+        print("Warning: 'yaml' module not found. Defaulting to dali.base.predict.sequence_length.")
     except Exception as e:
-        print(f"Warning: Could not save cache to {CACHE_FILE}: {e}")
+        print(f"Warning: Could not read config.yaml at {config_path}: {e}")
+    return backbone, model_type, image_size
+
+
+def sequence_length_flag(model_type: str) -> str:
+    """Return the config key holding the prediction batch size for model_type."""
+    if model_type.endswith("_mhcrnn"):
+        return "dali.context.predict.sequence_length"
+    return "dali.base.predict.sequence_length"
+
+
+def smaller_batch_size(profile: BatchSizeProfile, key: str, batch_size: int) -> int:
+    """Return the batch size to retry with after batch_size ran out of memory (and was recorded)."""
+    next_size = profile.next_batch_size(key)
+    return next_size if next_size < batch_size else batch_size // 2
+
+
+def drop_predicted_videos(litpose_args: list[str], model_dir: str, since: float) -> list[str]:
+    """Remove video args whose prediction CSV was written at or after `since`.
+
+    litpose predict handles videos in order, so when an OOM retry starts, the
+    videos finished by the failed attempt need not be predicted again.
+    """
+    preds_dir = os.path.join(model_dir, "video_preds")
+    kept = []
+    for arg in litpose_args:
+        if not arg.startswith("-") and arg != model_dir:
+            stem = os.path.splitext(os.path.basename(arg))[0]
+            csv_path = os.path.join(preds_dir, f"{stem}.csv")
+            if os.path.exists(csv_path) and os.path.getmtime(csv_path) >= since:
+                continue
+        kept.append(arg)
+    return kept
+
+
+def count_prediction_frames(csv_path: str) -> int:
+    """Return the number of frames in a prediction CSV (lines after litpose's 3 header rows)."""
+    try:
+        with open(csv_path, "rb") as f:
+            n_lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+    except OSError:
+        return 0
+    return max(0, n_lines - 3)
+
+
+def report_metrics(**counters) -> None:
+    """Print additive throughput counters for the server (see litpose_app.utils.inference_metrics)."""
+    print(f"LP_METRICS {json.dumps(counters)}", flush=True)
+
+
+def _report_predicted_frames(litpose_args: list[str], model_dir: str | None, since: float) -> None:
+    """Report the frames of every video in litpose_args predicted at or after since."""
+    if not model_dir:
+        return
+    frames = 0
+    for arg in litpose_args:
+        if not arg.startswith("-") and arg != model_dir:
+            stem = os.path.splitext(os.path.basename(arg))[0]
+            csv_path = os.path.join(model_dir, "video_preds", f"{stem}.csv")
+            if os.path.exists(csv_path) and os.path.getmtime(csv_path) >= since:
+                frames += count_prediction_frames(csv_path)
+    report_metrics(frames=frames)
+
+
+def _video_args(litpose_args: list[str], model_dir: str | None) -> list[str]:
+    """Return the video paths among litpose predict's positional args."""
+    return [a for a in litpose_args if not a.startswith("-") and a != model_dir]
+
+
+class LitposeProgress:
+    """Translates litpose predict's console output into progress channel updates.
+
+    litpose predicts videos in argument order, showing a tqdm bar for each. The
+    bar's fraction is scaled to the video's frame count. A video counts as done
+    once its prediction CSV exists and litpose has moved on (its next bar is
+    showing), or litpose exited successfully: while the CSV is being written it
+    already exists, so its appearance alone doesn't mean it is complete. The
+    server relies on this to start work that reads the CSV. This is the only
+    place that reads litpose's console output; the server only sees the channel.
+    """
+
+    def __init__(self, model_dir: str, videos: list[str], since: float) -> None:
+        """Track videos (in prediction order) of model_dir, counting CSVs written since since."""
+        self.model_dir = model_dir
+        self.since = since
+        self.writer = ProgressWriter()
+        self.pending = list(videos)
+        self.totals = {v: video_frame_count(v) for v in videos} if self.writer.path else {}
+
+    def _csv_path(self, video: str) -> str:
+        """Return the prediction CSV of video."""
+        stem = os.path.splitext(os.path.basename(video))[0]
+        return os.path.join(self.model_dir, "video_preds", f"{stem}.csv")
+
+    def _advance(self) -> None:
+        """Report videos whose predictions have been fully written as done.
+
+        Only called once litpose is past them: on a progress bar line (which
+        belongs to a later video once the CSV exists) or after a successful exit.
+        """
+        while self.pending:
+            csv_path = self._csv_path(self.pending[0])
+            if not (os.path.exists(csv_path) and os.path.getmtime(csv_path) >= self.since):
+                return
+            video = self.pending.pop(0)
+            total = self.totals.get(video) or count_prediction_frames(csv_path)
+            self.writer.update(self.model_dir, video, total, total)
+
+    def on_line(self, line: str) -> None:
+        """Update progress from one line of litpose output."""
+        if not self.writer.path:
+            return
+        match = _TQDM_COUNTER.search(line)
+        if match:
+            self._advance()
+        if match and self.pending:
+            n, of = int(match.group(1)), int(match.group(2))
+            total = self.totals.get(self.pending[0])
+            if total and of > 0:
+                done = min(total, round(total * n / of))
+                self.writer.update(self.model_dir, self.pending[0], done, total)
+
+    def finish(self) -> None:
+        """Report every video written by the time litpose exited."""
+        if self.writer.path:
+            self._advance()
+
 
 def main() -> None:
-    """Run litpose predict, halving the batch size and retrying on CUDA OOM until success."""
+    """Run litpose predict at the profiled batch size, stepping down on CUDA OOM until success."""
     # Use parse_known_args to separate wrapper-specific args from litpose args
     parser = argparse.ArgumentParser(description="Wrapper for litpose predict to handle CUDA OOM.")
     parser.add_argument("--fake", action="store_true", help="Use fake_predict.py instead of litpose")
     parser.add_argument("--initial_batch_size", type=int, help="Initial batch size")
+    parser.add_argument(
+        "--profile", default=str(DEFAULT_PROFILE_PATH), help="Batch size profile JSON file"
+    )
 
     # The rest of the arguments will be passed to litpose predict
     args, litpose_args = parser.parse_known_args()
 
     fake = args.fake
 
-    # Identify model_dir to determine the correct override flag and cache key
+    # Identify model_dir to determine the correct override flag and profile key
     model_dir_path = None
     for arg in litpose_args:
         if not arg.startswith("-"):
             model_dir_path = arg
             break
 
-    override_flag = "dali.base.predict.sequence_length"
-    backbone = "unknown"
-    is_context = False
-
-    if model_dir_path:
-        config_path = os.path.join(model_dir_path, "config.yaml")
-        if os.path.exists(config_path):
-            try:
-                import yaml
-                with open(config_path) as f:
-                    config = yaml.safe_load(f)
-
-                # Check for backbone
-                backbone = config.get("model", {}).get("backbone", "unknown")
-
-                # Check for context model
-                model_type = config.get("model", {}).get("model_type", "")
-                if isinstance(model_type, str) and model_type.endswith("_mhcrnn"):
-                    is_context = True
-                    override_flag = "dali.context.predict.sequence_length"
-                    print(f"--- Detected context model, using {override_flag} ---")
-                else:
-                    print(f"--- Using standard flag {override_flag} ---")
-            except ImportError:
-                print("Warning: 'yaml' module not found. Defaulting to dali.base.predict.sequence_length.")
-            except Exception as e:
-                print(f"Warning: Could not read config.yaml at {config_path}: {e}")
-
-    cache_key = f"{backbone}_context_{is_context}"
-
-    # Starting batch size
+    backbone, model_type, image_size = read_model_config(model_dir_path)
+    override_flag = sequence_length_flag(model_type)
+    if model_type.endswith("_mhcrnn"):
+        print(f"--- Detected context model, using {override_flag} ---")
+    else:
+        print(f"--- Using standard flag {override_flag} ---")
+
+    gpu_name, free_mib = ("fake", 0) if fake else gpu_info()
+    key = profile_key(backbone, model_type, image_size, gpu_name, free_mib)
+    profile = BatchSizeProfile(args.profile)
+
     if args.initial_batch_size is not None:
         batch_size = args.initial_batch_size
     else:
-        cache = load_cache()
-        if cache_key in cache:
-            batch_size = cache[cache_key]
-            print(f"--- Using cached batch size {batch_size} for {cache_key} ---")
-        else:
-            batch_size = 96
+        batch_size = profile.next_batch_size(key)
+        max_ok, min_oom = profile.bounds(key)
+        print(
+            f"--- Using batch size {batch_size} for {key} "
+            f"(known good: {max_ok}, known OOM: {min_oom}) ---"
+        )
 
-    while batch_size >= 1:
+    # Allow for coarse mtime resolution when telling freshly written predictions apart.
+    started = time.time() - 2
+    all_args = list(litpose_args)
+    progress = LitposeProgress(
+        model_dir_path or "", _video_args(litpose_args, model_dir_path), started
+    )
+    while True:
         # Construct the command
         if fake:
             fake_path = os.path.join(os.path.dirname(__file__), "fake_predict.py")
@@ -105,7 +243,7 @@ def main() -> None:
         cmd.append(f"--overrides={override_flag}={batch_size}")
 
         print(f"--- Running prediction with batch size {batch_size} ---")
-        print(f"Command: {' '.join(cmd)}")
+        print(f"Command: {' '.join(cmd)}", flush=True)
 
         # Execute and capture output
         process = subprocess.Popen(
@@ -116,37 +254,48 @@ def main() -> None:
             bufsize=1,
         )
 
-        output_log = []
         oom_detected = False
-
         for line in iter(process.stdout.readline, ''):
             print(line, end="", flush=True)
-            output_log.append(line)
+            progress.on_line(line)
             if "CUDA out of memory" in line:
+                # Bound the attempt: the rest of the run is wasted, and torch can
+                # take a long time to unwind (or keep going on other videos).
                 oom_detected = True
+                process.kill()
+                break
 
         process.wait()
         ret_code = process.returncode
 
-        if ret_code == 0:
+        if ret_code == 0 and not oom_detected:
             print(f"--- Success with batch size {batch_size} ---")
-            save_to_cache(cache_key, batch_size)
+            profile.record_ok(key, batch_size)
+            progress.finish()
+            _report_predicted_frames(all_args, model_dir_path, started)
             sys.exit(0)
 
-        if oom_detected:
-            print(f"\n!!! Detected CUDA out of memory with batch size {batch_size} !!!")
-            batch_size //= 2
-            if batch_size < 1:
-                print("Error: Batch size reduced to 0, still failing.")
-                sys.exit(ret_code)
-            print(f"--- Retrying with batch size {batch_size} ---\n")
-            continue
-        else:
+        if not oom_detected:
             print(f"--- Command failed with return code {ret_code} (not an OOM error) ---")
             sys.exit(ret_code)
 
-    print("Error: Could not complete prediction even with minimum batch size.")
-    sys.exit(1)
+        print(f"\n!!! Detected CUDA out of memory with batch size {batch_size} !!!")
+        profile.record_oom(key, batch_size)
+        if batch_size <= 1:
+            print("Error: Could not complete prediction even with minimum batch size.")
+            sys.exit(ret_code or 1)
+        batch_size = smaller_batch_size(profile, key, batch_size)
+        if model_dir_path:
+            remaining = drop_predicted_videos(litpose_args, model_dir_path, started)
+            if len(remaining) < len(litpose_args):
+                print(f"--- Skipping {len(litpose_args) - len(remaining)} already predicted videos ---")
+                litpose_args = remaining
+            if not _video_args(litpose_args, model_dir_path):
+                print("--- All videos were predicted before the OOM ---")
+                progress.finish()
+                _report_predicted_frames(all_args, model_dir_path, started)
+                sys.exit(0)
+        print(f"--- Retrying with batch size {batch_size} ---\n")
 
 if __name__ == "__main__":
     main()
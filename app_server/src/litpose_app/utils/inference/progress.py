@@ -0,0 +1,72 @@
+"""Machine-readable progress channel from prediction subprocesses to the server.
+
+The server points the environment variable LP_PROGRESS_FILE of every step
+subprocess at a file next to its stdout. Writers append one JSON object per line:
+
+    {"model": "/models/m1", "video": "/data/s1_camA.mp4", "done": 1200, "total": 3600}
+
+Each line is the absolute state of one video of one model, not an increment, so
+duplicates (the wrapper and the fake predictor may both report a video) and
+re-reads after a server restart are harmless. ``total`` is null when the frame
+count isn't known. A file rather than a pipe keeps the channel readable by a
+server that reattached to the process after a restart, like stdout.
+
+This module only uses the standard library (and cv2 if available), because the
+writers run in lightning-pose's environment.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+
+ENV_VAR = "LP_PROGRESS_FILE"
+
+
+def video_frame_count(video_path: str) -> int | None:
+    """Return the number of frames in a video according to its container, or None."""
+    try:
+        import cv2
+    except ImportError:
+        return None
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+    return n if n > 0 else None
+
+
+class ProgressWriter:
+    """Appends per-video progress to the channel named by LP_PROGRESS_FILE, if any.
+
+    Updates of a video are throttled to one per `min_interval` seconds, except
+    the one that completes it.
+    """
+
+    def __init__(self, path: str | None = None, min_interval: float = 0.5) -> None:
+        """Write to path, defaulting to $LP_PROGRESS_FILE; without either, do nothing."""
+        self.path = path or os.environ.get(ENV_VAR)
+        self.min_interval = min_interval
+        self._last: dict[tuple[str, str], tuple[float, int]] = {}
+
+    def update(self, model: str, video: str, done: int, total: int | None) -> None:
+        """Report that done of total frames of video have been predicted by model."""
+        if not self.path:
+            return
+        key = (str(model), str(video))
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None:
+            last_time, last_done = last
+            if done == last_done or (now - last_time < self.min_interval and done != total):
+                return
+        self._last[key] = (now, done)
+        line = json.dumps({"model": key[0], "video": key[1], "done": done, "total": total})
+        try:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+        except OSError:
+            # Progress is best effort; never fail a prediction over it.
+            self.path = None
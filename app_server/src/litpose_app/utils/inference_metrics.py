@@ -0,0 +1,239 @@
+"""Throughput metrics of inference subprocesses, aggregated per task.
+
+Every prediction or smoothing subprocess yields one `ProcessMetrics` record:
+wall time, measured by the server, peak RSS and GPU memory of its process tree,
+sampled while it runs, and counters the subprocess reports itself by printing
+lines of the form::
+
+    LP_METRICS {"frames": 1800, "model_load_seconds": 11.2}
+
+Reported counters are additive, so a model worker can report frames after each
+session. `TaskMetrics` aggregates the records of one task into the summary
+shown in the task status, and rewrites ``<metrics_dir>/<task_id>.json`` after
+each record so the numbers survive the task (and the server) for capacity
+planning and comparisons across lightning-pose versions.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "LP_METRICS "
+_ADDITIVE_FIELDS = ("frames", "model_load_seconds")
+
+
+@dataclass
+class ProcessMetrics:
+    """Measurements of one step subprocess (which may run several steps)."""
+
+    steps: list[int]
+    kind: str | None = None
+    model: str | None = None
+    sessions: list[str] = field(default_factory=list)
+    wall_seconds: float | None = None
+    frames: int | None = None
+    model_load_seconds: float | None = None
+    peak_rss_mb: float | None = None
+    peak_gpu_mb: float | None = None
+
+    @property
+    def fps(self) -> float | None:
+        """Frames per second of prediction time (wall time minus model load, if known)."""
+        if not self.frames or not self.wall_seconds:
+            return None
+        seconds = self.wall_seconds - (self.model_load_seconds or 0)
+        return self.frames / seconds if seconds > 0 else None
+
+    def add_reported(self, line: str) -> bool:
+        """Add the counters of an LP_METRICS line. Returns False if line isn't one."""
+        if not line.startswith(METRICS_PREFIX):
+            return False
+        try:
+            payload = json.loads(line[len(METRICS_PREFIX):])
+        except ValueError:
+            return True
+        for name in _ADDITIVE_FIELDS:
+            value = payload.get(name)
+            if isinstance(value, (int, float)):
+                setattr(self, name, (getattr(self, name) or 0) + value)
+        return True
+
+    def to_dict(self) -> dict:
+        """Return a JSON-serializable dict, including fps."""
+        return {**asdict(self), "fps": self.fps}
+
+
+class ProcessSampler:
+    """Tracks peak RSS and GPU memory of a process and its children.
+
+    RSS is cheap and sampled every `rss_interval`; GPU memory needs nvidia-smi,
+    so it is sampled every `gpu_interval` and not at all once nvidia-smi fails.
+    """
+
+    _gpu_available: bool | None = None
+
+    def __init__(self, pid: int, rss_interval: float = 0.5, gpu_interval: float = 2.0) -> None:
+        """Sample the process tree rooted at pid."""
+        self.pid = pid
+        self.rss_interval = rss_interval
+        self.gpu_interval = gpu_interval
+        self.peak_rss_mb: float | None = None
+        self.peak_gpu_mb: float | None = None
+        self._next_rss = 0.0
+        self._next_gpu = 0.0
+
+    def _tree(self) -> list[psutil.Process]:
+        """Return the root process and all its descendants still alive."""
+        try:
+            root = psutil.Process(self.pid)
+            return [root, *root.children(recursive=True)]
+        except psutil.Error:
+            return []
+
+    def sample(self) -> None:
+        """Update the peaks if their sampling interval has elapsed."""
+        now = time.monotonic()
+        if now < self._next_rss:
+            return
+        self._next_rss = now + self.rss_interval
+        procs = self._tree()
+        if not procs:
+            return
+        rss = 0
+        for proc in procs:
+            try:
+                rss += proc.memory_info().rss
+            except psutil.Error:
+                pass
+        self.peak_rss_mb = max(self.peak_rss_mb or 0.0, rss / 2**20)
+        if now >= self._next_gpu and ProcessSampler._gpu_available is not False:
+            self._next_gpu = now + self.gpu_interval
+            gpu_mb = _gpu_memory_mb({p.pid for p in procs})
+            if gpu_mb is not None:
+                self.peak_gpu_mb = max(self.peak_gpu_mb or 0.0, gpu_mb)
+
+
+def _gpu_memory_mb(pids: set[int]) -> float | None:
+    """Return the GPU memory used by pids according to nvidia-smi, or None if unavailable."""
+    try:
+        out = subprocess.run(
+            [
+                "nvidia-smi",
+                "--query-compute-apps=pid,used_memory",
+                "--format=csv,noheader,nounits",
+            ],
+            capture_output=True,
+            text=True,
+            timeout=5,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        ProcessSampler._gpu_available = False
+        return None
+    ProcessSampler._gpu_available = True
+    total = 0.0
+    for line in out.splitlines():
+        try:
+            pid, used = (part.strip() for part in line.split(","))
+            if int(pid) in pids:
+                total += float(used)
+        except ValueError:
+            continue
+    return total
+
+
+class TaskMetrics:
+    """Thread-safe collection of the ProcessMetrics of one inference task."""
+
+    def __init__(self, task_id: str, path: Path | None = None) -> None:
+        """Collect metrics for task_id, persisting them to path (if given) on every change.
+
+        Records already in path (a task resumed after a restart) are kept.
+        """
+        self.task_id = task_id
+        self.path = path
+        self._lock = threading.Lock()
+        self._processes: list[ProcessMetrics] = []
+        if path is not None:
+            self._processes = _load_processes(path)
+
+    def add(self, metrics: ProcessMetrics) -> dict:
+        """Record one finished process and return the updated summary."""
+        with self._lock:
+            self._processes.append(metrics)
+            summary = self._summary_nolock()
+            if self.path is not None:
+                # Written under the lock so concurrent records can't land out of order.
+                self._write(
+                    {
+                        "taskId": self.task_id,
+                        "summary": summary,
+                        "processes": [m.to_dict() for m in self._processes],
+                    }
+                )
+        return summary
+
+    def summary(self) -> dict:
+        """Return the aggregate metrics of all processes recorded so far."""
+        with self._lock:
+            return self._summary_nolock()
+
+    def _summary_nolock(self) -> dict:
+        """Aggregate the recorded processes. Caller must hold _lock."""
+        predict = [m for m in self._processes if m.kind != "eks"]
+        frames = sum(m.frames or 0 for m in predict)
+        load = sum(m.model_load_seconds or 0 for m in predict)
+        predict_seconds = sum(m.wall_seconds or 0 for m in predict) - load
+        return {
+            "processes": len(self._processes),
+            "frames": frames,
+            "predictSeconds": round(predict_seconds, 3),
+            "modelLoadSeconds": round(load, 3),
+            "fps": round(frames / predict_seconds, 2) if frames and predict_seconds > 0 else None,
+            "eksSeconds": round(
+                sum(m.wall_seconds or 0 for m in self._processes if m.kind == "eks"), 3
+            ),
+            "peakRssMb": _max_or_none(m.peak_rss_mb for m in self._processes),
+            "peakGpuMb": _max_or_none(m.peak_gpu_mb for m in self._processes),
+        }
+
+    def _write(self, document: dict) -> None:
+        """Atomically replace the task's metrics file."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.task_id}")
+            with os.fdopen(fd, "w") as f:
+                json.dump(document, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError:
+            logger.exception("Failed to write inference metrics to %s", self.path)
+
+
+def _load_processes(path: Path) -> list[ProcessMetrics]:
+    """Read the process records of a metrics file, or none if it is missing or corrupt."""
+    try:
+        document = json.loads(path.read_text())
+        return [
+            ProcessMetrics(**{k: v for k, v in p.items() if k != "fps"})
+            for p in document.get("processes", [])
+        ]
+    except (OSError, ValueError, TypeError, AttributeError):
+        return []
+
+
+def _max_or_none(values) -> float | None:
+    """Return the max of the non-None values, rounded, or None if there are none."""
+    present = [v for v in values if v is not None]
+    return round(max(present), 1) if present else None
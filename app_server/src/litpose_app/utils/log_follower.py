@@ -0,0 +1,390 @@
+"""Shared followers of growing log files, for SSE endpoints.
+
+Tailing a log per SSE connection meant reopening, seeking and reading every file
+every 200 ms for every open stream, even when nothing was written, and a line
+caught half-written was split in two. A `LogFollower` keeps one reader per file
+however many clients follow it: a single background thread reads what was
+appended, buffers an incomplete last line until its newline arrives, keeps the
+recent lines in memory and wakes the subscribers through a `ChangeNotifier`.
+Each subscriber keeps its own line offset, so slow clients don't hold others up.
+
+Only the last ``max_lines`` lines of a file are kept, so a client that joins
+late (or falls that far behind) gets those, preceded by a line saying how many
+were left out, instead of the whole log. Lines are split like
+``str.splitlines`` (so progress bars redrawn with ``\r`` give one line per
+redraw), and empty lines are dropped.
+
+Files are read outside the lock that guards the kept lines, so subscribers
+reading them never wait for file I/O; the event loop only touches memory, and
+loading a file for a new subscriber happens on a worker thread.
+
+Changes are detected with inotify on the files' directories where available
+(Linux). Elsewhere, or for files whose directory can't be watched, files are
+polled with stat. Even with inotify, every file is stat-checked every few
+seconds, since some file systems (e.g. NFS) don't report changes made by other
+machines.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import anyio
+
+from .notifier import ChangeNotifier, Subscription
+
+logger = logging.getLogger(__name__)
+
+# Directory events after which a file in it may have changed.
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_Q_OVERFLOW = 0x4000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes binding of Linux inotify: watch directories, read events."""
+
+    def __init__(self, libc: ctypes.CDLL, fd: int) -> None:
+        """Wrap an inotify instance created by `create`."""
+        self._libc = libc
+        self.fd = fd
+
+    @classmethod
+    def create(cls) -> _Inotify | None:
+        """Return a non-blocking inotify instance, or None where inotify is unavailable."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            logger.warning("inotify unavailable (errno %s); polling log files", ctypes.get_errno())
+            return None
+        return cls(libc, fd)
+
+    def add_watch(self, directory: Path) -> int | None:
+        """Watch a directory; return the watch descriptor, or None if it can't be watched."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), _WATCH_MASK)
+        return wd if wd >= 0 else None
+
+    def rm_watch(self, wd: int) -> None:
+        """Stop watching a directory."""
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> list[tuple[int, int, str]]:
+        """Return the pending (watch descriptor, mask, file name) events."""
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos + _EVENT_HEADER.size <= len(buf):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, pos)
+            pos += _EVENT_HEADER.size
+            name = buf[pos : pos + length].rstrip(b"\0")
+            pos += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+
+@dataclass
+class _FollowedFile:
+    """Reader state of one followed file, shared by all its subscribers.
+
+    io_lock serializes reading the file and guards read_lines, signature,
+    offset and partial; the follower's lock guards refs, wd, base and lines.
+    """
+
+    path: Path
+    # Whether the file is read as lines; watched-only files just signal changes.
+    read_lines: bool
+    io_lock: threading.Lock = field(default_factory=threading.Lock)
+    refs: int = 0
+    wd: int | None = None
+    # (inode, size, mtime) at the last check, None if the file didn't exist.
+    signature: tuple[int, int, int] | None = None
+    offset: int = 0
+    partial: bytes = b""
+    # Absolute line number of lines[0]; earlier lines were dropped from memory.
+    base: int = 0
+    lines: list[str] = field(default_factory=list)
+
+
+def _split_lines(data: bytes) -> list[str]:
+    """Decode complete lines of a log, dropping empty ones."""
+    return [ln for ln in data.decode("utf-8", errors="replace").splitlines() if ln]
+
+
+class LogSubscription:
+    """One client's view of the files it follows: its own line offsets and wake-up flag."""
+
+    def __init__(self, follower: LogFollower, sub: Subscription, paths: Iterable[Path]) -> None:
+        """Start every followed file at the oldest line still in memory."""
+        self._follower = follower
+        self._sub = sub
+        self._offsets = {path: 0 for path in paths}
+
+    async def wait(self, timeout: float | None = None) -> bool:
+        """Wait until a followed or watched file changes (or timeout). True if it did."""
+        return await self._sub.wait(timeout)
+
+    def read_lines(self, path: Path, final: bool = False) -> list[str]:
+        """Return the lines of path appended since the last call.
+
+        If some of those lines are no longer in memory, a line saying how many
+        were left out comes first. Without final this only reads memory, so it can
+        run on the event loop. With final, the file is read up to its current end
+        first and an incomplete last line is returned too; use it (off the event
+        loop) once the writer is done.
+        """
+        lines, self._offsets[path] = self._follower._lines_since(
+            path, self._offsets[path], final
+        )
+        return lines
+
+
+class LogFollower:
+    """Follows files for any number of subscribers, with one reader per file."""
+
+    def __init__(
+        self,
+        poll_interval_seconds: float = 0.2,
+        recheck_interval_seconds: float = 2.0,
+        max_lines: int = 10_000,
+        use_inotify: bool = True,
+    ) -> None:
+        """Keep up to max_lines recent lines per file for subscribers that join late."""
+        self.poll_interval_seconds = poll_interval_seconds
+        self.recheck_interval_seconds = recheck_interval_seconds
+        self.max_lines = max_lines
+        self._inotify = _Inotify.create() if use_inotify else None
+        self._notifier = ChangeNotifier()
+        self._lock = threading.Lock()
+        self._files: dict[Path, _FollowedFile] = {}
+        # Watched directory -> (watch descriptor, number of followed files in it).
+        self._dirs: dict[Path, tuple[int, int]] = {}
+        self._thread: threading.Thread | None = None
+
+    # -----------------------------
+    # Subscribers
+    # -----------------------------
+
+    @contextlib.asynccontextmanager
+    async def follow(
+        self, *paths: Path, watch: Iterable[Path] = ()
+    ) -> AsyncIterator[LogSubscription]:
+        """Follow the lines of paths, and changes of the watch files, for the block.
+
+        Must run on an event loop; files not followed yet are loaded on a worker
+        thread. The first `read_lines` of a file returns the recent lines already
+        written.
+        """
+        watch = tuple(watch)
+        keys = [str(p) for p in (*paths, *watch)]
+        acquired: list[Path] = []
+
+        def acquire_all() -> None:
+            """Take a reference to every file, loading the new ones."""
+            for path, read_lines in [*((p, True) for p in paths), *((p, False) for p in watch)]:
+                self._acquire(path, read_lines)
+                acquired.append(path)
+
+        try:
+            # Files are loaded before subscribing, so the initial load doesn't wake the
+            # new subscriber; whatever the reader adds after that does.
+            await anyio.to_thread.run_sync(acquire_all)
+            with self._notifier.subscribe(*keys) as sub:
+                yield LogSubscription(self, sub, paths)
+        finally:
+            for path in acquired:
+                self._release(path)
+
+    def _acquire(self, path: Path, read_lines: bool) -> None:
+        """Add a reference to a followed file, loading it and starting the watcher if needed.
+
+        Reads the file, so it must not run on the event loop.
+        """
+        with self._lock:
+            f = self._files.get(path)
+            if f is None:
+                f = self._files[path] = _FollowedFile(path, read_lines)
+                f.wd = self._watch_dir(path.parent)
+            f.refs += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="log-follower", daemon=True
+                )
+                self._thread.start()
+        if read_lines:
+            with f.io_lock:
+                if not f.read_lines:
+                    # Only watched so far: read it from the start.
+                    f.read_lines, f.signature = True, None
+        self._refresh(f)
+
+    def _release(self, path: Path) -> None:
+        """Drop a reference to a followed file, forgetting it with the last one."""
+        with self._lock:
+            f = self._files[path]
+            f.refs -= 1
+            if f.refs == 0:
+                del self._files[path]
+                self._unwatch_dir(path.parent)
+
+    def _lines_since(self, path: Path, offset: int, final: bool) -> tuple[list[str], int]:
+        """Return the lines of path from absolute line offset, and the offset after them."""
+        with self._lock:
+            f = self._files[path]
+        if final:
+            self._refresh(f)
+            with f.io_lock:
+                last, f.partial = _split_lines(f.partial), b""
+                with self._lock:
+                    self._append(f, last)
+        with self._lock:
+            start = max(offset, f.base)
+            lines = f.lines[start - f.base :]
+            end = f.base + len(f.lines)
+        if start > offset:
+            lines = [f"[... {start - offset} earlier lines not shown ...]", *lines]
+        return lines, end
+
+    def follower_count(self, path: Path) -> int:
+        """Return how many subscriptions currently follow path."""
+        with self._lock:
+            f = self._files.get(path)
+            return f.refs if f else 0
+
+    # -----------------------------
+    # Reader
+    # -----------------------------
+
+    def _watch_dir(self, directory: Path) -> int | None:
+        """Watch a directory with inotify, sharing one watch per directory."""
+        if self._inotify is None:
+            return None
+        if directory in self._dirs:
+            wd, count = self._dirs[directory]
+            self._dirs[directory] = (wd, count + 1)
+            return wd
+        wd = self._inotify.add_watch(directory)
+        if wd is not None:
+            self._dirs[directory] = (wd, 1)
+        return wd
+
+    def _unwatch_dir(self, directory: Path) -> None:
+        """Release a directory watch taken by `_watch_dir`."""
+        if directory not in self._dirs:
+            return
+        wd, count = self._dirs[directory]
+        if count > 1:
+            self._dirs[directory] = (wd, count - 1)
+            return
+        del self._dirs[directory]
+        self._inotify.rm_watch(wd)
+
+    def _append(self, f: _FollowedFile, lines: list[str]) -> None:
+        """Add lines to a file's memory, dropping the oldest beyond max_lines. Needs _lock."""
+        f.lines.extend(lines)
+        excess = len(f.lines) - self.max_lines
+        if excess > 0:
+            del f.lines[:excess]
+            f.base += excess
+
+    def _refresh(self, f: _FollowedFile) -> None:
+        """Read what changed in a file since the last check and wake its subscribers.
+
+        The file is read holding only its io_lock, not the follower's lock.
+        """
+        with f.io_lock:
+            try:
+                st = f.path.stat()
+                signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                signature = None
+            if signature == f.signature:
+                return
+            replaced = f.signature is not None and (
+                signature is None or signature[0] != f.signature[0] or signature[1] < f.offset
+            )
+            f.signature = signature
+            if f.read_lines and signature is not None:
+                if replaced:
+                    # Truncated or replaced: read the new content from the start.
+                    f.offset, f.partial = 0, b""
+                try:
+                    with open(f.path, "rb") as fh:
+                        fh.seek(f.offset)
+                        data = fh.read()
+                except OSError:
+                    logger.exception("Failed to read followed file %s", f.path)
+                    data = b""
+                f.offset += len(data)
+                # Lines are taken up to the last newline; the rest may still be written.
+                complete, _, f.partial = (f.partial + data).rpartition(b"\n")
+                lines = _split_lines(complete)
+                with self._lock:
+                    self._append(f, lines)
+        self._notifier.publish(str(f.path))
+
+    def _run(self) -> None:
+        """Watcher thread: refresh files as they change, until none is followed."""
+        last_full_check = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._files:
+                    self._thread = None
+                    return
+                polled = self._inotify is None or any(
+                    f.wd is None for f in self._files.values()
+                )
+            timeout = self.poll_interval_seconds if polled else self.recheck_interval_seconds
+            events: list[tuple[int, int, str]] = []
+            if self._inotify is not None:
+                ready, _, _ = select.select([self._inotify.fd], [], [], timeout)
+                if ready:
+                    events = self._inotify.read_events()
+            else:
+                time.sleep(timeout)
+
+            now = time.monotonic()
+            full_check = polled or now - last_full_check >= self.recheck_interval_seconds
+            if full_check:
+                last_full_check = now
+            overflow = any(mask & _IN_Q_OVERFLOW for _, mask, _ in events)
+            changed = {(wd, name) for wd, _, name in events}
+            with self._lock:
+                files = list(self._files.values())
+            for f in files:
+                if full_check or overflow or (f.wd, f.path.name) in changed:
+                    self._refresh(f)
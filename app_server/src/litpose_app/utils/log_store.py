@@ -0,0 +1,230 @@
+"""Bounded per-task log storage: an in-memory ring buffer that spills to compressed disk blocks.
+
+Each task's log is an append-only sequence of lines addressed by absolute offset
+(0 = first line ever logged). Only the most recent `ring_size` lines are kept in
+memory; older lines are compressed in blocks of `spill_block_lines` and appended
+to ``<spill_dir>/<task_id>.log.z``. An in-memory block index (first offset, byte
+position, byte length) makes any offset readable with a single seek + decompress,
+so SSE subscribers can replay from 0 or resume from where they left off.
+
+Finished tasks are evicted, together with their spill files, once they are older
+than `finished_ttl_seconds` or once more than `max_finished_tasks` finished tasks
+are retained (least recently read first).
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _SpillBlock:
+    """Location of one compressed block of lines in a task's spill file."""
+
+    first_offset: int
+    n_lines: int
+    byte_pos: int
+    byte_len: int
+
+
+@dataclass
+class _TaskLog:
+    """In-memory state of one task's log."""
+
+    # Absolute offset of ring[0]; equals the number of lines spilled to disk.
+    base: int = 0
+    ring: list[str] = field(default_factory=list)
+    blocks: list[_SpillBlock] = field(default_factory=list)
+    spill_bytes: int = 0
+    finished_at: float | None = None
+    last_access: float = field(default_factory=time.monotonic)
+
+    @property
+    def count(self) -> int:
+        """Total number of lines ever appended."""
+        return self.base + len(self.ring)
+
+
+class TaskLogStore:
+    """Thread-safe, memory-bounded log lines per task with offset-based random access."""
+
+    def __init__(
+        self,
+        spill_dir: Path,
+        ring_size: int = 2000,
+        spill_block_lines: int = 1000,
+        max_finished_tasks: int = 20,
+        finished_ttl_seconds: float = 24 * 3600,
+    ) -> None:
+        """Configure the store. Nothing is written to spill_dir until a log overflows."""
+        assert 0 < spill_block_lines <= ring_size
+        self.spill_dir = spill_dir
+        self.ring_size = ring_size
+        self.spill_block_lines = spill_block_lines
+        self.max_finished_tasks = max_finished_tasks
+        self.finished_ttl_seconds = finished_ttl_seconds
+        self._lock = threading.RLock()
+        self._logs: dict[str, _TaskLog] = {}
+
+    def spill_path(self, task_id: str) -> Path:
+        """Return the spill file path for task_id."""
+        return self.spill_dir / f"{task_id}.log.z"
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+
+    def append(self, task_id: str, line: str) -> None:
+        """Append one line to task_id's log, spilling the oldest block if the ring is full."""
+        with self._lock:
+            log = self._logs.setdefault(task_id, _TaskLog())
+            log.ring.append(line)
+            if len(log.ring) > self.ring_size:
+                self._spill_nolock(task_id, log)
+
+    def _spill_nolock(self, task_id: str, log: _TaskLog) -> None:
+        """Compress the oldest block of ring lines and append it to the spill file."""
+        lines = log.ring[: self.spill_block_lines]
+        data = zlib.compress(json.dumps(lines).encode("utf-8"))
+        # The first spill replaces any file an earlier process left for the same task
+        # (a resumed task): the block index describing it died with that process.
+        mode = "ab" if log.blocks else "wb"
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path(task_id), mode) as f:
+                f.write(data)
+        except OSError:
+            # Keep the process healthy if the disk is unavailable: drop the lines.
+            logger.exception("Failed to spill logs for task %s; dropping oldest lines", task_id)
+            data = b""
+        log.blocks.append(
+            _SpillBlock(
+                first_offset=log.base,
+                n_lines=len(lines),
+                byte_pos=log.spill_bytes,
+                byte_len=len(data),
+            )
+        )
+        log.spill_bytes += len(data)
+        log.base += len(lines)
+        del log.ring[: len(lines)]
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+
+    def count(self, task_id: str) -> int:
+        """Return the number of lines logged for task_id (the next line's offset)."""
+        with self._lock:
+            log = self._logs.get(task_id)
+            return log.count if log is not None else 0
+
+    def get(self, task_id: str, from_offset: int = 0, limit: int | None = None) -> list[str]:
+        """Return up to limit lines of task_id's log starting at absolute from_offset."""
+        with self._lock:
+            log = self._logs.get(task_id)
+            if log is None:
+                return []
+            log.last_access = time.monotonic()
+            end = log.count if limit is None else min(log.count, from_offset + limit)
+            if from_offset >= end:
+                return []
+
+            out: list[str] = []
+            if from_offset < log.base:
+                out.extend(self._read_spilled_nolock(task_id, log, from_offset, min(end, log.base)))
+            if end > log.base:
+                ring_start = max(from_offset, log.base) - log.base
+                out.extend(log.ring[ring_start : end - log.base])
+            return out
+
+    def _read_spilled_nolock(self, task_id: str, log: _TaskLog, start: int, end: int) -> list[str]:
+        """Read lines [start, end) from the spill file, decompressing only the blocks needed."""
+        firsts = [b.first_offset for b in log.blocks]
+        i = bisect.bisect_right(firsts, start) - 1
+        out: list[str] = []
+        try:
+            with open(self.spill_path(task_id), "rb") as f:
+                while i < len(log.blocks) and log.blocks[i].first_offset < end:
+                    block = log.blocks[i]
+                    if block.byte_len == 0:
+                        lines = [""] * block.n_lines  # dropped on a failed spill
+                    else:
+                        f.seek(block.byte_pos)
+                        lines = json.loads(zlib.decompress(f.read(block.byte_len)))
+                    lo = max(start, block.first_offset) - block.first_offset
+                    hi = min(end, block.first_offset + block.n_lines) - block.first_offset
+                    out.extend(lines[lo:hi])
+                    i += 1
+        except (OSError, zlib.error, ValueError):
+            logger.exception("Failed to read spilled logs for task %s", task_id)
+        return out
+
+    # -----------------------------
+    # Lifecycle / eviction
+    # -----------------------------
+
+    def mark_finished(self, task_id: str) -> list[str]:
+        """Record that task_id reached a terminal state, then evict. Returns evicted task IDs."""
+        with self._lock:
+            log = self._logs.setdefault(task_id, _TaskLog())
+            if log.finished_at is None:
+                log.finished_at = log.last_access = time.monotonic()
+        return self.evict()
+
+    def evict(self) -> list[str]:
+        """Drop finished tasks past their TTL or beyond the retention count (LRU first)."""
+        now = time.monotonic()
+        with self._lock:
+            finished = [
+                (tid, log) for tid, log in self._logs.items() if log.finished_at is not None
+            ]
+            evicted = {
+                tid for tid, log in finished if now - log.finished_at > self.finished_ttl_seconds
+            }
+            remaining = sorted(
+                ((tid, log) for tid, log in finished if tid not in evicted),
+                key=lambda item: item[1].last_access,
+            )
+            overflow = len(remaining) - self.max_finished_tasks
+            if overflow > 0:
+                evicted.update(tid for tid, _ in remaining[:overflow])
+            for tid in evicted:
+                self._discard_nolock(tid)
+        return sorted(evicted)
+
+    def remove_stale_spill_files(self) -> None:
+        """Delete spill files left by earlier processes that are older than the TTL."""
+        cutoff = time.time() - self.finished_ttl_seconds
+        try:
+            for path in self.spill_dir.glob("*.log.z"):
+                try:
+                    if path.stat().st_mtime < cutoff:
+                        path.unlink(missing_ok=True)
+                except OSError:
+                    continue
+        except OSError:
+            logger.exception("Failed to clean up spilled logs in %s", self.spill_dir)
+
+    def discard(self, task_id: str) -> None:
+        """Forget task_id's log and delete its spill file."""
+        with self._lock:
+            self._discard_nolock(task_id)
+
+    def _discard_nolock(self, task_id: str) -> None:
+        """Forget task_id's log and delete its spill file. Caller must hold the lock."""
+        log = self._logs.pop(task_id, None)
+        if log is not None and log.blocks:
+            try:
+                self.spill_path(task_id).unlink(missing_ok=True)
+            except OSError:
+                logger.exception("Failed to delete spilled logs for task %s", task_id)
@@ -0,0 +1,361 @@
+"""Background inventory of what a model directory holds on disk.
+
+Model directories grow to many GB of checkpoints, prediction CSVs and logs, and
+walking one on request (often on networked storage) is too slow for the request
+path. `ModelInventoryService` scans models on its own thread pool and answers
+with the last completed scan, queueing a rescan once it is older than
+``max_age_seconds``.
+
+Rescans are incremental. A directory is listed again only when its mtime
+changed, i.e. when entries were added, removed or renamed in it. A file is
+stat'ed again unless it had been untouched for ``settle_seconds`` when last
+stat'ed: checkpoints and predictions are written once, and logs stop growing
+when training ends. Settled files that are rewritten in place are noticed by a
+full restat every ``full_restat_seconds``, or at once after `invalidate`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal
+
+from .checkpoints import inference_checkpoint, training_runs
+
+logger = logging.getLogger(__name__)
+
+# Directories holding prediction outputs; only these are pruned by age.
+PREDICTION_DIRS = ("video_preds", "video_preds_eks", "image_preds")
+
+Category = Literal["checkpoint", "prediction", "log", "other"]
+
+
+def classify(relative_path: str) -> Category:
+    """Return the artifact category of a file, by its posix path relative to the model dir."""
+    parts = relative_path.split("/")
+    name = parts[-1]
+    if name.endswith(".ckpt"):
+        return "checkpoint"
+    if parts[0] in PREDICTION_DIRS or (
+        len(parts) == 1 and name.startswith("predictions") and name.endswith(".csv")
+    ):
+        return "prediction"
+    if (
+        name.endswith(".log")
+        or ".tfevents." in name
+        or name == "metrics.csv"
+        or parts[0] == "tb_logs"
+    ):
+        return "log"
+    return "other"
+
+
+@dataclass
+class ArtifactTotals:
+    """Number and total size of the files of one category."""
+
+    files: int = 0
+    bytes: int = 0
+
+
+@dataclass
+class CheckpointFile:
+    """One checkpoint; best marks the one inference uses, which pruning keeps."""
+
+    path: str
+    bytes: int
+    mtime: float
+    best: bool = False
+
+
+@dataclass
+class ModelInventory:
+    """What a model directory held at the time of a scan."""
+
+    checkpoints: list[CheckpointFile] = field(default_factory=list)
+    predictions: ArtifactTotals = field(default_factory=ArtifactTotals)
+    logs: ArtifactTotals = field(default_factory=ArtifactTotals)
+    other: ArtifactTotals = field(default_factory=ArtifactTotals)
+    total_bytes: int = 0
+    # Wall-clock time the scan finished.
+    scanned_at: float = 0.0
+
+
+@dataclass
+class PruneResult:
+    """Files removed (or, in a dry run, that would be removed) from a model dir."""
+
+    files: list[str] = field(default_factory=list)
+    bytes: int = 0
+
+
+def mark_best_checkpoint(model_dir: Path, checkpoints: list[CheckpointFile]) -> None:
+    """Mark the checkpoint inference uses (see utils/checkpoints.py) as best.
+
+    None is marked if the model has several training runs: inference still loads
+    the first run's checkpoint, but the newer runs' may be the ones worth keeping.
+    """
+    if len(training_runs(model_dir)) > 1:
+        return
+    best = inference_checkpoint(model_dir)
+    if best is None:
+        return
+    rel = best.relative_to(model_dir).as_posix()
+    for c in checkpoints:
+        c.best = c.path == rel
+
+
+@dataclass
+class _FileStat:
+    """Size and mtime of a file, and when they were read."""
+
+    size: int
+    mtime: float
+    stated_at: float
+
+
+@dataclass
+class _DirNode:
+    """Cached listing of one directory of a model, valid while its mtime is unchanged."""
+
+    mtime_ns: int
+    subdirs: list[str]
+    files: dict[str, _FileStat]
+
+
+@dataclass
+class _ModelState:
+    """Scan state of one model dir."""
+
+    nodes: dict[str, _DirNode] = field(default_factory=dict)
+    inventory: ModelInventory | None = None
+    scanned_at_monotonic: float = 0.0
+    full_restat_at: float = 0.0
+    future: Future | None = None
+    # Set by invalidate: the next scan restats every file.
+    force_restat: bool = False
+
+
+class ModelInventoryService:
+    """Thread-safe, incrementally refreshed inventories of model directories."""
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_age_seconds: float = 30.0,
+        settle_seconds: float = 60.0,
+        full_restat_seconds: float = 600.0,
+    ) -> None:
+        """Scan with up to max_workers threads, created on first use."""
+        self.max_workers = max_workers
+        self.max_age_seconds = max_age_seconds
+        self.settle_seconds = settle_seconds
+        self.full_restat_seconds = full_restat_seconds
+        self._lock = threading.Lock()
+        self._states: dict[Path, _ModelState] = {}
+        self._executor: ThreadPoolExecutor | None = None
+
+    def inventory(
+        self, model_dir: Path, refresh: bool = False
+    ) -> tuple[ModelInventory | None, Future | None]:
+        """Return the last inventory of model_dir and the future of a pending scan, if any.
+
+        A scan is queued if there is no inventory yet, it is older than max_age_seconds
+        or refresh is set. The inventory is None until the first scan completes.
+        """
+        with self._lock:
+            state = self._states.setdefault(model_dir, _ModelState())
+            stale = (
+                state.inventory is None
+                or refresh
+                or time.monotonic() - state.scanned_at_monotonic >= self.max_age_seconds
+            )
+            if stale and state.future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="model-inventory"
+                    )
+                state.future = self._executor.submit(self._scan, model_dir, state)
+            return state.inventory, state.future
+
+    def invalidate(self, model_dir: Path) -> None:
+        """Make the next scan of model_dir restat every file (e.g. after rewriting some)."""
+        with self._lock:
+            state = self._states.get(model_dir)
+            if state is not None:
+                state.force_restat = True
+                state.scanned_at_monotonic = 0.0
+
+    def forget(self, model_dir: Path) -> None:
+        """Drop everything known about model_dir (deleted or renamed)."""
+        with self._lock:
+            self._states.pop(model_dir, None)
+
+    # -----------------------------
+    # Scanning
+    # -----------------------------
+
+    def _scan(self, model_dir: Path, state: _ModelState) -> ModelInventory | None:
+        """Worker: walk model_dir, reusing what is unchanged, and store the inventory."""
+        try:
+            with self._lock:
+                full = state.force_restat or (
+                    time.monotonic() - state.full_restat_at >= self.full_restat_seconds
+                )
+                state.force_restat = False
+                old_nodes = state.nodes
+            nodes: dict[str, _DirNode] = {}
+            inventory = ModelInventory()
+            self._walk(model_dir, "", old_nodes, nodes, inventory, full)
+            mark_best_checkpoint(model_dir, inventory.checkpoints)
+            inventory.checkpoints.sort(key=lambda c: c.path)
+            inventory.scanned_at = time.time()
+            with self._lock:
+                state.nodes = nodes
+                state.inventory = inventory
+                state.scanned_at_monotonic = time.monotonic()
+                if full:
+                    state.full_restat_at = state.scanned_at_monotonic
+            return inventory
+        except Exception:
+            logger.exception("Failed to scan model directory %s", model_dir)
+            return None
+        finally:
+            with self._lock:
+                state.future = None
+
+    def _walk(
+        self,
+        model_dir: Path,
+        rel: str,
+        old_nodes: dict[str, _DirNode],
+        nodes: dict[str, _DirNode],
+        inventory: ModelInventory,
+        full: bool,
+    ) -> None:
+        """Add the files under model_dir/rel to inventory, recording their nodes."""
+        directory = model_dir / rel if rel else model_dir
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return
+        old = old_nodes.get(rel)
+        if old is not None and old.mtime_ns == mtime_ns:
+            subdirs, names = old.subdirs, list(old.files)
+        else:
+            subdirs, names = [], []
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        # Symlinks aren't followed, so linked data isn't counted twice.
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                        elif entry.is_file(follow_symlinks=False):
+                            names.append(entry.name)
+            except OSError:
+                return
+
+        now = time.time()
+        files: dict[str, _FileStat] = {}
+        for name in names:
+            previous = old.files.get(name) if old is not None else None
+            if (
+                previous is not None
+                and not full
+                and previous.stated_at - previous.mtime >= self.settle_seconds
+            ):
+                stat = previous
+            else:
+                try:
+                    st = os.stat(directory / name, follow_symlinks=False)
+                except OSError:
+                    continue
+                stat = _FileStat(st.st_size, st.st_mtime, now)
+            files[name] = stat
+            self._add_file(inventory, f"{rel}/{name}" if rel else name, stat)
+        nodes[rel] = _DirNode(mtime_ns, subdirs, files)
+
+        for sub in subdirs:
+            self._walk(
+                model_dir, f"{rel}/{sub}" if rel else sub, old_nodes, nodes, inventory, full
+            )
+
+    @staticmethod
+    def _add_file(inventory: ModelInventory, rel: str, stat: _FileStat) -> None:
+        """Count one file in its category."""
+        inventory.total_bytes += stat.size
+        category = classify(rel)
+        if category == "checkpoint":
+            inventory.checkpoints.append(CheckpointFile(rel, stat.size, stat.mtime))
+            return
+        totals = {
+            "prediction": inventory.predictions,
+            "log": inventory.logs,
+            "other": inventory.other,
+        }[category]
+        totals.files += 1
+        totals.bytes += stat.size
+
+    # -----------------------------
+    # Cleanup
+    # -----------------------------
+
+    def prune_checkpoints(self, model_dir: Path, dry_run: bool = False) -> PruneResult:
+        """Remove all checkpoints of model_dir but the one inference uses.
+
+        Nothing is removed if none is marked best (no checkpoint inference would
+        find, or several training runs): then which one matters is unknown.
+        """
+        checkpoints = []
+        for path in model_dir.rglob("*.ckpt"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            rel = path.relative_to(model_dir).as_posix()
+            checkpoints.append(CheckpointFile(rel, st.st_size, st.st_mtime))
+        mark_best_checkpoint(model_dir, checkpoints)
+        if not any(c.best for c in checkpoints):
+            logger.warning("Not pruning checkpoints of %s: none is marked best", model_dir)
+            return PruneResult()
+        return self._remove(
+            model_dir, [(c.path, c.bytes) for c in checkpoints if not c.best], dry_run
+        )
+
+    def prune_predictions(
+        self, model_dir: Path, older_than: float, dry_run: bool = False
+    ) -> PruneResult:
+        """Remove prediction outputs of model_dir last modified before the given time."""
+        old_files = []
+        for dirname in PREDICTION_DIRS:
+            for path in (model_dir / dirname).rglob("*"):
+                try:
+                    st = path.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if path.is_file() and st.st_mtime < older_than:
+                    old_files.append((path.relative_to(model_dir).as_posix(), st.st_size))
+        return self._remove(model_dir, sorted(old_files), dry_run)
+
+    def _remove(
+        self, model_dir: Path, files: list[tuple[str, int]], dry_run: bool
+    ) -> PruneResult:
+        """Delete files (relative to model_dir) and refresh the inventory afterwards."""
+        result = PruneResult()
+        for rel, size in files:
+            if not dry_run:
+                try:
+                    (model_dir / rel).unlink()
+                except FileNotFoundError:
+                    continue
+                logger.info("Pruned %s (%d bytes)", model_dir / rel, size)
+            result.files.append(rel)
+            result.bytes += size
+        if result.files and not dry_run:
+            self.invalidate(model_dir)
+        return result
@@ -0,0 +1,156 @@
+"""Precomputed (session, frame) → row index over the per-view CSVs of a multiview label file.
+
+Label CSV rows are keyed by image path, e.g. ``labeled-data/session01_camA/img001.png``.
+Matching those strings against a session regex row-by-row, and intersecting pandas
+Index objects across views, is slow for label files with tens of thousands of rows.
+`MVLabelIndex` parses every index once into integer codes so that session filtering
+and cross-view synchronization become vectorized numpy operations.
+
+`load_mv_label_index` caches the index of a label file against the stat signatures
+of its CSVs, so it is only rebuilt after one of them is saved.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .fix_empty_first_row import fix_empty_first_row
+from .stat_cache import StatCache
+
+LABELED_DATA_PREFIX = "labeled-data/"
+
+
+@dataclass
+class MVLabelIndex:
+    """Maps each synchronized (session, frame) key to its row number in every view's CSV.
+
+    A key is the image path with the view name removed, so the same frame
+    captured by different cameras shares one key.
+    """
+
+    views: list[str]
+
+    session_dirs: np.ndarray
+    """(S,) unique session directories (view removed), e.g. ``session01_``."""
+
+    key_session: np.ndarray
+    """(K,) index into `session_dirs` for each key, -1 if not under labeled-data/."""
+
+    rows: np.ndarray
+    """(C, K) row number of each key in each view's dataframe, -1 if absent."""
+
+    coords: list[np.ndarray]
+    """Per view, the (R, 2 * n_keypoints) x/y coordinate array of the dataframe."""
+
+    @classmethod
+    def from_dfs(cls, dfs_by_view: dict[str, pd.DataFrame]) -> MVLabelIndex:
+        """Build the index from label dataframes (3-level column header, image path index)."""
+        views = list(dfs_by_view.keys())
+        normalized = [
+            pd.Index(dfs_by_view[v].index.astype(str)).str.replace(v, "", regex=False)
+            for v in views
+        ]
+
+        # One shared vocabulary of keys across views.
+        key_codes, keys = pd.factorize(np.concatenate([n.to_numpy() for n in normalized]))
+        n_keys = len(keys)
+        rows = np.full((len(views), n_keys), -1, dtype=np.int64)
+        start = 0
+        for c, n in enumerate(normalized):
+            codes = key_codes[start : start + len(n)]
+            # Later duplicates win, matching a dict built over the rows in order.
+            rows[c, codes] = np.arange(len(n))
+            start += len(n)
+
+        # Session directory of each key: the path component after labeled-data/.
+        keys_s = pd.Series(keys, dtype=object)
+        under_labeled = keys_s.str.startswith(LABELED_DATA_PREFIX).to_numpy(dtype=bool)
+        parts = keys_s.str.slice(len(LABELED_DATA_PREFIX)).str.split("/", n=1)
+        has_dir = parts.str.len().to_numpy() == 2
+        dirs = np.where(under_labeled & has_dir, parts.str[0].to_numpy(dtype=object), None)
+        dir_codes, session_dirs = pd.factorize(pd.Series(dirs, dtype=object))
+
+        coords = []
+        for v in views:
+            df = dfs_by_view[v]
+            coords_cols = df.columns.get_level_values(2).isin(["x", "y"])
+            coords.append(df.loc[:, coords_cols].to_numpy(dtype=np.float64))
+
+        return cls(
+            views=views,
+            session_dirs=np.asarray(session_dirs, dtype=object),
+            key_session=dir_codes.astype(np.int64),
+            rows=rows,
+            coords=coords,
+        )
+
+    def for_views(self, views: list[str]) -> MVLabelIndex:
+        """Return the index of the given views only, in that order."""
+        missing = [v for v in views if v not in self.views]
+        if missing:
+            raise KeyError(f"No CSV found for view(s) {', '.join(missing)}")
+        positions = [self.views.index(v) for v in views]
+        return replace(
+            self,
+            views=list(views),
+            rows=self.rows[positions],
+            coords=[self.coords[c] for c in positions],
+        )
+
+    def session_mask(self, session_keys: list[str]) -> np.ndarray:
+        """(K,) mask of keys belonging to any of session_keys, in every view.
+
+        Session keys have the view stripped out; the view name is also removed
+        from them per view, like the key paths themselves.
+        """
+        dir_lookup = {d: i for i, d in enumerate(self.session_dirs)}
+        mask = np.ones(len(self.key_session), dtype=bool)
+        for view in self.views:
+            codes = [
+                dir_lookup[d]
+                for k in session_keys
+                if (d := f"{k.replace(view, '')}_") in dir_lookup
+            ]
+            mask &= np.isin(self.key_session, codes)
+        return mask
+
+    def synchronized_rows(self, session_keys: list[str]) -> np.ndarray:
+        """(C, N) row numbers of keys in session_keys that are fully labeled in every view."""
+        valid = self.session_mask(session_keys) & (self.rows >= 0).all(axis=0)
+        for c, coords in enumerate(self.coords):
+            row_ok = ~np.isnan(coords).any(axis=1)
+            # rows is -1 where absent; those keys are already excluded by `valid`.
+            valid &= row_ok[np.maximum(self.rows[c], 0)] if len(row_ok) else False
+        return self.rows[:, valid]
+
+    def gather_p2ds(self, rows: np.ndarray) -> np.ndarray:
+        """Return a (C, N * n_keypoints, 2) array of points for the given (C, N) row numbers."""
+        return np.stack(
+            [coords[rows[c]].reshape(-1, 2) for c, coords in enumerate(self.coords)]
+        )
+
+
+_index_cache: StatCache[MVLabelIndex] = StatCache(max_entries=16)
+
+
+def read_label_csv(path: Path) -> pd.DataFrame:
+    """Read a label CSV with its 3-level column header and image path index."""
+    return fix_empty_first_row(pd.read_csv(path, header=[0, 1, 2], index_col=0))
+
+
+def load_mv_label_index(csv_paths_by_view: dict[str, Path]) -> MVLabelIndex:
+    """Return the index of a label file's per-view CSVs, rebuilt only when one changes."""
+    paths = [Path(p) for p in csv_paths_by_view.values()]
+    key = tuple((view, str(p)) for view, p in zip(csv_paths_by_view, paths, strict=True))
+    index, _ = _index_cache.get(
+        key,
+        paths,
+        lambda: MVLabelIndex.from_dfs(
+            {view: read_label_csv(p) for view, p in zip(csv_paths_by_view, paths, strict=True)}
+        ),
+    )
+    return index
@@ -0,0 +1,93 @@
+"""Thread-safe publish/subscribe of change signals, for async SSE endpoints.
+
+Background work (inference threads, subprocess log readers) runs on plain threads,
+while SSE endpoints are async generators on the event loop. `ChangeNotifier` bridges
+the two: producers call `publish(key)` from any thread, and each subscriber awaits
+`Subscription.wait()` on its own loop without occupying a threadpool thread.
+
+Signals carry no payload. Subscribers re-read whatever state they track (e.g. a log
+offset) after waking, so coalesced or missed-while-busy signals are harmless.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import threading
+from collections.abc import Iterator
+
+
+class Subscription:
+    """One subscriber's wake-up flag, bound to the event loop it was created on."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Create an unset subscription on loop."""
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def _signal(self) -> None:
+        """Set the flag from any thread."""
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            # Loop already closed; the subscriber is gone.
+            pass
+
+    async def wait(self, timeout: float | None = None) -> bool:
+        """Wait until signalled (or timeout). Returns True if signalled.
+
+        The flag is cleared on return, so state read after this call is at least as
+        new as the signal that woke us.
+        """
+        try:
+            if timeout is None:
+                await self._event.wait()
+            else:
+                await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._event.clear()
+        return True
+
+
+class ChangeNotifier:
+    """Maps keys (e.g. task IDs) to the subscriptions waiting on them."""
+
+    def __init__(self) -> None:
+        """Create a notifier with no subscribers."""
+        self._lock = threading.Lock()
+        self._subs: dict[str, set[Subscription]] = {}
+
+    def publish(self, key: str) -> None:
+        """Wake every subscriber of key. Safe to call from any thread."""
+        with self._lock:
+            subs = list(self._subs.get(key, ()))
+        for sub in subs:
+            sub._signal()
+
+    @contextlib.contextmanager
+    def subscribe(self, *keys: str) -> Iterator[Subscription]:
+        """Subscribe to keys for the duration of the block. Must run on an event loop.
+
+        A signal on any of the keys wakes the subscription.
+        """
+        sub = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            for key in keys:
+                self._subs.setdefault(key, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            with self._lock:
+                for key in keys:
+                    subs = self._subs.get(key)
+                    if subs is not None:
+                        subs.discard(sub)
+                        if not subs:
+                            del self._subs[key]
+
+    def subscriber_count(self, key: str) -> int:
+        """Return how many subscriptions are currently open for key."""
+        with self._lock:
+            return len(self._subs.get(key, ()))
@@ -0,0 +1,259 @@
+"""Content-addressed cache of prediction outputs, shared by all models and projects.
+
+Predictions in ``video_preds/`` are keyed only by file name, so re-importing a
+video under a new session name, or re-running with ``force``, repeats the GPU
+pass. This cache keys a video's prediction files by
+``sha256(model key, video fingerprint)``, where the model key covers the
+checkpoint inference loads (see ``checkpoints.py``) and config.yaml and thus
+every setting that affects predictions. Other checkpoints are left out, so
+pruning them keeps the cached predictions valid.
+
+Layout under ``cache_dir``::
+
+    index.sqlite                  fingerprints + entries (the hash index)
+    objects/ab/abcdef.../@.csv    one directory per entry; '@' stands for the video stem
+
+Fingerprints are computed from the file size and three sampled chunks rather
+than the whole file, because videos and checkpoints are large and often on
+network storage. They are remembered per (path, size, mtime), so a lookup costs
+one stat plus one indexed query, and planning never reads file contents
+(a video not yet fingerprinted shows as a miss until inference runs).
+
+Entries are copied (not hard-linked) into ``video_preds/``: litpose rewrites
+prediction CSVs in place, which would corrupt a linked cache object.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Iterator
+from pathlib import Path
+
+from .checkpoints import inference_checkpoint
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every entry if the key derivation changes.
+_KEY_VERSION = "v1"
+_SAMPLE_BYTES = 4 * 1024 * 1024
+# Files litpose predict writes per video, as suffixes appended to the video stem.
+PREDICTION_SUFFIXES = (
+    ".csv",
+    "_temporal_norm.csv",
+    "_pca_singleview_error.csv",
+    "_pca_multiview_error.csv",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    bytes INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+
+def sample_fingerprint(path: Path, size: int) -> str:
+    """Hash a file's size and its first, middle and last chunks."""
+    h = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - _SAMPLE_BYTES // 2), max(0, size - _SAMPLE_BYTES)}):
+            f.seek(offset)
+            h.update(f.read(_SAMPLE_BYTES))
+    return h.hexdigest()
+
+
+class PredictionCache:
+    """Thread-safe content-addressed store of per-video prediction files."""
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 20 * 1024**3) -> None:
+        """Open (creating if needed) the cache at cache_dir, capped at max_bytes of objects."""
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # model_dir -> (mtime_ns of its completion marker, model key)
+        self._model_keys: dict[Path, tuple[int, str]] = {}
+        (cache_dir / "objects").mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection inside a transaction, serialized across threads."""
+        with self._lock:
+            conn = sqlite3.connect(self.cache_dir / "index.sqlite", timeout=10)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                conn.close()
+
+    # -----------------------------
+    # Keys
+    # -----------------------------
+
+    def fingerprint(self, path: Path, compute: bool = True) -> str | None:
+        """Return the fingerprint of path from the index, computing it only if compute."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT digest FROM fingerprints WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (str(path), st.st_size, st.st_mtime_ns),
+            ).fetchone()
+        if row is not None:
+            return row[0]
+        if not compute:
+            return None
+        digest = sample_fingerprint(path, st.st_size)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fingerprints (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                (str(path), st.st_size, st.st_mtime_ns, digest),
+            )
+        return digest
+
+    def model_key(self, model_dir: Path, compute: bool = True) -> str | None:
+        """Return a key covering a model's inference checkpoint and config.yaml, or None.
+
+        Cached in memory until the model's train_status.json changes (e.g. retraining).
+        """
+        try:
+            marker_mtime_ns = os.stat(model_dir / "train_status.json").st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._model_keys.get(model_dir)
+        if cached is not None and cached[0] == marker_mtime_ns:
+            return cached[1]
+        checkpoint = inference_checkpoint(model_dir)
+        if checkpoint is None:
+            return None
+        files = [checkpoint, model_dir / "config.yaml"]
+        h = hashlib.sha256(_KEY_VERSION.encode())
+        for path in files:
+            digest = self.fingerprint(path, compute)
+            if digest is None:
+                return None
+            h.update(digest.encode())
+        key = h.hexdigest()
+        with self._lock:
+            self._model_keys[model_dir] = (marker_mtime_ns, key)
+        return key
+
+    def entry_key(self, model_dir: Path, video_path: Path, compute: bool = True) -> str | None:
+        """Return the cache key of (model, video), or None if it can't be derived."""
+        model_key = self.model_key(model_dir, compute)
+        if model_key is None:
+            return None
+        video_fp = self.fingerprint(video_path, compute)
+        if video_fp is None:
+            return None
+        return hashlib.sha256(f"{model_key}:{video_fp}".encode()).hexdigest()
+
+    def _object_dir(self, key: str) -> Path:
+        """Return the directory holding the files of one entry."""
+        return self.cache_dir / "objects" / key[:2] / key
+
+    # -----------------------------
+    # Lookup / restore / store
+    # -----------------------------
+
+    def contains(self, model_dir: Path, video_path: Path) -> bool:
+        """Return True if (model, video) is cached, without reading any file contents."""
+        key = self.entry_key(model_dir, video_path, compute=False)
+        return key is not None and self._object_dir(key).is_dir()
+
+    def restore(self, model_dir: Path, video_path: Path) -> bool:
+        """Copy a cached entry into model_dir/video_preds. Returns True on a hit.
+
+        Unlike `contains`, this fingerprints a video not seen before, so a video
+        re-imported under another name is still found.
+        """
+        key = self.entry_key(model_dir, video_path)
+        if key is None:
+            return False
+        obj = self._object_dir(key)
+        try:
+            names = [p.name for p in obj.iterdir()]
+        except OSError:
+            return False
+        preds_dir = model_dir / "video_preds"
+        preds_dir.mkdir(parents=True, exist_ok=True)
+        stem = video_path.stem
+        try:
+            for name in names:
+                shutil.copyfile(obj / name, preds_dir / name.replace("@", stem, 1))
+        except OSError:
+            logger.exception("Failed to restore cached predictions for %s", video_path)
+            return False
+        with self._connect() as conn:
+            conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        return True
+
+    def store(self, model_dir: Path, video_path: Path) -> bool:
+        """Add the prediction files of (model, video) to the cache. Returns True if stored."""
+        key = self.entry_key(model_dir, video_path)
+        if key is None:
+            return False
+        obj = self._object_dir(key)
+        if obj.is_dir():
+            return True
+        preds_dir = model_dir / "video_preds"
+        stem = video_path.stem
+        files = [
+            (preds_dir / f"{stem}{suffix}", f"@{suffix}")
+            for suffix in PREDICTION_SUFFIXES
+            if (preds_dir / f"{stem}{suffix}").is_file()
+        ]
+        if not any(name == "@.csv" for _, name in files):
+            return False
+        tmp = obj.parent / f".tmp-{uuid.uuid4().hex}"
+        try:
+            tmp.mkdir(parents=True)
+            for src, name in files:
+                shutil.copyfile(src, tmp / name)
+            n_bytes = sum(p.stat().st_size for p in tmp.iterdir())
+            os.rename(tmp, obj)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            # Another process may have stored the same entry concurrently.
+            return obj.is_dir()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, bytes, last_used) VALUES (?, ?, ?)",
+                (key, n_bytes, time.time()),
+            )
+        self._evict()
+        return True
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, bytes FROM entries ORDER BY last_used DESC").fetchall()
+            total = 0
+            evicted = []
+            for key, n_bytes in rows:
+                total += n_bytes
+                if total > self.max_bytes:
+                    evicted.append(key)
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in evicted])
+        for key in evicted:
+            shutil.rmtree(self._object_dir(key), ignore_errors=True)
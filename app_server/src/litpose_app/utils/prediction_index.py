@@ -0,0 +1,162 @@
+"""Cached index of model prediction outputs, used to decide which inference steps to skip.
+
+Planning inference asks, for every (model, session, view), whether a prediction
+CSV exists and is newer than what it was computed from. Answered with one
+``exists()`` per file that is tens of thousands of stat calls for a large
+project, on storage that is often networked.
+
+Instead each model's ``video_preds/`` is listed once with ``scandir`` and the
+listing is cached against the directory's mtime, which changes whenever a file
+is added, removed or renamed. Per-file mtimes are stat'ed lazily and cached
+with the listing. The model's completion marker (``train_status.json``, or
+``ensemble.yaml`` for EKS models) is likewise parsed once per change of its
+mtime. A trained model counts as completed when the checkpoint inference loads
+was written, not when COMPLETED was: training predicts the videos given in its
+config (``eval.predict_vids_after_training``) while EVALUATING, in between. An
+EKS model has no checkpoint; it counts from when ensemble.yaml was written.
+
+Files rewritten in place don't change the directory mtime, so writers should
+call `invalidate` (inference does so after each step).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .checkpoints import inference_checkpoint
+
+
+@dataclass
+class _PredsListing:
+    """Cached listing of one video_preds/ directory."""
+
+    dir_mtime_ns: int
+    names: frozenset[str]
+    mtimes: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class ModelMarker:
+    """Whether a model is complete, and when it was completed (checkpoint time)."""
+
+    completed: bool
+    completed_at: float | None
+
+
+@dataclass
+class _CachedMarker:
+    """A ModelMarker with the mtime of the file it was parsed from."""
+
+    path: Path
+    mtime_ns: int
+    marker: ModelMarker
+
+
+class PredictionIndex:
+    """Thread-safe, mtime-validated cache of prediction listings and model markers."""
+
+    def __init__(self) -> None:
+        """Create an empty index; entries are filled on first use."""
+        self._lock = threading.Lock()
+        self._listings: dict[Path, _PredsListing] = {}
+        self._markers: dict[Path, _CachedMarker] = {}
+
+    def invalidate(self, model_dir: Path) -> None:
+        """Forget everything cached about model_dir."""
+        with self._lock:
+            self._listings.pop(model_dir, None)
+            self._markers.pop(model_dir, None)
+
+    # -----------------------------
+    # Predictions
+    # -----------------------------
+
+    def _listing(self, model_dir: Path) -> _PredsListing | None:
+        """Return the (possibly cached) listing of model_dir/video_preds, or None if absent."""
+        preds_dir = model_dir / "video_preds"
+        try:
+            dir_mtime_ns = os.stat(preds_dir).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._listings.pop(model_dir, None)
+            return None
+        with self._lock:
+            cached = self._listings.get(model_dir)
+            if cached is not None and cached.dir_mtime_ns == dir_mtime_ns:
+                return cached
+        try:
+            with os.scandir(preds_dir) as it:
+                names = frozenset(e.name for e in it if e.name.endswith(".csv"))
+        except OSError:
+            return None
+        listing = _PredsListing(dir_mtime_ns=dir_mtime_ns, names=names)
+        with self._lock:
+            self._listings[model_dir] = listing
+        return listing
+
+    def pred_mtime(self, model_dir: Path, filename: str) -> float | None:
+        """Return the mtime of model_dir/video_preds/filename, or None if it doesn't exist."""
+        listing = self._listing(model_dir)
+        if listing is None or filename not in listing.names:
+            return None
+        with self._lock:
+            mtime = listing.mtimes.get(filename)
+        if mtime is None:
+            try:
+                mtime = os.stat(model_dir / "video_preds" / filename).st_mtime
+            except OSError:
+                return None
+            with self._lock:
+                listing.mtimes[filename] = mtime
+        return mtime
+
+    # -----------------------------
+    # Model completion
+    # -----------------------------
+
+    def model_marker(self, model_dir: Path) -> ModelMarker:
+        """Return whether model_dir is a completed model, and when it completed.
+
+        A model with train_status.json is complete when its status is COMPLETED, as
+        of the mtime of its inference checkpoint. EKS models have no
+        train_status.json; they are complete once ensemble.yaml exists, as of its mtime.
+        """
+        for name in ("train_status.json", "ensemble.yaml"):
+            path = model_dir / name
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            with self._lock:
+                cached = self._markers.get(model_dir)
+                if cached is not None and cached.path == path and cached.mtime_ns == st.st_mtime_ns:
+                    return cached.marker
+            if name == "train_status.json":
+                try:
+                    completed = json.loads(path.read_text()).get("status") == "COMPLETED"
+                except Exception:
+                    completed = False
+                completed_at = _checkpoint_mtime(model_dir) if completed else None
+            else:
+                completed = True
+                completed_at = st.st_mtime
+            marker = ModelMarker(completed=completed, completed_at=completed_at)
+            with self._lock:
+                self._markers[model_dir] = _CachedMarker(path, st.st_mtime_ns, marker)
+            return marker
+        return ModelMarker(completed=False, completed_at=None)
+
+
+def _checkpoint_mtime(model_dir: Path) -> float | None:
+    """Return the mtime of the checkpoint inference loads for model_dir, if there is one."""
+    checkpoint = inference_checkpoint(model_dir)
+    if checkpoint is None:
+        return None
+    try:
+        return os.stat(checkpoint).st_mtime
+    except OSError:
+        return None
@@ -0,0 +1,62 @@
+"""Values derived from files, recomputed only when one of the files changes.
+
+A value is cached together with the stat signature (inode, size, mtime) of the
+files it was computed from. Looking it up stats those files and recomputes only
+if a signature differs, so an unchanged value costs a few stats instead of
+reading and parsing the files. A directory's signature changes when entries are
+added, removed or renamed in it, so directory listings can be cached the same way.
+
+The signatures of a lookup are returned along with the value, for callers that
+derive an ETag from them.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Sequence
+from pathlib import Path
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+Signature = tuple[int, int, int] | None
+
+
+def stat_signature(path: Path) -> Signature:
+    """Return the (inode, size, mtime) of path, or None if it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class StatCache(Generic[T]):
+    """LRU cache of values keyed by the stat signatures of the files they depend on."""
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        """Keep up to max_entries values."""
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[tuple[Signature, ...], T]] = OrderedDict()
+
+    def get(
+        self, key: Hashable, paths: Sequence[Path], compute: Callable[[], T]
+    ) -> tuple[T, tuple[Signature, ...]]:
+        """Return the value for key and the signatures of paths, computing it if they changed."""
+        signatures = tuple(stat_signature(p) for p in paths)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == signatures:
+                self._entries.move_to_end(key)
+                return cached[1], signatures
+        # Computed outside the lock; racing computations of one key are harmless.
+        value = compute()
+        with self._lock:
+            self._entries[key] = (signatures, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value, signatures
@@ -0,0 +1,342 @@
+"""Training metrics (epoch, step, losses, validation metrics) read live from a model dir.
+
+Lightning writes the metrics of a run as TensorBoard event files under
+``tb_logs/`` (and as ``metrics.csv`` with its CSVLogger). The UI used to get
+only raw log lines, so plotting a loss curve meant downloading whole logs. A
+`TrainMetrics` reads those files incrementally, remembering the byte offset
+reached in each one, and keeps one downsampled series per metric in memory.
+
+Every point added gets a sequence number, so clients poll for what is new
+with a cursor (`delta(since)`).
+
+A model dir can hold several runs: Lightning logs each launch of the training
+(e.g. one relaunched after it failed) to a new ``version_N`` directory, whose
+steps start at 0 again. Duplicates are detected per run, and the steps of each
+later run are shifted to continue after the runs before it, so every series
+stays ordered by step. Series are capped at `MAX_POINTS` points: when
+one is full, every other point is dropped and only every other new point is
+kept from then on, so a 300-epoch run stays cheap to hold and send.
+
+Event files are decoded here rather than with the tensorboard package, which
+the server doesn't depend on. Only scalar summaries are read: a TFRecord stream
+of ``Event`` protos whose summary values carry ``simple_value`` (or, in newer
+writers, a scalar tensor).
+"""
+
+from __future__ import annotations
+
+import csv
+import logging
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MAX_POINTS = 500
+# How often to look for new metrics files (a new run version, a logger that started late).
+_RESCAN_SECONDS = 5.0
+# Directories of a model dir that never hold metrics and can be large.
+_SKIP_DIRS = {"video_preds", "image_preds", "video_preds_eks", "__pycache__"}
+
+
+@dataclass
+class _Series:
+    """Downsampled points of one metric, each a (seq, step, value) triple."""
+
+    points: list[tuple[int, int, float]] = field(default_factory=list)
+    stride: int = 1
+    seen: int = 0
+    # Last step added per run, to drop duplicates.
+    last_steps: dict[int, int] = field(default_factory=dict)
+
+    def add(self, seq: int, run: int, step: int, offset: int, value: float) -> bool:
+        """Add a point of run unless it's a duplicate or skipped by the stride; True if kept.
+
+        step is the run's own step; the point is stored at step + offset.
+        """
+        if step <= self.last_steps.get(run, -1):
+            # Logged by both loggers, or re-read after a file was rewritten.
+            return False
+        self.last_steps[run] = step
+        self.seen += 1
+        if (self.seen - 1) % self.stride:
+            return False
+        self.points.append((seq, step + offset, value))
+        if len(self.points) > MAX_POINTS:
+            self.points = self.points[::2]
+            self.stride *= 2
+        return True
+
+
+@dataclass
+class _FileState:
+    """How far a metrics file has been read."""
+
+    # Run the file belongs to: N of its version_N directory (0 if there is none).
+    run: int = 0
+    offset: int = 0
+    # CSV files: the header line, to notice the logger rewriting the file with new columns.
+    header: bytes = b""
+    columns: list[str] = field(default_factory=list)
+
+
+# -----------------------------
+# TensorBoard event files
+# -----------------------------
+
+def _varint(buf: bytes, pos: int) -> tuple[int, int]:
+    """Decode a protobuf varint at pos; return (value, new pos)."""
+    result = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf: bytes) -> Iterator[tuple[int, int, int | bytes]]:
+    """Yield (field number, wire type, value) of a protobuf message.
+
+    Varints are ints; length-delimited and fixed-size values are raw bytes.
+    """
+    pos = 0
+    while pos < len(buf):
+        key, pos = _varint(buf, pos)
+        number, wire = key >> 3, key & 7
+        if wire == 0:
+            value, pos = _varint(buf, pos)
+        elif wire == 1:
+            value, pos = buf[pos : pos + 8], pos + 8
+        elif wire == 2:
+            length, pos = _varint(buf, pos)
+            value, pos = buf[pos : pos + length], pos + length
+        elif wire == 5:
+            value, pos = buf[pos : pos + 4], pos + 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire}")
+        yield number, wire, value
+
+
+def _tensor_scalar(buf: bytes) -> float | None:
+    """Return the value of a scalar TensorProto (float_val or double_val), or None."""
+    for number, _, value in _fields(buf):
+        if number == 5:  # float_val, packed or not
+            return struct.unpack_from("<f", value)[0]
+        if number == 6:  # double_val
+            return struct.unpack_from("<d", value)[0]
+    return None
+
+
+def _event_scalars(buf: bytes) -> tuple[int, list[tuple[str, float]]]:
+    """Return the step and the (tag, value) scalars of a serialized Event."""
+    step = 0
+    scalars = []
+    for number, _, value in _fields(buf):
+        if number == 2:
+            step = value
+        elif number == 5:  # summary
+            for v_number, _, v in _fields(value):
+                if v_number != 1:
+                    continue
+                tag, scalar = None, None
+                for s_number, _, s in _fields(v):
+                    if s_number == 1:
+                        tag = s.decode("utf-8", errors="replace")
+                    elif s_number == 2:
+                        scalar = struct.unpack("<f", s)[0]
+                    elif s_number == 8:
+                        scalar = _tensor_scalar(s)
+                if tag is not None and scalar is not None:
+                    scalars.append((tag, scalar))
+    return step, scalars
+
+
+def _read_records(path: Path, offset: int) -> tuple[list[bytes], int]:
+    """Read the complete TFRecord records after offset; return (records, new offset)."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    records = []
+    pos = 0
+    # Record: uint64 length, uint32 length CRC, data, uint32 data CRC.
+    while pos + 12 <= len(data):
+        (length,) = struct.unpack_from("<Q", data, pos)
+        end = pos + 12 + length + 4
+        if end > len(data):
+            break  # still being written
+        records.append(data[pos + 12 : pos + 12 + length])
+        pos = end
+    return records, offset + pos
+
+
+# -----------------------------
+# Metrics of one model
+# -----------------------------
+
+def _run_of(path: Path) -> int:
+    """Return N of the version_N directory a metrics file was logged to, or 0."""
+    for parent in path.parents:
+        prefix, _, number = parent.name.partition("_")
+        if prefix == "version" and number.isdigit():
+            return int(number)
+    return 0
+
+
+class TrainMetrics:
+    """Incrementally read metrics of one model dir, as downsampled series."""
+
+    def __init__(self, model_dir: Path) -> None:
+        """Track the metrics files under model_dir."""
+        self.model_dir = model_dir
+        self._lock = threading.Lock()
+        self._files: dict[Path, _FileState] = {}
+        self._series: dict[str, _Series] = {}
+        # Amount added to the steps of each run, so later runs continue the step axis.
+        self._step_offsets: dict[int, int] = {}
+        self._seq = 0
+        self._next_scan = 0.0
+        self.epoch: int | None = None
+        self.step: int | None = None
+
+    def _scan(self) -> None:
+        """Pick up metrics files that appeared since the last scan.
+
+        Files are kept in run order, so earlier runs are read (and get their
+        step offsets) first.
+        """
+        found = False
+        for root, dirs, files in os.walk(self.model_dir):
+            dirs[:] = [d for d in dirs if d not in _SKIP_DIRS]
+            for name in files:
+                path = Path(root) / name
+                if path not in self._files and (
+                    name == "metrics.csv" or name.startswith("events.out.tfevents.")
+                ):
+                    self._files[path] = _FileState(run=_run_of(path))
+                    found = True
+        if found:
+            self._files = dict(
+                sorted(self._files.items(), key=lambda item: (item[1].run, str(item[0])))
+            )
+
+    def _add(self, run: int, name: str, step: int, value: float) -> None:
+        """Record one value logged by run at its own step."""
+        if name == "epoch":
+            self.epoch = int(value)
+            return
+        offset = self._step_offsets.get(run)
+        if offset is None:
+            offset = self._step_offsets[run] = 0 if self.step is None else self.step + 1
+        if self._series.setdefault(name, _Series()).add(self._seq + 1, run, step, offset, value):
+            self._seq += 1
+        if self.step is None or step + offset > self.step:
+            self.step = step + offset
+
+    def _read_events(self, path: Path, state: _FileState) -> None:
+        """Add the scalars of event records written since the last read."""
+        records, state.offset = _read_records(path, state.offset)
+        for record in records:
+            try:
+                step, scalars = _event_scalars(record)
+            except (ValueError, IndexError, struct.error):
+                logger.debug("Skipping undecodable event record in %s", path)
+                continue
+            for tag, value in scalars:
+                self._add(state.run, tag, step, value)
+
+    def _read_csv(self, path: Path, state: _FileState) -> None:
+        """Add the rows of a CSVLogger metrics.csv written since the last read."""
+        with open(path, "rb") as f:
+            header = f.readline()
+            if not header.endswith(b"\n"):
+                return
+            if header != state.header:
+                # New file, or rewritten with more columns: read again from the top.
+                # Points already seen are dropped as duplicates by step.
+                state.header = header
+                state.columns = next(csv.reader([header.decode("utf-8")]))
+                state.offset = len(header)
+            f.seek(state.offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        state.offset += end
+        for row in csv.reader(data[:end].decode("utf-8", errors="replace").splitlines()):
+            values = dict(zip(state.columns, row, strict=False))
+            try:
+                step = int(float(values.get("step") or 0))
+            except ValueError:
+                continue
+            for name, raw in values.items():
+                if name == "step" or raw == "":
+                    continue
+                try:
+                    self._add(state.run, name, step, float(raw))
+                except ValueError:
+                    continue
+
+    def refresh(self) -> None:
+        """Read what was written to the metrics files since the last refresh."""
+        with self._lock:
+            now = time.monotonic()
+            if now >= self._next_scan:
+                self._next_scan = now + _RESCAN_SECONDS
+                self._scan()
+            for path, state in self._files.items():
+                try:
+                    if path.stat().st_size < state.offset:
+                        # Truncated or replaced.
+                        self._files[path] = state = _FileState(run=state.run)
+                    if path.name == "metrics.csv":
+                        self._read_csv(path, state)
+                    else:
+                        self._read_events(path, state)
+                except FileNotFoundError:
+                    continue
+                except OSError:
+                    logger.exception("Failed to read training metrics from %s", path)
+
+    def delta(self, since: int = 0) -> dict:
+        """Return the points added after cursor since, and the cursor to pass next time."""
+        with self._lock:
+            series = {}
+            for name, s in self._series.items():
+                points = [[step, value] for seq, step, value in s.points if seq > since]
+                if points:
+                    series[name] = points
+            return {"cursor": self._seq, "epoch": self.epoch, "step": self.step, "series": series}
+
+
+class TrainMetricsStore:
+    """The TrainMetrics of recently viewed models, least recently used dropped first."""
+
+    def __init__(self, max_models: int = 32) -> None:
+        """Keep the metrics of up to max_models models in memory."""
+        self.max_models = max_models
+        self._lock = threading.Lock()
+        self._models: OrderedDict[Path, TrainMetrics] = OrderedDict()
+
+    def get(self, model_dir: Path) -> TrainMetrics:
+        """Return the metrics of model_dir, refreshed from its files."""
+        with self._lock:
+            metrics = self._models.get(model_dir)
+            if metrics is None:
+                metrics = self._models[model_dir] = TrainMetrics(model_dir)
+                while len(self._models) > self.max_models:
+                    self._models.popitem(last=False)
+            else:
+                self._models.move_to_end(model_dir)
+        metrics.refresh()
+        return metrics
+
+    def forget(self, model_dir: Path) -> None:
+        """Drop the metrics of a model that was deleted or renamed."""
+        with self._lock:
+            self._models.pop(model_dir, None)
@@ -0,0 +1,38 @@
+"""Wake-up channel from the web process to the train scheduler process.
+
+The scheduler process (see ``train_scheduler.py``) sleeps until it has a reason
+to look for work: a training task was created, or the GPU was released by an
+inference task. The server creates a multiprocessing Event at startup, hands it
+to the scheduler process and registers it here; request handlers then call
+`wake_train_scheduler()`. Without a registered event (tests, a scheduler started
+on its own) waking is a no-op and the scheduler's periodic scan picks up the work.
+"""
+
+from __future__ import annotations
+
+from typing import Protocol
+
+
+class WakeEvent(Protocol):
+    """The part of threading.Event / multiprocessing.Event the scheduler uses."""
+
+    def set(self) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def wait(self, timeout: float | None = None) -> bool: ...
+
+
+_wake_event: WakeEvent | None = None
+
+
+def set_wake_event(event: WakeEvent | None) -> None:
+    """Register the event shared with the scheduler process (None to unregister)."""
+    global _wake_event
+    _wake_event = event
+
+
+def wake_train_scheduler() -> None:
+    """Ask the scheduler to scan for PENDING training tasks now."""
+    if _wake_event is not None:
+        _wake_event.set()
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from litpose_app.routes.labeler.bundle_adjust import (
+    get_p2ds,
+    get_p2ds_multisession,
+    subsample_p2ds,
+)
+
+
+def _make_label_df(view: str, rows: dict[str, list[float]]) -> pd.DataFrame:
+    columns = pd.MultiIndex.from_product(
+        [["scorer"], ["nose", "tail"], ["x", "y"]]
+    )
+    index = [f"labeled-data/{session}_{view}/{img}" for session, img in
+             (key.split("/") for key in rows)]
+    return pd.DataFrame(list(rows.values()), index=index, columns=columns, dtype="float64")
+
+
+def _make_dfs_by_view() -> dict[str, pd.DataFrame]:
+    rows_a = {
+        "s1/img0.png": [1, 2, 3, 4],
+        "s1/img1.png": [5, 6, 7, 8],
+        "s2/img0.png": [9, 10, 11, 12],
+        "s3/img0.png": [13, 14, 15, 16],
+    }
+    rows_b = {
+        "s1/img0.png": [21, 22, 23, 24],
+        "s1/img1.png": [np.nan, 26, 27, 28],  # not fully labeled -> dropped
+        "s2/img0.png": [29, 30, 31, 32],
+        "s3/img0.png": [33, 34, 35, 36],
+    }
+    return {"camA": _make_label_df("camA", rows_a), "camB": _make_label_df("camB", rows_b)}
+
+
+def test_get_p2ds_single_session():
+    p2ds = get_p2ds(_make_dfs_by_view(), "s1")
+    # 2 cameras, 1 synchronized frame x 2 keypoints
+    assert p2ds.shape == (2, 2, 2)
+    np.testing.assert_array_equal(p2ds[0], [[1, 2], [3, 4]])
+    np.testing.assert_array_equal(p2ds[1], [[21, 22], [23, 24]])
+
+
+def test_get_p2ds_multisession_pools_sessions():
+    p2ds = get_p2ds_multisession(_make_dfs_by_view(), ["s1", "s2"])
+    assert p2ds.shape == (2, 4, 2)
+    np.testing.assert_array_equal(p2ds[0, :, 0], [1, 3, 9, 11])
+    np.testing.assert_array_equal(p2ds[1, :, 0], [21, 23, 29, 31])
+
+
+def test_subsample_p2ds():
+    p2ds = np.arange(2 * 100 * 2, dtype=float).reshape(2, 100, 2)
+
+    assert subsample_p2ds(p2ds, 1000) is p2ds
+
+    sample = subsample_p2ds(p2ds, 10)
+    assert sample.shape == (2, 10, 2)
+    # Same columns are sampled for every camera, so correspondences are kept.
+    np.testing.assert_array_equal(sample[1] - sample[0], np.full((10, 2), 200.0))
+    # Deterministic for a given seed.
+    np.testing.assert_array_equal(sample, subsample_p2ds(p2ds, 10))
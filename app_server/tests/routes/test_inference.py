@@ -1 +1,658 @@
 from __future__ import annotations
+
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from litpose_app import deps
+from litpose_app.config import Config
+from litpose_app.inference_registry import InferenceTaskRegistry, StepState
+from litpose_app.routes import inference
+from litpose_app.routes.inference import InferenceStatus, InferStep
+from litpose_app.utils.eks_service import EksResult
+from litpose_app.utils.log_store import TaskLogStore
+from litpose_app.utils.prediction_cache import PredictionCache
+
+
+@pytest.fixture(autouse=True)
+def log_store(tmp_path, monkeypatch) -> TaskLogStore:
+    store = TaskLogStore(tmp_path / "inference_logs")
+    monkeypatch.setattr(inference, "_log_store", store)
+    return store
+
+
+@pytest.fixture(autouse=True)
+def registry(tmp_path, monkeypatch) -> InferenceTaskRegistry:
+    reg = InferenceTaskRegistry(tmp_path / "inference_tasks.sqlite")
+    monkeypatch.setattr(inference, "_registry", reg)
+    return reg
+
+
+@pytest.fixture(autouse=True)
+def metrics_dir(tmp_path, monkeypatch) -> Path:
+    monkeypatch.setattr(inference, "_metrics_dir", tmp_path / "inference_metrics")
+    return tmp_path / "inference_metrics"
+
+
+class _FakeEksService:
+    """Smooths synchronously in the calling thread instead of a worker pool."""
+
+    def __init__(self) -> None:
+        self.on_job = None
+        self.jobs = []
+
+    def submit(self, job) -> Future:
+        self.jobs.append(job)
+        if self.on_job is not None:
+            self.on_job(job)
+        future = Future()
+        future.set_result(EksResult(ok=True, output=["EKS complete."], frames=10))
+        return future
+
+
+@pytest.fixture(autouse=True)
+def eks_service(monkeypatch) -> _FakeEksService:
+    service = _FakeEksService()
+    monkeypatch.setattr(inference, "_eks_service", service)
+    return service
+
+
+def _collect_sse(response, max_events: int = 100) -> list[dict]:
+    out = []
+    for raw in response.iter_lines():
+        if raw.startswith("data: "):
+            out.append(json.loads(raw[len("data: "):]))
+        if len(out) >= max_events:
+            break
+    return out
+
+
+def test_stream_pushes_updates_until_terminal(client: TestClient):
+    task_id = str(uuid.uuid4())
+    inference.set_status(task_id, status=InferenceStatus.RUNNING, completed=0, total=2)
+    inference._append_log(task_id, "first")
+
+    def producer() -> None:
+        time.sleep(0.2)
+        inference._append_log(task_id, "second")
+        inference.set_status(task_id, completed=1)
+        time.sleep(0.1)
+        inference._append_log(task_id, "done")
+        inference.set_status(task_id, status=InferenceStatus.COMPLETED, completed=2)
+
+    t = threading.Thread(target=producer)
+    t.start()
+    with client.stream("GET", f"/app/v0/inference/task/{task_id}/stream") as response:
+        assert response.status_code == 200
+        events = _collect_sse(response)
+    t.join()
+
+    # Logs replayed first, then everything pushed as it happened.
+    assert events[0] == {"type": "log", "lines": ["first"]}
+    lines = [ln for e in events if e["type"] == "log" for ln in e["lines"]]
+    statuses = [e for e in events if e["type"] == "status"]
+    assert lines == ["first", "second", "done"]
+    assert statuses[0]["status"] == InferenceStatus.RUNNING
+    assert statuses[-1]["status"] == InferenceStatus.COMPLETED
+    assert statuses[-1]["completed"] == 2
+    assert "logs" not in statuses[-1]
+    assert inference._notifier.subscriber_count(task_id) == 0
+
+
+def test_stream_of_cancelled_task_ends(client: TestClient):
+    task_id = str(uuid.uuid4())
+    inference.set_status(task_id, status=InferenceStatus.WAITING)
+
+    def cancel() -> None:
+        time.sleep(0.2)
+        client.post(f"/app/v0/inference/task/{task_id}/cancel")
+
+    t = threading.Thread(target=cancel)
+    t.start()
+    with client.stream("GET", f"/app/v0/inference/task/{task_id}/stream") as response:
+        events = _collect_sse(response)
+    t.join()
+
+    assert events[-1]["status"] == InferenceStatus.CANCELLED
+
+
+def test_unknown_task_is_not_created_by_reads(client: TestClient):
+    task_id = str(uuid.uuid4())
+    assert client.get(f"/app/v0/inference/task/{task_id}/stream").status_code == 404
+    assert client.get(f"/app/v0/inference/task/{task_id}").status_code == 404
+    assert task_id not in inference._status_by_task
+    assert client.get("/app/v0/inference/task/active").json()["taskId"] != task_id
+
+
+def test_subprocess_output_is_followed_into_logs(tmp_path):
+    task_id = str(uuid.uuid4())
+    script = (
+        "import sys, time\n"
+        "print('loading', flush=True)\n"
+        "sys.stdout.write('10%\\r50%\\r100%\\n'); sys.stdout.flush()\n"
+        "time.sleep(0.3)\n"
+        "print('oops', file=sys.stderr)\n"
+        "sys.stdout.write('no newline')\n"
+    )
+    ret = inference._run_subprocess_with_logging(task_id, [sys.executable, "-c", script], 0)
+
+    assert ret == 0
+    lines = inference._get_logs(task_id)
+    assert [ln for ln in lines if not ln.startswith("[stderr]")] == [
+        "loading", "10%", "50%", "100%", "no newline"
+    ]
+    assert "[stderr] oops" in lines
+
+
+def test_subprocess_metrics_are_collected_and_persisted(tmp_path, metrics_dir, client):
+    task_id = str(uuid.uuid4())
+    steps = [_make_step(tmp_path, "s1"), _make_step(tmp_path, "s2")]
+    script = (
+        "import time\n"
+        "print('LP_METRICS {\"model_load_seconds\": 0.1}', flush=True)\n"
+        "print('LP_METRICS {\"frames\": 300}', flush=True)\n"
+        "time.sleep(0.3)\n"
+        "print('LP_METRICS {\"frames\": 200}', flush=True)\n"
+    )
+    inference._telemetry_by_task[task_id] = inference._TaskTelemetry(
+        inference.TaskMetrics(task_id, inference._metrics_path(task_id)), steps
+    )
+    try:
+        inference._run_subprocess_with_logging(
+            task_id, [sys.executable, "-c", script], 0, shared_by=[0, 1]
+        )
+    finally:
+        inference._telemetry_by_task.pop(task_id)
+
+    # Metrics lines don't clutter the log.
+    assert not any("LP_METRICS" in ln for ln in inference._get_logs(task_id))
+    throughput = inference.get_or_create_status(task_id).throughput
+    assert throughput["frames"] == 500
+    assert throughput["modelLoadSeconds"] == 0.1
+    assert throughput["fps"] > 0
+    assert throughput["peakRssMb"] > 0
+
+    document = client.get(f"/app/v0/inference/task/{task_id}/metrics").json()
+    assert document["summary"] == throughput
+    (process,) = document["processes"]
+    assert process["model"] == "m1"
+    assert process["sessions"] == ["s1", "s2"]
+    assert (metrics_dir / f"{task_id}.json").exists()
+
+
+def test_progress_channel_feeds_frame_progress(tmp_path):
+    task_id = str(uuid.uuid4())
+    steps = [_make_step(tmp_path, "s1"), _make_step(tmp_path, "s2")]
+    script = (
+        "import json, os\n"
+        "path = os.environ['LP_PROGRESS_FILE']\n"
+        "with open(path, 'a') as f:\n"
+        "    for done in (50, 100):\n"
+        "        f.write(json.dumps({'model': 'm1', 'video': 'a.mp4', 'done': done, 'total': 100}) + '\\n')\n"
+        "    f.write(json.dumps({'model': 'm1', 'video': 'b.mp4', 'done': 20, 'total': 300}) + '\\n')\n"
+        "    f.write('not json\\n')\n"
+    )
+    telemetry = inference._TaskTelemetry(inference.TaskMetrics(task_id), steps)
+    telemetry.frames = inference.FrameProgress(n_videos=3)
+    inference._telemetry_by_task[task_id] = telemetry
+    try:
+        inference._run_subprocess_with_logging(task_id, [sys.executable, "-c", script], 0)
+    finally:
+        inference._telemetry_by_task.pop(task_id)
+
+    frames = inference.get_or_create_status(task_id).frameProgress
+    assert frames["framesDone"] == 120
+    assert frames["videosDone"] == 1
+    # The unseen third video is estimated at the mean of the two seen.
+    assert frames["framesTotal"] == 600
+    assert frames["videosTotal"] == 3
+
+
+def _make_step(tmp_path: Path, session: str) -> InferStep:
+    model_dir = tmp_path / "models" / "m1"
+    return InferStep(
+        kind="normal",
+        model_dir=model_dir,
+        session=session,
+        video_paths=[tmp_path / "videos" / f"{session}_camA.mp4"],
+    )
+
+
+def test_recover_resumes_unfinished_steps(tmp_path, registry, monkeypatch):
+    task_id = str(uuid.uuid4())
+    steps = [_make_step(tmp_path, "s1"), _make_step(tmp_path, "s2"), _make_step(tmp_path, "s3")]
+    registry.create_task(
+        task_id, "proj", InferenceStatus.RUNNING, [inference._step_to_spec(s) for s in steps]
+    )
+    registry.step_started(task_id, 0)
+    registry.step_finished(task_id, 0, ok=True)
+    # Step 1 was running in a process that no longer exists.
+    registry.step_started(task_id, 1, pid=2**22 + 12345, pid_create_time=1.0)
+    # Simulate the task being owned by a server process that has exited.
+    with registry._connect() as conn:
+        conn.execute("UPDATE tasks SET owner_pid = ? WHERE task_id = ?", (2**22 + 12345, task_id))
+
+    ran: list[str] = []
+
+    def fake_run(tid, cmd, step_index=None, *, shared_by=None, on_poll=None):
+        ran.extend(Path(a).stem for a in cmd if a.endswith(".mp4"))
+        return 0
+
+    monkeypatch.setattr(inference, "_run_subprocess_with_logging", fake_run)
+    monkeypatch.setattr(inference, "_MODEL_WORKER_MIN_STEPS", 99)
+    inference.recover_inference_tasks()
+    inference._futures_by_task[task_id].result(timeout=30)
+
+    assert ran == ["s2_camA", "s3_camA"]
+    status = inference.get_or_create_status(task_id)
+    assert status.status == InferenceStatus.COMPLETED
+    assert status.completed == 3
+    persisted = registry.get_task(task_id)
+    assert persisted.status == InferenceStatus.COMPLETED
+    assert [s.state for s in persisted.steps] == [StepState.DONE] * 3
+
+
+def test_recover_without_resume_marks_failed(tmp_path, registry):
+    task_id = str(uuid.uuid4())
+    steps = [_make_step(tmp_path, "s1")]
+    registry.create_task(
+        task_id, "proj", InferenceStatus.WAITING, [inference._step_to_spec(s) for s in steps]
+    )
+    with registry._connect() as conn:
+        conn.execute("UPDATE tasks SET owner_pid = NULL WHERE task_id = ?", (task_id,))
+
+    inference.recover_inference_tasks(resume=False)
+
+    assert registry.get_task(task_id).status == InferenceStatus.FAILED
+    assert registry.list_tasks({InferenceStatus.WAITING}) == []
+
+
+def test_recover_removes_unreadable_spill_files(tmp_path, registry, log_store):
+    log_store.spill_dir.mkdir(parents=True)
+    orphan = log_store.spill_path("finished-before-restart")
+    orphan.write_bytes(b"blocks")
+    # Another live server process still owns this task and reads its spill file.
+    registry.create_task("other", "proj", InferenceStatus.COMPLETED, [])
+    with registry._connect() as conn:
+        conn.execute("UPDATE tasks SET owner_pid = ? WHERE task_id = 'other'", (os.getppid(),))
+    in_use = log_store.spill_path("other")
+    in_use.write_bytes(b"blocks")
+
+    inference.recover_inference_tasks()
+
+    assert not orphan.exists()
+    assert in_use.exists()
+
+
+def test_recover_reattaches_to_surviving_step_process(tmp_path, registry, monkeypatch):
+    task_id = str(uuid.uuid4())
+    step = _make_step(tmp_path, "s1")
+    registry.create_task(task_id, "proj", InferenceStatus.RUNNING, [inference._step_to_spec(step)])
+    with registry._connect() as conn:
+        conn.execute("UPDATE tasks SET owner_pid = NULL WHERE task_id = ?", (task_id,))
+
+    # A step subprocess left behind by the previous server, writing its predictions.
+    stdout_path, stderr_path = inference._step_output_paths(task_id, 0)
+    stdout_path.parent.mkdir(parents=True)
+    preds = step.model_dir / "video_preds" / "s1_camA.csv"
+    preds.parent.mkdir(parents=True)
+    script = (
+        "import pathlib, sys, time\n"
+        "print('predicting', flush=True)\n"
+        "time.sleep(0.5)\n"
+        "pathlib.Path(sys.argv[1]).write_text('x')\n"
+    )
+    with open(stdout_path, "wb") as out, open(stderr_path, "wb") as err:
+        proc = subprocess.Popen([sys.executable, "-c", script, str(preds)], stdout=out, stderr=err)
+    registry.step_started(
+        task_id, 0, pid=proc.pid, pid_create_time=inference._pid_create_time(proc.pid)
+    )
+
+    def reap() -> None:
+        proc.wait()  # the test process is the parent, so reap to avoid a zombie
+
+    threading.Thread(target=reap).start()
+    monkeypatch.setattr(
+        inference, "_run_subprocess_with_logging", lambda *a, **k: pytest.fail("step rerun")
+    )
+    inference.recover_inference_tasks()
+    inference._futures_by_task[task_id].result(timeout=30)
+
+    status = inference.get_or_create_status(task_id)
+    assert status.status == InferenceStatus.COMPLETED
+    assert status.error is None
+    assert "predicting" in inference._get_logs(task_id)
+
+
+def test_model_worker_runs_sessions_of_one_model_and_falls_back(
+    tmp_path, registry, override_config, monkeypatch
+):
+    monkeypatch.setattr(deps, "root_config", lambda: override_config)
+    task_id = str(uuid.uuid4())
+    steps = [_make_step(tmp_path, "s1"), _make_step(tmp_path, "s2_fail"), _make_step(tmp_path, "s3")]
+    registry.create_task(
+        task_id, "proj", InferenceStatus.RUNNING, [inference._step_to_spec(s) for s in steps]
+    )
+    fallback: list[list[int]] = []
+
+    def fake_run_batch(tid, steps_, batch, total, progress):
+        fallback.append(batch)
+        for i in batch:
+            progress.finish(i, True)
+        return True
+
+    monkeypatch.setattr(inference, "_FAKE_PREDICT", True)
+    monkeypatch.setattr(inference, "_run_predict_batch", fake_run_batch)
+    assert inference._group_steps(steps, [0, 1, 2]) == [[0, 1, 2]]
+    inference._run_steps(task_id, steps, len(steps))
+
+    # The worker predicted s1, stopped at the failing session, and the rest were retried.
+    assert (steps[0].model_dir / "video_preds" / "s1_camA.csv").is_file()
+    assert fallback == [[1, 2]]
+    assert registry.get_task(task_id).steps[0].state == StepState.DONE
+    logs = inference._get_logs(task_id)
+    assert any("Model loaded" in ln for ln in logs)
+    assert inference.get_or_create_status(task_id).status == InferenceStatus.COMPLETED
+
+
+def _make_mv_step(tmp_path: Path, session: str) -> InferStep:
+    step = _make_step(tmp_path, session)
+    step.video_paths.append(tmp_path / "videos" / f"{session}_camB.mp4")
+    return step
+
+
+def test_batch_steps_caps_videos_per_invocation(tmp_path):
+    steps = [_make_mv_step(tmp_path, f"s{i}") for i in range(5)]
+
+    assert inference._batch_steps(steps, [0, 1, 2, 3, 4], max_videos=4) == [[0, 1], [2, 3], [4]]
+    assert inference._batch_steps(steps, [1, 3], max_videos=1) == [[1], [3]]
+
+
+def test_predict_batch_tracks_sessions_and_rebatches_after_failure(tmp_path, registry, monkeypatch):
+    task_id = str(uuid.uuid4())
+    steps = [_make_step(tmp_path, "s1"), _make_step(tmp_path, "s2_bad"), _make_step(tmp_path, "s3")]
+    registry.create_task(
+        task_id, "proj", InferenceStatus.RUNNING, [inference._step_to_spec(s) for s in steps]
+    )
+    preds_dir = steps[0].model_dir / "video_preds"
+    preds_dir.mkdir(parents=True)
+    calls: list[list[str]] = []
+
+    def fake_run(tid, cmd, step_index=None, *, shared_by=None, on_poll=None):
+        # Like litpose predict: videos in order, aborting at the first bad one.
+        videos = [a for a in cmd[3:] if a.endswith(".mp4")]
+        calls.append([Path(v).stem for v in videos])
+        frames = inference._telemetry_by_task[tid].frames
+        for video in videos:
+            # The CSV of the failing video is left half-written: only the
+            # progress channel says whether a session is done.
+            (preds_dir / f"{Path(video).stem}.csv").write_text("x")
+            if "bad" in video:
+                if on_poll:
+                    on_poll()
+                return 1
+            event = {"model": cmd[2], "video": video, "done": 10, "total": 10}
+            frames.update_from_line(json.dumps(event))
+        if on_poll:
+            on_poll()
+        return 0
+
+    monkeypatch.setattr(inference, "_MODEL_WORKER_MIN_STEPS", 99)
+    monkeypatch.setattr(inference, "_run_subprocess_with_logging", fake_run)
+    inference._run_steps(
+        task_id, steps, len(steps), config=Config(INFERENCE_MAX_VIDEOS_PER_PREDICT=8)
+    )
+
+    assert calls == [["s1_camA", "s2_bad_camA", "s3_camA"], ["s3_camA"]]
+    assert [s.state for s in registry.get_task(task_id).steps] == [
+        StepState.DONE, StepState.FAILED, StepState.DONE
+    ]
+    status = inference.get_or_create_status(task_id)
+    assert status.status == InferenceStatus.COMPLETED
+    assert status.completed == 3
+    assert "s2_bad" in status.error
+
+
+def _make_eks_plan(tmp_path: Path, sessions: list[str]) -> list[InferStep]:
+    members = [tmp_path / "models" / "m1", tmp_path / "models" / "m2"]
+    eks_dir = tmp_path / "models" / "eks"
+    config = {"view_names": ["camA"]}
+    steps = [
+        InferStep(
+            kind="member",
+            model_dir=m,
+            session=sess,
+            video_paths=[tmp_path / "videos" / f"{sess}_camA.mp4"],
+            member_of=eks_dir,
+            ensemble_config=config,
+        )
+        for m in members
+        for sess in sessions
+    ]
+    steps += [
+        InferStep(
+            kind="eks",
+            model_dir=eks_dir,
+            session=sess,
+            video_paths=[tmp_path / "videos" / f"{sess}_camA.mp4"],
+            member_dirs=members,
+            ensemble_config=config,
+        )
+        for sess in sessions
+    ]
+    return steps
+
+
+def test_eks_steps_depend_on_their_members(tmp_path):
+    steps = _make_eks_plan(tmp_path, ["s1", "s2"])
+
+    deps = inference._step_dependencies(steps)
+
+    assert deps[4] == {0, 2} and deps[5] == {1, 3}
+    assert [inference._step_resource(s) for s in steps] == ["gpu"] * 4 + ["cpu"] * 2
+
+
+def test_eks_overlaps_with_prediction_of_later_sessions(
+    tmp_path, registry, monkeypatch, eks_service
+):
+    task_id = str(uuid.uuid4())
+    steps = _make_eks_plan(tmp_path, ["s1", "s2"])
+    registry.create_task(
+        task_id, "proj", InferenceStatus.RUNNING, [inference._step_to_spec(s) for s in steps]
+    )
+    events: list[tuple[str, str, float]] = []
+
+    def fake_run(tid, cmd, step_index=None, *, shared_by=None, on_poll=None, log_prefix=""):
+        name = f"{Path(cmd[2]).name} {steps[step_index].session}"
+        events.append(("start", name, time.monotonic()))
+        time.sleep(0.3)
+        preds = Path(cmd[2]) / "video_preds"
+        preds.mkdir(parents=True, exist_ok=True)
+        for a in cmd[3:]:
+            if a.endswith(".mp4"):
+                (preds / f"{Path(a).stem}.csv").write_text("x")
+        events.append(("end", name, time.monotonic()))
+        return 0
+
+    def fake_smooth(job) -> None:
+        events.append(("start", f"eks {job.session}", time.monotonic()))
+        time.sleep(0.3)
+        events.append(("end", f"eks {job.session}", time.monotonic()))
+
+    eks_service.on_job = fake_smooth
+    monkeypatch.setattr(inference, "_MODEL_WORKER_MIN_STEPS", 99)
+    monkeypatch.setattr(inference, "_run_subprocess_with_logging", fake_run)
+    inference._run_steps(
+        task_id, steps, len(steps), config=Config(INFERENCE_MAX_VIDEOS_PER_PREDICT=1)
+    )
+
+    when = {(kind, name): t for kind, name, t in events}
+    # EKS for s1 runs while m2 is still predicting s2.
+    assert when[("start", "eks s1")] < when[("end", "m2 s2")]
+    assert when[("start", "eks s2")] >= when[("end", "m2 s2")]
+    status = inference.get_or_create_status(task_id)
+    assert status.status == InferenceStatus.COMPLETED
+    assert status.error is None
+    assert [s.state for s in registry.get_task(task_id).steps] == [StepState.DONE] * 6
+
+
+def test_cpu_only_plan_does_not_take_gpu_lock(tmp_path, monkeypatch):
+    task_id = str(uuid.uuid4())
+    steps = _make_eks_plan(tmp_path, ["s1"])[2:]
+    for m in steps[0].member_dirs:
+        (m / "video_preds").mkdir(parents=True)
+        (m / "video_preds" / "s1_camA.csv").write_text("x")
+    monkeypatch.setattr(inference, "_run_subprocess_with_logging", lambda *a, **k: 0)
+
+    def no_gpu_lock():
+        pytest.fail("GPU lock taken for a CPU-only plan")
+
+    inference._run_steps(task_id, steps, len(steps), gpu_lock=no_gpu_lock)
+
+    assert inference.get_or_create_status(task_id).status == InferenceStatus.COMPLETED
+
+
+def test_gpu_steps_run_on_the_leased_device(tmp_path, monkeypatch):
+    from litpose_app.utils.gpu_lock import GpuLease
+
+    task_id = str(uuid.uuid4())
+    steps = [_make_step(tmp_path, "s1")]
+    seen_env = []
+
+    def fake_run(tid, cmd, *args, **kwargs):
+        seen_env.append(inference._device_env_by_task.get(tid))
+        return 0
+
+    monkeypatch.setattr(inference, "_run_subprocess_with_logging", fake_run)
+
+    @contextlib.contextmanager
+    def lease_gpu_3():
+        yield GpuLease("3", "inference", task_id)
+
+    inference._run_steps(task_id, steps, len(steps), gpu_lock=lease_gpu_3)
+
+    assert seen_env == [{"CUDA_VISIBLE_DEVICES": "3"}]
+    assert task_id not in inference._device_env_by_task
+
+
+def test_plan_requeues_predictions_older_than_video_or_checkpoint(tmp_path):
+    from litpose_app.datatypes import Project, ProjectConfig, ProjectPaths
+
+    project = Project(
+        project_key="p",
+        paths=ProjectPaths(data_dir=tmp_path),
+        config=ProjectConfig(view_names=["camA"]),
+    )
+    model_dir = tmp_path / "models" / "m1"
+    (model_dir / "video_preds").mkdir(parents=True)
+    (tmp_path / "videos").mkdir()
+    (model_dir / "config.yaml").write_text("model: {model_name: m}\n")
+    ckpt = model_dir / "tb_logs" / "m" / "version_0" / "checkpoints" / "epoch=9.ckpt"
+    ckpt.parent.mkdir(parents=True)
+    ckpt.write_bytes(b"")
+    os.utime(ckpt, (1000, 1000))
+    status = model_dir / "train_status.json"
+    status.write_text(json.dumps({"status": "COMPLETED"}))
+    os.utime(status, (1000, 1000))
+    for session in ("fresh", "old_video", "missing"):
+        video = tmp_path / "videos" / f"{session}_camA.mp4"
+        video.write_text("v")
+        os.utime(video, (1000, 1000))
+    for session in ("fresh", "old_video"):
+        (model_dir / "video_preds" / f"{session}_camA.csv").write_text("x")
+        os.utime(model_dir / "video_preds" / f"{session}_camA.csv", (2000, 2000))
+    # The video was re-imported after it was predicted.
+    os.utime(tmp_path / "videos" / "old_video_camA.mp4", (3000, 3000))
+
+    plan = inference._build_infer_plan(project, ["m1"], ["all"])
+
+    queued = {s.session: s.stale for s in plan.steps}
+    assert queued == {"old_video": True, "missing": False}
+    assert plan.skipped_count == 1
+
+    # Retraining the model makes every prediction stale.
+    os.utime(ckpt, (4000, 4000))
+    os.utime(status, (4000, 4000))
+    plan = inference._build_infer_plan(project, ["m1"], ["all"])
+    assert {s.session for s in plan.steps} == {"fresh", "old_video", "missing"}
+
+
+def test_plan_skips_predictions_written_after_training_before_completed(tmp_path):
+    from litpose_app.datatypes import Project, ProjectConfig, ProjectPaths
+
+    project = Project(
+        project_key="p",
+        paths=ProjectPaths(data_dir=tmp_path),
+        config=ProjectConfig(view_names=["camA"]),
+    )
+    model_dir = tmp_path / "models" / "m1"
+    (model_dir / "video_preds").mkdir(parents=True)
+    (model_dir / "config.yaml").write_text("model: {model_name: m}\n")
+    ckpt = model_dir / "tb_logs" / "m" / "version_0" / "checkpoints" / "epoch=9.ckpt"
+    ckpt.parent.mkdir(parents=True)
+    ckpt.write_bytes(b"")
+    os.utime(ckpt, (1000, 1000))
+    (tmp_path / "videos").mkdir()
+    (tmp_path / "videos" / "s1_camA.mp4").write_text("v")
+    os.utime(tmp_path / "videos" / "s1_camA.mp4", (500, 500))
+    # predict_vids_after_training writes the CSV while EVALUATING, before COMPLETED.
+    (model_dir / "video_preds" / "s1_camA.csv").write_text("x")
+    os.utime(model_dir / "video_preds" / "s1_camA.csv", (2000, 2000))
+    status = model_dir / "train_status.json"
+    status.write_text(json.dumps({"status": "COMPLETED"}))
+    os.utime(status, (3000, 3000))
+
+    plan = inference._build_infer_plan(project, ["m1"], ["all"])
+
+    assert plan.steps == []
+    assert plan.skipped_count == 1
+
+
+def test_prediction_cache_restores_identical_video_without_predicting(tmp_path, monkeypatch):
+    cache = PredictionCache(tmp_path / "prediction_cache")
+    monkeypatch.setattr(inference, "_prediction_cache", cache)
+    model_dir = tmp_path / "models" / "m1"
+    checkpoints = model_dir / "tb_logs" / "m" / "version_0" / "checkpoints"
+    checkpoints.mkdir(parents=True)
+    (checkpoints / "epoch=9-best.ckpt").write_bytes(b"weights")
+    (model_dir / "config.yaml").write_text("model: {model_name: m}")
+    (model_dir / "train_status.json").write_text('{"status": "COMPLETED"}')
+    (tmp_path / "videos").mkdir()
+    (tmp_path / "videos" / "s1_camA.mp4").write_bytes(b"frames")
+    # The same video, re-imported under another session name.
+    (tmp_path / "videos" / "copy_camA.mp4").write_bytes(b"frames")
+    calls: list[str] = []
+
+    def fake_run(tid, cmd, step_index=None, *, shared_by=None, on_poll=None, log_prefix=""):
+        preds = model_dir / "video_preds"
+        preds.mkdir(exist_ok=True)
+        for a in cmd:
+            if a.endswith(".mp4"):
+                calls.append(Path(a).stem)
+                (preds / f"{Path(a).stem}.csv").write_text("predictions")
+        return 0
+
+    monkeypatch.setattr(inference, "_run_subprocess_with_logging", fake_run)
+    config = Config(INFERENCE_PREDICTION_CACHE=True)
+    inference._run_steps(str(uuid.uuid4()), [_make_step(tmp_path, "s1")], 1, config=config)
+    assert calls == ["s1_camA"]
+
+    step = _make_step(tmp_path, "copy")
+    # Planning doesn't read the unseen video; running the step fingerprints it.
+    assert not cache.contains(step.model_dir, step.video_paths[0])
+    task_id = str(uuid.uuid4())
+    inference._run_steps(task_id, [step], 1, config=config)
+
+    assert calls == ["s1_camA"]
+    assert (model_dir / "video_preds" / "copy_camA.csv").read_text() == "predictions"
+    assert inference.get_or_create_status(task_id).status == InferenceStatus.COMPLETED
@@ -0,0 +1,146 @@
+import json
+import shutil
+import threading
+import time
+
+from litpose_app.routes import models
+
+
+def _write_model(model_dir, name, status="COMPLETED"):
+    d = model_dir / name
+    d.mkdir(parents=True, exist_ok=True)
+    (d / "config.yaml").write_text("model:\n  backbone: resnet50\n")
+    (d / "train_status.json").write_text(json.dumps({"status": status}))
+    return d
+
+
+def test_list_models_is_cached_and_revalidated_with_etag(client, register_project, monkeypatch):
+    model_dir = register_project("proj") / "models"
+    _write_model(model_dir, "m1")
+    _write_model(model_dir / "group", "m2")
+    body = {"projectKey": "proj"}
+
+    resp = client.post("/app/v0/rpc/listModels", json=body)
+    assert resp.status_code == 200
+    paths = [m["model_relative_path"] for m in resp.json()["models"]]
+    assert paths == ["m1", "group/m2"]
+    etag = resp.headers["etag"]
+
+    # Unchanged files are neither re-read nor re-parsed.
+    def fail(*args):
+        raise AssertionError("model re-read")
+
+    monkeypatch.setattr(models, "_read_model_entry", fail)
+    resp = client.post("/app/v0/rpc/listModels", json=body, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert client.post("/app/v0/rpc/listModels", json=body).headers["etag"] == etag
+    monkeypatch.undo()
+
+    # A status change, a new model and a removed model each change the ETag.
+    (model_dir / "m1" / "train_status.json").write_text(json.dumps({"status": "FAILED"}))
+    resp = client.post("/app/v0/rpc/listModels", json=body, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["models"][0]["status"]["status"] == "FAILED"
+    etag = resp.headers["etag"]
+
+    _write_model(model_dir, "m3")
+    resp = client.post("/app/v0/rpc/listModels", json=body, headers={"If-None-Match": etag})
+    assert [m["model_name"] for m in resp.json()["models"]] == ["m1", "m3", "m2"]
+
+
+def test_list_models_delta_and_long_poll(client, register_project):
+    model_dir = register_project("proj") / "models"
+    _write_model(model_dir, "m1")
+    _write_model(model_dir, "m2")
+    body = {"projectKey": "proj"}
+
+    full = client.post("/app/v0/rpc/listModels", json=body).json()
+    assert not full["delta"] and len(full["models"]) == 2
+    cursor = full["cursor"]
+
+    resp = client.post("/app/v0/rpc/listModels", json={**body, "since": cursor}).json()
+    assert resp == {"models": [], "cursor": cursor, "delta": True, "removed": []}
+
+    (model_dir / "m1" / "train_status.json").write_text(json.dumps({"status": "FAILED"}))
+    shutil.rmtree(model_dir / "m2")
+    resp = client.post("/app/v0/rpc/listModels", json={**body, "since": cursor}).json()
+    assert [m["model_name"] for m in resp["models"]] == ["m1"]
+    assert resp["removed"] == ["m2"]
+    cursor = resp["cursor"]
+
+    # A long-poll returns as soon as a model changes.
+    timer = threading.Timer(0.3, _write_model, args=(model_dir, "m3"))
+    timer.start()
+    start = time.monotonic()
+    resp = client.post(
+        "/app/v0/rpc/listModels", json={**body, "since": cursor, "waitSeconds": 10}
+    ).json()
+    timer.join()
+    assert time.monotonic() - start < 5
+    assert [m["model_name"] for m in resp["models"]] == ["m3"]
+
+    # Cursors the server doesn't know get a full listing.
+    resp = client.post("/app/v0/rpc/listModels", json={**body, "since": "old:3"}).json()
+    assert not resp["delta"]
+    assert [m["model_name"] for m in resp["models"]] == ["m1", "m3"]
+
+
+def test_long_polls_share_one_scanner(client, register_project, monkeypatch):
+    model_dir = register_project("proj") / "models"
+    _write_model(model_dir, "m1")
+    _write_model(model_dir, "m2")
+    body = {"projectKey": "proj"}
+    cursor = client.post("/app/v0/rpc/listModels", json=body).json()["cursor"]
+    # No periodic rescans: only this process's own change can end the wait early.
+    monkeypatch.setattr(models, "_LIST_MODELS_POLL_SECONDS", 60.0)
+    scans = []
+    real_scan = models._scan_models
+    monkeypatch.setattr(models, "_scan_models", lambda d: scans.append(d) or real_scan(d))
+
+    delete = {"projectKey": "proj", "modelRelativePath": "m2"}
+    timer = threading.Timer(
+        0.3, client.post, args=("/app/v0/rpc/deleteModel",), kwargs={"json": delete}
+    )
+    timer.start()
+    start = time.monotonic()
+    resp = client.post(
+        "/app/v0/rpc/listModels", json={**body, "since": cursor, "waitSeconds": 10}
+    ).json()
+    timer.join()
+    assert time.monotonic() - start < 5
+    assert resp["removed"] == ["m2"]
+    # One scan when the call came in, one by the scanner after the deletion.
+    assert len(scans) == 2
+
+
+def test_list_models_summary_view_and_get_model_config(client, register_project):
+    model_dir = register_project("proj") / "models"
+    d = _write_model(model_dir, "m1")
+    (d / "config.yaml").write_text(
+        "model:\n  model_type: heatmap_mhcrnn\n  backbone: resnet50\n"
+        "  losses_to_use: [pca_singleview]\ntraining:\n  max_epochs: 300\n"
+        "creation_datetime: '2025-01-01T00:00:00'\n"
+    )
+    body = {"projectKey": "proj", "view": "summary"}
+
+    full = client.post("/app/v0/rpc/listModels", json={"projectKey": "proj"})
+    resp = client.post("/app/v0/rpc/listModels", json=body)
+    assert resp.headers["etag"] != full.headers["etag"]
+    [model] = resp.json()["models"]
+    assert model["config"] is None
+    assert model["summary"] == {
+        "model_type": "heatmap_mhcrnn",
+        "backbone": "resnet50",
+        "losses_to_use": ["pca_singleview"],
+        "max_epochs": 300,
+        "creation_datetime": "2025-01-01T00:00:00",
+        "n_members": None,
+    }
+
+    resp = client.post(
+        "/app/v0/rpc/getModelConfig", json={"projectKey": "proj", "modelRelativePath": "m1"}
+    )
+    assert resp.status_code == 200
+    assert resp.json()["config"]["training"] == {"max_epochs": 300}
+    missing = {"projectKey": "proj", "modelRelativePath": "nope"}
+    assert client.post("/app/v0/rpc/getModelConfig", json=missing).status_code == 404
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from litpose_app.scripts import run_eks
+from litpose_app.utils.eks_service import EksJob, EksService, run_job
+
+
+def _write_preds(path, n_frames):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = "scorer,m,m\nbodyparts,nose,nose\ncoords,x,y\n"
+    path.write_text(header + "".join(f"{i},0,0\n" for i in range(n_frames)))
+    return str(path)
+
+
+def _job(tmp_path, input_files):
+    return EksJob(
+        session="s1",
+        save_dir=tmp_path / "eks" / "video_preds",
+        camera_names=["camA"],
+        input_files=input_files,
+    )
+
+
+def test_job_reports_frames_of_the_smoothed_output(tmp_path, monkeypatch):
+    files = [
+        _write_preds(tmp_path / "m1" / "video_preds" / "s1_camA.csv", 12),
+        _write_preds(tmp_path / "m2" / "video_preds" / "s1_camA.csv", 12),
+    ]
+    read = []
+
+    def fake_fit(input_files, save_dir, camera_names, smooth_param, quantile_keep_pca):
+        # Like eks: the only reader of the member files.
+        read.extend(input_files)
+        (save_dir / "multicam_camA_results.csv").write_text("smoothed")
+        return [pd.read_csv(input_files[0], header=[0, 1, 2], index_col=0)], None, None, None
+
+    monkeypatch.setattr(run_eks, "_fit_eks", fake_fit)
+    result = run_job(_job(tmp_path, files))
+
+    assert result.ok, result.error
+    assert result.frames == 12
+    assert read == files
+    assert (tmp_path / "eks" / "video_preds" / "s1_camA.csv").read_text() == "smoothed"
+
+
+def test_missing_member_file_is_reported(tmp_path):
+    result = run_job(_job(tmp_path, [str(tmp_path / "m1" / "video_preds" / "s1_camA.csv")]))
+
+    assert not result.ok
+    assert result.error.startswith("Missing prediction file")
+
+
+def test_service_runs_jobs_in_worker_processes(tmp_path):
+    files = [
+        _write_preds(tmp_path / "m1" / "video_preds" / "s1_camA.csv", 10),
+        str(tmp_path / "m2" / "video_preds" / "s1_camA.csv"),
+    ]
+    service = EksService(max_workers=1)
+    try:
+        result = service.submit(_job(tmp_path, files)).result(timeout=60)
+    finally:
+        service.shutdown()
+
+    assert not result.ok
+    assert result.error == f"Missing prediction file: {files[1]}"
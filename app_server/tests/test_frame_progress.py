@@ -0,0 +1,41 @@
+import json
+
+from litpose_app.utils.frame_progress import FrameProgress
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _line(video: str, done: int, total: int | None) -> str:
+    return json.dumps({"model": "/m", "video": video, "done": done, "total": total})
+
+
+def test_eta_from_rate_and_estimated_total():
+    clock = _Clock()
+    progress = FrameProgress(n_videos=2, clock=clock)
+    progress.update_from_line(_line("a.mp4", 0, 1000))
+    clock.now += 10
+    progress.update_from_line(_line("a.mp4", 500, 1000))
+
+    snap = progress.snapshot()
+    assert snap["fps"] == 50
+    # b.mp4 hasn't started; assumed as long as a.mp4.
+    assert snap["framesTotal"] == 2000
+    assert snap["etaSeconds"] == 30
+
+
+def test_reports_never_go_backwards_and_publishing_is_throttled():
+    clock = _Clock()
+    progress = FrameProgress(n_videos=1, min_interval=1.0, clock=clock)
+    progress.update_from_line(_line("a.mp4", 40, 100))
+    assert progress.snapshot_if_due() is not None
+    # A retry restarting the video from 0 doesn't lose progress.
+    progress.update_from_line(_line("a.mp4", 0, 100))
+    assert progress.snapshot_if_due() is None
+    assert progress.snapshot_if_due(force=True)["framesDone"] == 40
+    assert progress.snapshot_if_due(force=True) is None
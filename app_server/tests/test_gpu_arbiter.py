@@ -0,0 +1,26 @@
+from litpose_app.utils import gpu_arbiter
+from litpose_app.utils.gpu_arbiter import GpuArbiter
+
+
+def test_waiters_are_served_by_priority_then_fifo(tmp_path):
+    arbiter = GpuArbiter(tmp_path / "queue.sqlite")
+    assert arbiter.join("training", "t1") == 0
+    assert arbiter.join("inference", "i1") == 1
+    assert arbiter.join("inference", "i2", priority=1) == 0
+    # Re-joining heartbeats without losing the place.
+    assert arbiter.join("training", "t1") == 1
+
+    waiters = arbiter.waiters()
+    assert [(w["taskId"], w["position"]) for w in waiters] == [("i2", 0), ("t1", 1), ("i1", 2)]
+
+    arbiter.leave("i2")
+    assert arbiter.join("inference", "i1") == 1
+
+
+def test_stale_waiters_are_dropped(tmp_path, monkeypatch):
+    arbiter = GpuArbiter(tmp_path / "queue.sqlite")
+    arbiter.join("training", "t1")
+
+    monkeypatch.setattr(gpu_arbiter, "STALE_SECONDS", -1.0)
+    assert arbiter.join("inference", "i1") == 0
+    assert [w["taskId"] for w in arbiter.waiters()] == []
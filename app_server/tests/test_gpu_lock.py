@@ -0,0 +1,82 @@
+import portalocker
+import pytest
+
+from litpose_app.utils import gpu_lock
+
+
+@pytest.fixture(autouse=True)
+def slots(tmp_path, monkeypatch):
+    monkeypatch.setattr(gpu_lock, "GPU_LOCK_DIR", tmp_path)
+    monkeypatch.setenv(gpu_lock.DEVICES_ENV_VAR, "0,1")
+
+
+def test_leases_take_free_devices_until_all_are_busy():
+    with gpu_lock.gpu_lock_nonblocking("training", "t1") as a:
+        with gpu_lock.gpu_lock_blocking("inference", "i1", project_key="p") as b:
+            assert (a.device, b.device) == ("0", "1")
+            assert b.env == {"CUDA_VISIBLE_DEVICES": "1"}
+            assert gpu_lock.read_gpu_tasks() == [
+                {"type": "training", "taskId": "t1", "device": "0", "priority": 0},
+                {
+                    "type": "inference",
+                    "taskId": "i1",
+                    "device": "1",
+                    "priority": 0,
+                    "projectKey": "p",
+                },
+            ]
+            with pytest.raises(portalocker.exceptions.LockException):
+                with gpu_lock.gpu_lock_nonblocking("training", "t2"):
+                    pass
+            # The failed attempt keeps t2's place in the GPU queue.
+            assert [w["taskId"] for w in gpu_lock.get_gpu_arbiter().waiters()] == ["t2"]
+        # Released slots are reused.
+        with gpu_lock.gpu_lock_nonblocking("training", "t2") as c:
+            assert c.device == "1"
+    assert gpu_lock.read_gpu_tasks() == []
+
+
+def test_fake_cpu_device_sets_no_environment(monkeypatch):
+    monkeypatch.setenv(gpu_lock.DEVICES_ENV_VAR, "cpu")
+    with gpu_lock.gpu_lock_blocking("inference", "i1") as lease:
+        assert lease.device == "cpu"
+        assert lease.env == {}
+
+
+def test_only_the_head_of_the_queue_takes_a_free_slot():
+    arbiter = gpu_lock.get_gpu_arbiter()
+    arbiter.join("inference", "i1")
+    with pytest.raises(portalocker.exceptions.LockException):
+        with gpu_lock.gpu_lock_nonblocking("training", "t1"):
+            pass
+    gpu_lock.withdraw_gpu_request("i1")
+    with gpu_lock.gpu_lock_nonblocking("training", "t1") as lease:
+        assert lease.device == "0"
+    assert arbiter.waiters() == []
+
+
+def test_blocking_wait_reports_position_and_can_be_cancelled(monkeypatch):
+    monkeypatch.setenv(gpu_lock.DEVICES_ENV_VAR, "0")
+    monkeypatch.setattr(gpu_lock, "_BLOCKING_POLL_SECONDS", 0.01)
+    positions = []
+    with gpu_lock.gpu_lock_nonblocking("training", "t1"):
+        with pytest.raises(gpu_lock.GpuWaitCancelled):
+            with gpu_lock.gpu_lock_blocking(
+                "inference", "i1", on_wait=positions.append, cancelled=lambda: bool(positions)
+            ):
+                pass
+    assert positions == [0]
+    assert gpu_lock.get_gpu_arbiter().waiters() == []
+
+
+def test_higher_priority_waiter_does_not_preempt_training(monkeypatch):
+    monkeypatch.setenv(gpu_lock.DEVICES_ENV_VAR, "0")
+    with gpu_lock.gpu_lock_nonblocking("training", "t1", priority=0):
+        # A higher priority goes first in the queue but waits for the slot to free up.
+        with pytest.raises(portalocker.exceptions.LockException):
+            with gpu_lock.gpu_lock_nonblocking("inference", "i1", priority=5):
+                pass
+        assert [t["taskId"] for t in gpu_lock.read_gpu_tasks()] == ["t1"]
+        assert [w["taskId"] for w in gpu_lock.get_gpu_arbiter().waiters()] == ["i1"]
+    with gpu_lock.gpu_lock_nonblocking("inference", "i1", priority=5):
+        assert [t["taskId"] for t in gpu_lock.read_gpu_tasks()] == ["i1"]
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import pytest
+
+from litpose_app.utils.log_follower import LogFollower
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "polling"])
+def follower(request):
+    return LogFollower(poll_interval_seconds=0.01, use_inotify=request.param)
+
+
+def test_partial_lines_are_buffered_and_fanned_out(follower, tmp_path):
+    log = tmp_path / "train_stdout.log"
+    log.write_text("epoch 1\nepo")
+
+    async def run():
+        async with follower.follow(log) as a, follower.follow(log) as b:
+            assert follower.follower_count(log) == 2
+            assert a.read_lines(log) == ["epoch 1"]
+
+            with open(log, "a") as f:
+                f.write("ch 2\nepoch 3")
+            assert await a.wait(5)
+            # Lines are read once, for every subscriber.
+            assert a.read_lines(log) == ["epoch 2"]
+            assert b.read_lines(log) == ["epoch 1", "epoch 2"]
+            assert a.read_lines(log, final=True) == ["epoch 3"]
+            assert b.read_lines(log) == ["epoch 3"]
+        assert follower.follower_count(log) == 0
+
+    asyncio.run(run())
+
+
+def test_late_subscriber_is_told_about_dropped_lines(tmp_path):
+    follower = LogFollower(poll_interval_seconds=0.01, max_lines=3)
+    log = tmp_path / "train_stdout.log"
+    # Progress bars redraw with \r; whitespace-only lines are kept, empty ones dropped.
+    log.write_text("a\nb\n\n  \nepoch 1: 50%\repoch 1: 100%\n")
+
+    async def run():
+        async with follower.follow(log) as sub:
+            assert sub.read_lines(log) == [
+                "[... 2 earlier lines not shown ...]", "  ", "epoch 1: 50%", "epoch 1: 100%"
+            ]
+
+    asyncio.run(run())
+
+
+def test_watched_file_replacement_wakes_subscribers(follower, tmp_path):
+    status = tmp_path / "train_status.json"
+    status.write_text("{}")
+
+    async def run():
+        async with follower.follow(watch=[status]) as sub:
+            tmp = tmp_path / "train_status.tmp"
+            tmp.write_text(json.dumps({"status": "COMPLETED"}))
+            tmp.rename(status)
+            assert await sub.wait(5)
+
+    asyncio.run(run())
+
+
+def test_stream_train_task_reads_logs_through_follower(client, register_project):
+    model_dir = register_project("proj") / "models" / "m1"
+    model_dir.mkdir(parents=True)
+    (model_dir / "train_stdout.log").write_text("line 1\nlast line without newline")
+    (model_dir / "train_stderr.log").write_text("warning\n")
+    (model_dir / "train_status.json").write_text(json.dumps({"status": "COMPLETED"}))
+
+    resp = client.get("/app/v0/rpc/models/proj/m1/stream")
+    assert resp.status_code == 200
+    events = [
+        json.loads(line[len("data: ") :])
+        for line in resp.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert events[0] == {"type": "log", "lines": ["line 1", "[stderr] warning"]}
+    assert events[1]["type"] == "status" and events[1]["status"] == "COMPLETED"
+    assert events[2] == {"type": "log", "lines": ["last line without newline"]}
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from litpose_app.utils.log_store import TaskLogStore
+
+
+def test_ring_spills_to_disk_with_random_access(tmp_path):
+    store = TaskLogStore(tmp_path, ring_size=10, spill_block_lines=4)
+    lines = [f"line {i}" for i in range(37)]
+    for ln in lines:
+        store.append("t1", ln)
+
+    assert store.count("t1") == 37
+    # Memory holds at most ring_size lines; the rest is on disk.
+    assert len(store._logs["t1"].ring) <= 10
+    assert store.spill_path("t1").exists()
+
+    assert store.get("t1") == lines
+    assert store.get("t1", 5, limit=3) == lines[5:8]
+    assert store.get("t1", 6, limit=20) == lines[6:26]
+    assert store.get("t1", 35) == lines[35:]
+    assert store.get("t1", 37) == []
+    assert store.get("unknown") == []
+
+
+def test_finished_tasks_are_evicted_lru(tmp_path):
+    store = TaskLogStore(tmp_path, ring_size=2, spill_block_lines=1, max_finished_tasks=2)
+    for tid in ("a", "b", "c"):
+        for i in range(5):
+            store.append(tid, f"{tid}{i}")
+
+    assert store.mark_finished("a") == []
+    assert store.mark_finished("b") == []
+    store.get("a")  # a is now more recently used than b
+    assert store.mark_finished("c") == ["b"]
+
+    assert store.get("b") == []
+    assert not store.spill_path("b").exists()
+    assert store.get("a") == [f"a{i}" for i in range(5)]
+
+
+def test_finished_tasks_expire_after_ttl(tmp_path):
+    store = TaskLogStore(tmp_path, finished_ttl_seconds=0)
+    store.append("running", "x")
+    store.append("done", "y")
+    store.mark_finished("done")
+
+    assert store.evict() == []  # already evicted by mark_finished
+    assert store.get("done") == []
+    assert store.get("running") == ["x"]
+
+
+def test_spill_file_of_an_earlier_process_is_replaced(tmp_path):
+    old = TaskLogStore(tmp_path, ring_size=2, spill_block_lines=1)
+    for i in range(5):
+        old.append("t1", f"old {i}")
+
+    # A resumed task logs from offset 0 again in a new process.
+    store = TaskLogStore(tmp_path, ring_size=2, spill_block_lines=1)
+    lines = [f"new {i}" for i in range(5)]
+    for ln in lines:
+        store.append("t1", ln)
+    assert store.get("t1") == lines
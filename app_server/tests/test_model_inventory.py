@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import time
+
+from litpose_app.train_queue import get_train_queue
+from litpose_app.utils.model_inventory import ModelInventoryService, classify
+
+
+def _touch(path, size, age=0.0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    t = time.time() - age
+    os.utime(path, (t, t))
+
+
+def _scan(service, model_dir, refresh=True):
+    _, future = service.inventory(model_dir, refresh=refresh)
+    return future.result(timeout=10)
+
+
+def test_classify():
+    assert classify("tb_logs/m/version_0/checkpoints/epoch=1-best.ckpt") == "checkpoint"
+    assert classify("video_preds/session_camA.csv") == "prediction"
+    assert classify("predictions_new.csv") == "prediction"
+    assert classify("train_stdout.log") == "log"
+    assert classify("tb_logs/m/version_0/events.out.tfevents.1.host") == "log"
+    assert classify("config.yaml") == "other"
+
+
+def test_scan_is_incremental(tmp_path, monkeypatch):
+    model_dir = tmp_path / "m1"
+    model_dir.mkdir()
+    (model_dir / "config.yaml").write_text("model: {model_name: m}\n")
+    t = time.time() - 3600
+    os.utime(model_dir / "config.yaml", (t, t))
+    run = model_dir / "tb_logs" / "m" / "version_0"
+    _touch(run / "checkpoints" / "epoch=9-step=90-best.ckpt", 100, age=3600)
+    _touch(run / "epoch=4-step=40.ckpt", 50, age=3600)
+    _touch(model_dir / "video_preds" / "s1.csv", 20, age=3600)
+    _touch(model_dir / "train_stdout.log", 5)
+    service = ModelInventoryService()
+
+    inv = _scan(service, model_dir)
+    # Only the checkpoint inference loads is best.
+    assert [(c.path.rsplit("/", 1)[-1], c.best) for c in inv.checkpoints] == [
+        ("epoch=9-step=90-best.ckpt", True),
+        ("epoch=4-step=40.ckpt", False),
+    ]
+    assert (inv.predictions.files, inv.predictions.bytes) == (1, 20)
+    assert inv.logs.bytes == 5
+    assert inv.total_bytes == 175 + len("model: {model_name: m}\n")
+    assert service.inventory(model_dir)[0] is inv
+
+    # Settled files in unchanged directories aren't stat'ed again; recent ones are.
+    stated = []
+    real_stat = os.stat
+
+    def counting_stat(path, *args, **kwargs):
+        stated.append(os.fspath(path))
+        return real_stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "stat", counting_stat)
+    with open(model_dir / "train_stdout.log", "a") as f:
+        f.write("more")
+    _touch(model_dir / "video_preds" / "s2.csv", 30, age=3600)
+    inv = _scan(service, model_dir)
+    monkeypatch.undo()
+    files = [p for p in stated if p.startswith(str(model_dir)) and not os.path.isdir(p)]
+    assert sorted(os.path.basename(p) for p in files) == ["s2.csv", "train_stdout.log"]
+    assert (inv.predictions.files, inv.predictions.bytes) == (2, 50)
+    assert inv.logs.bytes == 9
+
+
+def test_checkpoints_of_several_runs_are_not_pruned(tmp_path):
+    model_dir = tmp_path / "m1"
+    model_dir.mkdir()
+    (model_dir / "config.yaml").write_text("model: {model_name: m}\n")
+    runs = model_dir / "tb_logs" / "m"
+    _touch(runs / "version_0" / "checkpoints" / "epoch=3.ckpt", 10)
+    _touch(runs / "version_1" / "checkpoints" / "epoch=9.ckpt", 10)
+    service = ModelInventoryService()
+
+    # Inference loads version_0, but the finished run is version_1: neither is best.
+    inv = _scan(service, model_dir)
+    assert [c.best for c in inv.checkpoints] == [False, False]
+    assert service.prune_checkpoints(model_dir).files == []
+    assert len(list(runs.rglob("*.ckpt"))) == 2
+
+
+def test_inventory_and_prune_routes(client, register_project, override_config):
+    model_dir = register_project("proj") / "models" / "m1"
+    (model_dir / "config.yaml").parent.mkdir(parents=True)
+    (model_dir / "config.yaml").write_text("model:\n  model_name: m\n  backbone: resnet50\n")
+    (model_dir / "train_status.json").write_text(json.dumps({"status": "TRAINING"}))
+    best = "tb_logs/m/version_0/checkpoints/epoch=1-best.ckpt"
+    other = "tb_logs/m/version_0/epoch=0.ckpt"
+    _touch(model_dir / best, 100)
+    _touch(model_dir / other, 60)
+    _touch(model_dir / "video_preds" / "old.csv", 10, age=40 * 86400)
+    _touch(model_dir / "video_preds" / "new.csv", 10)
+
+    resp = client.post(
+        "/app/v0/rpc/getModelInventory", json={"projectKey": "proj", "waitSeconds": 10}
+    ).json()
+    [entry] = resp["models"]
+    assert entry["model_relative_path"] == "m1"
+    assert len(entry["inventory"]["checkpoints"]) == 2
+    assert entry["inventory"]["predictions"] == {"files": 2, "bytes": 20}
+
+    prune = {"projectKey": "proj", "modelRelativePaths": ["m1"]}
+    checkpoints = {**prune, "action": "non_best_checkpoints"}
+    assert client.post("/app/v0/rpc/pruneModelArtifacts", json=checkpoints).status_code == 409
+
+    # Still queued (e.g. about to be relaunched): refused whatever the status file says.
+    (model_dir / "train_status.json").write_text(json.dumps({"status": "COMPLETED"}))
+    queue = get_train_queue(override_config.LP_SYSTEM_DIR)
+    queue.enqueue("proj", model_dir)
+    assert client.post("/app/v0/rpc/pruneModelArtifacts", json=checkpoints).status_code == 409
+    queue.cancel(model_dir)
+
+    resp = client.post("/app/v0/rpc/pruneModelArtifacts", json={**checkpoints, "dryRun": True})
+    assert resp.json()["total_bytes"] == 60
+    assert (model_dir / other).exists()
+    resp = client.post("/app/v0/rpc/pruneModelArtifacts", json=checkpoints).json()
+    assert resp["models"][0]["files"] == [other]
+    assert not (model_dir / other).exists()
+
+    # A second training run makes the checkpoint to keep ambiguous.
+    _touch(model_dir / "tb_logs/m/version_1/checkpoints/epoch=0.ckpt", 60)
+    assert client.post("/app/v0/rpc/pruneModelArtifacts", json=checkpoints).status_code == 409
+    shutil.rmtree(model_dir / "tb_logs/m/version_1")
+
+    resp = client.post(
+        "/app/v0/rpc/pruneModelArtifacts", json={**prune, "action": "old_predictions"}
+    ).json()
+    assert resp["models"][0]["files"] == ["video_preds/old.csv"]
+
+    resp = client.post(
+        "/app/v0/rpc/getModelInventory",
+        json={"projectKey": "proj", "modelRelativePaths": ["m1"], "waitSeconds": 10},
+    ).json()
+    inventory = resp["models"][0]["inventory"]
+    assert [c["path"] for c in inventory["checkpoints"]] == [best]
+    assert inventory["predictions"] == {"files": 1, "bytes": 10}
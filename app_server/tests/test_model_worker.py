@@ -0,0 +1,111 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+WORKER = os.path.abspath("src/litpose_app/utils/inference/model_worker.py")
+
+
+def _run_worker(tmp_path, model_dir, jobs, results, env=None):
+    return subprocess.run(
+        [sys.executable, WORKER, str(model_dir), "--jobs", str(jobs),
+         "--results", str(results), "--profile", str(tmp_path / "batch_size_profile.json"),
+         "--fake"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+    )
+
+
+def test_worker_loads_once_and_reports_each_session(tmp_path):
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    jobs = tmp_path / "jobs.jsonl"
+    results = tmp_path / "results.jsonl"
+    jobs.write_text(
+        json.dumps({"index": 0, "session": "s1", "video_paths": ["s1_camA.mp4", "s1_camB.mp4"]})
+        + "\n"
+        + json.dumps({"index": 1, "session": "s2", "video_paths": ["s2_camA.mp4", "s2_camB.mp4"]})
+        + "\n"
+    )
+
+    proc = _run_worker(tmp_path, model_dir, jobs, results)
+
+    assert proc.returncode == 0, proc.stderr
+    events = [json.loads(line) for line in results.read_text().splitlines()]
+    assert [e["event"] for e in events] == ["model_loaded", "result", "result"]
+    assert [(e["index"], e["ok"]) for e in events[1:]] == [(0, True), (1, True)]
+    assert sorted(p.name for p in (model_dir / "video_preds").iterdir()) == [
+        "s1_camA.csv", "s1_camB.csv", "s2_camA.csv", "s2_camB.csv"
+    ]
+
+
+def test_worker_stops_at_first_failure(tmp_path):
+    jobs = tmp_path / "jobs.jsonl"
+    results = tmp_path / "results.jsonl"
+    jobs.write_text(
+        json.dumps({"index": 0, "session": "fail", "video_paths": ["fail.mp4"]}) + "\n"
+        + json.dumps({"index": 1, "session": "s2", "video_paths": ["s2.mp4"]}) + "\n"
+    )
+
+    proc = _run_worker(tmp_path, tmp_path, jobs, results)
+
+    assert proc.returncode == 1
+    events = [json.loads(line) for line in results.read_text().splitlines()]
+    assert events[-1]["index"] == 0 and not events[-1]["ok"]
+    assert "RuntimeError" in events[-1]["error"]
+
+
+def _write_video(path, n_frames):
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 10, (16, 16))
+    for _ in range(n_frames):
+        writer.write(np.zeros((16, 16, 3), np.uint8))
+    writer.release()
+
+
+def test_worker_backs_off_on_oom_and_reports_frame_progress(tmp_path):
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    videos = {name: str(tmp_path / f"{name}.mp4") for name in ("s1_camA", "s1_camB", "s2_camA")}
+    for video in videos.values():
+        _write_video(video, 40)
+    jobs = tmp_path / "jobs.jsonl"
+    results = tmp_path / "results.jsonl"
+    progress_file = tmp_path / "step0.progress"
+    jobs.write_text(
+        json.dumps(
+            {"index": 0, "session": "s1", "video_paths": [videos["s1_camA"], videos["s1_camB"]]}
+        )
+        + "\n"
+        + json.dumps({"index": 1, "session": "s2", "video_paths": [videos["s2_camA"]]})
+        + "\n"
+    )
+
+    proc = _run_worker(
+        tmp_path, model_dir, jobs, results,
+        env={
+            "LP_PROGRESS_FILE": str(progress_file),
+            "FAKE_PREDICT_FRAMES": "40",
+            "FAKE_PREDICT_MAX_BATCH": "20",
+        },
+    )
+
+    assert proc.returncode == 0, proc.stderr
+    events = [json.loads(line) for line in results.read_text().splitlines()]
+    assert [(e["index"], e["ok"]) for e in events[1:]] == [(0, True), (1, True)]
+    # The default batch size ran out of memory; smaller ones were tried until one fit,
+    # and later sessions kept it.
+    (entry,) = json.loads((tmp_path / "batch_size_profile.json").read_text()).values()
+    assert entry["max_ok"] <= 20 < entry["min_oom"]
+    assert proc.stdout.count("CUDA out of memory with batch size") >= 1
+    # Partial progress from the progress bar, then each video complete.
+    progress = [json.loads(line) for line in progress_file.read_text().splitlines()]
+    assert {"video": videos["s1_camA"], "done": 20, "total": 40} in [
+        {k: e[k] for k in ("video", "done", "total")} for e in progress
+    ]
+    done = {e["video"] for e in progress if e["done"] == e["total"] == 40}
+    assert done == set(videos.values())
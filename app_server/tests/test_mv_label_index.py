@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from litpose_app.utils import mv_label_index
+from litpose_app.utils.mv_label_index import MVLabelIndex, load_mv_label_index
+
+
+def _df(index: list[str], values: list[list[float]]) -> pd.DataFrame:
+    columns = pd.MultiIndex.from_product([["scorer"], ["nose"], ["x", "y"]])
+    return pd.DataFrame(values, index=index, columns=columns, dtype="float64")
+
+
+def test_index_aligns_rows_across_views():
+    dfs = {
+        "camA": _df(
+            [
+                "labeled-data/s1_camA/img0.png",
+                "labeled-data/s2_camA/img0.png",
+                "labeled-data/s1_camA/img1.png",
+            ],
+            [[1, 1], [2, 2], [3, 3]],
+        ),
+        # Different row order, and s1/img1 is missing from this view.
+        "camB": _df(
+            ["labeled-data/s2_camB/img0.png", "labeled-data/s1_camB/img0.png"],
+            [[20, 20], [10, 10]],
+        ),
+    }
+    index = MVLabelIndex.from_dfs(dfs)
+
+    rows = index.synchronized_rows(["s1"])
+    np.testing.assert_array_equal(rows, [[0], [1]])
+    np.testing.assert_array_equal(index.gather_p2ds(rows), [[[1, 1]], [[10, 10]]])
+
+    rows = index.synchronized_rows(["s1", "s2"])
+    np.testing.assert_array_equal(rows, [[0, 1], [1, 0]])
+
+
+def test_index_excludes_nan_rows_and_unknown_sessions():
+    dfs = {
+        "camA": _df(["labeled-data/s1_camA/img0.png", "other/img0.png"], [[1, 1], [2, 2]]),
+        "camB": _df(["labeled-data/s1_camB/img0.png", "other/img0.png"], [[np.nan, 1], [2, 2]]),
+    }
+    index = MVLabelIndex.from_dfs(dfs)
+
+    assert index.synchronized_rows(["s1"]).shape == (2, 0)
+    assert index.synchronized_rows(["missing"]).shape == (2, 0)
+
+
+def test_load_mv_label_index_is_cached_until_a_csv_changes(tmp_path, monkeypatch):
+    paths = {}
+    for view, value in [("camA", 1.0), ("camB", 2.0)]:
+        paths[view] = tmp_path / f"CollectedData_{view}.csv"
+        _df([f"labeled-data/s1_{view}/img0.png"], [[value, value]]).to_csv(paths[view])
+
+    index = load_mv_label_index(paths)
+    np.testing.assert_array_equal(index.synchronized_rows(["s1"]), [[0], [0]])
+
+    def fail(path):
+        raise AssertionError("label CSV re-read")
+
+    monkeypatch.setattr(mv_label_index, "read_label_csv", fail)
+    assert load_mv_label_index(paths) is index
+    monkeypatch.undo()
+
+    _df(
+        ["labeled-data/s1_camB/img0.png", "labeled-data/s1_camB/img1.png"],
+        [[2, 2], [3, 3]],
+    ).to_csv(paths["camB"])
+    assert load_mv_label_index(paths) is not index
+
+    # Views are selected and reordered to match a CameraGroup.
+    swapped = index.for_views(["camB", "camA"])
+    np.testing.assert_array_equal(swapped.gather_p2ds(swapped.rows), [[[2, 2]], [[1, 1]]])
@@ -1,7 +1,9 @@
 import json
 import os
+import shutil
 import subprocess
 import sys
+import time
 
 import pytest
 
@@ -20,18 +22,21 @@ def create_model_dir(tmp_path, name, model_type, backbone="resnet50"):
     config_path.write_text(f"model:\n  model_type: {model_type}\n  backbone: {backbone}\n")
     return str(model_dir)
 
-def run_wrapper(wrapper_path, model_dir, extra_args=None):
+def run_wrapper(wrapper_path, model_dir, extra_args=None, env=None):
     if extra_args is None:
         extra_args = []
 
-    # We use conda run -n lp to ensure 'yaml' is available in the wrapper
-    cmd = ["conda", "run", "-n", "lp", sys.executable, wrapper_path, "--fake", model_dir, "dummy_video.mp4"] + extra_args
+    profile = os.path.join(os.path.dirname(model_dir), "batch_size_profile.json")
+    cmd = [
+        sys.executable, wrapper_path, "--fake", "--profile", profile, model_dir, "dummy_video.mp4"
+    ] + extra_args
 
     result = subprocess.run(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        text=True
+        text=True,
+        env={**os.environ, **(env or {})},
     )
     return result
 
@@ -67,35 +72,82 @@ def test_non_oom_error_stops_retry(tmp_path, wrapper_paths):
     assert "Command failed with return code 1 (not an OOM error)" in result.stdout
     assert result.returncode == 1
 
-def test_caching_logic(tmp_path, wrapper_paths):
-    # Clear cache first
-    cache_file = "/tmp/litpose_predict_batch_size_cache.json"
-    if os.path.exists(cache_file):
-        os.remove(cache_file)
+def test_profile_converges_from_both_sides(tmp_path, wrapper_paths):
+    model_dir = create_model_dir(tmp_path, "profile_model", "heatmap", backbone="resnet18")
+    env = {"FAKE_PREDICT_MAX_BATCH": "40"}
+
+    # No profile yet: 96 OOMs, the retry at 48 OOMs, 24 succeeds.
+    result = run_wrapper(wrapper_paths["wrapper"], model_dir, env=env)
+    assert "Retrying with batch size 48" in result.stdout
+    assert "Success with batch size 24" in result.stdout
+
+    profile = json.loads((tmp_path / "batch_size_profile.json").read_text())
+    (key, entry), = profile.items()
+    assert key.startswith("resnet18|heatmap|")
+    assert (entry["max_ok"], entry["min_oom"]) == (24, 48)
+
+    # Later runs bisect between the known-good and known-OOM sizes.
+    sizes = []
+    for _ in range(4):
+        # Outputs of the previous run would otherwise count as predicted by this one.
+        shutil.rmtree(os.path.join(model_dir, "video_preds"), ignore_errors=True)
+        result = run_wrapper(wrapper_paths["wrapper"], model_dir, env=env)
+        assert result.returncode == 0
+        sizes.append(int(result.stdout.split("Success with batch size ")[1].split()[0]))
+    # Converged: within 1/8 of the true limit, and no longer changing.
+    assert 35 <= sizes[-1] <= 40
+    assert sizes[-1] == sizes[-2]
+
+    # A different backbone has its own entry.
+    model_dir_2 = create_model_dir(tmp_path, "other_model", "heatmap", backbone="resnet34")
+    result3 = run_wrapper(wrapper_paths["wrapper"], model_dir_2, env=env)
+    assert "dali.base.predict.sequence_length=96" in result3.stdout
 
-    model_dir = create_model_dir(tmp_path, "cache_model", "heatmap", backbone="resnet18")
 
-    # First run: start with 16, it fails (fake_predict OOMs > 8), retries with 8, succeeds.
-    result = run_wrapper(wrapper_paths["wrapper"], model_dir, ["--initial_batch_size", "16"])
+def test_profile_searches_upward_after_success(tmp_path, wrapper_paths):
+    model_dir = create_model_dir(tmp_path, "upward_model", "heatmap")
+    env = {"FAKE_PREDICT_MAX_BATCH": "1000"}
+
+    run_wrapper(wrapper_paths["wrapper"], model_dir, ["--initial_batch_size", "16"], env=env)
+    result = run_wrapper(wrapper_paths["wrapper"], model_dir, env=env)
+    assert "Success with batch size 32" in result.stdout
+
+
+def test_oom_attempt_is_killed_without_waiting_for_exit(tmp_path, wrapper_paths):
+    model_dir = create_model_dir(tmp_path, "hang_model", "heatmap")
+    t0 = time.monotonic()
+    result = run_wrapper(
+        wrapper_paths["wrapper"], model_dir, ["--initial_batch_size", "16"],
+        env={"FAKE_PREDICT_OOM_HANG": "60"},
+    )
     assert "Success with batch size 8" in result.stdout
+    assert time.monotonic() - t0 < 30
+    assert 'LP_METRICS {"frames": 10}' in result.stdout
 
-    # Check if cache file exists and has the value
-    assert os.path.exists(cache_file)
-    with open(cache_file) as f:
-        cache = json.load(f)
-    assert cache["resnet18_context_False"] == 8
 
-    # Second run: should use cached value 8 without retry
-    result2 = run_wrapper(wrapper_paths["wrapper"], model_dir)
-    assert "Using cached batch size 8 for resnet18_context_False" in result2.stdout
-    assert "Success with batch size 8" in result2.stdout
-    assert "Retrying" not in result2.stdout
+def test_drop_predicted_videos_keeps_unfinished_and_flags(tmp_path):
+    from litpose_app.utils.inference.predict_wrapper import drop_predicted_videos
+
+    model_dir = str(tmp_path)
+    preds = tmp_path / "video_preds"
+    preds.mkdir()
+    (preds / "a_camA.csv").write_text("x")
+    args = [model_dir, "/v/a_camA.mp4", "/v/b_camA.mp4", "--skip_viz"]
+
+    assert drop_predicted_videos(args, model_dir, since=0) == [model_dir, "/v/b_camA.mp4", "--skip_viz"]
+    # Predictions from before this run started don't count.
+    assert drop_predicted_videos(args, model_dir, since=time.time() + 60) == args
 
-    # Third run: different backbone, should NOT use the cached value for resnet18
-    model_dir_2 = create_model_dir(tmp_path, "other_model", "heatmap", backbone="resnet34")
-    result3 = run_wrapper(wrapper_paths["wrapper"], model_dir_2, ["--initial_batch_size", "8"])
-    assert "Using cached batch size 8 for resnet18_context_False" not in result3.stdout
 
-    # Clean up
-    if os.path.exists(cache_file):
-        os.remove(cache_file)
+def test_progress_channel_reports_each_video(tmp_path, wrapper_paths):
+    model_dir = create_model_dir(tmp_path, "progress_model", "heatmap")
+    progress_file = tmp_path / "step0.progress"
+    result = run_wrapper(
+        wrapper_paths["wrapper"], model_dir, ["--initial_batch_size", "8"],
+        env={"LP_PROGRESS_FILE": str(progress_file), "FAKE_PREDICT_FRAMES": "40"},
+    )
+
+    assert result.returncode == 0
+    events = [json.loads(line) for line in progress_file.read_text().splitlines()]
+    assert {e["video"] for e in events} == {"dummy_video.mp4"}
+    assert events[-1]["done"] == events[-1]["total"] == 40
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+from litpose_app.utils.prediction_cache import PredictionCache
+
+
+def _make_model(path: Path, weights: bytes) -> Path:
+    checkpoints = path / "tb_logs" / "m" / "version_0" / "checkpoints"
+    checkpoints.mkdir(parents=True)
+    (checkpoints / "epoch=9-best.ckpt").write_bytes(weights)
+    (path / "config.yaml").write_text("model: {model_name: m}")
+    (path / "train_status.json").write_text('{"status": "COMPLETED"}')
+    (path / "video_preds").mkdir()
+    return path
+
+
+def test_store_and_restore_are_keyed_by_model_and_video_content(tmp_path):
+    cache = PredictionCache(tmp_path / "cache")
+    model = _make_model(tmp_path / "m1", b"weights-1")
+    other_model = _make_model(tmp_path / "m2", b"weights-2")
+    video = tmp_path / "a_camA.mp4"
+    video.write_bytes(b"frames")
+    (model / "video_preds" / "a_camA.csv").write_text("preds")
+    (model / "video_preds" / "a_camA_temporal_norm.csv").write_text("norms")
+
+    assert not cache.contains(model, video)
+    assert cache.store(model, video)
+    assert cache.contains(model, video)
+    assert not cache.contains(other_model, video)
+
+    renamed = tmp_path / "b_camA.mp4"
+    renamed.write_bytes(b"frames")
+    assert cache.restore(model, renamed)
+    assert (model / "video_preds" / "b_camA.csv").read_text() == "preds"
+    assert (model / "video_preds" / "b_camA_temporal_norm.csv").read_text() == "norms"
+
+    different = tmp_path / "c_camA.mp4"
+    different.write_bytes(b"other frames")
+    assert not cache.restore(model, different)
+
+
+def test_eviction_keeps_cache_under_size_limit(tmp_path):
+    cache = PredictionCache(tmp_path / "cache", max_bytes=10)
+    model = _make_model(tmp_path / "m1", b"weights")
+    videos = []
+    for name in ("a", "b"):
+        video = tmp_path / f"{name}.mp4"
+        video.write_bytes(name.encode())
+        (model / "video_preds" / f"{name}.csv").write_text("x" * 8)
+        cache.store(model, video)
+        videos.append(video)
+
+    assert not cache.contains(model, videos[0])
+    assert cache.contains(model, videos[1])
+
+
+def test_model_key_covers_only_the_checkpoint_inference_loads(tmp_path):
+    model = _make_model(tmp_path / "m1", b"weights")
+    later_run = model / "tb_logs" / "m" / "version_1" / "checkpoints"
+    later_run.mkdir(parents=True)
+    (later_run / "epoch=3.ckpt").write_bytes(b"other weights")
+    key = PredictionCache(tmp_path / "cache").model_key(model)
+
+    # Pruning checkpoints inference doesn't use keeps cached predictions valid.
+    (later_run / "epoch=3.ckpt").unlink()
+    assert PredictionCache(tmp_path / "cache").model_key(model) == key
@@ -0,0 +1,44 @@
+import json
+import os
+
+from litpose_app.utils.prediction_index import PredictionIndex
+
+
+def test_listing_is_cached_until_directory_changes(tmp_path, monkeypatch):
+    preds = tmp_path / "video_preds"
+    preds.mkdir()
+    (preds / "s1_camA.csv").write_text("x")
+    index = PredictionIndex()
+    assert index.pred_mtime(tmp_path, "s1_camA.csv") is not None
+
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda p: scans.append(p) or real_scandir(p))
+    assert index.pred_mtime(tmp_path, "s1_camA.csv") is not None
+    assert index.pred_mtime(tmp_path, "s2_camA.csv") is None
+    assert scans == []
+
+    (preds / "s2_camA.csv").write_text("x")
+    os.utime(preds, ns=(0, os.stat(preds).st_mtime_ns + 1_000_000))
+    assert index.pred_mtime(tmp_path, "s2_camA.csv") is not None
+    assert len(scans) == 1
+
+
+def test_model_marker(tmp_path):
+    index = PredictionIndex()
+    assert not index.model_marker(tmp_path).completed
+
+    status = tmp_path / "train_status.json"
+    status.write_text(json.dumps({"status": "TRAINING"}))
+    assert not index.model_marker(tmp_path).completed
+
+    # Completed as of the checkpoint inference loads, not of the status write.
+    (tmp_path / "config.yaml").write_text("model: {model_name: m}\n")
+    ckpt = tmp_path / "tb_logs" / "m" / "version_0" / "checkpoints" / "epoch=9.ckpt"
+    ckpt.parent.mkdir(parents=True)
+    ckpt.write_bytes(b"")
+    os.utime(ckpt, (1000, 1500))
+    status.write_text(json.dumps({"status": "COMPLETED"}))
+    os.utime(status, (1000, 2000))
+    marker = index.model_marker(tmp_path)
+    assert marker.completed and marker.completed_at == 1500
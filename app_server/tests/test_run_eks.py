@@ -0,0 +1,95 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from litpose_app.scripts import run_eks
+
+
+def _write_preds(path: Path, n_frames: int, offset: float) -> str:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = "scorer,m,m,m\nbodyparts,nose,nose,nose\ncoords,x,y,likelihood\n"
+    rows = "".join(f"{i},{i + offset},{2 * i},1.0\n" for i in range(n_frames))
+    path.write_text(header + rows)
+    return str(path)
+
+
+def test_chunk_windows_hand_over_mid_overlap():
+    windows = run_eks.chunk_windows(n_frames=250, chunk_frames=100, overlap_frames=20)
+
+    assert windows == [
+        (0, 100, 0, 90),
+        (80, 180, 90, 170),
+        (160, 250, 170, 250),
+    ]
+
+
+def test_chunked_smoothing_streams_stitched_windows(tmp_path, monkeypatch):
+    n_frames = 250
+    files = [
+        _write_preds(tmp_path / f"m{j}" / "video_preds" / f"s1_{cam}.csv", n_frames, j)
+        for j in range(2)
+        for cam in ("camA", "camB")
+    ]
+    window_sizes = []
+
+    def fake_fit(input_files, save_dir, camera_names, smooth_param, quantile_keep_pca):
+        # "Smooth" by averaging members, and tag rows with their window's first frame.
+        camera_dfs = []
+        for cam in camera_names:
+            dfs = [
+                pd.read_csv(f, header=[0, 1, 2], index_col=0)
+                for f in input_files if cam in Path(f).name
+            ]
+            window_sizes.append(len(dfs[0]))
+            out = sum(dfs) / len(dfs)
+            out[("m", "nose", "likelihood")] = dfs[0].index[0]
+            camera_dfs.append(out.reset_index(drop=True))
+        return camera_dfs, None, None, None
+
+    monkeypatch.setattr(run_eks, "_fit_eks", fake_fit)
+    save_dir = tmp_path / "eks" / "video_preds"
+    frames = run_eks.smooth_session_chunked(
+        files, save_dir, ["camA", "camB"], 1000.0, 50.0, chunk_frames=100, overlap_frames=20
+    )
+
+    assert frames == n_frames
+    assert max(window_sizes) == 100
+    assert sorted(p.name for p in save_dir.iterdir()) == ["s1_camA.csv", "s1_camB.csv"]
+    out = pd.read_csv(save_dir / "s1_camA.csv", header=[0, 1, 2], index_col=0)
+    assert list(out.index) == list(range(n_frames))
+    assert (out[("m", "nose", "x")] == out.index + 0.5).all()
+    window_of = out[("m", "nose", "likelihood")]
+    assert window_of[89] == 0 and window_of[90] == 80 and window_of[170] == 160
+
+
+def test_concurrent_sessions_of_one_model_keep_their_own_outputs(tmp_path, monkeypatch):
+    barrier = threading.Barrier(2)
+
+    def fake_fit(input_files, save_dir, camera_names, smooth_param, quantile_keep_pca):
+        # Like eks: fixed output names, written while the other session is smoothing too.
+        session = Path(input_files[0]).stem.rsplit("_", 1)[0]
+        for cam in camera_names:
+            (save_dir / f"multicam_{cam}_results.csv").write_text(session)
+        barrier.wait(timeout=10)
+        return [], None, None, None
+
+    monkeypatch.setattr(run_eks, "_fit_eks", fake_fit)
+    save_dir = tmp_path / "eks" / "video_preds"
+    sessions = ["s1", "s2"]
+    with ThreadPoolExecutor(2) as pool:
+        futures = [
+            pool.submit(
+                run_eks.smooth_session,
+                [str(tmp_path / "m1" / "video_preds" / f"{s}_camA.csv")],
+                save_dir, ["camA"], 1000.0, 50.0,
+            )
+            for s in sessions
+        ]
+        for future in futures:
+            future.result()
+
+    assert sorted(p.name for p in save_dir.iterdir()) == ["s1_camA.csv", "s2_camA.csv"]
+    for s in sessions:
+        assert (save_dir / f"{s}_camA.csv").read_text() == s
@@ -0,0 +1,137 @@
+import json
+import struct
+
+from litpose_app.utils import train_metrics
+from litpose_app.utils.train_metrics import TrainMetrics
+
+
+def _varint(n):
+    out = b""
+    while True:
+        b, n = n & 0x7F, n >> 7
+        if n:
+            out += bytes([b | 0x80])
+        else:
+            return out + bytes([b])
+
+
+def _len_field(number, payload):
+    return _varint(number << 3 | 2) + _varint(len(payload)) + payload
+
+
+def _event(step, scalars):
+    """Serialize an Event with simple_value summaries, framed as a TFRecord."""
+    values = b"".join(
+        _len_field(1, _len_field(1, tag.encode()) + _varint(2 << 3 | 5) + struct.pack("<f", v))
+        for tag, v in scalars
+    )
+    data = _varint(2 << 3 | 0) + _varint(step) + _len_field(5, values)
+    return struct.pack("<Q", len(data)) + b"\0" * 4 + data + b"\0" * 4
+
+
+def test_reads_event_files_incrementally(tmp_path):
+    run = tmp_path / "tb_logs" / "version_0"
+    run.mkdir(parents=True)
+    events = run / "events.out.tfevents.123.host"
+    events.write_bytes(_event(0, [("train_loss", 2.0), ("epoch", 0.0)]))
+    metrics = TrainMetrics(tmp_path)
+    metrics.refresh()
+    first = metrics.delta()
+    assert first["series"] == {"train_loss": [[0, 2.0]]}
+    assert first["epoch"] == 0
+
+    # A record still being written is read once complete.
+    record = _event(10, [("train_loss", 1.5), ("val_loss", 1.75), ("epoch", 1.0)])
+    with open(events, "ab") as f:
+        f.write(record[:7])
+    metrics.refresh()
+    assert metrics.delta(first["cursor"])["series"] == {}
+    with open(events, "ab") as f:
+        f.write(record[7:])
+    metrics.refresh()
+    second = metrics.delta(first["cursor"])
+    assert second["series"] == {"train_loss": [[10, 1.5]], "val_loss": [[10, 1.75]]}
+    assert (second["epoch"], second["step"]) == (1, 10)
+
+
+def test_reads_csv_and_downsamples_long_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(train_metrics, "MAX_POINTS", 10)
+    csv_path = tmp_path / "metrics.csv"
+    csv_path.write_text("epoch,step,train_loss\n")
+    metrics = TrainMetrics(tmp_path)
+    for step in range(40):
+        with open(csv_path, "a") as f:
+            f.write(f"{step // 10},{step},{100 - step}\n")
+        metrics.refresh()
+
+    points = metrics.delta()["series"]["train_loss"]
+    assert len(points) <= 10
+    assert points[0] == [0, 100.0]
+    assert [step for step, _ in points] == sorted(step for step, _ in points)
+
+    # CSVLogger rewrites the file with a new header when a metric first appears.
+    rows = "".join(f"{s // 10},{s},{100 - s},\n" for s in range(40))
+    csv_path.write_text("epoch,step,train_loss,val_loss\n" + rows + "4,40,60,3.5\n")
+    cursor = metrics.delta()["cursor"]
+    metrics.refresh()
+    assert metrics.delta(cursor)["series"]["val_loss"] == [[40, 3.5]]
+
+
+def test_relaunched_run_continues_the_step_axis(tmp_path):
+    runs = tmp_path / "tb_logs" / "m"
+    (runs / "version_0").mkdir(parents=True)
+    (runs / "version_0" / "events.out.tfevents.1.host").write_bytes(
+        _event(0, [("train_loss", 2.0)]) + _event(10, [("train_loss", 1.5)])
+    )
+    metrics = TrainMetrics(tmp_path)
+    metrics.refresh()
+
+    # Relaunched: a new version whose steps start at 0 again.
+    (runs / "version_1").mkdir()
+    (runs / "version_1" / "events.out.tfevents.2.host").write_bytes(
+        _event(0, [("train_loss", 1.25)]) + _event(10, [("train_loss", 1.0)])
+    )
+    metrics._next_scan = 0.0
+    metrics.refresh()
+    delta = metrics.delta()
+    assert delta["series"]["train_loss"] == [[0, 2.0], [10, 1.5], [11, 1.25], [21, 1.0]]
+    assert delta["step"] == 21
+
+    # Read from scratch, runs are read in order.
+    fresh = TrainMetrics(tmp_path)
+    fresh.refresh()
+    assert fresh.delta()["series"] == delta["series"]
+
+
+def test_stream_train_metrics_ends_with_training(client, register_project):
+    model_dir = register_project("proj") / "models" / "m1"
+    model_dir.mkdir(parents=True)
+    (model_dir / "metrics.csv").write_text("epoch,step,train_loss\n0,5,1.25\n")
+    (model_dir / "train_status.json").write_text(json.dumps({"status": "COMPLETED"}))
+
+    resp = client.get("/app/v0/rpc/models/proj/m1/metrics/stream")
+    assert resp.status_code == 200
+    events = [
+        json.loads(line[len("data: ") :])
+        for line in resp.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert len(events) == 1
+    assert events[0]["series"] == {"train_loss": [[5, 1.25]]}
+
+
+def test_get_train_metrics_route(client, register_project):
+    model_dir = register_project("proj") / "models" / "m1"
+    model_dir.mkdir(parents=True)
+    (model_dir / "metrics.csv").write_text("epoch,step,train_loss\n0,5,1.25\n")
+    body = {"projectKey": "proj", "modelRelativePath": "m1"}
+
+    resp = client.post("/app/v0/rpc/getTrainMetrics", json=body)
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["series"] == {"train_loss": [[5, 1.25]]}
+    resp = client.post("/app/v0/rpc/getTrainMetrics", json={**body, "since": data["cursor"]})
+    assert resp.json()["series"] == {}
+
+    outside = {"projectKey": "proj", "modelRelativePath": "../../elsewhere"}
+    assert client.post("/app/v0/rpc/getTrainMetrics", json=outside).status_code == 400
@@ -0,0 +1,42 @@
+from litpose_app.train_queue import TrainQueue
+
+
+def _pop(queue):
+    entry = queue.peek()
+    queue.claim(entry.entry_id)
+    queue.remove(entry.entry_id)
+    return entry.model_dir.name
+
+
+def test_priority_then_position(tmp_path):
+    queue = TrainQueue(tmp_path / "q.sqlite")
+    for name in ("a", "b", "c"):
+        queue.enqueue("p", tmp_path / name)
+    queue.set_priority(tmp_path / "c", 5)
+    queue.move(tmp_path / "b", before=tmp_path / "a")
+
+    assert [_pop(queue) for _ in range(3)] == ["c", "b", "a"]
+    assert queue.peek() is None
+
+
+def test_projects_take_turns(tmp_path):
+    queue = TrainQueue(tmp_path / "q.sqlite")
+    for name in ("p1-a", "p1-b", "p1-c"):
+        queue.enqueue("p1", tmp_path / name)
+    for name in ("p2-a", "p2-b"):
+        queue.enqueue("p2", tmp_path / name)
+
+    assert [_pop(queue) for _ in range(5)] == ["p1-a", "p2-a", "p1-b", "p2-b", "p1-c"]
+
+
+def test_cancel_only_queued_entries(tmp_path):
+    queue = TrainQueue(tmp_path / "q.sqlite")
+    a = queue.enqueue("p", tmp_path / "a")
+    queue.enqueue("p", tmp_path / "b")
+    assert queue.claim(a.entry_id)
+
+    assert not queue.cancel(tmp_path / "a")
+    assert queue.cancel(tmp_path / "b")
+    assert [e.model_dir.name for e in queue.entries()] == ["a"]
+    # Enqueueing twice keeps the existing entry.
+    assert queue.enqueue("p", tmp_path / "a").entry_id == a.entry_id
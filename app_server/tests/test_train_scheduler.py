@@ -0,0 +1,210 @@
+import subprocess
+import sys
+import threading
+
+import portalocker
+import pytest
+
+from litpose_app import deps, train_scheduler
+from litpose_app.routes.models import TrainStatus
+from litpose_app.train_queue import get_train_queue
+from litpose_app.utils import gpu_lock, train_wakeup
+from litpose_app.utils.checkpoints import inference_checkpoint
+
+
+@pytest.fixture
+def model_dir(register_project, override_config, monkeypatch):
+    """A registered project's model dir, visible to the scheduler."""
+    monkeypatch.setattr(deps, "root_config", lambda: override_config)
+    base = register_project("proj") / "models"
+    base.mkdir()
+    return base
+
+
+@pytest.fixture
+def gpu_slots(tmp_path, monkeypatch):
+    """Configure the given GPU slots, with their lock files under tmp_path."""
+
+    def _configure(devices):
+        monkeypatch.setattr(gpu_lock, "GPU_LOCK_DIR", tmp_path)
+        monkeypatch.setenv(gpu_lock.DEVICES_ENV_VAR, devices)
+
+    return _configure
+
+
+def _fake_launch(launched):
+    def launch(d, env=None):
+        launched.append((d.name, (env or {}).get("CUDA_VISIBLE_DEVICES")))
+        train_scheduler._write_status(d / "train_status.json", TrainStatus(status="STARTED"))
+        return subprocess.Popen([sys.executable, "-c", "import time; time.sleep(0.3)"])
+
+    return launch
+
+
+def _add_pending(base, name):
+    d = base / name
+    d.mkdir()
+    train_scheduler._write_status(d / "train_status.json", TrainStatus(status="PENDING"))
+
+
+def test_create_train_task_wakes_scheduler(client, register_project, override_config, monkeypatch):
+    register_project("proj")
+    event = threading.Event()
+    monkeypatch.setattr(train_wakeup, "_wake_event", event)
+
+    resp = client.post(
+        "/app/v0/rpc/createTrainTask",
+        json={"projectKey": "proj", "modelName": "m1", "configYaml": "a: 1\n"},
+    )
+
+    assert resp.status_code == 200
+    assert event.is_set()
+    [entry] = get_train_queue(override_config.LP_SYSTEM_DIR).entries()
+    assert entry.model_dir.name == "m1"
+
+
+def test_scheduler_launches_next_task_when_training_exits(model_dir, gpu_slots, monkeypatch):
+    """PENDING dirs unknown to the queue are picked up by the startup scan."""
+    launched = []
+    monkeypatch.setattr(train_scheduler, "_launch_training", _fake_launch(launched))
+    gpu_slots("cpu")
+    _add_pending(model_dir, "m1")
+    _add_pending(model_dir, "m2")
+    wake = threading.Event()
+    scheduler = train_scheduler._TrainScheduler(wake, 2.0, 30.0)
+
+    # m2 keeps its place in the GPU queue, so the scheduler retries soon.
+    assert scheduler.run_once() == 2.0
+    assert scheduler.run_once() == 2.0
+    assert launched == [("m1", None)]
+
+    # The exit of the training wakes the loop without waiting for the fallback scan.
+    assert wake.wait(10)
+    scheduler.run_once()
+    assert launched == [("m1", None), ("m2", None)]
+    for active in scheduler.active.values():
+        active.proc.wait()
+
+
+def test_scheduler_releases_gpu_of_exited_training_despite_pid_reuse(
+    model_dir, gpu_slots, monkeypatch
+):
+    launched = []
+    monkeypatch.setattr(train_scheduler, "_launch_training", _fake_launch(launched))
+    # The reaped child's PID now belongs to some other process.
+    monkeypatch.setattr(train_scheduler, "_is_pid_alive", lambda pid: True)
+    gpu_slots("0")
+    _add_pending(model_dir, "m1")
+    wake = threading.Event()
+    scheduler = train_scheduler._TrainScheduler(wake, 2.0, 30.0)
+    scheduler.run_once()
+    assert len(scheduler.active) == 1
+
+    assert wake.wait(10)
+    scheduler.run_once()
+    assert scheduler.active == {}
+    assert gpu_lock.read_gpu_tasks() == []
+
+
+def test_scheduler_runs_one_training_per_gpu(model_dir, gpu_slots, monkeypatch):
+    launched = []
+    monkeypatch.setattr(train_scheduler, "_launch_training", _fake_launch(launched))
+    gpu_slots("0,1")
+    for name in ("m1", "m2", "m3"):
+        _add_pending(model_dir, name)
+    scheduler = train_scheduler._TrainScheduler(threading.Event(), 2.0, 30.0)
+
+    assert scheduler.run_once() == 2.0
+    assert launched == [("m1", "0"), ("m2", "1")]
+    assert [t["device"] for t in gpu_lock.read_gpu_tasks()] == ["0", "1"]
+    for active in scheduler.active.values():
+        active.proc.wait()
+
+
+def test_higher_priority_waiter_leaves_training_in_its_run(
+    model_dir, override_config, gpu_slots, monkeypatch
+):
+    ckpt = model_dir / "m1" / "tb_logs" / "m" / "version_0" / "checkpoints" / "epoch=1.ckpt"
+
+    def launch(d, env=None):
+        ckpt.parent.mkdir(parents=True)
+        ckpt.write_bytes(b"")
+        return subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+
+    monkeypatch.setattr(train_scheduler, "_launch_training", launch)
+    gpu_slots("0")
+    _add_pending(model_dir, "m1")
+    (model_dir / "m1" / "config.yaml").write_text("model: {model_name: m}\n")
+    get_train_queue(override_config.LP_SYSTEM_DIR).enqueue("proj", model_dir / "m1")
+    scheduler = train_scheduler._TrainScheduler(threading.Event(), 2.0, 30.0)
+    scheduler._next_reconcile = float("inf")
+    scheduler.run_once()
+    [active] = scheduler.active.values()
+
+    # A higher-priority inference at the head of the GPU queue waits for the slot:
+    # litpose train can't resume, so stopping the training would split it across runs.
+    gpu_lock.get_gpu_arbiter().join("inference", "i1", priority=5)
+    ckpt.touch()
+    scheduler.run_once()
+    assert active.proc.poll() is None
+    assert list(scheduler.active.values()) == [active]
+    assert [t["taskId"] for t in gpu_lock.read_gpu_tasks()] == ["train:proj:m1"]
+    assert [p.name for p in (model_dir / "m1" / "tb_logs" / "m").iterdir()] == ["version_0"]
+    assert inference_checkpoint(model_dir / "m1") == ckpt
+    active.proc.kill()
+    active.proc.wait()
+
+
+def test_scheduler_retries_soon_while_gpu_is_busy(model_dir, override_config, monkeypatch):
+    def busy(*args, **kwargs):
+        raise portalocker.exceptions.LockException()
+
+    monkeypatch.setattr(train_scheduler, "gpu_lock_nonblocking", busy)
+    scheduler = train_scheduler._TrainScheduler(threading.Event(), 2.0, 30.0)
+
+    assert scheduler.run_once() == 30.0
+    _add_pending(model_dir, "m1")
+    get_train_queue(override_config.LP_SYSTEM_DIR).enqueue("proj", model_dir / "m1")
+    assert scheduler.run_once() == 2.0
+    assert scheduler.active == {}
+
+
+def test_scheduler_drops_canceled_and_failed_entries(model_dir, override_config, gpu_slots):
+    gpu_slots("cpu")
+    queue = get_train_queue(override_config.LP_SYSTEM_DIR)
+    _add_pending(model_dir, "m1")
+    train_scheduler._write_status(
+        model_dir / "m1" / "train_status.json", TrainStatus(status="CANCELED")
+    )
+    queue.enqueue("proj", model_dir / "m1")
+    # A training launched by a previous scheduler, whose process is gone.
+    _add_pending(model_dir, "m2")
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    train_scheduler._write_status(
+        model_dir / "m2" / "train_status.json", TrainStatus(status="TRAINING", pid=dead.pid)
+    )
+    entry = queue.enqueue("proj", model_dir / "m2")
+    queue.claim(entry.entry_id)
+    queue.set_pid(entry.entry_id, dead.pid)
+    scheduler = train_scheduler._TrainScheduler(threading.Event(), 2.0, 30.0)
+    scheduler._next_reconcile = float("inf")
+
+    assert scheduler.run_once() == 30.0
+    assert queue.entries() == []
+    assert train_scheduler._read_status(model_dir / "m2" / "train_status.json").status == "FAILED"
+
+
+def test_cancel_train_task(client, register_project, override_config):
+    register_project("proj")
+    body = {"projectKey": "proj", "modelName": "m1", "configYaml": "a: 1\n"}
+    assert client.post("/app/v0/rpc/createTrainTask", json=body).status_code == 200
+
+    cancel = {"projectKey": "proj", "modelRelativePath": "m1"}
+    assert client.post("/app/v0/rpc/cancelTrainTask", json=cancel).status_code == 200
+    assert client.post("/app/v0/rpc/cancelTrainTask", json=cancel).status_code == 409
+
+    queue = client.post("/app/v0/rpc/listTrainQueue", json={}).json()
+    assert queue == {"entries": []}
+    [model] = client.post("/app/v0/rpc/listModels", json={"projectKey": "proj"}).json()["models"]
+    assert model["status"]["status"] == "CANCELED"
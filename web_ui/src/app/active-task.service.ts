@@ -5,10 +5,33 @@ import { takeUntilDestroyed } from '@angular/core/rxjs-interop';
 
 export type TaskType = 'inference' | 'training';
 
+export interface GpuSlotTask {
+  taskId: string;
+  type: TaskType;
+  device: string;
+  priority?: number;
+  projectKey?: string;
+}
+
+/** A task waiting for a GPU slot; position 0 takes the next free one. */
+export interface GpuQueueEntry {
+  taskId: string;
+  type: TaskType;
+  projectKey: string | null;
+  priority: number;
+  position: number;
+  waitingSeconds: number;
+}
+
+/** The first busy GPU slot's task at top level, plus every busy slot in `tasks`. */
 export interface ActiveTaskResponse {
   taskId: string | null;
   type?: TaskType;
+  device?: string;
   projectKey?: string;
+  tasks?: GpuSlotTask[];
+  devices?: string[];
+  queue?: GpuQueueEntry[];
 }
 
 @Injectable({
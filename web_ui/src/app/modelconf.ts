@@ -265,17 +265,72 @@ export interface EnsembleConfig {
   quantile_keep_pca: number;
 }
 
+/** The config fields the models table shows, sent instead of configs in the summary view. */
+export interface ModelSummary {
+  model_type: string | null;
+  backbone: string | null;
+  losses_to_use: string[];
+  max_epochs: number | null;
+  creation_datetime: string | null;
+  n_members: number | null;
+}
+
 export interface ModelListResponseEntry {
   model_name: string;
   model_relative_path: string;
   model_kind: 'normal' | 'eks';
-  config?: ModelConfig;
-  ensemble_config?: EnsembleConfig;
+  /** Left out (null) by listModels in the summary view; see SessionService.getModelConfig. */
+  config?: ModelConfig | null;
+  ensemble_config?: EnsembleConfig | null;
   status?: TrainStatus;
+  summary?: ModelSummary | null;
+}
+
+export interface ArtifactTotals {
+  files: number;
+  bytes: number;
+}
+
+export interface ModelInventory {
+  /** Best checkpoints are the ones inference uses; pruning keeps them. */
+  checkpoints: { path: string; bytes: number; mtime: number; best: boolean }[];
+  predictions: ArtifactTotals;
+  logs: ArtifactTotals;
+  other: ArtifactTotals;
+  total_bytes: number;
+  scanned_at: number;
+}
+
+export interface ModelInventoryResponse {
+  models: {
+    model_relative_path: string;
+    /** Null until the model's first background scan completes. */
+    inventory: ModelInventory | null;
+    scanning: boolean;
+  }[];
+  total_bytes: number;
+}
+
+export type PruneAction = 'non_best_checkpoints' | 'old_predictions';
+
+export interface PruneModelArtifactsResponse {
+  models: { model_relative_path: string; files: string[]; bytes: number }[];
+  total_bytes: number;
+}
+
+export interface ModelConfigResponse {
+  model_kind: 'normal' | 'eks';
+  config: ModelConfig | null;
+  ensemble_config: EnsembleConfig | null;
 }
 
 export interface ModelListResponse {
   models: ModelListResponseEntry[];
+  /** Pass as `since` to listModels to get only what changes after this response. */
+  cursor?: string | null;
+  /** True if models holds only the changed models and removed the removed paths. */
+  delta?: boolean;
+  removed?: string[];
 }
 
 export class mc_util {
@@ -288,17 +343,19 @@ export class mc_util {
   }
   get type(): ModelType | 'EKS' {
     if (this.isEks) return 'EKS';
-    if ((this.c!.model.losses_to_use?.length ?? 0) > 0) {
-      return this.c!.model.model_type.endsWith('mhcrnn')
-        ? ModelType.S_SUP_CTX
-        : ModelType.S_SUP;
+    const summary = this.m.summary;
+    const modelType = summary?.model_type ?? this.c?.model.model_type ?? '';
+    const losses = summary?.losses_to_use ?? this.c?.model.losses_to_use ?? [];
+    if (losses.length > 0) {
+      return modelType.endsWith('mhcrnn') ? ModelType.S_SUP_CTX : ModelType.S_SUP;
     } else {
-      return this.c!.model.model_type.endsWith('mhcrnn')
-        ? ModelType.SUP_CTX
-        : ModelType.SUP;
+      return modelType.endsWith('mhcrnn') ? ModelType.SUP_CTX : ModelType.SUP;
     }
   }
   get createdAt(): string | undefined {
+    if (this.m.summary?.creation_datetime) {
+      return this.m.summary.creation_datetime;
+    }
     if (this.isEks) {
       return (this.m.ensemble_config as any)?.creation_datetime;
     }
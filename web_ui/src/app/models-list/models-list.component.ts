@@ -62,7 +62,7 @@ export class ModelsListComponent implements OnInit, OnDestroy {
   selectedModel = model<ModelListResponseEntry | null>();
   inlineActionModel = model<ModelListResponseEntry | null>();
   actionSelectedModels = model<ModelListResponseEntry[]>([]);
-  private pollInterval?: number;
+  private destroyed = false;
 
   private queryParamsSub?: Subscription;
   private cdr = inject(ChangeDetectorRef);
@@ -97,23 +97,30 @@ export class ModelsListComponent implements OnInit, OnDestroy {
       })();
     });
 
-    this.pollInterval = setInterval(() => {
-      this.reloadModels();
-    }, 2500) as unknown as number;
+    this.pollModels();
   }
 
-  ngOnDestroy() {
-    if (this.pollInterval) {
-      clearInterval(this.pollInterval);
+  /** Long-poll for model changes until destroyed, backing off after a failure. */
+  private async pollModels() {
+    while (!this.destroyed) {
+      const ok = await this.reloadModels(25);
+      if (!ok) {
+        await new Promise((resolve) => setTimeout(resolve, 2500));
+      }
     }
+  }
+
+  ngOnDestroy() {
+    this.destroyed = true;
     if (this.queryParamsSub) {
       this.queryParamsSub.unsubscribe();
     }
   }
 
-  async reloadModels() {
+  /** Refresh the list with the changes since the last refresh; false if it failed. */
+  async reloadModels(waitSeconds = 0): Promise<boolean> {
     try {
-      const resp = await this.sessionService.listModels();
+      const resp = await this.sessionService.listModelsIncremental(waitSeconds);
       const newSelectedModelReference =
         resp.models.find(
           (m) =>
@@ -121,11 +128,13 @@ export class ModelsListComponent implements OnInit, OnDestroy {
         ) ?? null;
       this.models.set(resp);
       this.selectedModel.set(newSelectedModelReference);
+      return true;
     } catch {
       this.toast.showToast({
         content: 'Failed to refresh models list',
         variant: 'error',
       });
+      return false;
     }
   }
 
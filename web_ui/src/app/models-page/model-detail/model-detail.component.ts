@@ -9,11 +9,22 @@ import {
   signal,
   SimpleChanges,
 } from '@angular/core';
-import { ModelListResponseEntry, mc_util } from '../../modelconf';
+import {
+  ModelInventory,
+  ModelListResponseEntry,
+  mc_util,
+  PruneAction,
+} from '../../modelconf';
 import { ProjectInfoService } from '../../project-info.service';
+import { SessionService } from '../../session.service';
 import { ToastService } from '../../toast.service';
 import { HighlightDirective } from '../../highlight.directive';
-import { ModelTypeLabelPipe, PathPipe, YamlPipe } from '../../utils/pipes';
+import {
+  BytesPipe,
+  ModelTypeLabelPipe,
+  PathPipe,
+  YamlPipe,
+} from '../../utils/pipes';
 import { PathDisplayComponent } from '../../components/path-display/path-display.component';
 import { TerminalCommandComponent } from '../../components/terminal-command/terminal-command.component';
 
@@ -24,6 +35,7 @@ import { TerminalCommandComponent } from '../../components/terminal-command/term
     YamlPipe,
     PathPipe,
     ModelTypeLabelPipe,
+    BytesPipe,
     PathDisplayComponent,
     TerminalCommandComponent,
   ],
@@ -46,6 +58,7 @@ export class ModelDetailComponent implements OnChanges, OnDestroy {
 
     tabs.push(
       { id: 'tensorboard', label: 'Tensorboard' },
+      { id: 'storage', label: 'Storage' },
       //{ id: 'predictions', label: 'Predictions' },
     );
 
@@ -66,7 +79,17 @@ export class ModelDetailComponent implements OnChanges, OnDestroy {
   logs = signal<
     { filename: string; logUrl: string; content: string; nextOffset: number }[]
   >([]);
+  /** Full config of the selected model; listModels only sends summaries. */
+  protected modelConfig = signal<object | null>(null);
+  /** Disk usage of the selected model, loaded when the storage tab is shown. */
+  protected inventory = signal<ModelInventory | null>(null);
+  protected inventoryScanning = signal(false);
+  protected pruning = signal(false);
+  protected checkpointBytes = computed(() =>
+    (this.inventory()?.checkpoints ?? []).reduce((n, c) => n + c.bytes, 0),
+  );
   private projectInfoService = inject(ProjectInfoService);
+  private sessionService = inject(SessionService);
   private currentController: AbortController | null = null;
   private toast = inject(ToastService);
   private pollInterval?: number;
@@ -86,10 +109,15 @@ export class ModelDetailComponent implements OnChanges, OnDestroy {
     this.cleanup();
 
     this.logs.set([]);
+    this.loadConfig(this.selectedModel());
+    this.inventory.set(null);
 
     if (!this.tabs().some((t) => t.id === this.activeTab())) {
       this.activeTab.set('config');
     }
+    if (this.activeTab() === 'storage') {
+      this.loadInventory();
+    }
 
     if (!this.selectedModel()) {
       return;
@@ -146,6 +174,103 @@ export class ModelDetailComponent implements OnChanges, OnDestroy {
     }
   }
 
+  protected selectTab(id: string) {
+    this.activeTab.set(id);
+    if (id === 'storage') {
+      this.loadInventory();
+    }
+  }
+
+  protected async loadInventory(refresh = false) {
+    const model = this.selectedModel();
+    if (!model) return;
+    this.inventoryScanning.set(true);
+    try {
+      const resp = await this.sessionService.getModelInventory({
+        modelRelativePaths: [model.model_relative_path],
+        refresh,
+        waitSeconds: 10,
+      });
+      if (
+        this.selectedModel()?.model_relative_path !== model.model_relative_path
+      ) {
+        return;
+      }
+      this.inventory.set(resp.models[0]?.inventory ?? null);
+    } catch (error) {
+      this.toast.showToast({
+        content: 'Failed to load disk usage',
+        variant: 'error',
+      });
+      console.error('Error fetching model inventory:', error);
+    } finally {
+      this.inventoryScanning.set(false);
+    }
+  }
+
+  protected async prune(action: PruneAction) {
+    const model = this.selectedModel();
+    if (!model) return;
+    const paths = [model.model_relative_path];
+    this.pruning.set(true);
+    try {
+      const preview = await this.sessionService.pruneModelArtifacts(
+        paths,
+        action,
+        { dryRun: true },
+      );
+      if (preview.total_bytes === 0) {
+        this.toast.showToast({ content: 'Nothing to remove', variant: 'info' });
+        return;
+      }
+      const what =
+        action === 'non_best_checkpoints'
+          ? 'non-best checkpoints'
+          : 'prediction files older than 30 days';
+      const count = preview.models[0].files.length;
+      if (!window.confirm(`Remove ${count} ${what}?`)) return;
+      const result = await this.sessionService.pruneModelArtifacts(
+        paths,
+        action,
+      );
+      this.toast.showToast({
+        content: `Removed ${result.models[0].files.length} files`,
+        variant: 'success',
+      });
+      await this.loadInventory(true);
+    } catch (error) {
+      this.toast.showToast({
+        content: 'Failed to remove files',
+        variant: 'error',
+      });
+      console.error('Error pruning model artifacts:', error);
+    } finally {
+      this.pruning.set(false);
+    }
+  }
+
+  private async loadConfig(model: ModelListResponseEntry | null) {
+    this.modelConfig.set(model?.config ?? model?.ensemble_config ?? null);
+    if (!model || this.modelConfig()) return;
+    try {
+      const resp = await this.sessionService.getModelConfig(
+        model.model_relative_path,
+      );
+      // Ignore the answer if another model was selected meanwhile.
+      if (
+        this.selectedModel()?.model_relative_path === model.model_relative_path
+      ) {
+        this.modelConfig.set(resp.config ?? resp.ensemble_config);
+      }
+    } catch (error) {
+      this.toast.showToast({
+        content: `Failed to load ${this.configLabel()}`,
+        variant: 'error',
+      });
+      console.error('Error fetching model config:', error);
+    }
+  }
+
   private logPollIter(options?: { initial: boolean }) {
     // On initial we always fetch. On subsequent polls, only fetch if we're on the logs tab.
     if (!options?.initial && this.activeTab() !== 'logs') return;
@@ -1,5 +1,5 @@
 import { inject, Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpErrorResponse } from '@angular/common/http';
 import { firstValueFrom, Observable } from 'rxjs';
 
 @Injectable({
@@ -20,4 +20,38 @@ export class RpcService {
     const observable = this.callObservable(method, params);
     return firstValueFrom(observable);
   }
+
+  /** Last response with an ETag per method and params, revalidated by callConditional. */
+  private etagCache = new Map<string, { etag: string; body: unknown }>();
+
+  /**
+   * Like call(), for polled RPCs that send an ETag: sends If-None-Match with the last
+   * ETag and resolves to the previous response (the same object) on 304 Not Modified.
+   */
+  async callConditional(method: string, params?: any): Promise<unknown> {
+    const key = `${method}:${JSON.stringify(params ?? null)}`;
+    const cached = this.etagCache.get(key);
+    const headers: Record<string, string> = { 'Content-type': 'application/json' };
+    if (cached) {
+      headers['If-None-Match'] = cached.etag;
+    }
+    try {
+      const resp = await firstValueFrom(
+        this.http.post(`/app/v0/rpc/${method}`, params ?? null, {
+          headers,
+          observe: 'response',
+        }),
+      );
+      const etag = resp.headers.get('ETag');
+      if (etag) {
+        this.etagCache.set(key, { etag, body: resp.body });
+      }
+      return resp.body;
+    } catch (e) {
+      if (cached && e instanceof HttpErrorResponse && e.status === 304) {
+        return cached.body;
+      }
+      throw e;
+    }
+  }
 }
@@ -23,7 +23,13 @@ import {
   GetMVAutoLabelsResponse,
 } from './labeler/mv-autolabel';
 import _ from 'lodash';
-import { ModelListResponse } from './modelconf';
+import {
+  ModelConfigResponse,
+  ModelInventoryResponse,
+  ModelListResponse,
+  PruneAction,
+  PruneModelArtifactsResponse,
+} from './modelconf';
 
 type SessionModelMap = Record<string, string[]>;
 
@@ -634,14 +640,71 @@ export class SessionService {
     });
   }
 
-  /** Return all model entries for the current project. */
-  async listModels(): Promise<ModelListResponse> {
+  /** Merged model list and cursor of the last listModelsIncremental call. */
+  private modelsSnapshot: {
+    projectKey: string;
+    cursor: string;
+    models: ModelListResponseEntry[];
+  } | null = null;
+
+  /**
+   * Return all model entries for the current project, fetching only those changed since
+   * the previous call. If nothing changed, the server waits up to waitSeconds for a change;
+   * an unchanged list is returned as the same array.
+   */
+  async listModelsIncremental(waitSeconds = 0): Promise<ModelListResponse> {
+    const projectKey = this.getProjectKeyOrThrow();
+    const prev =
+      this.modelsSnapshot?.projectKey === projectKey ? this.modelsSnapshot : null;
     const resp = (await this.rpc.call('listModels', {
+      projectKey,
+      view: 'summary',
+      ...(prev ? { since: prev.cursor, waitSeconds } : {}),
+    })) as ModelListResponse;
+    let models = resp.models;
+    if (prev && resp.delta) {
+      if (resp.models.length === 0 && !resp.removed?.length) {
+        return { models: prev.models };
+      }
+      const byPath = new Map(prev.models.map((m) => [m.model_relative_path, m]));
+      for (const path of resp.removed ?? []) {
+        byPath.delete(path);
+      }
+      for (const m of resp.models) {
+        byPath.set(m.model_relative_path, m);
+      }
+      // Server order: top-level models first, then those in subdirectories, by path.
+      const depth = (m: ModelListResponseEntry) =>
+        m.model_relative_path.includes('/') ? 1 : 0;
+      models = [...byPath.values()].sort(
+        (a, b) =>
+          depth(a) - depth(b) ||
+          (a.model_relative_path < b.model_relative_path ? -1 : 1),
+      );
+    }
+    if (resp.cursor) {
+      this.modelsSnapshot = { projectKey, cursor: resp.cursor, models };
+    }
+    return { models };
+  }
+
+  /** Return all model entries for the current project, with summaries instead of configs. */
+  async listModels(): Promise<ModelListResponse> {
+    const resp = (await this.rpc.callConditional('listModels', {
       projectKey: this.getProjectKeyOrThrow(),
+      view: 'summary',
     })) as ModelListResponse;
     return resp;
   }
 
+  /** Return the full config (or ensemble config) of one model. */
+  async getModelConfig(modelRelativePath: string): Promise<ModelConfigResponse> {
+    return (await this.rpc.call('getModelConfig', {
+      projectKey: this.getProjectKeyOrThrow(),
+      modelRelativePath,
+    })) as ModelConfigResponse;
+  }
+
   /** Start a background inference task for the given models and sessions, returning the task ID. */
   async inferTask(
     models: string[],
@@ -749,6 +812,35 @@ export class SessionService {
       newModelName,
     });
   }
+
+  /**
+   * Return the disk usage of models (all of the project's if modelRelativePaths is omitted).
+   * Scans run in the background; waitSeconds bounds how long to wait for pending ones.
+   */
+  async getModelInventory(options?: {
+    modelRelativePaths?: string[];
+    refresh?: boolean;
+    waitSeconds?: number;
+  }): Promise<ModelInventoryResponse> {
+    return (await this.rpc.call('getModelInventory', {
+      projectKey: this.getProjectKeyOrThrow(),
+      ...options,
+    })) as ModelInventoryResponse;
+  }
+
+  /** Remove non-best checkpoints or prediction files older than olderThanDays from models. */
+  async pruneModelArtifacts(
+    modelRelativePaths: string[],
+    action: PruneAction,
+    options?: { olderThanDays?: number; dryRun?: boolean },
+  ): Promise<PruneModelArtifactsResponse> {
+    return (await this.rpc.call('pruneModelArtifacts', {
+      projectKey: this.getProjectKeyOrThrow(),
+      modelRelativePaths,
+      action,
+      ...options,
+    })) as PruneModelArtifactsResponse;
+  }
 }
 
 export type TranscodeStatus = 'PENDING' | 'ACTIVE' | 'DONE' | 'ERROR';
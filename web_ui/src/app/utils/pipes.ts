@@ -41,3 +41,23 @@ export class YamlPipe implements PipeTransform {
     return stringify(value);
   }
 }
+
+@Pipe({
+  name: 'bytes',
+  standalone: true,
+})
+export class BytesPipe implements PipeTransform {
+  transform(value: number | null | undefined): string {
+    if (value === null || value === undefined) {
+      return '';
+    }
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let val = value;
+    let idx = 0;
+    while (val >= 1024 && idx < units.length - 1) {
+      val /= 1024;
+      idx++;
+    }
+    return `${idx === 0 ? val : val.toFixed(1)} ${units[idx]}`;
+  }
+}